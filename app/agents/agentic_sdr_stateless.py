@@ -4,9 +4,10 @@ Cada requisição é completamente isolada e independente
 Não há estado compartilhado entre conversas
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-import pytz
+import asyncio
+import time
 import re
 import traceback
 
@@ -16,8 +17,14 @@ from app.core.model_manager import ModelManager
 from app.core.multimodal_processor import MultimodalProcessor
 from app.core.lead_manager import LeadManager
 from app.core.context_analyzer import ContextAnalyzer
+from app.core.history_builder import build_history
+from app.core.media_history import compact_media, content_text, describe_image, media_fingerprint
+from app.core.prompt_registry import get_prompt_registry
+from app.core.tool_schemas import select_specs
 from app.services.conversation_monitor import get_conversation_monitor
+from app.services.response_cache import get_response_cache
 from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
 from app.core.response_formatter import response_formatter
 from app.utils.time_utils import get_period_of_day
 from app.config import settings
@@ -39,10 +46,32 @@ from app.tools.followup_nautico_tools import FollowUpNauticoTools
 from app.services.audio_service import AudioService
 
 
+# Tools de uma mesma resposta rodam em paralelo; estas esperam as listadas terminarem.
+# Repetições do mesmo tool também rodam em sequência.
+TOOL_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    "calendar.schedule_meeting": ("calendar.check_availability", "calendar.suggest_times", "calendar.cancel_meeting"),
+    "calendar.reschedule_meeting": ("calendar.check_availability", "calendar.suggest_times"),
+    "crm.update_stage": ("calendar.schedule_meeting", "calendar.reschedule_meeting", "calendar.cancel_meeting"),
+    "followup.schedule": ("calendar.schedule_meeting",),
+}
+
+# Tools sem efeito colateral: podem ser canceladas no timeout. As demais (agendar,
+# atualizar CRM...) seguem rodando em background e a resposta ao modelo fica "pending"
+READ_ONLY_TOOLS = frozenset({
+    "knowledge.search",
+    "calendar.check_availability",
+    "calendar.suggest_times",
+})
+
+# Resposta padrão quando a segunda chamada após as tools falha (nunca vai para o cache de FAQ)
+TOOL_FALLBACK_RESPONSE = "As informações foram processadas com sucesso. Como posso ajudar mais?"
+
+
 class AgenticSDRStateless:
     """
     SDR Agent STATELESS - Cada requisição é isolada
-    Sem singleton, sem estado compartilhado
+    O grafo de serviços é compartilhado (ver get_agentic_sdr), mas todo
+    estado de conversa vive apenas no execution_context
     100% thread-safe e multi-tenant
     """
 
@@ -679,6 +708,9 @@ class AgenticSDRStateless:
                 f"Processando lead e histórico..."
             )
             conversation_history, lead_info = await self._update_context(message, conversation_history, lead_info, execution_context.get("media"))
+            if execution_context.get("media"):
+                # Versão persistível do turno: mídias como referência + texto extraído
+                execution_context["user_message_text"] = content_text(conversation_history[-1]["content"])
             emoji_logger.system_success(
                 f"Contexto atualizado - Lead: {lead_info.get('name', 'N/A')}, "
                 f"Histórico: {len(conversation_history)} msgs"
@@ -807,133 +839,73 @@ class AgenticSDRStateless:
                 execution_context.get("lead_info", {})
             )
 
-    async def _update_context(self, message: str, conversation_history: list, lead_info: dict, media_data: dict) -> tuple[list, dict]:
+    async def _update_context(self, message: str, conversation_history: list, lead_info: dict, media_data) -> tuple[list, dict]:
         """
         Prepara a mensagem do usuário, atualiza o histórico, enriquece as informações
         do lead e persiste as mudanças no banco de dados de forma atômica.
+        media_data pode ser uma mídia (dict) ou todas as mídias do lote do buffer (list).
         """
         emoji_logger.system_debug("📝 PREPARAÇÃO MENSAGEM - Adicionando mensagem do usuário ao histórico...")
         
         # 1. Adicionar nova mensagem do usuário ao histórico
         user_message_content = [{"type": "text", "text": message}]
-        if media_data:
-            emoji_logger.system_debug("📎 PROCESSAMENTO MÍDIA - Detectada mídia na mensagem...")
-            # (O restante do código de processamento de mídia permanece o mesmo)
-            if media_data.get("type") == "error":
-                raise ValueError(media_data.get("content", "Erro ao processar mídia."))
-            media_content = media_data.get("content") or media_data.get("data", "")
-            mime_type = media_data.get("mimetype", "application/octet-stream")
-            if "base64," in media_content:
-                media_content = media_content.split("base64,")[1]
-            user_message_content.append({
-                "type": "media",
-                "media_data": {"mime_type": mime_type, "content": media_content}
-            })
-            emoji_logger.multimodal_event(f"📎 Mídia do tipo {mime_type} adicionada.")
-            emoji_logger.system_info(f"🔍 INICIANDO PROCESSAMENTO MÍDIA: mime_type={mime_type}")
-            media_result = await self.multimodal.process_media(media_data)
-            emoji_logger.system_info(f"🔍 RESULTADO PROCESSAMENTO: success={media_result.get('success')}")
-            # Injetar transcrição de áudio como texto adicional para o LLM
-            try:
-                if media_result.get('success') and media_result.get('type') == 'audio':
-                    audio_text = media_result.get('text', '').strip()
-                    if audio_text:
-                        user_message_content.append({
-                            "type": "text",
-                            "text": f"[Áudio] {audio_text}"
-                        })
-                        emoji_logger.multimodal_event(
-                            f"📝 Transcrição injetada no histórico ({len(audio_text)} chars)"
-                        )
-            except Exception as ie:
-                emoji_logger.system_warning(f"Falha ao injetar transcrição no histórico: {ie}")
-            if media_result.get("success"):
-                analysis = media_result.get("analysis", {})
-                
-                # Processar comprovante de pagamento do Náutico
-                extracted_payment_value = analysis.get("payment_value")
-                if extracted_payment_value:
-                    lead_info['membership_interest'] = 8  # Alto interesse por enviar comprovante
-                    emoji_logger.system_info(f"Pagamento de R${extracted_payment_value} detectado - interesse alto definido.")
-                
-                # Debug: Verificar se chegou na análise de pagamento
-                emoji_logger.system_info(f"🔍 ANÁLISE MÍDIA: analysis.keys()={list(analysis.keys()) if analysis else 'None'}")
-                emoji_logger.system_info(f"🔍 IS_PAYMENT_RECEIPT: {analysis.get('is_payment_receipt') if analysis else 'No analysis'}")
-                
-                # Processar comprovante de pagamento do Náutico
-                if analysis.get("is_payment_receipt"):
-                    # VERIFICAÇÃO CRÍTICA: Evitar reprocessamento se pagamento já foi validado OU lead já qualificado
-                    already_validated = lead_info.get('is_valid_nautico_payment', False)
-                    current_stage = lead_info.get('current_stage', '').upper()
-                    
-                    # DEBUG: Verificar dados do lead
-                    emoji_logger.system_info(f"🔍 DEBUG LEAD STATUS: already_validated={already_validated}, current_stage='{current_stage}', lead_id={lead_info.get('id')}")
-                    
-                    if already_validated or current_stage == 'QUALIFICADO':
-                        emoji_logger.system_info(
-                            "🔒 COMPROVANTE IGNORADO - Lead já validado/qualificado. "
-                            f"Status: {current_stage}, Pagamento original: R${lead_info.get('payment_value', 'N/A')}"
-                        )
-                        # Não processar novamente, manter os dados existentes
-                    else:
-                        emoji_logger.system_info("🆕 PRIMEIRO COMPROVANTE - Processando validação de pagamento")
-                        
-                        payment_value = analysis.get("payment_value")
-                        payer_name = analysis.get("payer_name")
-                        is_valid_payment = analysis.get("is_valid_nautico_payment", False)
-                        
-                        # Armazenar informações do pagamento no lead_info
-                        lead_info['payment_value'] = payment_value
-                        lead_info['payer_name'] = payer_name
-                        lead_info['is_valid_nautico_payment'] = is_valid_payment
-                    
-                    # Usar valores atuais (novos ou existentes)
-                    current_payment_value = lead_info.get('payment_value')
-                    current_payer_name = lead_info.get('payer_name')
-                    current_is_valid = lead_info.get('is_valid_nautico_payment', False)
-                    
-                    emoji_logger.multimodal_event(
-                        f"💰 Comprovante detectado - Valor: R${current_payment_value}, "
-                        f"Pagador: {current_payer_name}, Válido: {current_is_valid}"
-                    )
-                    
-                    # Debug adicional
-                    emoji_logger.system_info(f"🔍 DEBUG: is_valid_payment={current_is_valid}, payment_value={current_payment_value}")
-                    
-                    # Se o comprovante é válido, qualificar automaticamente o lead (APENAS se ainda não foi qualificado)
-                    emoji_logger.system_info(f"🔍 CONDIÇÃO QUALIFICAÇÃO: is_valid_payment={current_is_valid}, payment_value={current_payment_value}")
-                    
-                    # VERIFICAÇÃO ADICIONAL: Evitar requalificação se já está qualificado
-                    current_stage = lead_info.get('current_stage', '').upper()
-                    if current_stage == 'QUALIFICADO':
-                        emoji_logger.system_info("🔒 LEAD JÁ QUALIFICADO - Ignorando nova tentativa de qualificação")
-                    elif current_is_valid and current_payment_value and not already_validated:
-                        emoji_logger.system_info("🎯 INICIANDO qualificação automática do lead")
-                        try:
-                            emoji_logger.system_info("🎯 Qualificando automaticamente lead com comprovante válido")
-                            
-                            # Mover para "Qualificado" usando a instância já inicializada com CRM service
-                            qualification_result = await self.stage_tools.move_to_qualificado(
-                                lead_info=lead_info,
-                                payment_value=str(current_payment_value),
-                                payment_valid=True,
-                                notes=f"Qualificado automaticamente - Comprovante de pagamento válido de R${current_payment_value}"
-                            )
-                            
-                            if qualification_result.get("success"):
-                                emoji_logger.system_success(
-                                    f"✅ Lead qualificado automaticamente - Pagamento R${current_payment_value} confirmado"
-                                )
-                                lead_info.update(qualification_result.get("updated_lead_info", {}))
-                            else:
-                                emoji_logger.system_error(
-                                    f"Erro ao qualificar lead automaticamente: {qualification_result.get('message')}"
-                                )
-                                
-                        except Exception as e:
-                            emoji_logger.system_error("AUTO_QUALIFICATION_ERROR", f"Erro na qualificação automática: {e}")
-            else:
-                emoji_logger.system_warning(f"Falha na extração de texto da mídia: {media_result.get('message')}")
+        media_items = [m for m in (media_data if isinstance(media_data, list) else [media_data]) if m]
+        if media_items:
+            emoji_logger.system_debug(f"📎 PROCESSAMENTO MÍDIA - {len(media_items)} mídia(s) na mensagem...")
+            failed_items = [m for m in media_items if m.get("type") == "error"]
+            valid_items = [m for m in media_items if m.get("type") != "error"]
+            if failed_items and not valid_items:
+                raise ValueError(failed_items[0].get("content", "Erro ao processar mídia."))
+            for failed in failed_items:
+                # Lote com outras mídias válidas: registrar a falha sem descartar o restante
+                user_message_content.append({
+                    "type": "text",
+                    "text": f"[Mídia não recebida] {failed.get('content', '')}"
+                })
+            media_parts = []
+            for item in valid_items:
+                media_content = item.get("content") or item.get("data", "")
+                mime_type = item.get("mimetype", "application/octet-stream")
+                if "base64," in media_content:
+                    media_content = media_content.split("base64,")[1]
+                media_part = {
+                    "type": "media",
+                    "media_data": {"mime_type": mime_type, "content": media_content},
+                    "sha256": media_fingerprint(media_content)
+                }
+                media_parts.append(media_part)
+                user_message_content.append(media_part)
+                emoji_logger.multimodal_event(f"📎 Mídia do tipo {mime_type} adicionada.")
+
+            # OCR/transcrição (e descrição de imagens, se habilitada) de todas as mídias em
+            # paralelo; efeitos no lead aplicados em ordem
+            emoji_logger.system_info(f"🔍 INICIANDO PROCESSAMENTO MÍDIA: {len(valid_items)} item(ns)")
+            media_results, descriptions = await asyncio.gather(
+                asyncio.gather(
+                    *(self.multimodal.process_media(item) for item in valid_items),
+                    return_exceptions=True
+                ),
+                asyncio.gather(
+                    *(
+                        describe_image(self.model_manager, part)
+                        if part["media_data"]["mime_type"].startswith("image/") else asyncio.sleep(0)
+                        for part in media_parts
+                    ),
+                    return_exceptions=True
+                )
+            )
+            for media_part, media_result, description in zip(media_parts, media_results, descriptions):
+                if isinstance(media_result, Exception):
+                    media_result = {"success": False, "message": str(media_result)}
+                emoji_logger.system_info(f"🔍 RESULTADO PROCESSAMENTO: success={media_result.get('success')}")
+                # Texto que representa a mídia no histórico depois deste turno
+                # (a transcrição de áudio já entra como texto no próprio turno)
+                extracted = [description] if isinstance(description, str) else []
+                if media_result.get("success") and media_result.get("type") != "audio" and media_result.get("text"):
+                    extracted.append(media_result["text"])
+                if extracted:
+                    media_part["extracted_text"] = " ".join(extracted)
+                await self._apply_media_result(media_result, lead_info, user_message_content)
 
         user_message = {"role": "user", "content": user_message_content, "timestamp": datetime.now().isoformat()}
         conversation_history.append(user_message)
@@ -1000,6 +972,113 @@ class AgenticSDRStateless:
         emoji_logger.system_success("✅ CONTEXTO ATUALIZADO - Histórico e lead_info finalizados")
         return conversation_history, updated_lead_info
 
+    async def _apply_media_result(self, media_result: dict, lead_info: dict, user_message_content: list) -> None:
+        """
+        Aplica o resultado de uma mídia processada: injeta a transcrição de áudio no turno
+        do usuário e valida comprovantes de pagamento (qualificação automática)
+        """
+        # Injetar transcrição de áudio como texto adicional para o LLM
+        try:
+            if media_result.get('success') and media_result.get('type') == 'audio':
+                audio_text = media_result.get('text', '').strip()
+                if audio_text:
+                    user_message_content.append({
+                        "type": "text",
+                        "text": f"[Áudio] {audio_text}"
+                    })
+                    emoji_logger.multimodal_event(
+                        f"📝 Transcrição injetada no histórico ({len(audio_text)} chars)"
+                    )
+        except Exception as ie:
+            emoji_logger.system_warning(f"Falha ao injetar transcrição no histórico: {ie}")
+        if media_result.get("success"):
+            analysis = media_result.get("analysis", {})
+            
+            # Processar comprovante de pagamento do Náutico
+            extracted_payment_value = analysis.get("payment_value")
+            if extracted_payment_value:
+                lead_info['membership_interest'] = 8  # Alto interesse por enviar comprovante
+                emoji_logger.system_info(f"Pagamento de R${extracted_payment_value} detectado - interesse alto definido.")
+            
+            # Debug: Verificar se chegou na análise de pagamento
+            emoji_logger.system_info(f"🔍 ANÁLISE MÍDIA: analysis.keys()={list(analysis.keys()) if analysis else 'None'}")
+            emoji_logger.system_info(f"🔍 IS_PAYMENT_RECEIPT: {analysis.get('is_payment_receipt') if analysis else 'No analysis'}")
+            
+            # Processar comprovante de pagamento do Náutico
+            if analysis.get("is_payment_receipt"):
+                # VERIFICAÇÃO CRÍTICA: Evitar reprocessamento se pagamento já foi validado OU lead já qualificado
+                already_validated = lead_info.get('is_valid_nautico_payment', False)
+                current_stage = lead_info.get('current_stage', '').upper()
+                
+                # DEBUG: Verificar dados do lead
+                emoji_logger.system_info(f"🔍 DEBUG LEAD STATUS: already_validated={already_validated}, current_stage='{current_stage}', lead_id={lead_info.get('id')}")
+                
+                if already_validated or current_stage == 'QUALIFICADO':
+                    emoji_logger.system_info(
+                        "🔒 COMPROVANTE IGNORADO - Lead já validado/qualificado. "
+                        f"Status: {current_stage}, Pagamento original: R${lead_info.get('payment_value', 'N/A')}"
+                    )
+                    # Não processar novamente, manter os dados existentes
+                else:
+                    emoji_logger.system_info("🆕 PRIMEIRO COMPROVANTE - Processando validação de pagamento")
+                    
+                    payment_value = analysis.get("payment_value")
+                    payer_name = analysis.get("payer_name")
+                    is_valid_payment = analysis.get("is_valid_nautico_payment", False)
+                    
+                    # Armazenar informações do pagamento no lead_info
+                    lead_info['payment_value'] = payment_value
+                    lead_info['payer_name'] = payer_name
+                    lead_info['is_valid_nautico_payment'] = is_valid_payment
+                
+                # Usar valores atuais (novos ou existentes)
+                current_payment_value = lead_info.get('payment_value')
+                current_payer_name = lead_info.get('payer_name')
+                current_is_valid = lead_info.get('is_valid_nautico_payment', False)
+                
+                emoji_logger.multimodal_event(
+                    f"💰 Comprovante detectado - Valor: R${current_payment_value}, "
+                    f"Pagador: {current_payer_name}, Válido: {current_is_valid}"
+                )
+                
+                # Debug adicional
+                emoji_logger.system_info(f"🔍 DEBUG: is_valid_payment={current_is_valid}, payment_value={current_payment_value}")
+                
+                # Se o comprovante é válido, qualificar automaticamente o lead (APENAS se ainda não foi qualificado)
+                emoji_logger.system_info(f"🔍 CONDIÇÃO QUALIFICAÇÃO: is_valid_payment={current_is_valid}, payment_value={current_payment_value}")
+                
+                # VERIFICAÇÃO ADICIONAL: Evitar requalificação se já está qualificado
+                current_stage = lead_info.get('current_stage', '').upper()
+                if current_stage == 'QUALIFICADO':
+                    emoji_logger.system_info("🔒 LEAD JÁ QUALIFICADO - Ignorando nova tentativa de qualificação")
+                elif current_is_valid and current_payment_value and not already_validated:
+                    emoji_logger.system_info("🎯 INICIANDO qualificação automática do lead")
+                    try:
+                        emoji_logger.system_info("🎯 Qualificando automaticamente lead com comprovante válido")
+                        
+                        # Mover para "Qualificado" usando a instância já inicializada com CRM service
+                        qualification_result = await self.stage_tools.move_to_qualificado(
+                            lead_info=lead_info,
+                            payment_value=str(current_payment_value),
+                            payment_valid=True,
+                            notes=f"Qualificado automaticamente - Comprovante de pagamento válido de R${current_payment_value}"
+                        )
+                        
+                        if qualification_result.get("success"):
+                            emoji_logger.system_success(
+                                f"✅ Lead qualificado automaticamente - Pagamento R${current_payment_value} confirmado"
+                            )
+                            lead_info.update(qualification_result.get("updated_lead_info", {}))
+                        else:
+                            emoji_logger.system_error(
+                                f"Erro ao qualificar lead automaticamente: {qualification_result.get('message')}"
+                            )
+                            
+                    except Exception as e:
+                        emoji_logger.system_error("AUTO_QUALIFICATION_ERROR", f"Erro na qualificação automática: {e}")
+        else:
+            emoji_logger.system_warning(f"Falha na extração de texto da mídia: {media_result.get('message')}")
+
     async def _sync_external_services(self, lead_info: dict, phone: str) -> dict:
         """
         MODIFICADO: Sincroniza leads existentes com Kommo após coleta de nome
@@ -1211,6 +1290,7 @@ class AgenticSDRStateless:
     ) -> dict:
         """
         Parse e executa tool calls na resposta do agente.
+        Tools independentes rodam em paralelo, cada um com timeout próprio.
         """
         emoji_logger.system_debug(f"Raw LLM response before tool parsing: {response}")
         tool_pattern = r'\[TOOL:\s*([^|\]]+?)\s*\|\s*([^\]]*)\]'
@@ -1227,8 +1307,7 @@ class AgenticSDRStateless:
         if not tool_matches:
             return {}
 
-        tool_results = {}
-
+        calls = []
         for match in tool_matches:
             service_method = match[0].strip()
             params_str = match[1].strip() if len(
@@ -1241,23 +1320,162 @@ class AgenticSDRStateless:
                     if '=' in pair:
                         key, value = pair.split('=', 1)
                         params[key.strip()] = value.strip()
+            calls.append((service_method, params))
 
-            try:
-                result = await self._execute_single_tool(
-                    service_method, params, lead_info, context, conversation_history
-                )
-                tool_results[service_method] = result
-                emoji_logger.system_success(
-                    f"✅ Tool executado: {service_method}"
+        results = await self._execute_tool_calls(calls, lead_info, context, conversation_history)
+
+        # Mesma ordem (e mesma chave por tool) da execução sequencial
+        tool_results = {}
+        for (service_method, _), result in zip(calls, results):
+            tool_results[service_method] = result
+        return tool_results
+
+    async def _execute_tool_calls(
+            self,
+            calls: list,
+            lead_info: dict,
+            context: dict,
+            conversation_history: list
+    ) -> list:
+        """
+        Executa [(service.method, params), ...] e devolve os resultados na mesma ordem.
+        Tools independentes rodam em paralelo; dependências declaradas em TOOL_DEPENDENCIES
+        valem em qualquer ordem (a lista de tasks está completa antes de rodarem).
+        """
+        tasks = []
+
+        async def run_after_dependencies(index: int, service_method: str, params: dict):
+            depends_on = TOOL_DEPENDENCIES.get(service_method, ())
+            previous = [
+                tasks[i] for i, (other, _) in enumerate(calls)
+                if other in depends_on or (other == service_method and i < index)
+            ]
+            if previous:
+                await asyncio.gather(*previous, return_exceptions=True)
+            return await self._run_tool(service_method, params, lead_info, context, conversation_history)
+
+        for index, (service_method, params) in enumerate(calls):
+            tasks.append(asyncio.create_task(run_after_dependencies(index, service_method, params)))
+        return list(await asyncio.gather(*tasks))
+
+    async def _generate_with_native_tools(
+            self,
+            messages: list,
+            static_prefix: str,
+            context_suffix: str,
+            conversation_id: Optional[str],
+            lead_info: dict,
+            context: dict,
+            conversation_history: list,
+            executed: dict
+    ) -> Optional[str]:
+        """
+        Function calling nativo: tools dos serviços habilitados declarados por schema.
+        executed recebe os resultados dos tools já executados (mesmo se o modelo falhar depois).
+        """
+        services = [
+            name for name, service in (
+                ("calendar", self.calendar_service), ("crm", self.crm_service),
+                ("followup", self.followup_service), ("knowledge", self.knowledge_service)
+            ) if service
+        ]
+        specs = select_specs(services)
+        if not specs:
+            return None
+
+        async def execute(calls: list) -> list:
+            results = await self._execute_tool_calls(calls, lead_info, context, conversation_history)
+            for (service_method, _), result in zip(calls, results):
+                executed[service_method] = result
+            return results
+
+        return await self.model_manager.get_tool_response(
+            messages=messages,
+            specs=specs,
+            execute=execute,
+            system_prompt=static_prefix,
+            context_suffix=context_suffix,
+            conversation_id=conversation_id,
+            max_rounds=settings.native_tool_max_rounds
+        )
+
+    def _record_tool_turn(self, mode: str, started: float, conversation_id: Optional[str], tokens_before: int) -> None:
+        """Latência e tokens de entrada de um turno com tools (comparação texto x nativo)"""
+        metrics.observe(f"tool_turn_ms:{mode}", (time.perf_counter() - started) * 1000)
+        if conversation_id:
+            tokens_after = self.model_manager.get_conversation_usage(conversation_id).get("prompt_tokens", 0)
+            metrics.observe(f"tool_turn_prompt_tokens:{mode}", tokens_after - tokens_before)
+
+    async def _run_tool(
+            self,
+            service_method: str,
+            params: dict,
+            lead_info: dict,
+            context: dict,
+            conversation_history: list
+    ):
+        """
+        Executa um tool com timeout, registrando a latência; erros viram {"error": ...}.
+        Só tools de leitura são canceladas no timeout; as de escrita continuam
+        (shield) e o modelo recebe {"status": "pending"} para não repetir a ação
+        """
+        started = time.perf_counter()
+        task = asyncio.ensure_future(
+            self._execute_single_tool(
+                service_method, params, lead_info, context, conversation_history
+            )
+        )
+        read_only = service_method in READ_ONLY_TOOLS
+        try:
+            result = await asyncio.wait_for(
+                task if read_only else asyncio.shield(task),
+                timeout=settings.tool_call_timeout
+            )
+            emoji_logger.system_success(
+                f"✅ Tool executado: {service_method}"
+            )
+            return result
+        except asyncio.TimeoutError:
+            metrics.increment("tool_timeouts")
+            if not read_only:
+                metrics.increment("tool_pending")
+                task.add_done_callback(
+                    lambda t: self._log_pending_tool(service_method, t)
                 )
-            except Exception as e:
-                tool_results[service_method] = {"error": str(e)}
-                emoji_logger.system_error(
-                    "Tool execution error",
-                    f"❌ Erro no tool {service_method}: {e}"
+                emoji_logger.system_warning(
+                    f"Tool {service_method} excedeu {settings.tool_call_timeout}s; segue em background"
                 )
+                return {
+                    "status": "pending",
+                    "message": "Ação em andamento; não repita a chamada, confirme depois com o lead"
+                }
+            emoji_logger.system_error(
+                "Tool execution error",
+                f"❌ Tool {service_method} excedeu {settings.tool_call_timeout}s"
+            )
+            return {"error": f"timeout após {settings.tool_call_timeout}s"}
+        except Exception as e:
+            emoji_logger.system_error(
+                "Tool execution error",
+                f"❌ Erro no tool {service_method}: {e}"
+            )
+            return {"error": str(e)}
+        finally:
+            metrics.observe(f"tool_latency_ms:{service_method}", (time.perf_counter() - started) * 1000)
 
-        return tool_results
+    @staticmethod
+    def _log_pending_tool(service_method: str, task: asyncio.Future) -> None:
+        """Registra o desfecho de um tool de escrita que passou do timeout"""
+        if task.cancelled():
+            emoji_logger.system_warning(f"Tool pendente {service_method} foi cancelado")
+        elif task.exception() is not None:
+            metrics.increment("tool_pending_failed")
+            emoji_logger.system_error(
+                "Tool execution error",
+                f"❌ Tool pendente {service_method} falhou: {task.exception()}"
+            )
+        else:
+            emoji_logger.system_success(f"✅ Tool pendente concluído: {service_method}")
 
     async def _execute_single_tool(
             self,
@@ -1412,71 +1630,15 @@ class AgenticSDRStateless:
         """Gera a resposta do agente usando o ModelManager com injeção de contexto robusta."""
         import json
 
-        # 1. Carrega o prompt do sistema (persona) e injeta o contexto de data/hora.
-        system_prompt = "Você é um assistente de vendas." # Fallback inicial
-        try:
-            # Usar o prompt atualizado do Náutico
-            with open("app/prompts/prompt-agente-nautico.atualizado.md", "r", encoding="utf-8") as f:
-                system_prompt = f.read()
-        except FileNotFoundError:
-            emoji_logger.system_warning("Arquivo de prompt atualizado não encontrado. Tentando prompt original.")
-            try:
-                with open("app/prompts/prompt-agente.md", "r", encoding="utf-8") as f:
-                    system_prompt = f.read()
-            except FileNotFoundError:
-                emoji_logger.system_warning("Nenhum arquivo de prompt encontrado. Usando fallback.")
-
-        # Injeção de Contexto Temporal
-        tz = pytz.timezone(settings.timezone)
-        now = datetime.now(tz)
-        current_date_str = now.strftime('%Y-%m-%d %H:%M')
-        days_map = {0: "Segunda-feira", 1: "Terça-feira", 2: "Quarta-feira", 3: "Quinta-feira", 4: "Sexta-feira", 5: "Sábado", 6: "Domingo"}
-        day_of_week_pt = days_map[now.weekday()]
-        
-        date_context = f"<contexto_temporal>\nA data e hora atuais são: {current_date_str} ({day_of_week_pt}).\n</contexto_temporal>\n\n"
-        
-        # Injeção de Contexto de Validação de Pagamento
-        payment_context = ""
-        has_validated_payment = lead_info.get('is_valid_nautico_payment', False)
-        payment_value = lead_info.get('payment_value')
-        current_stage = lead_info.get('current_stage', '').upper()
-        
-        if has_validated_payment and payment_value:
-            # Lead já tem pagamento validado - não deve confirmar novamente
-            payment_context = f"<contexto_pagamento>\nEste lead JÁ TEM PAGAMENTO VALIDADO de R${payment_value}. Se enviarem novos comprovantes, apenas agradeça e confirme que o pagamento já foi processado. NÃO repita confirmações de boas-vindas.\n</contexto_pagamento>\n\n"
-        else:
-            payment_context = f"<contexto_pagamento>\nEste lead NÃO tem comprovante de pagamento validado. JAMAIS confirme pagamento sem receber e validar documento. Sempre solicite o comprovante antes de qualquer confirmação.\n</contexto_pagamento>\n\n"
-        
-        # Reforçar instruções críticas sobre persona e ferramentas (sem conflitar com o prompt)
-        lead_name = lead_info.get('name', '')
-        name_instruction = ""
-
-        if lead_name and lead_name not in ["Lead Náutico", "Usuário Náutico", "Cliente Náutico"]:
-            name_instruction = f"""
-<nome_do_lead>
-O nome do lead é: {lead_name}
-IMPORTANTE: Sempre que mencionar o nome do lead, use EXATAMENTE "{lead_name}" - NUNCA use placeholders como [nome], {{nome}}, $nome ou <nome>.
-</nome_do_lead>
-"""
-
-        critical_instructions = f"""
-
-<instrucoes_criticas>
-- Você é Laura, Especialista em Relacionamento da Torcida do Náutico (NÃO Marina)
-- SEMPRE use a ferramenta [TOOL: knowledge.search | query=...] para perguntas sobre planos, ingressos, benefícios, cancelamentos
-- Siga exatamente a persona e etapas definidas no prompt principal
-- Responda de forma direta, sem formatação markdown
-
-**REGRA CRÍTICA DE PLACEHOLDERS:**
-- JAMAIS use placeholders como [nome], {{nome}}, $nome ou <nome> em suas respostas
-- SEMPRE use o nome REAL do lead quando disponível
-- Se o nome do lead estiver disponível, use-o diretamente: "Oi, {lead_name}!" (exemplo)
-- Se não souber o nome, simplesmente não use nome nenhum: "Oi!" ao invés de "Oi, [nome]!"
-</instrucoes_criticas>
-
-{name_instruction}"""
-
-        system_prompt_with_context = system_prompt + date_context + payment_context + critical_instructions
+        # 1. Persona + instruções fixas (prefixo estável, lido uma vez pelo registro) e
+        #    contexto de data/hora, pagamento e nome do lead, enviado por último ao modelo
+        #    para que o cache de prompt do provedor reaproveite o prefixo.
+        prompt_registry = get_prompt_registry()
+        static_prefix = prompt_registry.get_static_prefix()
+        context_suffix = prompt_registry.build_dynamic_suffix(lead_info)
+        conversation_id = (execution_context or {}).get("conversation_id")
+        # Streaming: trechos completos vão para o WhatsApp enquanto o modelo ainda gera
+        streamer = None if is_followup else (execution_context or {}).get("response_streamer")
 
         # 2. Prepara as mensagens para o modelo.
         if is_followup:
@@ -1485,13 +1647,26 @@ IMPORTANTE: Sempre que mencionar o nome do lead, use EXATAMENTE "{lead_name}" -
         else:
             messages_for_model = list(conversation_history)
 
-        # Limita o histórico para as últimas 200 mensagens para evitar sobrecarga de contexto
-        if len(messages_for_model) > 200:
-            emoji_logger.system_warning(
-                "Histórico longo detectado, truncando para as últimas 200 mensagens.",
-                original_size=len(messages_for_model)
+        # Limita o histórico por orçamento de tokens (mais recentes primeiro); turnos antigos
+        # que ficam de fora entram pelo resumo acumulado da conversa
+        if not is_followup:
+            original_size = len(messages_for_model)
+            messages_for_model, history_tokens = build_history(
+                messages_for_model,
+                settings.history_token_budget,
+                summary=(execution_context or {}).get("history_summary"),
+                model_id=getattr(self.model_manager.primary_model, "id", None),
+                history_is_tail=bool((execution_context or {}).get("history_summary_until"))
             )
-            messages_for_model = messages_for_model[-200:]
+            if len(messages_for_model) < original_size:
+                emoji_logger.system_debug(
+                    "Histórico truncado pelo orçamento de tokens",
+                    original_size=original_size,
+                    kept=len(messages_for_model),
+                    history_tokens=history_tokens
+                )
+            # Mídia inline só no turno atual; turnos anteriores levam a referência + texto extraído
+            messages_for_model = compact_media(messages_for_model)
 
         # VERIFICAÇÃO CRÍTICA: Garantir que não estamos enviando conteúdo vazio.
         if not messages_for_model or not any(msg.get("content") for msg in messages_for_model):
@@ -1500,12 +1675,72 @@ IMPORTANTE: Sempre que mencionar o nome do lead, use EXATAMENTE "{lead_name}" -
             )
             return "Não consegui processar sua solicitação no momento."
 
-        # 3. Primeira chamada ao modelo para obter a resposta inicial (que pode conter tools).
-        response_text = await self.model_manager.get_response(
-            messages=messages_for_model,
-            system_prompt=system_prompt_with_context
+        # Tempo entre a chegada da primeira mensagem do lote e a primeira chamada ao LLM
+        received_at = (execution_context or {}).get("received_at")
+        if received_at and not is_followup:
+            metrics.observe("time_to_first_llm_call_ms", (time.time() - received_at) * 1000)
+
+        turn_started = time.perf_counter()
+        tokens_before = (
+            self.model_manager.get_conversation_usage(conversation_id).get("prompt_tokens", 0)
+            if conversation_id else 0
         )
 
+        # Cache de respostas de FAQ (opcional): mesma pergunta, mesmo estágio e mesma
+        # versão da base de conhecimento dispensam as chamadas ao modelo e o knowledge.search
+        faq_cache = None
+        if settings.enable_response_cache and not is_followup and self.knowledge_service:
+            last_content = messages_for_model[-1].get("content")
+            has_media = isinstance(last_content, list) and any(p.get("type") == "media" for p in last_content)
+            if not has_media:
+                try:
+                    kb_version = await self.knowledge_service.get_version()
+                except Exception as e:
+                    emoji_logger.system_warning(f"Cache de FAQ indisponível: {e}")
+                    kb_version = ""
+                stage = lead_info.get("current_stage", "")
+                cached_response = get_response_cache().get(message, stage, kb_version, lead_info)
+                if cached_response:
+                    if streamer:
+                        streamer.start_round(lead_info)
+                        await streamer.complete(cached_response)
+                    return cached_response
+                faq_cache = (stage, kb_version)
+
+        # 3a. Function calling nativo (opcional): tools estruturados, sem re-parse do texto
+        #     e sem segunda chamada com a resposta inicial + instrução final.
+        native_results: Dict[str, Any] = {}
+        tool_results: Dict[str, Any] = {}
+        pending_tool_results = None
+        response_text = None
+        if settings.enable_native_tool_calling and not is_followup:
+            if streamer:
+                streamer.start_round(lead_info)
+            response_text = await self._generate_with_native_tools(
+                messages_for_model, static_prefix, context_suffix, conversation_id,
+                lead_info, context, conversation_history, native_results
+            )
+            if response_text and native_results:
+                self._record_tool_turn("native", turn_started, conversation_id, tokens_before)
+            elif response_text is None and native_results:
+                # O modelo falhou depois de executar tools: não executa de novo, segue para a
+                # segunda chamada em texto com os resultados já obtidos
+                pending_tool_results = native_results
+                response_text = " ".join(f"[TOOL: {name} | ]" for name in native_results)
+
+        # 3b. Primeira chamada ao modelo para obter a resposta inicial (que pode conter tools).
+        #     Em streaming, tags [TOOL: ...] ficam retidas e nunca chegam ao usuário.
+        if response_text is None:
+            if streamer:
+                streamer.start_round(lead_info)
+            response_text = await self.model_manager.get_response(
+                messages=messages_for_model,
+                system_prompt=static_prefix,
+                context_suffix=context_suffix,
+                conversation_id=conversation_id,
+                on_delta=streamer.feed if streamer else None
+            )
+
         # VALIDAÇÃO CRÍTICA: Verificar se response_text contém placeholders e substituir imediatamente
         if response_text and lead_info.get('name'):
             placeholder_patterns = [r'\[nome\]', r'\{nome\}', r'\$nome', r'<nome>']
@@ -1523,9 +1758,12 @@ IMPORTANTE: Sempre que mencionar o nome do lead, use EXATAMENTE "{lead_name}" -
 
         if response_text:
             # 5. Analisa e executa ferramentas, se houver.
-            tool_results = await self._parse_and_execute_tools(
-                response_text, lead_info, context, conversation_history
-            )
+            if pending_tool_results is not None:
+                tool_results = pending_tool_results
+            else:
+                tool_results = await self._parse_and_execute_tools(
+                    response_text, lead_info, context, conversation_history
+                )
             if tool_results:
                 # 6. Se ferramentas foram usadas, faz uma segunda chamada ao modelo com os resultados.
                 tool_results_str = "\n".join(
@@ -1535,15 +1773,26 @@ IMPORTANTE: Sempre que mencionar o nome do lead, use EXATAMENTE "{lead_name}" -
                 final_instruction = (
                     f"""=== RESULTADO DAS FERRAMENTAS ===\nSua resposta inicial foi: \n'{response_text}'\nAs seguintes ferramentas foram executadas com estes resultados:\n{tool_results_str}\n\n=== INSTRUÇÃO FINAL ===\nCom base nos resultados das ferramentas, gere a resposta final, clara e amigável para o usuário. Siga TODAS as regras do seu prompt de sistema. Não inclua mais chamadas de ferramentas. Apenas a resposta final."""
                 )
+                if streamer and streamer.sent_text:
+                    # Trechos anteriores à tool já foram enviados durante o streaming
+                    final_instruction += (
+                        f"\nO usuário já recebeu esta parte da resposta: '{streamer.sent_text}'. Não a repita; apenas continue."
+                    )
 
-                # Adiciona a resposta do assistente (com tools) e a instrução final ao histórico
-                messages_for_final_response = list(messages_for_model)
+                # Adiciona a resposta do assistente (com tools) e a instrução final ao histórico;
+                # a mídia já foi vista na primeira chamada e segue só como referência
+                messages_for_final_response = compact_media(messages_for_model, keep_last=False)
                 messages_for_final_response.append({"role": "assistant", "content": response_text})
                 messages_for_final_response.append({"role": "user", "content": final_instruction})
 
+                if streamer:
+                    streamer.start_round(lead_info)
                 response_text = await self.model_manager.get_response(
                     messages=messages_for_final_response,
-                    system_prompt=system_prompt_with_context # Reutiliza o mesmo system_prompt com contexto
+                    system_prompt=static_prefix,  # Mesmo prefixo: acerto no cache do provedor
+                    context_suffix=context_suffix,
+                    conversation_id=conversation_id,
+                    on_delta=streamer.feed if streamer else None
                 )
 
                 # VALIDAÇÃO CRÍTICA: Verificar placeholders na segunda resposta também
@@ -1566,19 +1815,35 @@ IMPORTANTE: Sempre que mencionar o nome do lead, use EXATAMENTE "{lead_name}" -
                         "AgenticSDRStateless", 
                         "Segunda chamada ao LLM retornou None após execução de tools"
                     )
-                    response_text = "As informações foram processadas com sucesso. Como posso ajudar mais?"
+                    response_text = TOOL_FALLBACK_RESPONSE
                 elif re.search(r'\[\w+[:\.].*?\]', response_text):
                     emoji_logger.system_error(
                         "AgenticSDRStateless", 
                         f"Segunda chamada ao LLM ainda contém tools: {response_text[:100]}..."
                     )
-                    response_text = "As informações foram processadas com sucesso. Como posso ajudar mais?"
+                    response_text = TOOL_FALLBACK_RESPONSE
                 else:
                     emoji_logger.system_success(
                         f"Segunda chamada ao LLM bem-sucedida: {response_text[:50]}..."
                     )
+                self._record_tool_turn("text", turn_started, conversation_id, tokens_before)
+
+        # Só respostas de FAQ puras (turno que usou apenas a base de conhecimento) entram no cache
+        if (
+            faq_cache and response_text and response_text != TOOL_FALLBACK_RESPONSE
+            and set(native_results) | set(tool_results or {}) == {"knowledge.search"}
+        ):
+            turn_tokens = (
+                self.model_manager.get_conversation_usage(conversation_id).get("prompt_tokens", 0) - tokens_before
+                if conversation_id else 0
+            )
+            get_response_cache().put(message, *faq_cache, response_text, lead_info, prompt_tokens=turn_tokens)
 
-        return response_text or "Não consegui gerar uma resposta no momento."
+        response_text = response_text or "Não consegui gerar uma resposta no momento."
+        if streamer:
+            # Libera o restante do stream (ou a resposta inteira, se nada saiu nesta rodada)
+            await streamer.complete(response_text)
+        return response_text
 
 
     @staticmethod
@@ -1755,3 +2020,28 @@ IMPORTANTE: Sempre que mencionar o nome do lead, use EXATAMENTE "{lead_name}" -
                 f"Erro na Etapa 0 (áudio inicial): {e}"
             )
             return False  # Erro na execução
+
+
+agentic_sdr: Optional[AgenticSDRStateless] = None
+_agentic_sdr_lock = asyncio.Lock()
+
+
+async def get_agentic_sdr() -> AgenticSDRStateless:
+    """
+    Retorna instância global do agente, criada e inicializada uma única vez.
+    Seguro para reuso entre conversas: nenhum estado por lead fica no agente.
+    """
+    global agentic_sdr
+    if agentic_sdr is None or not agentic_sdr.is_initialized:
+        async with _agentic_sdr_lock:
+            if agentic_sdr is None or not agentic_sdr.is_initialized:
+                agent = AgenticSDRStateless()
+                await agent.initialize()
+                agentic_sdr = agent
+    return agentic_sdr
+
+
+def set_agentic_sdr(agent: Optional[AgenticSDRStateless]) -> None:
+    """Define instância global do agente"""
+    global agentic_sdr
+    agentic_sdr = agent
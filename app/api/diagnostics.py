@@ -14,6 +14,7 @@ from app.integrations.redis_client import redis_client
 from app.config import settings
 from app.utils.logger import emoji_logger
 from app.services.kommo_queue_service import kommo_queue_service
+from app.core.prompt_registry import get_prompt_registry
 
 router = APIRouter()
 
@@ -292,6 +293,19 @@ async def fix_connections():
     }
 
 
+@router.post("/prompts/reload")
+async def reload_prompts():
+    """Relê o prompt do agente do disco (sem reiniciar o processo)"""
+    try:
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "prompt": get_prompt_registry().reload()
+        }
+    except Exception as e:
+        emoji_logger.system_error("Diagnostics", f"Erro ao recarregar prompt: {e}")
+        return {"error": str(e)}
+
+
 @router.get("/kommo-queue")
 async def kommo_queue_status():
     """Status detalhado da fila do Kommo CRM"""
@@ -8,7 +8,8 @@ from loguru import logger
 from app.integrations.supabase_client import supabase_client
 from app.integrations.evolution import evolution_client
 from app.integrations.redis_client import redis_client
-from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.utils.metrics import metrics as process_metrics
+from app.agents.agentic_sdr_stateless import get_agentic_sdr
 
 router = APIRouter()
 
@@ -33,9 +34,8 @@ async def liveness():
 async def readiness():
     """Readiness probe - verifica se o serviço está pronto"""
     try:
-        # Instanciar agente para verificação
-        agent = AgenticSDRStateless()
-        await agent.initialize()
+        # Verificar a instância compartilhada do agente
+        agent = await get_agentic_sdr()
 
         checks = {
             "supabase": await supabase_client.test_connection(),
@@ -69,6 +69,12 @@ async def metrics():
             "histograms": {}
         }
 
+        # Métricas em memória deste processo (latências, reuso de conexões...)
+        snapshot = process_metrics.snapshot()
+        metrics_data["counters"].update(snapshot["counters"])
+        metrics_data["gauges"].update(snapshot["gauges"])
+        metrics_data["histograms"].update(snapshot["histograms"])
+
         # Obtém métricas do Redis se disponível
         if await redis_client.ping():
             # Contadores
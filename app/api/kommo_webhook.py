@@ -29,6 +29,11 @@ async def process_lead_status_change(payload: Dict[str, Any]):
                 return
 
         new_status_id = lead_data.get('status_id')
+
+        # Status mudou no Kommo: o cache da checagem de handoff deixa de valer
+        if lead_data.get('id'):
+            await redis_client.invalidate_kommo_lead_status(str(lead_data['id']))
+
         custom_fields = lead_data.get('custom_fields', [])
         phone = None
 
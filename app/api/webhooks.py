@@ -4,10 +4,11 @@ Processa mensagens recebidas e eventos do CRM
 """
 
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 import asyncio
 import re
 import json
+import time
 import traceback
 
 from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
@@ -15,11 +16,16 @@ from loguru import logger
 
 from app.config import settings
 from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
 from app.integrations.redis_client import redis_client
 from app.integrations.evolution import evolution_client
-from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.agents.agentic_sdr_stateless import get_agentic_sdr
+from app.services.conversation_summarizer import get_conversation_summarizer
 from app.services.message_buffer import MessageBuffer, get_message_buffer
+from app.services.inbound_queue import get_inbound_queue
+from app.services.message_dedupe import get_message_deduplicator
 from app.services.message_splitter import MessageSplitter, get_message_splitter
+from app.services.response_streamer import ResponseStreamer
 from app.utils.agno_media_detection import AGNOMediaDetector
 from app.exceptions import HandoffActiveException
 from app.core.response_formatter import response_formatter
@@ -280,13 +286,30 @@ async def process_message_update(data: Dict[str, Any]):
 
 
 async def process_presence_update(data: Dict[str, Any]):
-    """Processa atualizações de presença (digitando, online, etc.)."""
-    remote_jid = data.get("remoteJid")
-    presence = data.get("presence")
-    if remote_jid and presence:
+    """
+    Processa atualizações de presença (digitando, online, etc.).
+    "composing" estende a janela do Message Buffer; "paused"/"available" a encerra.
+    """
+    data = data.get("data", data) if isinstance(data, dict) else {}
+    updates = []
+    if data.get("remoteJid") and data.get("presence"):
+        updates.append((data["remoteJid"], data["presence"]))
+    # Formato Evolution v2: {"id": jid, "presences": {jid: {"lastKnownPresence": ...}}}
+    for jid, info in (data.get("presences") or {}).items():
+        if isinstance(info, dict) and info.get("lastKnownPresence"):
+            updates.append((jid, info["lastKnownPresence"]))
+
+    for remote_jid, presence in updates:
         emoji_logger.system_debug(
             f"Presence update from {remote_jid}: {presence}"
         )
+        if "@g.us" in remote_jid or not settings.enable_message_buffer:
+            continue
+        phone = remote_jid.split("@")[0]
+        try:
+            await get_message_buffer_instance().note_presence(phone, presence)
+        except Exception as e:
+            emoji_logger.system_warning(f"Falha ao registrar presença de {phone}: {e}")
 
 
 # Cache para deduplicação de webhooks CONTACTS_UPDATE
@@ -615,13 +638,13 @@ def extract_final_response(full_response: str) -> str:
 async def create_agent_with_context(
         phone: str,
         conversation_id: str = None,
-        media_data: Optional[Dict[str, Any]] = None
+        media_data: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None
 ) -> tuple:
     """
     Cria agente stateless com contexto completo, sincronizando com o CRM em tempo real.
+    media_data: mídia única ou lista com todas as mídias de um lote do buffer
     """
     from app.integrations.supabase_client import supabase_client
-    from app.services.crm_service_100_real import CRMServiceReal
 
     emoji_logger.webhook_process("🏭 Criando agente stateless com contexto...")
 
@@ -633,23 +656,35 @@ async def create_agent_with_context(
         if lead_data:
             emoji_logger.system_info(f"🔍 DEBUG LEAD CARREGADO: id={lead_data.get('id')}, current_stage='{lead_data.get('current_stage')}', is_valid_payment={lead_data.get('is_valid_nautico_payment')}, payment_value={lead_data.get('payment_value')}")
         
-        # Passo 2: Sincronização em Tempo Real com Kommo (se habilitado)
+        # Passo 2: Sincronização com Kommo (se habilitado)
+        # O status_id fica em cache curto no Redis e é invalidado pelo webhook do Kommo,
+        # então uma mensagem comum não consome o rate limit do CRM
         if lead_data and lead_data.get("kommo_lead_id") and settings.enable_kommo_crm:
-            crm_service = CRMServiceReal()
-            await crm_service.initialize() # Garante que o serviço esteja inicializado
-            
-            # Verificar se o lead ainda existe no Kommo antes de usar
             kommo_lead_id = str(lead_data["kommo_lead_id"])
-            kommo_lead = await crm_service.get_lead_by_id(kommo_lead_id)
-            
-            # Se o lead não existir mais no Kommo, limpar o kommo_lead_id do Supabase
-            if not kommo_lead:
-                emoji_logger.service_warning(f"Lead {kommo_lead_id} não encontrado no Kommo - limpando kommo_lead_id")
-                await supabase_client.update_lead(lead_data["id"], {"kommo_lead_id": None})
-                lead_data["kommo_lead_id"] = None
-
-            if kommo_lead:
-                current_status_id = kommo_lead.get('status_id')
+            current_status_id = None
+
+            cached_status = await redis_client.get_kommo_lead_status(kommo_lead_id)
+            if isinstance(cached_status, dict) and "status_id" in cached_status:
+                current_status_id = cached_status["status_id"]
+                emoji_logger.system_debug(f"Status Kommo em cache para lead {kommo_lead_id}: {current_status_id}")
+            else:
+                # Reutiliza o CRM já inicializado no startup (sem refetch de campos/estágios)
+                from app.services.kommo_queue_service import kommo_queue_service
+                kommo_lead = await kommo_queue_service.crm_service.get_lead_by_id(kommo_lead_id)
+
+                # Se o lead não existir mais no Kommo, limpar o kommo_lead_id do Supabase
+                if not kommo_lead:
+                    emoji_logger.service_warning(f"Lead {kommo_lead_id} não encontrado no Kommo - limpando kommo_lead_id")
+                    await supabase_client.update_lead(lead_data["id"], {"kommo_lead_id": None})
+                    lead_data["kommo_lead_id"] = None
+                else:
+                    current_status_id = kommo_lead.get('status_id')
+                    await redis_client.cache_kommo_lead_status(
+                        kommo_lead_id, current_status_id,
+                        ttl=settings.kommo_lead_status_cache_ttl
+                    )
+
+            if current_status_id is not None:
                 human_handoff_stage_id = settings.kommo_human_handoff_stage_id
 
                 # Passo 3: Ativar/Desativar Pausa e lançar exceção
@@ -665,8 +700,15 @@ async def create_agent_with_context(
 
         # Continua com a criação do contexto se o handoff não estiver ativo
         conversation_history = []
+        conversation_summary = None
         if conversation_id:
-            conversation_history = await supabase_client.get_conversation_messages(conversation_id, limit=200)
+            # Resumo acumulado + apenas as mensagens posteriores a ele
+            conversation_summary = await supabase_client.get_conversation_summary(conversation_id)
+            conversation_history = await supabase_client.get_conversation_messages(
+                conversation_id,
+                limit=settings.history_fetch_limit,
+                since=(conversation_summary or {}).get("history_summary_until")
+            )
 
         # Tentativa de enriquecer contexto com pushName (fallback de nome)
         push_name = None
@@ -705,16 +747,18 @@ async def create_agent_with_context(
             "lead_info": lead_data or {},
             "conversation_id": conversation_id,
             "conversation_history": conversation_history or [],
+            "history_summary": (conversation_summary or {}).get("history_summary"),
+            "history_summary_until": (conversation_summary or {}).get("history_summary_until"),
             "media": media_data,
             "timestamp": datetime.now().isoformat(),
             "pushName": push_name
         }
 
-        agent = AgenticSDRStateless()
-        await agent.initialize()
+        # Agente e serviços são construídos uma vez no startup e reutilizados
+        agent = await get_agentic_sdr()
 
         emoji_logger.system_ready(
-            "✅ Agente stateless criado com contexto",
+            "✅ Agente stateless pronto com contexto",
             history_count=len(conversation_history),
             lead_name=(lead_data.get('name') if lead_data else 'Não identificado')
         )
@@ -856,7 +900,7 @@ async def whatsapp_dynamic_webhook(
 
         if event == "MESSAGES_UPSERT":
             actual_data = data.get("data", data)
-            background_tasks.add_task(process_new_message, actual_data)
+            await dispatch_new_message(background_tasks, actual_data)
         elif event == "CONNECTION_UPDATE":
             await process_connection_update(data)
         elif event == "QRCODE_UPDATED":
@@ -931,7 +975,7 @@ async def evolution_webhook(
         
         if normalized_event in ["MESSAGES_UPSERT", "MESSAGE_UPSERT"]:
             actual_data = data.get("data", data)
-            background_tasks.add_task(process_new_message, actual_data)
+            await dispatch_new_message(background_tasks, actual_data)
         elif normalized_event == "CONNECTION_UPDATE":
             await process_connection_update(data.get("data", {}))
         elif normalized_event == "QRCODE_UPDATED":
@@ -957,8 +1001,33 @@ async def evolution_webhook(
         return {"status": "error", "message": str(e)}
 
 
-async def process_new_message(data: Any):
-    """Processa cada nova mensagem recebida, normalizando o payload para sempre ser uma lista."""
+async def dispatch_new_message(background_tasks: BackgroundTasks, data: Any):
+    """
+    Modo fila (INBOUND_QUEUE_ENABLED): grava o evento no Redis Stream e retorna;
+    os consumidores da InboundQueue rodam o pipeline. Sem Redis, cai para BackgroundTasks.
+    """
+    if settings.inbound_queue_enabled:
+        try:
+            await get_inbound_queue().enqueue(data)
+            return
+        except Exception as e:
+            emoji_logger.system_warning(f"Fila de entrada indisponível - processando em background: {e}")
+    background_tasks.add_task(process_new_message, data)
+
+
+async def process_new_message(
+    data: Any, received_at: Optional[float] = None, redelivered: bool = False,
+    raise_errors: bool = False
+):
+    """
+    Processa cada nova mensagem recebida, normalizando o payload para sempre ser uma lista.
+    received_at: epoch da chegada no webhook (eventos vindos da fila de entrada)
+    redelivered: entrada reentregue pela fila; já foi "vista" na primeira entrega, então
+        só é ignorada se o pipeline daquela mensagem já terminou
+    raise_errors: propaga a falha depois de registrá-la (a fila de entrada não faz XACK
+        e reentrega o evento; em BackgroundTasks não há quem tente de novo)
+    """
+    received_at = received_at or time.time()
     try:
         emoji_logger.system_debug(f"🔥 DEBUG: process_new_message CHAMADA com data: {type(data)}")
         
@@ -997,6 +1066,12 @@ async def process_new_message(data: Any):
                 emoji_logger.webhook_process(f"Mensagem de grupo ignorada: {remote_jid}")
                 continue
 
+            # Idempotência: reentregas da Evolution custam no máximo uma operação no Redis
+            dedupe = get_message_deduplicator()
+            if await (dedupe.is_processed(message_id) if redelivered else dedupe.is_duplicate(message_id)):
+                emoji_logger.webhook_process(f"Mensagem {message_id} já processada - reentrega ignorada")
+                continue
+
             emoji_logger.webhook_process(f"Processando mensagem de {phone}")
             
             # Extrair pushName da mensagem para cache
@@ -1030,7 +1105,6 @@ async def process_new_message(data: Any):
                             process_new_message._memory_cache = {}
                         
                         # Limpar entradas antigas (simular TTL)
-                        import time
                         current_time = time.time()
                         process_new_message._memory_cache = {
                             k: v for k, v in process_new_message._memory_cache.items() 
@@ -1100,12 +1174,16 @@ async def process_new_message(data: Any):
                     message_content=message_content,
                     original_message=message,
                     message_id=message_id,
-                    media_data=media_data
+                    media_data=media_data,
+                    received_at=received_at
                 )
+            await dedupe.mark_processed(message_id)
 
     except Exception as e:
         emoji_logger.system_error("Webhook Message Processing", str(e))
         logger.exception("Erro detalhado no processamento:")
+        if raise_errors:
+            raise
 
 
 async def process_message_with_agent(
@@ -1113,9 +1191,14 @@ async def process_message_with_agent(
     message_content: str,
     original_message: Dict[str, Any],
     message_id: str,
-    media_data: Optional[Dict[str, Any]] = None
+    media_data: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None,
+    received_at: Optional[float] = None
 ):
-    """Processa mensagem com o agente AGENTIC SDR"""
+    """
+    Processa mensagem com o agente AGENTIC SDR
+    media_data: mídia única ou lista com todas as mídias do lote do buffer
+    received_at: epoch da chegada da primeira mensagem do lote (métrica de latência)
+    """
     from app.integrations.supabase_client import supabase_client
 
     # Log inicial do processamento
@@ -1138,9 +1221,9 @@ async def process_message_with_agent(
                 conversation_id = conversation_data["id"]
                 
                 # Deletar mensagens
-                delete_result = supabase_client.client.table('messages').delete().eq(
+                delete_result = await supabase_client.execute_query(supabase_client.client.table('messages').delete().eq(
                     'conversation_id', conversation_id
-                ).execute()
+                ))
                 deleted_messages = len(delete_result.data) if delete_result.data else 0
                 
                 # Reset conversa
@@ -1169,9 +1252,9 @@ async def process_message_with_agent(
                     emoji_logger.system_info(f"🔍 Buscando follow-ups para lead_id: {lead_id}")
                     
                     # Buscar follow-ups diretamente por lead_id
-                    pending_result = supabase_client.client.table('follow_ups').select("*").eq(
+                    pending_result = await supabase_client.execute_query(supabase_client.client.table('follow_ups').select("*").eq(
                         'lead_id', lead_id
-                    ).in_('status', ['pending', 'queued']).execute()
+                    ).in_('status', ['pending', 'queued']))
                     
                     pending_followups = pending_result.data or []
                     emoji_logger.system_info(f"📋 Encontrados {len(pending_followups)} follow-ups para cancelar")
@@ -1221,9 +1304,11 @@ async def process_message_with_agent(
         )
         return
     
-    if media_data and media_data.get("error"):
-        emoji_logger.system_warning(f"Erro na mídia para {phone}: {media_data['error']}")
-        await evolution_client.send_text_message(phone, media_data["error"])
+    media_items = media_data if isinstance(media_data, list) else [media_data] if media_data else []
+    media_error = next((item["error"] for item in media_items if item.get("error")), None)
+    if media_error:
+        emoji_logger.system_warning(f"Erro na mídia para {phone}: {media_error}")
+        await evolution_client.send_text_message(phone, media_error)
         return
 
     # Log de busca de dados
@@ -1310,7 +1395,7 @@ async def process_message_with_agent(
             }
         )
     ]
-    await asyncio.gather(*save_tasks, return_exceptions=True)
+    saved_message, _ = await asyncio.gather(*save_tasks, return_exceptions=True)
     emoji_logger.system_success("Mensagem e cache salvos")
 
     emoji_logger.webhook_process("Criando AGENTIC SDR Stateless...")
@@ -1320,6 +1405,15 @@ async def process_message_with_agent(
             conversation_id=conversation["id"],
             media_data=media_data
         )
+        execution_context["received_at"] = received_at
+        if settings.enable_streaming_responses:
+            execution_context["response_streamer"] = ResponseStreamer(
+                phone=phone,
+                send=evolution_client.send_text_message,
+                splitter=get_message_splitter_instance(),
+                min_chunk_length=settings.streaming_min_chunk_chars,
+                received_at=received_at
+            )
         emoji_logger.webhook_process("AGENTIC SDR Stateless pronto para uso")
     except HandoffActiveException:
         emoji_logger.system_info(f"Processamento interrompido para {phone} devido a handoff ativo.")
@@ -1331,10 +1425,15 @@ async def process_message_with_agent(
         )
 
     emoji_logger.system_debug("Processando mensagem com agente...")
-    response_text, updated_lead_info = await agentic.process_message(
-        message=message_content,
-        execution_context=execution_context
-    )
+    response_streamer = execution_context.get("response_streamer")
+    try:
+        response_text, updated_lead_info = await agentic.process_message(
+            message=message_content,
+            execution_context=execution_context
+        )
+    finally:
+        if response_streamer:
+            await response_streamer.aclose()
     emoji_logger.system_success(
         f"Resposta gerada pelo agente: '{response_text[:100]}...'"
     )
@@ -1342,6 +1441,12 @@ async def process_message_with_agent(
     final_response = extract_final_response(response_text)
     emoji_logger.system_debug(f"Resposta final extraída: '{final_response[:100]}...'")
 
+    # Mensagem com mídia fica salva como referência + texto extraído: os próximos turnos
+    # sabem o que foi enviado sem reenviar o base64 ao modelo
+    user_message_text = execution_context.get("user_message_text")
+    if user_message_text and isinstance(saved_message, dict) and saved_message.get("id"):
+        await supabase_client.update_message(saved_message["id"], {"content": user_message_text})
+
     if "<SILENCE>" in final_response or "<SILENCIO>" in final_response:
         emoji_logger.system_info(f"Protocolo de silêncio ativado para {phone}. Nenhuma mensagem será enviada.")
         return
@@ -1357,6 +1462,10 @@ async def process_message_with_agent(
         }
         await supabase_client.save_message(assistant_message_data)
         emoji_logger.system_success("Resposta do assistente salva")
+        # Resumo incremental em background quando a cauda não resumida passa do limite
+        get_conversation_summarizer().schedule(
+            conversation["id"], len(execution_context.get("conversation_history") or []) + 1
+        )
 
     if updated_lead_info and updated_lead_info.get("id"):
         emoji_logger.system_debug("Atualizando informações do lead...")
@@ -1364,13 +1473,19 @@ async def process_message_with_agent(
         await supabase_client.update_lead(updated_lead_info["id"], updated_lead_info)
         emoji_logger.system_success("Lead atualizado")
     
-    if final_response:
+    if response_streamer and response_streamer.completed:
+        emoji_logger.system_success(
+            f"Resposta enviada via WhatsApp em streaming ({len(response_streamer.sent_chunks)} chunks)"
+        )
+    elif final_response:
         emoji_logger.system_debug("Enviando resposta via WhatsApp...")
         splitter = get_message_splitter_instance()
         message_chunks = splitter.split_message(final_response)
         for i, chunk in enumerate(message_chunks):
             emoji_logger.system_debug(f"Enviando chunk {i+1}/{len(message_chunks)}: '{chunk[:50]}...'")
             await evolution_client.send_text_message(phone, chunk)
+            if i == 0 and received_at:
+                metrics.observe("time_to_first_bubble_ms", (time.time() - received_at) * 1000)
         emoji_logger.system_success("Resposta enviada via WhatsApp")
     else:
         emoji_logger.system_warning(
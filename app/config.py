@@ -44,6 +44,51 @@ class Settings(BaseSettings):
     supabase_service_key: str = Field(default="", env="SUPABASE_SERVICE_KEY")
     supabase_db_url: str = Field(default="", env="SUPABASE_DB_URL")
     supabase_key: str = Field(default="", env="SUPABASE_KEY")
+    supabase_max_workers: int = Field(
+        default=16, env="SUPABASE_MAX_WORKERS"
+    )
+    media_pool_workers: int = Field(
+        default=2, env="MEDIA_POOL_WORKERS"
+    )  # Processos para OCR/PDF (0 = thread única, sem processos)
+    media_pool_max_queue: int = Field(
+        default=32, env="MEDIA_POOL_MAX_QUEUE"
+    )
+    media_job_timeout: float = Field(
+        default=30.0, env="MEDIA_JOB_TIMEOUT"
+    )
+    media_pdf_max_ocr_pages: int = Field(
+        default=10, env="MEDIA_PDF_MAX_OCR_PAGES"
+    )
+    enable_ocr_preprocessing: bool = Field(
+        default=False, env="ENABLE_OCR_PREPROCESSING"
+    )  # Reduz, binariza e recorta a imagem antes do Tesseract (opt-in até haver benchmark)
+    ocr_target_width: int = Field(
+        default=800, env="OCR_TARGET_WIDTH"
+    )
+    ocr_tesseract_psm: int = Field(
+        default=4, env="OCR_TESSERACT_PSM"
+    )
+    enable_media_cache: bool = Field(
+        default=True, env="ENABLE_MEDIA_CACHE"
+    )  # Resultados de OCR/análise/transcrição por SHA-256 do conteúdo
+    media_cache_ttl: int = Field(
+        default=604800, env="MEDIA_CACHE_TTL"
+    )
+    media_cache_dir: str = Field(
+        default="/tmp/sdr_media_cache", env="MEDIA_CACHE_DIR"
+    )  # Fallback em disco quando o Redis não está disponível
+    media_cache_disk_max_mb: int = Field(
+        default=200, env="MEDIA_CACHE_DISK_MAX_MB"
+    )
+    audio_transcription_concurrency: int = Field(
+        default=4, env="AUDIO_TRANSCRIPTION_CONCURRENCY"
+    )  # Transcrições simultâneas (ffmpeg + Whisper)
+    audio_transcode_timeout: float = Field(
+        default=30.0, env="AUDIO_TRANSCODE_TIMEOUT"
+    )
+    audio_transcription_timeout: float = Field(
+        default=60.0, env="AUDIO_TRANSCRIPTION_TIMEOUT"
+    )
     redis_url: str = Field(
         default="redis://localhost:6379/0", env="REDIS_URL"
     )
@@ -108,6 +153,9 @@ class Settings(BaseSettings):
     kommo_human_handoff_stage_id: int = Field(
         default=90421387, env="KOMMO_HUMAN_HANDOFF_STAGE_ID"
     )
+    kommo_lead_status_cache_ttl: int = Field(
+        default=60, env="KOMMO_LEAD_STATUS_CACHE_TTL"
+    )
     kommo_not_interested_stage_id: int = Field(
         default=89709599, env="KOMMO_NOT_INTERESTED_STAGE_ID"
     )
@@ -255,6 +303,66 @@ class Settings(BaseSettings):
     message_buffer_timeout: float = Field(
         default=10.0, env="MESSAGE_BUFFER_TIMEOUT"
     )
+    message_buffer_backend: str = Field(
+        default="memory", env="MESSAGE_BUFFER_BACKEND"
+    )  # memory | redis (coalescência compartilhada entre workers)
+    message_buffer_lease_ttl: int = Field(
+        default=120, env="MESSAGE_BUFFER_LEASE_TTL"
+    )
+    message_buffer_quick_window: float = Field(
+        default=1.0, env="MESSAGE_BUFFER_QUICK_WINDOW"
+    )
+    message_buffer_incomplete_window: float = Field(
+        default=4.0, env="MESSAGE_BUFFER_INCOMPLETE_WINDOW"
+    )
+    message_buffer_max_wait: float = Field(
+        default=30.0, env="MESSAGE_BUFFER_MAX_WAIT"
+    )
+    message_buffer_idle_ttl: float = Field(
+        default=600.0, env="MESSAGE_BUFFER_IDLE_TTL"
+    )
+    message_buffer_max_phones: int = Field(
+        default=5000, env="MESSAGE_BUFFER_MAX_PHONES"
+    )
+    gemini_model_cache_size: int = Field(
+        default=32, env="GEMINI_MODEL_CACHE_SIZE"
+    )
+    llm_max_concurrency_per_model: int = Field(
+        default=16, env="LLM_MAX_CONCURRENCY_PER_MODEL"
+    )
+    enable_prompt_cache: bool = Field(
+        default=True, env="ENABLE_PROMPT_CACHE"
+    )
+    gemini_context_cache_ttl: int = Field(
+        default=3600, env="GEMINI_CONTEXT_CACHE_TTL"
+    )  # TTL (s) do CachedContent com a persona do agente
+    message_dedupe_ttl: int = Field(
+        default=86400, env="MESSAGE_DEDUPE_TTL"
+    )
+    message_dedupe_lru_size: int = Field(
+        default=10000, env="MESSAGE_DEDUPE_LRU_SIZE"
+    )
+    inbound_queue_enabled: bool = Field(
+        default=False, env="INBOUND_QUEUE_ENABLED"
+    )  # Webhook só grava no Redis Stream; consumidores rodam o pipeline
+    inbound_queue_stream: str = Field(
+        default="inbound:evolution", env="INBOUND_QUEUE_STREAM"
+    )
+    inbound_queue_group: str = Field(
+        default="sdr-workers", env="INBOUND_QUEUE_GROUP"
+    )
+    inbound_queue_concurrency: int = Field(
+        default=8, env="INBOUND_QUEUE_CONCURRENCY"
+    )
+    inbound_queue_claim_idle_ms: int = Field(
+        default=120000, env="INBOUND_QUEUE_CLAIM_IDLE_MS"
+    )
+    inbound_queue_max_deliveries: int = Field(
+        default=5, env="INBOUND_QUEUE_MAX_DELIVERIES"
+    )
+    inbound_queue_maxlen: int = Field(
+        default=10000, env="INBOUND_QUEUE_MAXLEN"
+    )
     enable_message_splitter: bool = Field(
         default=True, env="ENABLE_MESSAGE_SPLITTER"
     )
@@ -373,9 +481,60 @@ class Settings(BaseSettings):
     enable_streaming_responses: bool = Field(
         default=True, env="ENABLE_STREAMING_RESPONSES"
     )
+    streaming_min_chunk_chars: int = Field(
+        default=80, env="STREAMING_MIN_CHUNK_CHARS"
+    )
     enable_parallel_agent_processing: bool = Field(
         default=True, env="ENABLE_PARALLEL_AGENT_PROCESSING"
     )
+    tool_call_timeout: float = Field(
+        default=30.0, env="TOOL_CALL_TIMEOUT"
+    )
+    enable_native_tool_calling: bool = Field(
+        default=False, env="ENABLE_NATIVE_TOOL_CALLING"
+    )
+    native_tool_max_rounds: int = Field(
+        default=3, env="NATIVE_TOOL_MAX_ROUNDS"
+    )
+    history_token_budget: int = Field(
+        default=12000, env="HISTORY_TOKEN_BUDGET"
+    )  # Tokens do histórico enviados ao LLM (mais recentes primeiro)
+    history_fetch_limit: int = Field(
+        default=200, env="HISTORY_FETCH_LIMIT"
+    )
+    enable_conversation_summary: bool = Field(
+        default=True, env="ENABLE_CONVERSATION_SUMMARY"
+    )
+    conversation_summary_threshold: int = Field(
+        default=20, env="CONVERSATION_SUMMARY_THRESHOLD"
+    )  # Mensagens não resumidas (além das keep_recent) que disparam o resumo
+    conversation_summary_keep_recent: int = Field(
+        default=10, env="CONVERSATION_SUMMARY_KEEP_RECENT"
+    )
+    conversation_summary_max_tokens: int = Field(
+        default=600, env="CONVERSATION_SUMMARY_MAX_TOKENS"
+    )
+    enable_image_description_cache: bool = Field(
+        default=False, env="ENABLE_IMAGE_DESCRIPTION_CACHE"
+    )  # Descrição da imagem pelo modelo, em cache pelo hash do conteúdo
+    image_description_cache_ttl: int = Field(
+        default=604800, env="IMAGE_DESCRIPTION_CACHE_TTL"
+    )
+    enable_response_cache: bool = Field(
+        default=False, env="ENABLE_RESPONSE_CACHE"
+    )  # Respostas de FAQ reaproveitadas (pergunta + estágio + versão da base)
+    response_cache_similarity: float = Field(
+        default=0.8, env="RESPONSE_CACHE_SIMILARITY"
+    )
+    response_cache_min_terms: int = Field(
+        default=3, env="RESPONSE_CACHE_MIN_TERMS"
+    )  # Perguntas com menos termos dependem do contexto da conversa
+    response_cache_ttl: int = Field(
+        default=86400, env="RESPONSE_CACHE_TTL"
+    )
+    response_cache_max_entries: int = Field(
+        default=2000, env="RESPONSE_CACHE_MAX_ENTRIES"
+    )
     max_reasoning_depth: int = Field(default=3, env="MAX_REASONING_DEPTH")
 
     @validator('google_private_key')
@@ -0,0 +1,98 @@
+"""
+History Builder - Histórico da conversa limitado por orçamento de tokens
+Preenche o orçamento da mensagem mais recente para a mais antiga; os turnos que ficam
+de fora são representados pelo resumo acumulado da conversa (coluna history_summary)
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.metrics import metrics
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Custo fixo por mensagem (papel e delimitadores) e por mídia inline
+MESSAGE_OVERHEAD_TOKENS = 4
+MEDIA_PART_TOKENS = 258
+# Estimativa para modelos sem tokenizer local (Gemini): ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+SUMMARY_TEMPLATE = "<resumo_da_conversa_anterior>\n{summary}\n</resumo_da_conversa_anterior>"
+
+_encoders: Dict[str, Any] = {}
+
+
+def _get_encoder(model_id: Optional[str]):
+    """Tokenizer tiktoken para modelos OpenAI; None usa a estimativa por caracteres"""
+    if not TIKTOKEN_AVAILABLE or not model_id or model_id.startswith("gemini"):
+        return None
+    if model_id not in _encoders:
+        try:
+            try:
+                _encoders[model_id] = tiktoken.encoding_for_model(model_id)
+            except KeyError:
+                _encoders[model_id] = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Sem o arquivo de encoding (ambiente offline): estimativa daqui em diante
+            _encoders[model_id] = None
+    return _encoders[model_id]
+
+
+def count_text_tokens(text: str, model_id: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    encoder = _get_encoder(model_id)
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def count_message_tokens(message: Dict[str, Any], model_id: Optional[str] = None) -> int:
+    content = message.get("content")
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    if isinstance(content, list):
+        for part in content:
+            if part.get("type") == "media":
+                tokens += MEDIA_PART_TOKENS
+            else:
+                tokens += count_text_tokens(part.get("text", ""), model_id)
+    else:
+        tokens += count_text_tokens(str(content or ""), model_id)
+    return tokens
+
+
+def build_history(
+    messages: List[Dict[str, Any]],
+    budget: int,
+    summary: Optional[str] = None,
+    model_id: Optional[str] = None,
+    history_is_tail: bool = False
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Mensagens mais recentes que cabem em `budget` tokens, na ordem original.
+    A última mensagem sempre entra; o resumo abre o histórico se algo ficou de fora
+    ou se `messages` já é só a cauda posterior ao resumo (history_is_tail).
+    Retorna (histórico, tokens estimados).
+    """
+    kept: List[Dict[str, Any]] = []
+    used = 0
+    for message in reversed(messages):
+        cost = count_message_tokens(message, model_id)
+        if kept and used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+
+    dropped = len(messages) - len(kept)
+    if dropped:
+        metrics.increment("history_messages_dropped", dropped)
+    if summary and (dropped or history_is_tail):
+        summary_message = {"role": "user", "content": SUMMARY_TEMPLATE.format(summary=summary)}
+        kept.insert(0, summary_message)
+        used += count_message_tokens(summary_message, model_id)
+
+    metrics.observe("history_prompt_tokens", used)
+    return kept, used
@@ -0,0 +1,128 @@
+"""
+Media Cache - Resultados de análise de mídia endereçados pelo conteúdo
+Chave = SHA-256 dos bytes decodificados: o mesmo comprovante ou áudio reenviado
+(ex.: depois de "não recebi") reaproveita OCR, análise e transcrição sem CPU nem API.
+Redis quando disponível; sem Redis, arquivos JSON em disco com TTL e limite de tamanho.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.integrations.redis_client import redis_client
+from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
+
+# Incrementar quando o formato do resultado ou a lógica de análise mudar
+MEDIA_CACHE_VERSION = 2
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class MediaAnalysisCache:
+    """
+    Cache de resultados de process_media (Redis com fallback em disco)
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[int] = None,
+                 disk_max_bytes: Optional[int] = None):
+        self.directory = Path(directory or settings.media_cache_dir)
+        self.ttl = ttl or settings.media_cache_ttl
+        self.disk_max_bytes = disk_max_bytes or settings.media_cache_disk_max_mb * 1024 * 1024
+        metrics.register_gauge("media_cache_hit_rate", self.hit_rate)
+
+    @staticmethod
+    def _key(media_type: str, digest: str, variant: str = "") -> str:
+        # variant: configuração que muda o resultado (ex.: pipeline de OCR)
+        scope = f"{media_type}:{variant}" if variant else media_type
+        return f"media:analysis:v{MEDIA_CACHE_VERSION}:{scope}:{digest}"
+
+    def hit_rate(self) -> float:
+        hits = metrics.get_counter("media_cache_hits")
+        total = hits + metrics.get_counter("media_cache_misses")
+        return round(hits / total, 3) if total else 0.0
+
+    async def get(self, media_type: str, digest: str, variant: str = "") -> Optional[Dict[str, Any]]:
+        key = self._key(media_type, digest, variant)
+        result = None
+        if redis_client.redis_client:
+            result = await redis_client.get(key)
+        if not isinstance(result, dict):
+            result = await asyncio.to_thread(self._disk_get, key)
+
+        if result is None:
+            metrics.increment("media_cache_misses")
+            return None
+        metrics.increment("media_cache_hits")
+        emoji_logger.multimodal_event(f"♻️ Mídia já analisada (#{digest[:12]}), resultado reaproveitado")
+        return result
+
+    async def put(self, media_type: str, digest: str, result: Dict[str, Any], variant: str = "") -> None:
+        key = self._key(media_type, digest, variant)
+        if redis_client.redis_client and await redis_client.set(key, result, ttl=self.ttl):
+            return
+        try:
+            await asyncio.to_thread(self._disk_put, key, result)
+        except Exception as e:
+            emoji_logger.system_warning(f"Falha ao gravar cache de mídia em disco: {e}")
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key.replace(":", "_") + ".json")
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key: str, result: Dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(result, ensure_ascii=False, default=str), encoding="utf-8")
+        os.replace(tmp_path, path)
+        self._enforce_disk_limit()
+
+    def _enforce_disk_limit(self) -> None:
+        """Remove os arquivos mais antigos até caber em MEDIA_CACHE_DISK_MAX_MB"""
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            metrics.increment("media_cache_disk_evictions")
+
+
+_media_cache: Optional[MediaAnalysisCache] = None
+
+
+def get_media_cache() -> MediaAnalysisCache:
+    """Retorna a instância singleton do MediaAnalysisCache"""
+    global _media_cache
+    if _media_cache is None:
+        _media_cache = MediaAnalysisCache()
+    return _media_cache
+
+
+def set_media_cache(cache: Optional[MediaAnalysisCache]) -> None:
+    """Define a instância global do MediaAnalysisCache"""
+    global _media_cache
+    _media_cache = cache
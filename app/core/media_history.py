@@ -0,0 +1,118 @@
+"""
+Media History - Mídia enviada ao modelo uma única vez, no turno em que chega
+Fora desse turno (e nas chamadas seguintes do mesmo turno) cada mídia vira uma
+referência compacta com o texto extraído: OCR, transcrição ou descrição da imagem
+"""
+import hashlib
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.integrations.redis_client import redis_client
+from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
+
+MEDIA_LABELS = {
+    "image": "Imagem",
+    "audio": "Áudio",
+    "video": "Vídeo",
+    "application": "Documento",
+}
+# Texto extraído guardado na referência (o histórico não deve crescer com OCR de PDFs longos)
+MAX_EXTRACTED_CHARS = 1500
+DESCRIBE_IMAGE_PROMPT = (
+    "Descreva esta imagem em até 3 frases objetivas, em português. Se for um comprovante "
+    "de pagamento, informe valor, data, pagador e recebedor visíveis."
+)
+
+
+def media_fingerprint(content: str) -> str:
+    """Hash do conteúdo base64 (mesma mídia reenviada = mesma referência)"""
+    return hashlib.sha256((content or "").encode()).hexdigest()[:16]
+
+
+def media_reference(part: Dict[str, Any]) -> str:
+    """Referência textual que substitui a parte `media` (com sha256/extracted_text) no histórico"""
+    media_data = part.get("media_data", {})
+    mime_type = media_data.get("mime_type") or "application/octet-stream"
+    label = MEDIA_LABELS.get(mime_type.split("/")[0], "Arquivo")
+    fingerprint = part.get("sha256") or media_fingerprint(media_data.get("content", ""))
+    reference = f"[Mídia do lead: {label} ({mime_type}, #{fingerprint})]"
+    extracted = (part.get("extracted_text") or "").strip()
+    if extracted:
+        reference += f" Conteúdo extraído: {extracted[:MAX_EXTRACTED_CHARS]}"
+    return reference
+
+
+def compact_media(messages: List[Dict[str, Any]], keep_last: bool = True) -> List[Dict[str, Any]]:
+    """
+    Substitui partes `media` por referências, exceto na última mensagem quando
+    keep_last (o turno em que a mídia chegou). Mensagens sem mídia não são copiadas.
+    """
+    compacted = []
+    last_index = len(messages) - 1
+    for index, message in enumerate(messages):
+        content = message.get("content")
+        has_media = isinstance(content, list) and any(p.get("type") == "media" for p in content)
+        if not has_media or (keep_last and index == last_index):
+            compacted.append(message)
+            continue
+        parts = []
+        for part in content:
+            if part.get("type") == "media":
+                parts.append({"type": "text", "text": media_reference(part)})
+                metrics.increment("media_parts_compacted")
+            else:
+                parts.append(part)
+        compacted.append({**message, "content": parts})
+    return compacted
+
+
+def content_text(content: Any) -> str:
+    """Conteúdo multimodal em texto (mídias viram referências) para persistir no banco"""
+    if not isinstance(content, list):
+        return str(content or "")
+    texts = []
+    for part in content:
+        if part.get("type") == "media":
+            texts.append(media_reference(part))
+        elif part.get("text"):
+            texts.append(part["text"])
+    return "\n".join(texts)
+
+
+async def describe_image(model_manager, part: Dict[str, Any]) -> Optional[str]:
+    """
+    Descrição curta da imagem pelo modelo, em cache no Redis pelo hash do conteúdo
+    (ENABLE_IMAGE_DESCRIPTION_CACHE). Falhas retornam None sem interromper o turno.
+    """
+    if not settings.enable_image_description_cache:
+        return None
+    media_data = part.get("media_data", {})
+    fingerprint = part.get("sha256") or media_fingerprint(media_data.get("content", ""))
+    key = f"media:image_description:{fingerprint}"
+    cached = await redis_client.get(key)
+    if cached:
+        metrics.increment("image_description_cache_hits")
+        return cached if isinstance(cached, str) else str(cached)
+
+    metrics.increment("image_description_cache_misses")
+    started = time.perf_counter()
+    try:
+        description = await model_manager.get_response(
+            [{"role": "user", "content": [
+                {"type": "text", "text": DESCRIBE_IMAGE_PROMPT},
+                {"type": "media", "media_data": media_data},
+            ]}],
+            temperature=0.2,
+            max_tokens=200
+        )
+    except Exception as e:
+        emoji_logger.system_warning(f"Falha ao descrever imagem #{fingerprint}: {e}")
+        return None
+    metrics.observe("image_description_ms", (time.perf_counter() - started) * 1000)
+
+    if description:
+        description = description.strip()
+        await redis_client.set(key, description, ttl=settings.image_description_cache_ttl)
+    return description or None
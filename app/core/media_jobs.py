@@ -0,0 +1,129 @@
+"""
+Media Jobs - Trabalho de CPU do processamento de mídia (OCR, PDF, DOCX)
+Funções puras executadas nos processos do MediaProcessPool: recebem e devolvem só
+bytes/str/int (serializáveis) e não importam nada do app além das bibliotecas de mídia
+"""
+import io
+from typing import List, Tuple
+
+OCR_LANG = "por"
+# Largura alvo do OCR: texto de comprovante fica com ~25-30 px de altura, a faixa
+# em que o Tesseract acerta mais (screenshots de 1080-1440 px só custam tempo)
+OCR_TARGET_WIDTH = 800
+# --psm 4: uma coluna de texto com tamanhos variados (rótulo + valor por linha)
+OCR_PSM = 4
+OCR_CROP_MARGIN = 12
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Limiar que melhor separa texto e fundo (Otsu) a partir do histograma em cinza"""
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    weight_bg = sum_bg = 0
+    best_variance, threshold = 0.0, 127
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += level * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_variance, threshold = variance, level
+    return threshold
+
+
+def preprocess_for_ocr(image, max_width: int = OCR_TARGET_WIDTH):
+    """
+    Prepara screenshot para o Tesseract: reduz para max_width, converte para cinza,
+    binariza (texto preto em fundo branco, inclusive modo escuro) e recorta na região de texto
+    """
+    from PIL import Image, ImageOps
+
+    gray = ImageOps.grayscale(ImageOps.exif_transpose(image))
+    if gray.width > max_width:
+        height = max(1, round(gray.height * max_width / gray.width))
+        gray = gray.resize((max_width, height), Image.LANCZOS)
+
+    histogram = gray.histogram()
+    mean = sum(i * count for i, count in enumerate(histogram)) / max(1, sum(histogram))
+    if mean < 128:
+        gray = ImageOps.invert(gray)
+        histogram = histogram[::-1]
+
+    threshold = _otsu_threshold(histogram)
+    binary = gray.point(lambda p: 255 if p > threshold else 0)
+
+    bbox = ImageOps.invert(binary).getbbox()
+    if bbox:
+        left, top, right, bottom = bbox
+        binary = binary.crop((
+            max(0, left - OCR_CROP_MARGIN),
+            max(0, top - OCR_CROP_MARGIN),
+            min(binary.width, right + OCR_CROP_MARGIN),
+            min(binary.height, bottom + OCR_CROP_MARGIN),
+        ))
+    return binary
+
+
+def ocr_image(
+    image_bytes: bytes,
+    lang: str = OCR_LANG,
+    preprocess: bool = True,
+    max_width: int = OCR_TARGET_WIDTH,
+    psm: int = OCR_PSM,
+    timeout: float = 0
+) -> Tuple[str, int, int, str]:
+    """
+    OCR de uma imagem: (texto, largura, altura, formato) — dimensões da original.
+    timeout (s, 0 = sem limite) mata o tesseract travado e libera o worker do pool
+    """
+    from PIL import Image
+    import pytesseract
+
+    image = Image.open(io.BytesIO(image_bytes))
+    width, height = image.size
+    image_format = image.format or "unknown"
+    if preprocess:
+        image = preprocess_for_ocr(image, max_width)
+    text = pytesseract.image_to_string(image, lang=lang, config=f"--psm {psm}", timeout=timeout)
+    return text, width, height, image_format
+
+
+def image_info(image_bytes: bytes) -> Tuple[int, int, str]:
+    """Dimensões e formato, sem OCR"""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_bytes))
+    return image.size[0], image.size[1], image.format or "unknown"
+
+
+def pdf_text(pdf_bytes: bytes) -> Tuple[str, int]:
+    """Texto embutido do PDF e número de páginas (PdfReadError se não for PDF)"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    text = "".join(page.extract_text() or "" for page in reader.pages)
+    return text, len(reader.pages)
+
+
+def ocr_pdf_page(pdf_bytes: bytes, page_number: int, lang: str = OCR_LANG, timeout: float = 0) -> str:
+    """Renderiza uma única página (1-based) e aplica OCR (timeout por etapa, 0 = sem limite)"""
+    from pdf2image import convert_from_bytes
+    import pytesseract
+
+    images = convert_from_bytes(
+        pdf_bytes, first_page=page_number, last_page=page_number, timeout=timeout or None
+    )
+    return pytesseract.image_to_string(images[0], lang=lang, timeout=timeout) if images else ""
+
+
+def docx_text(docx_bytes: bytes) -> str:
+    from docx import Document
+
+    document = Document(io.BytesIO(docx_bytes))
+    return "\n".join(p.text for p in document.paragraphs)
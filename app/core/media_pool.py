@@ -0,0 +1,135 @@
+"""
+Media Process Pool - OCR e parsing de documentos fora do event loop
+ProcessPoolExecutor dedicado com concorrência limitada, limite de fila (jobs esperando
++ executando), timeout por job e métricas de espera na fila e de execução. Um worker que
+morre (OOM, segfault no tesseract) quebra o executor; ele é descartado e recriado no próximo job
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.config import settings
+from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
+
+
+class MediaPoolBusyError(Exception):
+    """Fila do pool cheia: o job é recusado em vez de esperar indefinidamente"""
+
+
+class MediaProcessPool:
+    """
+    Pool de processos para trabalho de CPU de mídia (workers=0 usa threads)
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        job_timeout: Optional[float] = None
+    ):
+        self.workers = settings.media_pool_workers if workers is None else workers
+        self.max_queue = max_queue or settings.media_pool_max_queue
+        self.job_timeout = job_timeout or settings.media_job_timeout
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+        self._semaphore = asyncio.Semaphore(max(1, self.workers))
+        metrics.register_gauge("media_pool_pending", lambda: self.pending)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.workers > 0:
+                # spawn: processos limpos, sem herdar threads/locks do uvicorn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="media")
+            emoji_logger.system_ready("🧮 MediaProcessPool", workers=self.workers, max_queue=self.max_queue)
+        return self._executor
+
+    def _reset_executor(self, executor: Executor) -> None:
+        """Descarta um executor quebrado (só se ainda for o atual)"""
+        if self._executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Executa fn(*args) no pool. MediaPoolBusyError se a fila estiver cheia;
+        asyncio.TimeoutError se passar do timeout (o slot só volta quando o job termina);
+        BrokenProcessPool se o worker morrer durante o job
+        """
+        if self.pending >= self.max_queue:
+            metrics.increment("media_pool_rejected")
+            raise MediaPoolBusyError(f"Fila de mídia cheia ({self.pending} jobs)")
+
+        self.pending += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self.pending -= 1
+            raise
+        started = time.perf_counter()
+        metrics.observe("media_pool_queue_wait_ms", (started - queued_at) * 1000)
+
+        def _done(_):
+            metrics.observe(f"media_job_ms:{fn.__name__}", (time.perf_counter() - started) * 1000)
+            self.pending -= 1
+            self._semaphore.release()
+
+        loop = asyncio.get_running_loop()
+        try:
+            executor = self._get_executor()
+            try:
+                future = loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                # Quebrou depois do último job: recria e submete de novo
+                self._reset_executor(executor)
+                executor = self._get_executor()
+                future = loop.run_in_executor(executor, fn, *args)
+        except BaseException:
+            self.pending -= 1
+            self._semaphore.release()
+            raise
+        future.add_done_callback(_done)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.job_timeout)
+        except asyncio.TimeoutError:
+            metrics.increment("media_job_timeouts")
+            emoji_logger.system_warning(f"Job de mídia {fn.__name__} excedeu {timeout or self.job_timeout}s")
+            raise
+        except BrokenProcessPool:
+            # Só os jobs em andamento falham; o próximo run já usa um executor novo
+            metrics.increment("media_pool_broken")
+            emoji_logger.system_warning(f"Worker de mídia morreu durante {fn.__name__}; recriando o pool")
+            self._reset_executor(executor)
+            raise
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_media_pool: Optional[MediaProcessPool] = None
+
+
+def get_media_pool() -> MediaProcessPool:
+    """Retorna a instância singleton do MediaProcessPool"""
+    global _media_pool
+    if _media_pool is None:
+        _media_pool = MediaProcessPool()
+    return _media_pool
+
+
+def set_media_pool(pool: Optional[MediaProcessPool]) -> None:
+    """Define a instância global do MediaProcessPool"""
+    global _media_pool
+    _media_pool = pool
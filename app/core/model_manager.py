@@ -3,11 +3,19 @@ Model Manager - Gerenciamento simples de modelos AI
 ZERO complexidade, máxima confiabilidade
 """
 
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import Optional, Dict, Any, Callable, Awaitable, List, Tuple
 import asyncio
 import base64
+import hashlib
+import json
+import time
 from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
 from app.config import settings
+from app.core.tool_schemas import gemini_tools, openai_tools, serialize_result, service_method
 
 # Import das bibliotecas REAIS de AI
 try:
@@ -24,6 +32,11 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+# Recebe cada trecho de texto conforme o modelo gera (streaming)
+DeltaCallback = Callable[[str], Awaitable[None]]
+# Executa as chamadas [(service.method, params), ...] e devolve os resultados na mesma ordem
+ToolExecutor = Callable[[List[Tuple[str, Dict[str, Any]]]], Awaitable[List[Any]]]
+
 
 # Classes wrapper para APIs REAIS
 class Gemini:
@@ -41,20 +54,241 @@ class Gemini:
             # Para outros modelos, usa o próprio ID como base
             self.base_model_name = id
 
+        # Cache explícito da persona (CachedContent) por hash do prefixo estático
+        self.context_cache_ttl = settings.gemini_context_cache_ttl if settings.enable_prompt_cache else 0
+        self._cached_models: Dict[str, tuple] = {}
+        self._cache_disabled_until = 0.0
+
+        # GenerativeModel reutilizado por (modelo, hash do system_instruction), com LRU
+        self._models: "OrderedDict[tuple, Any]" = OrderedDict()
+        self.max_cached_models = settings.gemini_model_cache_size
+        # Limite de chamadas simultâneas a este modelo no processo
+        self._semaphore = asyncio.Semaphore(max(1, settings.llm_max_concurrency_per_model))
+        self.in_flight = 0
+        metrics.register_gauge(f"llm_in_flight:{self.id}", lambda: self.in_flight)
+
         if GEMINI_AVAILABLE:
             genai.configure(api_key=api_key)
 
-    async def achat(self, messages, system_prompt: Optional[str] = None):
-        """Chamada REAL para Gemini API com suporte multimodal, criando um modelo com o system_prompt a cada chamada."""
+    async def _get_cached_model(self, static_prefix: str):
+        """
+        Retorna um modelo ligado a um CachedContent com a persona (TTL context_cache_ttl).
+        None quando o cache está desabilitado ou indisponível (ex.: prompt abaixo do
+        mínimo de tokens do modelo) - nesse caso a persona vai em system_instruction.
+        """
+        if not GEMINI_AVAILABLE or self.context_cache_ttl <= 0 or time.time() < self._cache_disabled_until:
+            return None
+        key = hashlib.sha256(static_prefix.encode("utf-8")).hexdigest()
+        cached = self._cached_models.get(key)
+        # Margem de 60s para não usar um cache prestes a expirar no provedor
+        if cached and cached[1] > time.time() + 60:
+            return cached[0]
+        try:
+            cache = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: genai.caching.CachedContent.create(
+                    model=f"models/{self.base_model_name}",
+                    display_name=f"persona-{key[:16]}",
+                    system_instruction=static_prefix,
+                    ttl=timedelta(seconds=self.context_cache_ttl)
+                )
+            )
+            model = genai.GenerativeModel.from_cached_content(cached_content=cache)
+            # Uma persona ativa por vez: caches de prefixos antigos expiram sozinhos
+            self._cached_models = {key: (model, time.time() + self.context_cache_ttl)}
+            metrics.increment("gemini_context_cache_created")
+            emoji_logger.system_debug(f"Cache de contexto Gemini criado para a persona ({key[:16]})")
+            return model
+        except Exception as e:
+            self._cache_disabled_until = time.time() + 600
+            emoji_logger.model_warning(f"Cache de contexto Gemini indisponível, usando system_instruction: {e}")
+            return None
+
+    def _get_model(self, system_instruction: Optional[str]):
+        """GenerativeModel em cache LRU; só é construído quando o system_instruction muda"""
+        digest = hashlib.sha256((system_instruction or "").encode("utf-8")).hexdigest()
+        key = (self.base_model_name, digest)
+        model = self._models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(
+                model_name=self.base_model_name,
+                system_instruction=system_instruction
+            )
+            self._models[key] = model
+            metrics.increment("gemini_models_created")
+            while len(self._models) > self.max_cached_models:
+                self._models.popitem(last=False)
+        else:
+            self._models.move_to_end(key)
+        return model
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Vaga no limite de concorrência do modelo, com histogramas de espera e latência"""
+        wait_started = time.perf_counter()
+        async with self._semaphore:
+            metrics.observe(f"llm_concurrency_wait_ms:{self.id}", (time.perf_counter() - wait_started) * 1000)
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                metrics.observe(f"llm_request_ms:{self.id}", (time.perf_counter() - started) * 1000)
+
+    async def _generate(self, model, contents, **kwargs):
+        """Chamada assíncrona nativa, limitada por modelo"""
+        async with self._slot():
+            return await model.generate_content_async(contents, **kwargs)
+
+    @staticmethod
+    def _usage(response) -> Dict[str, int]:
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+            "cached_tokens": getattr(usage, "cached_content_token_count", 0) or 0,
+        }
+
+    async def achat(self, messages, system_prompt: Optional[str] = None, context_suffix: Optional[str] = None):
+        """
+        Chamada REAL para Gemini API com suporte multimodal.
+        system_prompt é o prefixo estático (persona, cacheável); context_suffix é o
+        contexto volátil (data, pagamento, nome), enviado por último.
+        """
         if not GEMINI_AVAILABLE:
             return type('Response', (), {'content': 'Gemini não disponível. Configure GOOGLE_API_KEY.'})()
 
-        # Cria uma nova instância do modelo a cada chamada, garantindo que o system_prompt seja aplicado.
-        model = genai.GenerativeModel(
-            model_name=self.base_model_name,
-            system_instruction=system_prompt
-        )
+        model, gemini_history = await self._prepare(messages, system_prompt, context_suffix)
+        response = await self._generate(model, gemini_history)
+
+        try:
+            # Acesso seguro ao conteúdo da resposta
+            content = response.text
+            return type('Response', (), {'content': content, 'usage': self._usage(response)})()
+        except Exception as e:
+            # Se response.text falhar (e.g., sem 'parts' válidas), loga e retorna None
+            finish_reason = getattr(response, 'finish_reason', 'N/A')
+            prompt_feedback = getattr(response, 'prompt_feedback', 'N/A')
+            emoji_logger.model_warning(
+                "Gemini response has no valid part, indicating a potential issue (e.g., safety filters). Triggering fallback.",
+                finish_reason=finish_reason,
+                prompt_feedback=str(prompt_feedback),
+                error=str(e)
+            )
+            return None
 
+    async def astream(
+            self, messages, on_delta: DeltaCallback, system_prompt: Optional[str] = None,
+            context_suffix: Optional[str] = None
+    ):
+        """Como achat, mas entrega cada trecho de texto a on_delta assim que chega"""
+        if not GEMINI_AVAILABLE:
+            return None
+
+        model, gemini_history = await self._prepare(messages, system_prompt, context_suffix)
+        parts, usage = [], {}
+        async with self._slot():
+            response = await model.generate_content_async(gemini_history, stream=True)
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except Exception:
+                    # Chunk sem parts (ex.: só usage ou bloqueio de segurança)
+                    text = ""
+                if text:
+                    parts.append(text)
+                    await on_delta(text)
+                if getattr(chunk, "usage_metadata", None):
+                    usage = self._usage(chunk)
+
+        content = "".join(parts)
+        if not content:
+            emoji_logger.model_warning("Stream do Gemini terminou sem texto. Triggering fallback.")
+            return None
+        return type('Response', (), {'content': content, 'usage': usage})()
+
+    async def _prepare(self, messages, system_prompt: Optional[str], context_suffix: Optional[str]) -> tuple:
+        """Escolhe o modelo (cache de contexto ou system_instruction) e monta o histórico"""
+        gemini_history = self._to_gemini_history(messages)
+
+        model = None
+        if system_prompt and context_suffix is not None:
+            model = await self._get_cached_model(system_prompt)
+        if model is None:
+            # Sem cache explícito: system_instruction só com o prefixo estável, o que mantém
+            # o GenerativeModel reutilizável e o prefixo elegível ao cache implícito
+            model = self._get_model(system_prompt)
+        self._append_context_suffix(gemini_history, context_suffix)
+        return model, gemini_history
+
+    @staticmethod
+    def _append_context_suffix(gemini_history: list, context_suffix: Optional[str]) -> None:
+        """Contexto volátil no fim do último turno do usuário"""
+        if not context_suffix:
+            return
+        if gemini_history and gemini_history[-1]['role'] == 'user':
+            gemini_history[-1]['parts'].append(context_suffix)
+        else:
+            gemini_history.append({'role': 'user', 'parts': [context_suffix]})
+
+    async def arun_tools(
+            self, messages, specs: List[Dict[str, Any]], execute: ToolExecutor, max_rounds: int = 3,
+            system_prompt: Optional[str] = None, context_suffix: Optional[str] = None
+    ):
+        """
+        Function calling nativo: o modelo devolve function_call estruturados, executados por
+        execute. Cada rodada só acrescenta o turno do modelo e as function_response ao fim
+        do histórico; o prefixo fica idêntico entre rodadas.
+        """
+        if not GEMINI_AVAILABLE:
+            return None
+
+        gemini_history = self._to_gemini_history(messages)
+        # Tools vão por chamada; o modelo do cache explícito (CachedContent) não os aceita avulsos
+        model = self._get_model(system_prompt)
+        self._append_context_suffix(gemini_history, context_suffix)
+        tools = gemini_tools(specs)
+        usage = {"prompt_tokens": 0, "cached_tokens": 0}
+
+        for round_index in range(max_rounds + 1):
+            kwargs = {"tools": tools}
+            if round_index == max_rounds:
+                # Última rodada: só texto
+                kwargs["tool_config"] = {"function_calling_config": {"mode": "NONE"}}
+            response = await self._generate(model, gemini_history, **kwargs)
+            for key, value in self._usage(response).items():
+                usage[key] += value
+
+            parts = response.candidates[0].content.parts if response.candidates else []
+            calls = [
+                part.function_call for part in parts
+                if getattr(part, "function_call", None) and part.function_call.name
+            ]
+            if not calls:
+                try:
+                    content = response.text
+                except Exception as e:
+                    emoji_logger.model_warning(f"Gemini sem texto após function calling: {e}")
+                    return None
+                return type('Response', (), {'content': content, 'usage': usage, 'tool_rounds': round_index})()
+
+            gemini_history.append({
+                'role': 'model',
+                'parts': [{'function_call': {'name': call.name, 'args': dict(call.args)}} for call in calls]
+            })
+            results = await execute([(service_method(call.name), dict(call.args)) for call in calls])
+            gemini_history.append({
+                'role': 'user',
+                'parts': [
+                    {'function_response': {'name': call.name, 'response': {'result': serialize_result(result)}}}
+                    for call, result in zip(calls, results)
+                ]
+            })
+        return None
+
+    @staticmethod
+    def _to_gemini_history(messages) -> list:
+        """Converte o histórico interno (texto + mídia base64) para o formato do Gemini"""
         gemini_history = []
         for msg in messages:
             role = 'user' if msg['role'] == 'user' else 'model'
@@ -81,27 +315,7 @@ class Gemini:
 
             if parts:
                 gemini_history.append({'role': role, 'parts': parts})
-
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: model.generate_content(gemini_history)
-        )
-
-        try:
-            # Acesso seguro ao conteúdo da resposta
-            content = response.text
-            return type('Response', (), {'content': content})()
-        except Exception as e:
-            # Se response.text falhar (e.g., sem 'parts' válidas), loga e retorna None
-            finish_reason = getattr(response, 'finish_reason', 'N/A')
-            prompt_feedback = getattr(response, 'prompt_feedback', 'N/A')
-            emoji_logger.model_warning(
-                "Gemini response has no valid part, indicating a potential issue (e.g., safety filters). Triggering fallback.",
-                finish_reason=finish_reason,
-                prompt_feedback=str(prompt_feedback),
-                error=str(e)
-            )
-            return None
+        return gemini_history
 
 
 class OpenAI:
@@ -119,12 +333,18 @@ class OpenAI:
                 "OpenAI client não pôde ser inicializado. Verifique a disponibilidade da biblioteca e a OPENAI_API_KEY."
             )
 
-    async def achat(self, messages):
-        """Chamada REAL para OpenAI API com suporte para nosso formato multimodal interno."""
-        if not self.client:
-            emoji_logger.model_error("Tentativa de usar o fallback OpenAI, mas o cliente não está configurado.")
-            return None
+    @staticmethod
+    def _usage(response) -> Dict[str, int]:
+        """Tokens de entrada e quantos vieram do cache automático de prefixo da OpenAI"""
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+        }
 
+    def _build_params(self, messages) -> Dict[str, Any]:
+        """Parâmetros da chamada, com o histórico convertido do nosso formato multimodal interno"""
         # Transforma o histórico de mensagens para o formato da OpenAI
         openai_messages = []
         for msg in messages:
@@ -161,25 +381,124 @@ class OpenAI:
                 # Mensagem de texto simples
                 openai_messages.append({"role": role, "content": content})
 
-        try:
-            params = {
-                "model": self.id,
-                "messages": openai_messages,
-            }
+        params = {
+            "model": self.id,
+            "messages": openai_messages,
+        }
+
+        if 'o3-mini' not in self.id:
+            params["temperature"] = 0.7
+        return params
 
-            if 'o3-mini' not in self.id:
-                params["temperature"] = 0.7
+    async def achat(self, messages):
+        """Chamada REAL para OpenAI API com suporte para nosso formato multimodal interno."""
+        if not self.client:
+            emoji_logger.model_error("Tentativa de usar o fallback OpenAI, mas o cliente não está configurado.")
+            return None
 
+        try:
+            params = self._build_params(messages)
             response = await self.client.chat.completions.create(**params)
 
             return type('Response', (), {
-                'content': response.choices[0].message.content
+                'content': response.choices[0].message.content,
+                'usage': self._usage(response)
             })()
 
         except Exception as e:
             emoji_logger.model_error(f"Erro na API OpenAI: {e}")
             return None
 
+    async def arun_tools(
+            self, messages, specs: List[Dict[str, Any]], execute: ToolExecutor, max_rounds: int = 3
+    ):
+        """
+        Function calling nativo: tool_calls estruturados executados por execute. Cada rodada
+        só acrescenta a mensagem do assistente e as mensagens role=tool ao fim da conversa;
+        o prefixo idêntico é servido pelo cache automático de prompt.
+        """
+        if not self.client:
+            emoji_logger.model_error("Tentativa de usar o fallback OpenAI, mas o cliente não está configurado.")
+            return None
+
+        try:
+            params = self._build_params(messages)
+            params["tools"] = openai_tools(specs)
+            conversation = params["messages"]
+            usage = {"prompt_tokens": 0, "cached_tokens": 0}
+
+            for round_index in range(max_rounds + 1):
+                if round_index == max_rounds:
+                    # Última rodada: só texto
+                    params["tool_choice"] = "none"
+                response = await self.client.chat.completions.create(**params)
+                for key, value in self._usage(response).items():
+                    usage[key] += value
+
+                message = response.choices[0].message
+                tool_calls = getattr(message, "tool_calls", None) or []
+                if not tool_calls:
+                    return type('Response', (), {
+                        'content': message.content, 'usage': usage, 'tool_rounds': round_index
+                    })()
+
+                conversation.append({
+                    "role": "assistant",
+                    "content": message.content,
+                    "tool_calls": [
+                        {
+                            "id": call.id,
+                            "type": "function",
+                            "function": {"name": call.function.name, "arguments": call.function.arguments},
+                        }
+                        for call in tool_calls
+                    ],
+                })
+                results = await execute([
+                    (service_method(call.function.name), json.loads(call.function.arguments or "{}"))
+                    for call in tool_calls
+                ])
+                for call, result in zip(tool_calls, results):
+                    conversation.append({
+                        "role": "tool",
+                        "tool_call_id": call.id,
+                        "content": json.dumps(serialize_result(result), ensure_ascii=False),
+                    })
+            return None
+
+        except Exception as e:
+            emoji_logger.model_error(f"Erro no function calling da API OpenAI: {e}")
+            return None
+
+    async def astream(self, messages, on_delta: DeltaCallback):
+        """Como achat, com stream=True: cada trecho de texto vai para on_delta assim que chega"""
+        if not self.client:
+            emoji_logger.model_error("Tentativa de usar o fallback OpenAI, mas o cliente não está configurado.")
+            return None
+
+        try:
+            params = self._build_params(messages)
+            params["stream"] = True
+            params["stream_options"] = {"include_usage": True}
+            stream = await self.client.chat.completions.create(**params)
+
+            parts, usage = [], {}
+            async for chunk in stream:
+                if chunk.choices:
+                    text = chunk.choices[0].delta.content
+                    if text:
+                        parts.append(text)
+                        await on_delta(text)
+                if getattr(chunk, "usage", None):
+                    # Último chunk (include_usage) traz o uso de tokens da chamada
+                    usage = self._usage(chunk)
+
+            return type('Response', (), {'content': "".join(parts), 'usage': usage})()
+
+        except Exception as e:
+            emoji_logger.model_error(f"Erro no stream da API OpenAI: {e}")
+            return None
+
 
 class ModelManager:
     """
@@ -194,6 +513,11 @@ class ModelManager:
         self.retry_count = 0
         self.max_retries = 5
         self.is_initialized = False
+        # Uso de tokens por conversa (economia do cache de prompt), limitado em LRU
+        self.conversation_usage: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self.max_tracked_conversations = 1000
+
+        metrics.register_gauge("llm_cached_token_ratio", self._cached_token_ratio)
 
     def initialize(self):
         """Inicialização SIMPLES dos modelos"""
@@ -275,25 +599,91 @@ class ModelManager:
             reasoning_enabled=self.reasoning_model is not None
         )
 
+    @staticmethod
+    def _cached_token_ratio() -> float:
+        prompt_tokens = metrics.get_counter("llm_prompt_tokens")
+        if not prompt_tokens:
+            return 0.0
+        return round(metrics.get_counter("llm_cached_tokens") / prompt_tokens, 3)
+
+    def _record_usage(
+            self, model: Any, usage: Optional[Dict[str, int]], latency_ms: float,
+            conversation_id: Optional[str] = None
+    ) -> None:
+        """Registra tokens de entrada/cacheados e latência (hit vs miss do cache de prompt)"""
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        cached_tokens = usage.get("cached_tokens", 0)
+        metrics.increment("llm_prompt_tokens", prompt_tokens)
+        metrics.increment("llm_cached_tokens", cached_tokens)
+        if prompt_tokens:
+            metrics.observe("llm_prompt_tokens_per_call", prompt_tokens)
+        metrics.observe(f"llm_latency_ms:{'cache_hit' if cached_tokens else 'cache_miss'}", latency_ms)
+
+        if conversation_id:
+            stats = self.conversation_usage.setdefault(
+                conversation_id, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "latency_ms": 0.0}
+            )
+            stats["calls"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["cached_tokens"] += cached_tokens
+            stats["latency_ms"] += latency_ms
+            self.conversation_usage.move_to_end(conversation_id)
+            while len(self.conversation_usage) > self.max_tracked_conversations:
+                self.conversation_usage.popitem(last=False)
+
+        emoji_logger.system_debug(
+            "Uso de tokens do LLM",
+            model=model.id,
+            conversation_id=conversation_id,
+            prompt_tokens=prompt_tokens,
+            cached_tokens=cached_tokens,
+            latency_ms=round(latency_ms, 1)
+        )
+
+    def get_conversation_usage(self, conversation_id: str) -> Dict[str, float]:
+        """Tokens de entrada, tokens servidos do cache e latência acumulada da conversa"""
+        return dict(self.conversation_usage.get(conversation_id, {}))
+
     async def get_response(
             self,
             messages: list,
             system_prompt: Optional[str] = None,
             use_reasoning: bool = False,
             temperature: float = 0.7,
-            max_tokens: int = 2000
+            max_tokens: int = 2000,
+            context_suffix: Optional[str] = None,
+            conversation_id: Optional[str] = None,
+            on_delta: Optional[DeltaCallback] = None
     ) -> Optional[str]:
         """
         Obtém resposta REAL do modelo com fallback automático
+
+        system_prompt: prefixo estático (idêntico entre chamadas, cacheável no provedor)
+        context_suffix: contexto volátil da requisição, enviado depois do histórico
+        on_delta: se informado, a resposta é gerada em streaming e cada trecho é repassado.
+            Depois que algum trecho foi repassado, o fallback para outro modelo não faz
+            streaming (o texto completo é devolvido normalmente).
         """
         model_to_use = self.primary_model
         if use_reasoning and self.reasoning_model:
             model_to_use = self.reasoning_model
 
+        streamed = False
+
+        async def relay(delta: str) -> None:
+            nonlocal streamed
+            streamed = True
+            await on_delta(delta)
+
+        def stream_target() -> Optional[DeltaCallback]:
+            return relay if on_delta and not streamed else None
+
         if use_reasoning and self.reasoning_model:
             try:
                 response = await self._try_model(
-                    self.reasoning_model, messages, system_prompt
+                    self.reasoning_model, messages, system_prompt, context_suffix, conversation_id,
+                    stream_target()
                 )
                 if response:
                     return response
@@ -303,7 +693,8 @@ class ModelManager:
         if self.primary_model:
             try:
                 response = await self._try_model(
-                    self.primary_model, messages, system_prompt
+                    self.primary_model, messages, system_prompt, context_suffix, conversation_id,
+                    stream_target()
                 )
                 if response:
                     return response
@@ -314,7 +705,8 @@ class ModelManager:
             emoji_logger.model_warning(f"Modelo primário falhou. Acionando fallback para {self.fallback_model.id}.")
             try:
                 response = await self._try_model(
-                    self.fallback_model, messages, system_prompt
+                    self.fallback_model, messages, system_prompt, context_suffix, conversation_id,
+                    stream_target()
                 )
                 if response:
                     emoji_logger.model_warning(f"Usando modelo fallback: {self.fallback_model.id}")
@@ -329,10 +721,15 @@ class ModelManager:
             self,
             model: Any,
             messages: list,
-            system_prompt: Optional[str] = None
+            system_prompt: Optional[str] = None,
+            context_suffix: Optional[str] = None,
+            conversation_id: Optional[str] = None,
+            on_delta: Optional[DeltaCallback] = None
     ) -> Optional[str]:
         """
-        Tenta obter resposta de um modelo específico
+        Tenta obter resposta de um modelo específico.
+        Layout: prefixo estático primeiro, histórico, contexto volátil por último.
+        Com on_delta, usa o streaming do modelo (astream) quando disponível.
         """
         try:
             emoji_logger.system_debug(
@@ -341,18 +738,44 @@ class ModelManager:
                 history_length=len(messages),
                 system_prompt_length=len(system_prompt or "")
             )
-            if isinstance(model, OpenAI) and system_prompt:
-                messages_with_system = [{"role": "system", "content": system_prompt}] + messages
-                response = await model.achat(messages_with_system)
+            started = time.perf_counter()
+            if on_delta:
+                on_delta = self._time_first_token(model, started, on_delta)
+            if isinstance(model, OpenAI) and (system_prompt or context_suffix):
+                messages_with_system = self._openai_layout(messages, system_prompt, context_suffix)
+                if on_delta:
+                    response = await model.astream(messages_with_system, on_delta)
+                else:
+                    response = await model.achat(messages_with_system)
             elif isinstance(model, Gemini):
+                streamed = False
+
+                async def relay(delta: str) -> None:
+                    nonlocal streamed
+                    streamed = True
+                    await on_delta(delta)
+
                 async def gemini_call():
-                    return await model.achat(messages, system_prompt=system_prompt)
-                response = await self.retry_with_backoff(gemini_call)
+                    if on_delta:
+                        return await model.astream(
+                            messages, relay, system_prompt=system_prompt, context_suffix=context_suffix
+                        )
+                    return await model.achat(
+                        messages, system_prompt=system_prompt, context_suffix=context_suffix
+                    )
+                # Depois do primeiro trecho repassado, repetir duplicaria as mensagens enviadas
+                response = await self.retry_with_backoff(gemini_call, can_retry=lambda: not streamed)
+            elif on_delta and hasattr(model, "astream"):
+                response = await model.astream(messages, on_delta)
             else:
                 # Fallback para outros modelos que possam ser adicionados
                 response = await model.achat(messages)
 
             if response and getattr(response, "content", None):
+                self._record_usage(
+                    model, getattr(response, "usage", None),
+                    (time.perf_counter() - started) * 1000, conversation_id
+                )
                 emoji_logger.system_debug(
                     "Resposta recebida do LLM",
                     model=model.id,
@@ -372,24 +795,94 @@ class ModelManager:
             # Retorna None para permitir fallback em get_response
             return None
 
+    @staticmethod
+    def _openai_layout(messages: list, system_prompt: Optional[str], context_suffix: Optional[str]) -> list:
+        """Cache automático da OpenAI: o prefixo (system estático) precisa ser byte-idêntico"""
+        messages_with_system = list(messages)
+        if system_prompt:
+            messages_with_system.insert(0, {"role": "system", "content": system_prompt})
+        if context_suffix:
+            messages_with_system.append({"role": "system", "content": context_suffix})
+        return messages_with_system
+
+    async def get_tool_response(
+            self,
+            messages: list,
+            specs: List[Dict[str, Any]],
+            execute: ToolExecutor,
+            system_prompt: Optional[str] = None,
+            context_suffix: Optional[str] = None,
+            conversation_id: Optional[str] = None,
+            max_rounds: int = 3
+    ) -> Optional[str]:
+        """
+        Resposta com function calling nativo no modelo primário: tools declarados por schema,
+        chamadas estruturadas e só as mensagens de tool acrescentadas a cada rodada.
+        None se o modelo não suportar ou falhar (o chamador volta ao modo de tags [TOOL: ...]).
+        """
+        model = self.primary_model
+        if not model or not hasattr(model, "arun_tools"):
+            return None
+        started = time.perf_counter()
+        try:
+            if isinstance(model, OpenAI):
+                response = await model.arun_tools(
+                    self._openai_layout(messages, system_prompt, context_suffix), specs, execute, max_rounds
+                )
+            else:
+                response = await model.arun_tools(
+                    messages, specs, execute, max_rounds,
+                    system_prompt=system_prompt, context_suffix=context_suffix
+                )
+        except Exception as e:
+            emoji_logger.model_error(f"Erro no function calling nativo: {e}")
+            return None
+
+        if not response or not getattr(response, "content", None):
+            emoji_logger.system_warning("Function calling nativo sem resposta", model=model.id)
+            return None
+        self._record_usage(model, response.usage, (time.perf_counter() - started) * 1000, conversation_id)
+        emoji_logger.system_debug(
+            "Resposta recebida do LLM (function calling)",
+            model=model.id,
+            tool_rounds=response.tool_rounds,
+            response_length=len(response.content)
+        )
+        return response.content
+
+    @staticmethod
+    def _time_first_token(model: Any, started: float, on_delta: DeltaCallback) -> DeltaCallback:
+        """Envolve on_delta para registrar o tempo até o primeiro token do modelo"""
+        first = True
+
+        async def timed(delta: str) -> None:
+            nonlocal first
+            if first:
+                first = False
+                metrics.observe(f"llm_first_token_ms:{model.id}", (time.perf_counter() - started) * 1000)
+            await on_delta(delta)
+        return timed
+
     async def retry_with_backoff(
             self,
             func,
             max_attempts: int = 3,
-            initial_delay: float = 1.0
+            initial_delay: float = 1.0,
+            can_retry: Optional[Callable[[], bool]] = None
     ):
         """
         Retry com backoff exponencial SIMPLES
+        can_retry: consultado antes de cada nova tentativa (False encerra sem repetir)
         """
         delay = initial_delay
 
         for attempt in range(max_attempts):
             try:
                 result = await func()
-                if result:
+                if result or (can_retry and not can_retry()):
                     return result
             except ResourceExhausted as e:
-                if attempt < max_attempts - 1:
+                if attempt < max_attempts - 1 and (can_retry is None or can_retry()):
                     emoji_logger.model_warning(
                         f"Erro de quota (429). Tentativa {attempt + 1} falhou, "
                         f"aguardando {delay}s. Detalhes: {e}"
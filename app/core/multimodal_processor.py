@@ -4,23 +4,22 @@ ZERO complexidade, funcionalidade total
 """
 
 from typing import Dict, Any, List, Optional
+import asyncio
 import base64
-import io
-from PIL import Image
-import pytesseract
+import binascii
+import importlib.util
 import speech_recognition as sr
 from pydub import AudioSegment
-import PyPDF2
-from docx import Document
 from app.utils.logger import emoji_logger
 from app.config import settings
 from app.utils.dependency_checker import check_multimodal_dependencies
+from app.core import media_jobs, receipt_extractor
+from app.core.media_cache import content_digest, get_media_cache
+from app.core.media_pool import MediaPoolBusyError, get_media_pool
 
-try:
-    from pdf2image import convert_from_bytes
-    PDF2IMAGE_AVAILABLE = True
-except ImportError:
-    PDF2IMAGE_AVAILABLE = False
+# OCR de PDFs roda em media_jobs; aqui só importa se o pacote existe
+PDF2IMAGE_AVAILABLE = importlib.util.find_spec("pdf2image") is not None
+if not PDF2IMAGE_AVAILABLE:
     emoji_logger.system_warning(
         "pdf2image não instalado - OCR para PDFs desabilitado"
     )
@@ -65,6 +64,32 @@ class MultimodalProcessor:
         media_type = media_data.get("type", "").lower()
         content = media_data.get("content") or media_data.get("data", "")
 
+        # Mesma mídia reenviada (SHA-256 dos bytes): reaproveita OCR/análise/transcrição
+        cache_type = "audio" if media_type == "voice" else media_type
+        # Imagens: o pipeline de OCR configurado entra na chave (resultados de outro pipeline não servem)
+        variant = (
+            f"pre{int(settings.enable_ocr_preprocessing)}-w{settings.ocr_target_width}-psm{settings.ocr_tesseract_psm}"
+            if cache_type == "image" else ""
+        )
+        digest = None
+        if settings.enable_media_cache and content and cache_type in ("image", "audio", "document"):
+            try:
+                raw = content.split("base64,")[1] if "base64," in content else content
+                digest = content_digest(base64.b64decode(raw))
+                cached = await get_media_cache().get(cache_type, digest, variant)
+                if cached:
+                    return cached
+            except (ValueError, binascii.Error):
+                digest = None
+
+        result = await self._process_uncached(media_type, content)
+        # OCR que falhou (timeout, worker morto, erro do tesseract) não entra no cache:
+        # o reenvio do mesmo comprovante precisa de uma nova tentativa
+        if digest and result.get("success") and not result.get("ocr_failed"):
+            await get_media_cache().put(cache_type, digest, result, variant)
+        return result
+
+    async def _process_uncached(self, media_type: str, content: str) -> Dict[str, Any]:
         try:
             if media_type == "image":
                 if not self.dependencies.get("ocr"):
@@ -100,26 +125,37 @@ class MultimodalProcessor:
                 image_data = image_data.split("base64,")[1]
 
             image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
 
             text = ""
+            ocr_failed = False
+            width, height, format_img = media_jobs.image_info(image_bytes)
             enable_ocr = getattr(settings, 'enable_ocr', True)
             if enable_ocr:
+                # OCR no pool de processos: não trava as outras conversas do worker
                 try:
-                    text = pytesseract.image_to_string(image, lang='por')
+                    text, width, height, format_img = await get_media_pool().run(
+                        media_jobs.ocr_image,
+                        image_bytes,
+                        media_jobs.OCR_LANG,
+                        settings.enable_ocr_preprocessing,
+                        settings.ocr_target_width,
+                        settings.ocr_tesseract_psm,
+                        settings.media_job_timeout
+                    )
                     emoji_logger.multimodal_event(
                         f"📸 OCR extraiu {len(text)} caracteres"
                     )
+                except MediaPoolBusyError:
+                    raise
                 except Exception as ocr_error:
-                    emoji_logger.system_warning(f"OCR falhou: {ocr_error}")
-
-            width, height = image.size
-            format_img = image.format or "unknown"
+                    ocr_failed = True
+                    emoji_logger.system_warning(f"OCR falhou: {ocr_error!r}")
 
             result = {
                 "success": True,
                 "type": "image",
                 "text": text.strip() if text else "",
+                "ocr_failed": ocr_failed,
                 "metadata": {
                     "width": width,
                     "height": height,
@@ -199,41 +235,44 @@ class MultimodalProcessor:
                 doc_data = doc_data.split("base64,")[1]
 
             doc_bytes = base64.b64decode(doc_data)
-            doc_buffer = io.BytesIO(doc_bytes)
 
             text = ""
             doc_type = "unknown"
             ocr_used = False
+            ocr_failed = False
+            pool = get_media_pool()
 
             try:
-                pdf_reader = PyPDF2.PdfReader(doc_buffer)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
+                text, page_count = await pool.run(media_jobs.pdf_text, doc_bytes)
                 doc_type = "pdf"
 
                 if (not text or len(
                         text.strip()) < 10) and PDF2IMAGE_AVAILABLE:
                     emoji_logger.multimodal_event(
-                        "📸 PDF sem texto detectado, aplicando OCR..."
+                        f"📸 PDF sem texto detectado, aplicando OCR em {page_count} página(s)..."
+                    )
+                    # OCR das páginas em paralelo (uma página por job)
+                    pages = min(page_count, settings.media_pdf_max_ocr_pages)
+                    page_results = await asyncio.gather(
+                        *(pool.run(
+                            media_jobs.ocr_pdf_page, doc_bytes, i + 1,
+                            media_jobs.OCR_LANG, settings.media_job_timeout
+                        )
+                        for i in range(pages)),
+                        return_exceptions=True
                     )
-                    doc_buffer.seek(0)
-                    images = convert_from_bytes(doc_buffer.read())
                     ocr_texts = []
-                    for i, image in enumerate(images):
-                        try:
-                            page_text = pytesseract.image_to_string(
-                                image, lang='por'
-                            )
-                            if page_text.strip():
-                                ocr_texts.append(page_text)
-                                emoji_logger.multimodal_event(
-                                    f"📄 OCR página {i+1}: "
-                                    f"{len(page_text)} caracteres"
-                                )
-                        except Exception as ocr_error:
+                    for i, page_text in enumerate(page_results):
+                        if isinstance(page_text, Exception):
+                            ocr_failed = True
                             emoji_logger.system_warning(
-                                f"OCR falhou na página {i+1}: {ocr_error}"
+                                f"OCR falhou na página {i+1}: {page_text!r}"
+                            )
+                        elif page_text.strip():
+                            ocr_texts.append(page_text)
+                            emoji_logger.multimodal_event(
+                                f"📄 OCR página {i+1}: "
+                                f"{len(page_text)} caracteres"
                             )
                     if ocr_texts:
                         text = "\n\n".join(ocr_texts)
@@ -241,12 +280,14 @@ class MultimodalProcessor:
                         emoji_logger.multimodal_event(
                             f"✅ OCR completo: {len(text)} caracteres extraídos"
                         )
+            except MediaPoolBusyError:
+                raise
             except Exception:
                 try:
-                    doc_buffer.seek(0)
-                    doc = Document(doc_buffer)
-                    text = "\n".join([p.text for p in doc.paragraphs])
+                    text = await pool.run(media_jobs.docx_text, doc_bytes)
                     doc_type = "docx"
+                except MediaPoolBusyError:
+                    raise
                 except Exception:
                     pass
 
@@ -256,6 +297,7 @@ class MultimodalProcessor:
                     "success": True,
                     "type": "document",
                     "text": text,
+                    "ocr_failed": ocr_failed,
                     "metadata": {
                         "doc_type": doc_type,
                         "char_count": len(text),
@@ -374,146 +416,31 @@ class MultimodalProcessor:
         """
         Lógica de extração de valor de conta robusta e centralizada.
         """
-        import re
-        from collections import Counter
-
-        patterns = [
-            r"R\$\s*(\d{1,3}(?:\.\d{3})*,\d{2})",
-            r"R\$\s*(\d+,\d{2})",
-            r"(\d{1,3}(?:\.\d{3})*,\d{2})",
-            r"(\d+,\d{2})"
-        ]
-        all_values = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                try:
-                    value_str = match.replace(".", "").replace(",", ".")
-                    value = float(value_str)
-                    if 10 <= value <= 100000:
-                        all_values.append(value)
-                except Exception:
-                    pass
-        
-        if not all_values:
-            return None
-
-        # Lógica de seleção do valor mais provável
-        selected_value = None
-        text_lower = text.lower()
-        total_patterns = [
-            r"total\s*a?\s*pagar[:\s]*R?$\\s*(\d{1,3}(?:\.\d{3})*,\d{2})",
-            r"valor\s*total[:\s]*R?$\\s*(\d{1,3}(?:\.\d{3})*,\d{2})",
-            r"total[:\s]*R?$\\s*(\d{1,3}(?:\.\d{3})*,\d{2})"
-        ]
-        for pattern in total_patterns:
-            matches = re.findall(pattern, text_lower)
-            if matches:
-                try:
-                    value_str = matches[0].replace(".", "").replace(",", ".")
-                    selected_value = float(value_str)
-                    break
-                except Exception:
-                    pass
-        
-        if selected_value is None:
-            rounded_values = [round(v, 2) for v in all_values]
-            value_counts = Counter(rounded_values)
-            most_common = value_counts.most_common(1)
-            if most_common and most_common[0][1] >= 2: # Se um valor aparece 2+ vezes
-                selected_value = most_common[0][0]
-
-        if selected_value is None:
-            selected_value = max(all_values) # Fallback para o maior valor encontrado
-
-        emoji_logger.multimodal_event(
-            f"💵 Valores encontrados: {sorted(set([round(v, 2) for v in all_values]))[:10]},"
-            f" selecionado: R$ {selected_value:.2f}"
-        )
-        return selected_value
+        value = receipt_extractor.extract_bill_value(text)
+        if value is not None:
+            emoji_logger.multimodal_event(f"💵 Valor da conta selecionado: R$ {value:.2f}")
+        return value
 
     def _extract_payment_value_from_text(self, text: str) -> Optional[float]:
         """
         Extração de valor de comprovante de pagamento.
         """
-        import re
-        
-        # Buscar por padrões específicos de valores em comprovantes
-        payment_patterns = [
-            r"valor\s*(?:da\s*)?(?:transação|transferência|pagamento)[:\s]*R?\$?\s*(\d{1,3}(?:\.\d{3})*,\d{2})",
-            r"R\$\s*(\d{1,3}(?:\.\d{3})*,\d{2})",
-            r"(\d{1,3}(?:\.\d{3})*,\d{2})",
-        ]
-        
-        all_values = []
-        for pattern in payment_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                try:
-                    value_str = match.replace(".", "").replace(",", ".")
-                    value = float(value_str)
-                    if 1 <= value <= 50000:  # Range amplo para valores de pagamento
-                        all_values.append(value)
-                except Exception:
-                    pass
-        
-        if all_values:
-            # Retornar o primeiro valor encontrado (geralmente é o valor principal)
-            return all_values[0]
-        
-        return None
+        return receipt_extractor.extract_payment_value(text)
 
     def _extract_payer_name_from_text(self, text: str) -> Optional[str]:
         """
         Extração de nome do pagador do comprovante.
         """
-        import re
-        
-        # Padrões para encontrar nomes em comprovantes
-        name_patterns = [
-            r"(?:pagador|remetente|de)[:\s]*([A-ZÁÊÇÕ][a-záêçõ\s]+[A-ZÁÊÇÕ])",
-            r"origem[:\s]*([A-ZÁÊÇÕ][a-záêçõ\s]+)",
-            r"nome[:\s]*([A-ZÁÊÇÕ][a-záêçõ\s]+)",
-        ]
-        
-        for pattern in name_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                name = matches[0].strip()
-                # Validar se parece um nome (pelo menos 2 palavras)
-                if len(name.split()) >= 2 and len(name) <= 50:
-                    return name
-        
-        return None
+        return receipt_extractor.extract_payer_name(text)
 
     def _is_valid_nautico_payment_value(self, value: float) -> bool:
         """
         Valida se o valor está na lista de valores válidos do programa de sócios do Náutico.
         """
-        emoji_logger.system_info(f"🔍 VALIDANDO VALOR: {value} (tipo: {type(value)})")
-        valid_values = [
-            # Planos principais do Náutico
-            399.90, 399.00,  # Plano premium
-            99.90, 99.00,    # Plano básico 
-            39.90, 39.00,    # Plano starter
-            24.90, 24.00,    # Plano mínimo
-            79.90, 79.00,    # Plano intermediário
-            
-            # Valores especiais e anuais
-            3000.00, 1518.00, 
-            
-            # Outros valores possíveis
-            12.90, 12.00, 11.00, 10.00, 50.00, 25.00, 30.00, 
-            15.00, 20.00, 35.00, 40.00, 75.00, 80.00, 95.00, 100.00
-        ]
-        
-        # Considerar uma pequena margem de erro para valores decimais
-        tolerance = 0.01
-        for valid_value in valid_values:
-            if abs(value - valid_value) <= tolerance:
-                emoji_logger.system_info(f"🔍 VALOR VÁLIDO ENCONTRADO: {value} ≈ {valid_value}")
-                return True
-        
+        if receipt_extractor.is_valid_plan_value(value):
+            emoji_logger.system_info(f"🔍 VALOR VÁLIDO ENCONTRADO: {value}")
+            return True
+
         emoji_logger.system_warning(f"🔍 VALOR INVÁLIDO: {value} não está na lista de valores válidos")
         return False
 
@@ -0,0 +1,214 @@
+"""
+Prompt Registry - Persona carregada uma vez e montagem barata do system prompt
+Prefixo estático (persona + instruções fixas) estável entre chamadas para o cache
+de prompt do provedor; apenas o sufixo dinâmico (data, pagamento, nome) muda.
+Com ENABLE_NATIVE_TOOL_CALLING, as instruções de tags [TOOL: ...] dão lugar às
+funções declaradas na requisição.
+"""
+import hashlib
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import pytz
+from app.config import settings
+from app.utils.logger import emoji_logger
+
+
+PROMPT_PATHS = [
+    "app/prompts/prompt-agente-nautico.atualizado.md",
+    "app/prompts/prompt-agente.md",
+]
+FALLBACK_PERSONA = "Você é um assistente de vendas."
+
+DAYS_PT = {
+    0: "Segunda-feira", 1: "Terça-feira", 2: "Quarta-feira", 3: "Quinta-feira",
+    4: "Sexta-feira", 5: "Sábado", 6: "Domingo"
+}
+GENERIC_LEAD_NAMES = {"Lead Náutico", "Usuário Náutico", "Cliente Náutico"}
+
+TEXT_TOOL_RULE = (
+    "- SEMPRE use a ferramenta [TOOL: knowledge.search | query=...] para perguntas sobre planos, "
+    "ingressos, benefícios, cancelamentos"
+)
+NATIVE_TOOL_RULE = (
+    "- SEMPRE chame a função knowledge_search (declarada nas ferramentas da requisição) para perguntas "
+    "sobre planos, ingressos, benefícios, cancelamentos. NUNCA escreva chamadas de ferramenta no texto"
+)
+STATIC_INSTRUCTIONS = """
+
+<instrucoes_criticas>
+- Você é Laura, Especialista em Relacionamento da Torcida do Náutico (NÃO Marina)
+{tool_rule}
+- Siga exatamente a persona e etapas definidas no prompt principal
+- Responda de forma direta, sem formatação markdown
+
+**REGRA CRÍTICA DE PLACEHOLDERS:**
+- JAMAIS use placeholders como [nome], {nome}, $nome ou <nome> em suas respostas
+- SEMPRE use o nome REAL do lead quando disponível
+- Se o nome do lead estiver disponível (bloco <nome_do_lead>), use-o diretamente
+- Se não souber o nome, simplesmente não use nome nenhum: "Oi!" ao invés de "Oi, [nome]!"
+</instrucoes_criticas>
+
+"""
+
+# Seção de ferramentas da persona (sintaxe [TOOL: ...]) e a versão para function calling nativo
+TOOLS_SECTION_PATTERN = re.compile(r"<ferramentas_disponiveis>.*?</ferramentas_disponiveis>", re.DOTALL)
+NATIVE_TOOLS_SECTION = """<ferramentas_disponiveis>
+
+# FERRAMENTAS DISPONÍVEIS
+
+As ferramentas desta conversa são as funções declaradas na requisição. Chame a função diretamente
+(por exemplo knowledge_search com o parâmetro query); NUNCA escreva a chamada de uma ferramenta
+como texto da resposta.
+
+Chame knowledge_search ANTES de responder sobre planos e benefícios, preços, adesão, cancelamentos,
+compra de ingressos (sócio e não-sócio), carteirinha, formas de pagamento, cadastro facial,
+regularização de planos e dependentes.
+
+</ferramentas_disponiveis>"""
+
+DATE_TEMPLATE = "<contexto_temporal>\nA data e hora atuais são: {date} ({weekday}).\n</contexto_temporal>\n\n"
+PAYMENT_VALIDATED_TEMPLATE = (
+    "<contexto_pagamento>\nEste lead JÁ TEM PAGAMENTO VALIDADO de R${value}. Se enviarem novos "
+    "comprovantes, apenas agradeça e confirme que o pagamento já foi processado. NÃO repita "
+    "confirmações de boas-vindas.\n</contexto_pagamento>\n\n"
+)
+PAYMENT_PENDING = (
+    "<contexto_pagamento>\nEste lead NÃO tem comprovante de pagamento validado. JAMAIS confirme "
+    "pagamento sem receber e validar documento. Sempre solicite o comprovante antes de qualquer "
+    "confirmação.\n</contexto_pagamento>\n\n"
+)
+NAME_TEMPLATE = """<nome_do_lead>
+O nome do lead é: {name}
+IMPORTANTE: Sempre que mencionar o nome do lead, use EXATAMENTE "{name}" - NUNCA use placeholders como [nome], {{nome}}, $nome ou <nome>.
+Exemplo: "Oi, {name}!"
+</nome_do_lead>
+"""
+
+
+class PromptRegistry:
+    """
+    Registro da persona do agente.
+
+    - Lê o arquivo uma vez; recarrega se o mtime mudar (checado no máximo a cada
+      check_interval segundos) ou via reload() (endpoint administrativo)
+    - static_prefix: persona + instruções fixas, idêntico entre chamadas
+    - build_system_prompt: static_prefix + sufixo dinâmico por lead/horário
+    """
+
+    def __init__(self, paths: Optional[List[str]] = None, check_interval: float = 5.0):
+        self.paths = paths or PROMPT_PATHS
+        self.check_interval = check_interval
+        self.source_path: Optional[str] = None
+        self.persona = FALLBACK_PERSONA
+        self.native_tools = settings.enable_native_tool_calling
+        self.static_prefix = FALLBACK_PERSONA + STATIC_INSTRUCTIONS.replace("{tool_rule}", TEXT_TOOL_RULE)
+        self.prefix_hash = ""
+        self.loads = 0
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self.reload()
+
+    def _resolve(self) -> Optional[str]:
+        return next((path for path in self.paths if os.path.exists(path)), None)
+
+    def reload(self) -> Dict[str, object]:
+        """Relê a persona do disco e recalcula o prefixo estático"""
+        path = self._resolve()
+        persona = FALLBACK_PERSONA
+        mtime = None
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                persona = f.read()
+            mtime = os.path.getmtime(path)
+            if path != self.paths[0]:
+                emoji_logger.system_warning(f"Prompt principal não encontrado. Usando {path}.")
+        else:
+            emoji_logger.system_warning("Nenhum arquivo de prompt encontrado. Usando fallback.")
+
+        self.source_path = path
+        self.persona = persona
+        self._build_prefix()
+        self._mtime = mtime
+        self._last_check = time.monotonic()
+        self.loads += 1
+        emoji_logger.system_debug(
+            f"Prompt carregado ({len(self.static_prefix)} chars, hash={self.prefix_hash})"
+        )
+        return self.info()
+
+    def _build_prefix(self) -> None:
+        """Persona + instruções fixas, no formato de tools do modo atual (texto ou nativo)"""
+        self.native_tools = settings.enable_native_tool_calling
+        persona, tool_rule = self.persona, TEXT_TOOL_RULE
+        if self.native_tools:
+            persona = TOOLS_SECTION_PATTERN.sub(lambda _: NATIVE_TOOLS_SECTION, persona)
+            tool_rule = NATIVE_TOOL_RULE
+        self.static_prefix = persona + STATIC_INSTRUCTIONS.replace("{tool_rule}", tool_rule)
+        self.prefix_hash = hashlib.sha256(self.static_prefix.encode("utf-8")).hexdigest()[:16]
+
+    def refresh_if_changed(self) -> bool:
+        """Recarrega se o arquivo mudou; stat no máximo a cada check_interval"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        path = self._resolve()
+        mtime = os.path.getmtime(path) if path else None
+        if path == self.source_path and mtime == self._mtime:
+            return False
+        self.reload()
+        return True
+
+    def get_static_prefix(self) -> str:
+        self.refresh_if_changed()
+        if self.native_tools != settings.enable_native_tool_calling:
+            self._build_prefix()
+        return self.static_prefix
+
+    @staticmethod
+    def build_dynamic_suffix(lead_info: Dict, now: Optional[datetime] = None) -> str:
+        """Contexto temporal, de pagamento e nome do lead (muda por chamada)"""
+        now = now or datetime.now(pytz.timezone(settings.timezone))
+        parts = [DATE_TEMPLATE.format(date=now.strftime('%Y-%m-%d %H:%M'), weekday=DAYS_PT[now.weekday()])]
+
+        payment_value = lead_info.get('payment_value')
+        if lead_info.get('is_valid_nautico_payment', False) and payment_value:
+            parts.append(PAYMENT_VALIDATED_TEMPLATE.format(value=payment_value))
+        else:
+            parts.append(PAYMENT_PENDING)
+
+        lead_name = lead_info.get('name', '')
+        if lead_name and lead_name not in GENERIC_LEAD_NAMES:
+            parts.append(NAME_TEMPLATE.format(name=lead_name))
+        return "".join(parts)
+
+    def build_system_prompt(self, lead_info: Dict, now: Optional[datetime] = None) -> str:
+        return self.get_static_prefix() + self.build_dynamic_suffix(lead_info, now)
+
+    def info(self) -> Dict[str, object]:
+        return {
+            "source": self.source_path,
+            "prefix_chars": len(self.static_prefix),
+            "prefix_hash": self.prefix_hash,
+            "loads": self.loads,
+        }
+
+
+prompt_registry: Optional[PromptRegistry] = None
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """Retorna instância global do registro de prompts"""
+    global prompt_registry
+    if not prompt_registry:
+        prompt_registry = PromptRegistry()
+    return prompt_registry
+
+
+def set_prompt_registry(registry: Optional[PromptRegistry]) -> None:
+    """Define instância global do registro de prompts"""
+    global prompt_registry
+    prompt_registry = registry
@@ -0,0 +1,129 @@
+"""
+Receipt Extractor - Valores e pagador de comprovantes/boletos a partir do texto do OCR
+Padrões compilados uma vez no import; os valores monetários saem de uma única varredura
+do texto (grupos nomeados) em vez de um findall por padrão, e a validação dos planos
+é uma consulta a um conjunto de centavos
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+# Valor brasileiro: "29,90", "1.234,56"
+_AMOUNT_RE = re.compile(r"(?P<head>\d+)(?P<groups>(?:\.\d{3})*),(?P<cents>\d{2})")
+# Rótulo que antecede o valor principal do comprovante ("Valor da transação: R$ ")
+_LABEL_RE = re.compile(
+    r"valor\s*(?:da\s*)?(?:transação|transferência|pagamento)[:\s]*R?\$?\s*",
+    re.IGNORECASE
+)
+
+_PAYER_NAME_RES = (
+    re.compile(r"(?:pagador|remetente|de)[:\s]*([A-ZÁÊÇÕ][a-záêçõ\s]+[A-ZÁÊÇÕ])", re.IGNORECASE),
+    re.compile(r"origem[:\s]*([A-ZÁÊÇÕ][a-záêçõ\s]+)", re.IGNORECASE),
+    re.compile(r"nome[:\s]*([A-ZÁÊÇÕ][a-záêçõ\s]+)", re.IGNORECASE),
+)
+
+# Valores do programa de sócios do Náutico, em centavos
+NAUTICO_PLAN_VALUES_CENTS = frozenset({
+    # Planos principais
+    39990, 39900, 9990, 9900, 3990, 3900, 2490, 2400, 7990, 7900,
+    # Valores especiais e anuais
+    300000, 151800,
+    # Outros valores possíveis
+    1290, 1200, 1100, 1000, 5000, 2500, 3000, 1500, 2000, 3500, 4000, 7500, 8000, 9500, 10000,
+})
+# Tolerância de 1 centavo para erros de OCR/arredondamento
+_VALID_CENTS = frozenset(cents + delta for cents in NAUTICO_PLAN_VALUES_CENTS for delta in (-1, 0, 1))
+
+
+class _Amount(NamedTuple):
+    value: float        # "1.234,56" -> 1234.56
+    tail: float         # até 3 dígitos antes do primeiro ponto + milhares ("12345.678,90" -> 345678.9)
+    last_group: float   # dígitos colados na vírgula ("1.234,56" -> 234.56)
+    labeled: bool       # precedido do rótulo "valor da transação/transferência/pagamento"
+    currency: bool      # precedido de "R$" (maiúsculo)
+    currency_any: bool  # precedido de "R$" ou "r$"
+    grouped: bool       # tem separador de milhar
+    short_head: bool    # até 3 dígitos antes do primeiro ponto/vírgula
+
+
+@lru_cache(maxsize=64)
+def _scan(text: str) -> Tuple[_Amount, ...]:
+    # Só uma varredura do texto pelos valores; o prefixo de cada um ("R$", rótulo)
+    # é conferido olhando para trás a partir do início do valor. Em cache porque a
+    # análise extrai valor da conta e do comprovante do mesmo texto
+    label_ends = {m.end() for m in _LABEL_RE.finditer(text)}
+    amounts = []
+    for match in _AMOUNT_RE.finditer(text):
+        head, groups, cents = match.group("head", "groups", "cents")
+        digits = groups.replace(".", "")
+        start = before = match.start()
+        while before and text[before - 1].isspace():
+            before -= 1
+        prefix = text[before - 2:before] if before >= 2 else ""
+        amounts.append(_Amount(
+            value=float(f"{head}{digits}.{cents}"),
+            tail=float(f"{head[-3:]}{digits}.{cents}"),
+            last_group=float(f"{groups[-3:] if groups else head}.{cents}"),
+            labeled=start in label_ends,
+            currency=prefix == "R$",
+            currency_any=prefix in ("R$", "r$"),
+            grouped=bool(groups),
+            short_head=len(head) <= 3
+        ))
+    return tuple(amounts)
+
+
+def extract_bill_value(text: str) -> Optional[float]:
+    """
+    Valor de conta/boleto: o valor que mais se repete no texto (2+ ocorrências),
+    senão o maior entre R$ 10 e R$ 100.000
+    """
+    amounts = _scan(text)
+    # Mesma contagem dos padrões "R$ 1.234,56", "R$ 1234,56", "1.234,56" e "1234,56"
+    # (o mesmo valor conta uma vez por padrão que o reconhece)
+    candidates = (
+        [a.value for a in amounts if a.currency and a.short_head]
+        + [a.value for a in amounts if a.currency and not a.grouped]
+        + [a.tail for a in amounts]
+        + [a.last_group for a in amounts]
+    )
+    all_values = [value for value in candidates if 10 <= value <= 100000]
+    if not all_values:
+        return None
+
+    value, count = Counter(all_values).most_common(1)[0]
+    return value if count >= 2 else max(all_values)
+
+
+def extract_payment_value(text: str) -> Optional[float]:
+    """
+    Valor do comprovante entre R$ 1 e R$ 50.000: primeiro o rotulado
+    ("valor da transação: R$ ..."), depois o primeiro "R$ ...", depois qualquer valor
+    """
+    amounts = _scan(text)
+    for candidates in (
+        (a.value for a in amounts if a.labeled and a.short_head),
+        (a.value for a in amounts if a.currency_any and a.short_head),
+        (a.tail for a in amounts),
+    ):
+        for value in candidates:
+            if 1 <= value <= 50000:
+                return value
+    return None
+
+
+def extract_payer_name(text: str) -> Optional[str]:
+    """Nome do pagador (pelo menos 2 palavras, até 50 caracteres)"""
+    for pattern in _PAYER_NAME_RES:
+        match = pattern.search(text)
+        if match:
+            name = match.group(1).strip()
+            if len(name.split()) >= 2 and len(name) <= 50:
+                return name
+    return None
+
+
+def is_valid_plan_value(value: float) -> bool:
+    """Valor corresponde a um plano do programa de sócios (±1 centavo)"""
+    return round(value * 100) in _VALID_CENTS
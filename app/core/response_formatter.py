@@ -98,12 +98,29 @@ class ResponseFormatter:
             )
 
         # Sanitize geral: remover markdown e listas/enumerações visíveis
+        clean_response = ResponseFormatter.strip_markdown(clean_response)
+
+        # Garantir pontuação final natural
+        if clean_response and not re.search(r'[\.!?]$', clean_response.strip()):
+            clean_response = clean_response.strip() + '.'
+
+        # Se ficou vazio, usar fallback
+        if not clean_response or len(clean_response) < 10:
+            emoji_logger.system_warning("Resposta vazia após limpeza - usando fallback")
+            clean_response = "Como posso te ajudar com o programa Sócio Mais Fiel do Nordeste?"
+
+        emoji_logger.system_success(f"✅ Resposta processada: {len(clean_response)} chars")
+        return clean_response
+
+    @staticmethod
+    def strip_markdown(text: str) -> str:
+        """Remove markdown, listas e enumerações visíveis (também usado por trecho no streaming)"""
         # Remover code fences e backticks
-        clean_response = clean_response.replace('```', '')
-        clean_response = clean_response.replace('`', '')
+        text = text.replace('```', '')
+        text = text.replace('`', '')
 
         # Remover cabeçalhos markdown (##, ###, etc.) no início das linhas
-        clean_response = re.sub(r'(?m)^\s*#{1,6}\s*', '', clean_response)
+        text = re.sub(r'(?m)^\s*#{1,6}\s*', '', text)
 
         # Remover bullets e enumerações no início das linhas
         def _strip_list_enumerations(text: str) -> str:
@@ -122,26 +139,15 @@ class ResponseFormatter:
             result = re.sub(r'\n{3,}', '\n\n', result)
             return result
 
-        clean_response = _strip_list_enumerations(clean_response)
+        text = _strip_list_enumerations(text)
 
         # Remover ênfases Markdown inline: *texto*, **texto**, _texto_, __texto__
-        clean_response = re.sub(r'\*{1,3}(.+?)\*{1,3}', r'\1', clean_response)
-        clean_response = re.sub(r'_{1,3}(.+?)_{1,3}', r'\1', clean_response)
+        text = re.sub(r'\*{1,3}(.+?)\*{1,3}', r'\1', text)
+        text = re.sub(r'_{1,3}(.+?)_{1,3}', r'\1', text)
 
         # Substituir traços isolados que simulam bullet dentro da linha
-        clean_response = re.sub(r'\s-\s', ' ', clean_response)
-
-        # Garantir pontuação final natural
-        if clean_response and not re.search(r'[\.!?]$', clean_response.strip()):
-            clean_response = clean_response.strip() + '.'
-
-        # Se ficou vazio, usar fallback
-        if not clean_response or len(clean_response) < 10:
-            emoji_logger.system_warning("Resposta vazia após limpeza - usando fallback")
-            clean_response = "Como posso te ajudar com o programa Sócio Mais Fiel do Nordeste?"
-
-        emoji_logger.system_success(f"✅ Resposta processada: {len(clean_response)} chars")
-        return clean_response
+        text = re.sub(r'\s-\s', ' ', text)
+        return text
 
     @staticmethod
     def validate_response_content(response: str) -> bool:
@@ -0,0 +1,125 @@
+"""
+Tool Schemas - Declaração dos tools do agente para function calling nativo (OpenAI/Gemini)
+Mesmos tools e parâmetros aceitos por AgenticSDRStateless._execute_single_tool
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def _params(properties: Dict[str, str], required: Iterable[str] = ()) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {
+            name: {"type": "string", "description": description}
+            for name, description in properties.items()
+        },
+        "required": list(required),
+    }
+
+
+TOOL_SPECS: List[Dict[str, Any]] = [
+    {
+        "name": "knowledge.search",
+        "description": "Busca na base de conhecimento do Náutico: planos, ingressos, benefícios, cancelamentos.",
+        "parameters": _params({"query": "Pergunta ou termos de busca"}, required=["query"]),
+    },
+    {
+        "name": "calendar.check_availability",
+        "description": "Verifica horários livres na agenda para a data pedida pelo lead.",
+        "parameters": _params({"date_request": "Data ou período pedido, ex.: 'amanhã à tarde'"}, required=["date_request"]),
+    },
+    {
+        "name": "calendar.suggest_times",
+        "description": "Sugere próximos horários disponíveis para uma reunião.",
+        "parameters": _params({}),
+    },
+    {
+        "name": "calendar.schedule_meeting",
+        "description": "Agenda a reunião com o lead em uma data e hora já confirmadas.",
+        "parameters": _params(
+            {"date": "Data no formato AAAA-MM-DD", "time": "Hora no formato HH:MM", "email": "E-mail do lead"},
+            required=["date", "time"]
+        ),
+    },
+    {
+        "name": "calendar.reschedule_meeting",
+        "description": "Remarca a última reunião do lead para nova data e hora.",
+        "parameters": _params(
+            {"date": "Data no formato AAAA-MM-DD", "time": "Hora no formato HH:MM"}, required=["date", "time"]
+        ),
+    },
+    {
+        "name": "calendar.cancel_meeting",
+        "description": "Cancela a reunião do lead (a mais recente, se meeting_id não for informado).",
+        "parameters": _params({"meeting_id": "ID do evento no Google Calendar"}),
+    },
+    {
+        "name": "crm.update_stage",
+        "description": "Move o lead para outro estágio do funil no CRM.",
+        "parameters": _params({"stage": "Nome do estágio"}, required=["stage"]),
+    },
+    {
+        "name": "crm.update_field",
+        "description": "Atualiza um campo personalizado do lead no CRM.",
+        "parameters": _params({"field": "Nome do campo", "value": "Novo valor"}, required=["field", "value"]),
+    },
+    {
+        "name": "followup.schedule",
+        "description": "Agenda uma mensagem de follow-up para o lead.",
+        "parameters": _params({"hours": "Horas até o envio (padrão 24)", "message": "Texto do follow-up"}),
+    },
+]
+
+
+def function_name(service_method: str) -> str:
+    """Nomes de função não aceitam ponto nas APIs: knowledge.search -> knowledge_search"""
+    return service_method.replace(".", "_")
+
+
+_BY_FUNCTION_NAME = {function_name(spec["name"]): spec["name"] for spec in TOOL_SPECS}
+
+
+def service_method(name: str) -> str:
+    """Inverso de function_name (nomes desconhecidos voltam como vieram)"""
+    return _BY_FUNCTION_NAME.get(name, name)
+
+
+def select_specs(services: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Specs dos tools cujos serviços estão habilitados (todos se services for None)"""
+    if services is None:
+        return list(TOOL_SPECS)
+    enabled = set(services)
+    return [spec for spec in TOOL_SPECS if spec["name"].split(".")[0] in enabled]
+
+
+def openai_tools(specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": function_name(spec["name"]),
+                "description": spec["description"],
+                "parameters": spec["parameters"],
+            },
+        }
+        for spec in specs
+    ]
+
+
+def gemini_tools(specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{
+        "function_declarations": [
+            {
+                "name": function_name(spec["name"]),
+                "description": spec["description"],
+                # Gemini rejeita OBJECT sem propriedades: tools sem parâmetros omitem o schema
+                **({"parameters": spec["parameters"]} if spec["parameters"]["properties"] else {}),
+            }
+            for spec in specs
+        ]
+    }]
+
+
+def serialize_result(result: Any) -> Any:
+    """Resultado de tool em JSON puro (datas e objetos viram string)"""
+    return json.loads(json.dumps(result, default=str, ensure_ascii=False))
@@ -168,6 +168,23 @@ class RedisClient:
         key = f"lead:{phone}"
         return await self.get(key)
 
+    async def cache_kommo_lead_status(
+        self, kommo_lead_id: str, status_id: Any, ttl: int = 60
+    ):
+        """Cache curto do status_id do lead no Kommo (checagem de handoff)"""
+        key = f"kommo:lead_status:{kommo_lead_id}"
+        await self.set(key, {"status_id": status_id}, ttl)
+
+    async def get_kommo_lead_status(self, kommo_lead_id: str) -> Optional[Dict[str, Any]]:
+        """Obtém status do lead no Kommo do cache"""
+        key = f"kommo:lead_status:{kommo_lead_id}"
+        return await self.get(key)
+
+    async def invalidate_kommo_lead_status(self, kommo_lead_id: str) -> bool:
+        """Remove o status em cache quando o lead muda no Kommo"""
+        key = f"kommo:lead_status:{kommo_lead_id}"
+        return await self.delete(key)
+
     async def enqueue(
             self, queue_name: str, data: Any, priority: int = 0
     ) -> bool:
@@ -303,6 +320,43 @@ class RedisClient:
             logger.error(f"Erro ao adquirir lock {key}: {e}")
             return False
 
+    async def mark_message_seen(self, message_id: str, ttl: int = 86400) -> bool:
+        """
+        Registra o ID da mensagem do WhatsApp (SET NX com TTL).
+        Retorna False se já foi visto (reentrega); sem Redis, assume mensagem nova.
+        """
+        if not self.redis_client:
+            return True
+        try:
+            result = await self.redis_client.set(
+                f"msg:seen:{message_id}", "1", nx=True, ex=ttl
+            )
+            return result is not None
+        except Exception as e:
+            logger.error(f"Erro ao registrar mensagem {message_id}: {e}")
+            return True
+
+    async def mark_message_processed(self, message_id: str, ttl: int = 86400) -> bool:
+        """Registra que o pipeline terminou para o ID (reentregas da fila são ignoradas)"""
+        if not self.redis_client:
+            return False
+        try:
+            await self.redis_client.set(f"msg:done:{message_id}", "1", ex=ttl)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao marcar mensagem {message_id} como processada: {e}")
+            return False
+
+    async def is_message_processed(self, message_id: str) -> bool:
+        """Pipeline já terminou para o ID; sem Redis, assume que não"""
+        if not self.redis_client:
+            return False
+        try:
+            return await self.redis_client.exists(f"msg:done:{message_id}") > 0
+        except Exception as e:
+            logger.error(f"Erro ao consultar mensagem {message_id}: {e}")
+            return False
+
     async def release_lock(self, key: str) -> bool:
         """Libera lock"""
         try:
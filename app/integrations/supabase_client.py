@@ -3,6 +3,7 @@ Cliente Supabase para o SDR IA Náutico
 Gerencia todas as operações com o banco de dados
 """
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from uuid import uuid4
@@ -36,6 +37,13 @@ class SupabaseClient:
         # Criar wrapper do cliente que intercepta TODAS as operações
         self.client = self._create_intercepted_client(original_client)
 
+        # Pool dedicado e limitado para as chamadas síncronas do PostgREST,
+        # evitando que cada round-trip bloqueie o event loop do uvicorn
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.supabase_max_workers),
+            thread_name_prefix="supabase"
+        )
+
     def _create_intercepted_client(self, original_client):
         """Cria um wrapper do cliente que intercepta operações da tabela leads"""
 
@@ -88,11 +96,18 @@ class SupabaseClient:
 
         return InterceptedClient(original_client)
 
+    async def execute_query(self, query):
+        """
+        Executa uma query do supabase-py no pool dedicado sem bloquear o event loop.
+        O número de chamadas simultâneas é limitado por SUPABASE_MAX_WORKERS.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, query.execute)
 
     async def test_connection(self) -> bool:
         """Testa conexão com o Supabase"""
         try:
-            self.client.table('leads').select("id").limit(1).execute()
+            await self.execute_query(self.client.table('leads').select("id").limit(1))
             return True
         except Exception as e:
             logger.error(f"Erro de conexão Supabase: {str(e)}")
@@ -124,7 +139,7 @@ class SupabaseClient:
 
             # PRIMEIRO: Buscar lead EXISTENTE mais recente (deve ser o correto)
             try:
-                result = self.client.table('leads').select("*").order('created_at', desc=True).limit(1).execute()
+                result = await self.execute_query(self.client.table('leads').select("*").order('created_at', desc=True).limit(1))
                 if result.data:
                     latest_lead = result.data[0]
                     emoji_logger.system_error("PRIORITY_LEAD", f"✅ ABSOLUTO PRIORITÁRIO: Lead mais recente: {latest_lead['id']}")
@@ -147,7 +162,7 @@ class SupabaseClient:
             name = lead_data.get("name", "")
             if name:
                 try:
-                    result = self.client.table('leads').select("*").eq('name', name).order('created_at', desc=True).limit(1).execute()
+                    result = await self.execute_query(self.client.table('leads').select("*").eq('name', name).order('created_at', desc=True).limit(1))
                     if result.data:
                         existing_lead = result.data[0]
                         emoji_logger.system_error("NAME_LEAD", f"✅ ABSOLUTO: Lead por nome: {existing_lead['id']}")
@@ -168,7 +183,7 @@ class SupabaseClient:
         lead_data['created_at'] = datetime.now().isoformat()
         lead_data['updated_at'] = datetime.now().isoformat()
 
-        result = self.client.table('leads').insert(lead_data).execute()
+        result = await self.execute_query(self.client.table('leads').insert(lead_data))
 
         if result.data:
             return result.data[0]
@@ -180,9 +195,9 @@ class SupabaseClient:
             self, phone: str
     ) -> Optional[Dict[str, Any]]:
         """Busca lead por telefone com retry automático"""
-        result = self.client.table('leads').select("*").eq(
+        result = await self.execute_query(self.client.table('leads').select("*").eq(
             'phone_number', phone
-        ).execute()
+        ))
 
         if result.data:
             return result.data[0]
@@ -194,9 +209,9 @@ class SupabaseClient:
             self, kommo_id: str
     ) -> Optional[Dict[str, Any]]:
         """Busca lead por kommo_lead_id com retry automático"""
-        result = self.client.table('leads').select("*").eq(
+        result = await self.execute_query(self.client.table('leads').select("*").eq(
             'kommo_lead_id', kommo_id
-        ).execute()
+        ))
 
         if result.data:
             return result.data[0]
@@ -210,9 +225,9 @@ class SupabaseClient:
         """Atualiza dados do lead com retry automático"""
         update_data['updated_at'] = datetime.now().isoformat()
 
-        result = self.client.table('leads').update(update_data).eq(
+        result = await self.execute_query(self.client.table('leads').update(update_data).eq(
             'id', lead_id
-        ).execute()
+        ))
 
         if result.data:
             return result.data[0]
@@ -223,7 +238,7 @@ class SupabaseClient:
     async def delete_lead(self, lead_id: str) -> bool:
         """Deleta um lead do banco de dados"""
         try:
-            result = self.client.table('leads').delete().eq('id', lead_id).execute()
+            result = await self.execute_query(self.client.table('leads').delete().eq('id', lead_id))
             return True
         except Exception as e:
             emoji_logger.system_error("DELETE_LEAD", f"Erro ao deletar lead {lead_id}: {e}")
@@ -233,7 +248,7 @@ class SupabaseClient:
     async def delete_messages_by_lead(self, lead_id: str) -> bool:
         """Deleta todas as mensagens de um lead"""
         try:
-            result = self.client.table('messages').delete().eq('lead_id', lead_id).execute()
+            result = await self.execute_query(self.client.table('messages').delete().eq('lead_id', lead_id))
             return True
         except Exception as e:
             emoji_logger.system_error("DELETE_MESSAGES", f"Erro ao deletar mensagens do lead {lead_id}: {e}")
@@ -243,7 +258,7 @@ class SupabaseClient:
     async def delete_conversation_by_phone(self, phone: str) -> bool:
         """Deleta conversa por telefone"""
         try:
-            result = self.client.table('conversations').delete().eq('phone_number', phone).execute()
+            result = await self.execute_query(self.client.table('conversations').delete().eq('phone_number', phone))
             return True
         except Exception as e:
             emoji_logger.system_error("DELETE_CONVERSATION", f"Erro ao deletar conversa para {phone}: {e}")
@@ -253,7 +268,7 @@ class SupabaseClient:
     async def delete_follow_ups_by_lead(self, lead_id: str) -> bool:
         """Deleta todos os follow-ups de um lead"""
         try:
-            result = self.client.table('follow_ups').delete().eq('lead_id', lead_id).execute()
+            result = await self.execute_query(self.client.table('follow_ups').delete().eq('lead_id', lead_id))
             return True
         except Exception as e:
             emoji_logger.system_error("DELETE_FOLLOWUPS", f"Erro ao deletar follow-ups do lead {lead_id}: {e}")
@@ -263,7 +278,7 @@ class SupabaseClient:
     async def delete_qualifications_by_lead(self, lead_id: str) -> bool:
         """Deleta todas as qualificações de um lead"""
         try:
-            result = self.client.table('leads_qualifications').delete().eq('lead_id', lead_id).execute()
+            result = await self.execute_query(self.client.table('leads_qualifications').delete().eq('lead_id', lead_id))
             return True
         except Exception as e:
             emoji_logger.system_error("DELETE_QUALIFICATIONS", f"Erro ao deletar qualificações do lead {lead_id}: {e}")
@@ -274,9 +289,9 @@ class SupabaseClient:
         """Deleta eventos de analytics por telefone"""
         try:
             # Analytics pode ter phone_number ou nos dados do evento
-            result = self.client.table('analytics').delete().or_(
+            result = await self.execute_query(self.client.table('analytics').delete().or_(
                 f'phone_number.eq.{phone},event_data->>phone_number.eq.{phone}'
-            ).execute()
+            ))
             return True
         except Exception as e:
             emoji_logger.system_error("DELETE_ANALYTICS", f"Erro ao deletar analytics para {phone}: {e}")
@@ -286,9 +301,9 @@ class SupabaseClient:
     async def get_qualified_leads(self) -> List[Dict[str, Any]]:
         """Retorna leads qualificados"""
         try:
-            result = self.client.table('leads').select("*").eq(
+            result = await self.execute_query(self.client.table('leads').select("*").eq(
                 'qualification_status', 'QUALIFIED'
-            ).execute()
+            ))
 
             return result.data or []
 
@@ -302,11 +317,11 @@ class SupabaseClient:
         """Busca leads por nome (busca parcial, case-insensitive)"""
         try:
             # Busca leads com nome similar (case-insensitive)
-            result = self.client.table('leads').select(
+            result = await self.execute_query(self.client.table('leads').select(
                 "id, name, phone_number, created_at"
             ).ilike('name', f'%{name}%').order(
                 'created_at', desc=True
-            ).limit(5).execute()
+            ).limit(5))
 
             return result.data if result.data else []
 
@@ -353,9 +368,9 @@ class SupabaseClient:
             'updated_at': datetime.now().isoformat()
         }
 
-        result = self.client.table('conversations').insert(
+        result = await self.execute_query(self.client.table('conversations').insert(
             conversation_data
-        ).execute()
+        ))
 
         if result.data:
             return result.data[0]
@@ -367,32 +382,51 @@ class SupabaseClient:
             self, phone: str
     ) -> Optional[Dict[str, Any]]:
         """Busca dados da conversa por número de telefone com retry automático"""
-        lead_result = self.client.table('leads').select('id').eq(
+        lead_result = await self.execute_query(self.client.table('leads').select('id').eq(
             'phone_number', phone
-        ).execute()
+        ))
 
         if not lead_result.data:
             return None
 
         lead_id = lead_result.data[0]['id']
 
-        conversation_result = self.client.table('conversations').select(
+        conversation_result = await self.execute_query(self.client.table('conversations').select(
             'id, emotional_state, current_stage, created_at, updated_at'
-        ).eq('lead_id', lead_id).execute()
+        ).eq('lead_id', lead_id))
 
         if conversation_result.data:
             return conversation_result.data[0]
 
         return None
 
+    async def get_conversation_summary(
+            self, conversation_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """Resumo acumulado da conversa (history_summary / history_summary_until)"""
+        try:
+            result = await self.execute_query(self.client.table('conversations').select(
+                'history_summary, history_summary_until'
+            ).eq('id', conversation_id))
+
+            if result.data:
+                return result.data[0]
+
+            return None
+
+        except Exception as e:
+            # Coluna ausente (migração não aplicada) não deve bloquear a resposta
+            logger.warning(f"Erro ao obter resumo da conversa: {str(e)}")
+            return None
+
     async def get_conversation_emotional_state(
             self, conversation_id: str
     ) -> str:
         """Obtém estado emocional atual da conversa"""
         try:
-            result = self.client.table('conversations').select(
+            result = await self.execute_query(self.client.table('conversations').select(
                 'emotional_state'
-            ).eq('id', conversation_id).execute()
+            ).eq('id', conversation_id))
 
             if result.data:
                 return result.data[0].get('emotional_state', 'neutro')
@@ -441,9 +475,9 @@ class SupabaseClient:
         """Salva mensagem no banco com retry automático"""
         message_data['created_at'] = datetime.now().isoformat()
 
-        result = self.client.table('messages').insert(
+        result = await self.execute_query(self.client.table('messages').insert(
             message_data
-        ).execute()
+        ))
 
         if result.data:
             if message_data.get('conversation_id'):
@@ -455,18 +489,40 @@ class SupabaseClient:
 
         raise Exception("Erro ao salvar mensagem")
 
+    async def update_message(
+            self, message_id: str, update_data: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Atualiza uma mensagem salva (ex.: conteúdo com a referência da mídia)"""
+        try:
+            result = await self.execute_query(self.client.table('messages').update(
+                update_data
+            ).eq('id', message_id))
+
+            return result.data[0] if result.data else None
+
+        except Exception as e:
+            logger.error(f"Erro ao atualizar mensagem: {str(e)}")
+            return None
+
     @supabase_safe_operation(default_return=[])
     async def get_conversation_messages(
         self,
         conversation_id: str,
-        limit: int = 200
+        limit: int = 200,
+        since: Optional[str] = None,
+        ascending: bool = False
     ) -> List[Dict[str, Any]]:
-        """Retorna mensagens de uma conversa com contexto expandido"""
-        result = self.client.table('messages').select("*").eq(
-            'conversation_id', conversation_id
-        ).order('created_at', desc=True).limit(limit).execute()
+        """
+        Retorna mensagens de uma conversa com contexto expandido (após `since`, se informado),
+        em ordem cronológica. Por padrão as `limit` mais recentes; com ascending=True,
+        as `limit` mais antigas
+        """
+        query = self.client.table('messages').select("*").eq('conversation_id', conversation_id)
+        if since:
+            query = query.gt('created_at', since)
+        result = await self.execute_query(query.order('created_at', desc=not ascending).limit(limit))
 
-        if result.data:
+        if result.data and not ascending:
             result.data.reverse()
 
         return result.data or []
@@ -474,17 +530,17 @@ class SupabaseClient:
     async def _increment_message_count(self, conversation_id: str):
         """Incrementa contador de mensagens na conversa"""
         try:
-            conv = self.client.table('conversations').select(
+            conv = await self.execute_query(self.client.table('conversations').select(
                 "total_messages"
-            ).eq('id', conversation_id).execute()
+            ).eq('id', conversation_id))
 
             if conv.data:
                 current_count = conv.data[0].get('total_messages', 0)
 
-                self.client.table('conversations').update({
+                await self.execute_query(self.client.table('conversations').update({
                     'total_messages': current_count + 1,
                     'updated_at': datetime.now().isoformat()
-                }).eq('id', conversation_id).execute()
+                }).eq('id', conversation_id))
 
         except Exception as e:
             logger.error(f"Erro ao incrementar contador: {str(e)}")
@@ -505,7 +561,7 @@ class SupabaseClient:
 
         # Verificar se lead existe na tabela
         if lead_id:
-            lead_check = self.client.table('leads').select('id').eq('id', lead_id).execute()
+            lead_check = await self.execute_query(self.client.table('leads').select('id').eq('id', lead_id))
             if not lead_check.data:
                 emoji_logger.system_error("LEAD_NOT_FOUND", f"❌ Lead {lead_id} não encontrado - corrigindo")
 
@@ -513,7 +569,7 @@ class SupabaseClient:
             if phone_number:
                 try:
                     clean_phone = phone_number.replace('+', '').replace('-', '').replace(' ', '')
-                    emergency_response = self.client.table('leads').select('*').eq('phone_number', clean_phone).order('created_at', desc=True).limit(1).execute()
+                    emergency_response = await self.execute_query(self.client.table('leads').select('*').eq('phone_number', clean_phone).order('created_at', desc=True).limit(1))
                     if emergency_response.data:
                         emergency_lead = emergency_response.data[0]
                         correct_supabase_id = emergency_lead['id']
@@ -530,7 +586,7 @@ class SupabaseClient:
 
         if lead_id:
             # Verificar se o lead existe na tabela leads
-            lead_check = self.client.table('leads').select('id').eq('id', lead_id).execute()
+            lead_check = await self.execute_query(self.client.table('leads').select('id').eq('id', lead_id))
             if not lead_check.data:
                 emoji_logger.system_error("LEAD_NOT_EXISTS", f"🚫 LEAD NÃO EXISTE: {lead_id} - BUSCANDO SUBSTITUTO")
 
@@ -541,7 +597,7 @@ class SupabaseClient:
                         clean_phone = phone_number.replace('+', '').replace('-', '').replace(' ', '')
 
                         # Buscar lead por phone
-                        phone_response = self.client.table('leads').select('*').eq('phone_number', clean_phone).order('created_at', desc=True).limit(1).execute()
+                        phone_response = await self.execute_query(self.client.table('leads').select('*').eq('phone_number', clean_phone).order('created_at', desc=True).limit(1))
 
                         if phone_response.data:
                             correct_lead = phone_response.data[0]
@@ -554,7 +610,7 @@ class SupabaseClient:
 
                         else:
                             # ÚLTIMO RECURSO: Lead mais recente
-                            latest_response = self.client.table('leads').select('*').order('created_at', desc=True).limit(1).execute()
+                            latest_response = await self.execute_query(self.client.table('leads').select('*').order('created_at', desc=True).limit(1))
                             if latest_response.data:
                                 latest_lead = latest_response.data[0]
                                 latest_lead_id = latest_lead['id']
@@ -589,7 +645,7 @@ class SupabaseClient:
             emoji_logger.system_error("DYNAMIC_UNIVERSAL", f"🚨 DINÂMICA UNIVERSAL: Detectado phone {final_phone} - aplicando correção")
             try:
                 # BUSCA DIRETA por phone
-                universal_response = self.client.table('leads').select('*').eq('phone_number', final_phone).order('created_at', desc=True).limit(1).execute()
+                universal_response = await self.execute_query(self.client.table('leads').select('*').eq('phone_number', final_phone).order('created_at', desc=True).limit(1))
                 if universal_response.data:
                     universal_lead = universal_response.data[0]
                     correct_universal_id = universal_lead['id']
@@ -599,7 +655,7 @@ class SupabaseClient:
                     emoji_logger.system_error("DYNAMIC_LEAD", f"🚨 DINÂMICA LEAD: {universal_lead.get('name', 'Sem nome')} (Kommo: {universal_lead.get('kommo_lead_id')})")
 
                     # VERIFICAÇÃO DINÂMICA
-                    dynamic_check = self.client.table('leads').select('id').eq('id', correct_universal_id).execute()
+                    dynamic_check = await self.execute_query(self.client.table('leads').select('id').eq('id', correct_universal_id))
                     if dynamic_check.data:
                         emoji_logger.system_error("DYNAMIC_CHECK", f"✅ DINÂMICA CHECK: Lead {correct_universal_id} CONFIRMADO")
                     else:
@@ -612,7 +668,7 @@ class SupabaseClient:
                     if len(final_phone) >= 8:
                         last_digits = final_phone[-8:]
                         emoji_logger.system_error("DYNAMIC_LIKE", f"🔍 DINÂMICA LIKE: Buscando por últimos 8 dígitos: {last_digits}")
-                        like_response = self.client.table('leads').select('*').like('phone_number', f'%{last_digits}%').order('created_at', desc=True).limit(1).execute()
+                        like_response = await self.execute_query(self.client.table('leads').select('*').like('phone_number', f'%{last_digits}%').order('created_at', desc=True).limit(1))
                         if like_response.data:
                             like_lead = like_response.data[0]
                             like_id = like_lead['id']
@@ -625,12 +681,12 @@ class SupabaseClient:
 
         # Verificação final de segurança
         current_lead_id = follow_up_data.get('lead_id')
-        final_check = self.client.table('leads').select('id').eq('id', current_lead_id).execute()
+        final_check = await self.execute_query(self.client.table('leads').select('id').eq('id', current_lead_id))
         if not final_check.data:
             emoji_logger.system_error("NUCLEAR_STILL_NOT_EXISTS", f"🚫 NUCLEAR: Lead {current_lead_id} AINDA não existe! ÚLTIMA CORREÇÃO")
 
             # ÚLTIMO RECURSO: Lead mais recente
-            ultimate_response = self.client.table('leads').select('*').order('created_at', desc=True).limit(1).execute()
+            ultimate_response = await self.execute_query(self.client.table('leads').select('*').order('created_at', desc=True).limit(1))
             if ultimate_response.data:
                 ultimate_lead = ultimate_response.data[0]
                 ultimate_id = ultimate_lead['id']
@@ -639,9 +695,9 @@ class SupabaseClient:
 
         emoji_logger.system_error("NUCLEAR_FINAL", f"🚀 NUCLEAR FINAL: Inserindo follow-up com lead_id={follow_up_data.get('lead_id')}")
 
-        result = self.client.table('follow_ups').insert(
+        result = await self.execute_query(self.client.table('follow_ups').insert(
             follow_up_data
-        ).execute()
+        ))
 
         if result.data:
             logger.info(f"Follow-up criado: {result.data[0]['id']}")
@@ -656,9 +712,9 @@ class SupabaseClient:
             from datetime import timezone
             now = datetime.now(timezone.utc).isoformat()
 
-            result = self.client.table('follow_ups').select("*").eq(
+            result = await self.execute_query(self.client.table('follow_ups').select("*").eq(
                 'status', 'pending'
-            ).lte('scheduled_at', now).order('priority', desc=True).execute()
+            ).lte('scheduled_at', now).order('priority', desc=True))
 
             follow_ups = result.data or []
             if follow_ups:
@@ -697,9 +753,9 @@ class SupabaseClient:
             update_data['error_reason'] = reason
 
         try:
-            result = self.client.table('follow_ups').update(update_data).eq(
+            result = await self.execute_query(self.client.table('follow_ups').update(update_data).eq(
                 'id', follow_up_id
-            ).execute()
+            ))
 
             if result.data:
                 return result.data[0]
@@ -720,9 +776,9 @@ class SupabaseClient:
             knowledge_data['created_at'] = datetime.now().isoformat()
             knowledge_data['updated_at'] = datetime.now().isoformat()
 
-            result = self.client.table('knowledge_base').insert(
+            result = await self.execute_query(self.client.table('knowledge_base').insert(
                 knowledge_data
-            ).execute()
+            ))
 
             if result.data:
                 logger.info(
@@ -744,9 +800,9 @@ class SupabaseClient:
             event_data['timestamp'] = datetime.now().isoformat()
             event_data['created_at'] = datetime.now().isoformat()
 
-            result = self.client.table('analytics').insert(
+            result = await self.execute_query(self.client.table('analytics').insert(
                 event_data
-            ).execute()
+            ))
 
             if result.data:
                 return result.data[0]
@@ -764,23 +820,23 @@ class SupabaseClient:
                 hour=0, minute=0, second=0
             ).isoformat()
 
-            leads = self.client.table('leads').select(
+            leads = await self.execute_query(self.client.table('leads').select(
                 "id", count='exact'
-            ).gte('created_at', today_start).execute()
+            ).gte('created_at', today_start))
 
-            qualified = self.client.table('leads').select(
+            qualified = await self.execute_query(self.client.table('leads').select(
                 "id", count='exact'
             ).gte('created_at', today_start).eq(
                 'qualification_status', 'QUALIFIED'
-            ).execute()
+            ))
 
-            active_convs = self.client.table('conversations').select(
+            active_convs = await self.execute_query(self.client.table('conversations').select(
                 "id", count='exact'
-            ).eq('status', 'ACTIVE').execute()
+            ).eq('status', 'ACTIVE'))
 
-            meetings = self.client.table('leads_qualifications').select(
+            meetings = await self.execute_query(self.client.table('leads_qualifications').select(
                 "id", count='exact'
-            ).gte('meeting_scheduled_at', today_start).execute()
+            ).gte('meeting_scheduled_at', today_start))
 
             return {
                 'date': datetime.now().date().isoformat(),
@@ -831,9 +887,9 @@ class SupabaseClient:
             qualification_data['created_at'] = datetime.now().isoformat()
             qualification_data['updated_at'] = datetime.now().isoformat()
 
-            result = self.client.table('leads_qualifications').insert(
+            result = await self.execute_query(self.client.table('leads_qualifications').insert(
                 qualification_data
-            ).execute()
+            ))
 
             if result.data:
                 logger.info(
@@ -849,8 +905,8 @@ class SupabaseClient:
             raise
 
     async def close(self):
-        """Fecha conexão com Supabase"""
-        pass
+        """Fecha conexão com Supabase e libera o pool de execução"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
     async def save_qualification(
             self, qualification_data: Dict[str, Any]
@@ -860,9 +916,9 @@ class SupabaseClient:
             qualification_data['created_at'] = datetime.now().isoformat()
             qualification_data['updated_at'] = datetime.now().isoformat()
 
-            result = self.client.table('leads_qualifications').insert(
+            result = await self.execute_query(self.client.table('leads_qualifications').insert(
                 qualification_data
-            ).execute()
+            ))
 
             if result.data:
                 logger.info(
@@ -882,11 +938,11 @@ class SupabaseClient:
     ) -> Optional[Dict[str, Any]]:
         """Obtém última qualificação do lead"""
         try:
-            response = self.client.table("leads_qualifications").select(
+            response = await self.execute_query(self.client.table("leads_qualifications").select(
                 "*"
             ).eq("lead_id", lead_id).order(
                 "created_at", desc=True
-            ).limit(1).execute()
+            ).limit(1))
 
             if response.data:
                 return response.data[0]
@@ -901,9 +957,9 @@ class SupabaseClient:
             self, lead_id: str
     ) -> Optional[Dict[str, Any]]:
         """Busca lead por ID com tratamento de erro automático"""
-        response = self.client.table("leads").select("*").eq(
+        response = await self.execute_query(self.client.table("leads").select("*").eq(
             "id", lead_id
-        ).execute()
+        ))
 
         if response.data:
             return response.data[0]
@@ -920,7 +976,7 @@ class SupabaseClient:
             # Contar apenas follow-ups que foram realmente executados (status executed ou failed)
             attempt_statuses = ['executed', 'failed']
 
-            result = await asyncio.to_thread(
+            result = await self.execute_query(
                 self.client.table('follow_ups').select(
                     'id', count='exact'
                 ).eq(
@@ -929,7 +985,7 @@ class SupabaseClient:
                     'updated_at', since.isoformat()  # Usar updated_at em vez de created_at
                 ).in_(
                     'status', attempt_statuses  # Apenas executed e failed
-                ).execute
+                )
             )
             
             return result.count
@@ -946,9 +1002,9 @@ class SupabaseClient:
         try:
             update_data['updated_at'] = datetime.now().isoformat()
 
-            result = self.client.table('conversations').update(
+            result = await self.execute_query(self.client.table('conversations').update(
                 update_data
-            ).eq('id', conversation_id).execute()
+            ).eq('id', conversation_id))
 
             if result.data:
                 return result.data[0]
@@ -969,9 +1025,9 @@ class SupabaseClient:
         try:
             update_data['updated_at'] = datetime.now().isoformat()
 
-            result = self.client.table('leads_qualifications').update(
+            result = await self.execute_query(self.client.table('leads_qualifications').update(
                 update_data
-            ).eq('id', qualification_id).execute()
+            ).eq('id', qualification_id))
 
             if result.data:
                 return result.data[0]
@@ -1,18 +1,25 @@
 """
 Audio Transcription Service - Transcreve áudios do WhatsApp
-Engine único: OpenAI Whisper-1
+Engine único: OpenAI Whisper-1 (cliente assíncrono)
+OGG/Opus e demais formatos aceitos pelo Whisper vão direto para a API; o resto passa
+pelo ffmpeg via stdin/stdout, sem arquivos temporários e sem bloquear o event loop
 """
-from pydub import AudioSegment
-import io
+import asyncio
 import base64
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional
 from loguru import logger
 from app.utils.logger import emoji_logger
-import tempfile
-import os
-import subprocess
+from app.utils.metrics import metrics
 from app.config import settings
 
+# Limite de upload da API de transcrição
+WHISPER_MAX_BYTES = 25 * 1024 * 1024
+FFMPEG_TO_WAV = [
+    "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+    "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", "-f", "wav", "pipe:1"
+]
+
 
 def validate_audio_base64(audio_data: str) -> tuple[bool, str]:
     """
@@ -39,18 +46,81 @@ def validate_audio_base64(audio_data: str) -> tuple[bool, str]:
         return False, "invalid_base64"
 
 
+def detect_whisper_format(data: bytes) -> Optional[str]:
+    """
+    Extensão do formato pelos bytes iniciais, se o Whisper aceitar o arquivo como está
+    """
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if data[4:8] == b"ftyp" and data[8:11] != b"3gp":
+        return "m4a"
+    # MP3: tag ID3 ou frame sync com layer definido (AAC/ADTS tem layer 00)
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0 and data[1] & 0x06):
+        return "mp3"
+    return None
+
+
+def ogg_opus_duration(data: bytes) -> Optional[float]:
+    """
+    Duração do OGG/Opus pelos cabeçalhos: granule position da última página (48 kHz)
+    menos o pre-skip do OpusHead
+    """
+    head = data.find(b"OpusHead")
+    last_page = data.rfind(b"OggS")
+    if head < 0 or last_page < 0 or len(data) < last_page + 14:
+        return None
+    pre_skip = int.from_bytes(data[head + 10:head + 12], "little")
+    granule = int.from_bytes(data[last_page + 6:last_page + 14], "little", signed=True)
+    if granule < 0:
+        return None
+    return max(0.0, (granule - pre_skip) / 48000)
+
+
+def wav_duration(data: bytes) -> Optional[float]:
+    """
+    Duração do WAV pelos chunks fmt/data. ffmpeg escrevendo em pipe não volta para
+    preencher o tamanho do chunk data, então vale o que chegou
+    """
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    position, byte_rate = 12, None
+    while position + 8 <= len(data):
+        chunk_id = data[position:position + 4]
+        size = int.from_bytes(data[position + 4:position + 8], "little")
+        if chunk_id == b"fmt ":
+            byte_rate = int.from_bytes(data[position + 16:position + 20], "little")
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            available = len(data) - position - 8
+            length = available if size in (0, 0xFFFFFFFF) else min(size, available)
+            return length / byte_rate
+        position += 8 + size + (size & 1)
+    return None
+
+
 class AudioTranscriber:
     """
-    Serviço de transcrição de áudio usando SpeechRecognition.
+    Serviço de transcrição de áudio usando Whisper-1 (OpenAI).
     """
 
     def __init__(self):
-        """Inicializa o transcriber com Google e OpenAI como fallback"""
+        """Inicializa o transcriber com o cliente assíncrono da OpenAI"""
         self.openai_available = False
+        self._semaphore = asyncio.Semaphore(max(1, settings.audio_transcription_concurrency))
         try:
             if hasattr(settings, 'openai_api_key') and settings.openai_api_key:
-                from openai import OpenAI
-                self.openai_client = OpenAI(api_key=settings.openai_api_key)
+                from openai import AsyncOpenAI
+                self.openai_client = AsyncOpenAI(
+                    api_key=settings.openai_api_key,
+                    timeout=settings.audio_transcription_timeout
+                )
                 self.openai_available = True
                 emoji_logger.system_info(
                     "✅ AudioTranscriber com Whisper-1 (OpenAI)"
@@ -97,65 +167,88 @@ class AudioTranscriber:
                     "text": "", "status": "error",
                     "error": f"Erro ao decodificar: {e}"
                 }
-            # Converter com ffmpeg para WAV 16k mono e transcrever com Whisper
-            try:
-                if not self.openai_available:
-                    return {
-                        "text": "", "status": "error",
-                        "error": "OPENAI_API_KEY ausente"
-                    }
-                # Escrever bytes em arquivo temporário
-                audio_format = (mimetype.split("/")[1] if "/" in mimetype else "ogg")
-                with tempfile.NamedTemporaryFile(suffix=f".{audio_format}", delete=False) as temp_in:
-                    temp_in.write(audio_bytes)
-                    temp_in_path = temp_in.name
-                # Converter para WAV
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_out:
-                    temp_out_path = temp_out.name
-                cmd = [
-                    'ffmpeg', '-i', temp_in_path, '-acodec', 'pcm_s16le',
-                    '-ar', '16000', '-ac', '1', '-f', 'wav', '-loglevel', 'error', '-y', temp_out_path
-                ]
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                if result.returncode != 0 or not os.path.exists(temp_out_path) or os.path.getsize(temp_out_path) == 0:
-                    raise Exception(f"ffmpeg falhou: {result.stderr}")
-                # Duração
-                audio_seg = AudioSegment.from_wav(temp_out_path)
-                duration_seconds = len(audio_seg) / 1000.0
-                # Whisper
-                with open(temp_out_path, 'rb') as audio_file:
-                    transcription = self.openai_client.audio.transcriptions.create(
-                        model='whisper-1', file=audio_file, language='pt'
-                    )
-                text = getattr(transcription, 'text', '') or ''
-                return {
-                    "text": text, "status": "success",
-                    "duration": duration_seconds,
-                    "language": language, "engine": "whisper-1"
-                }
-            except Exception as e:
-                logger.error(f"Erro Whisper: {e}")
-                return {
-                    "text": "", "status": "error",
-                    "error": f"Erro ao transcrever: {e}"
-                }
-            finally:
-                try:
-                    if 'temp_in_path' in locals() and os.path.exists(temp_in_path):
-                        os.unlink(temp_in_path)
-                except Exception:
-                    pass
-                try:
-                    if 'temp_out_path' in locals() and os.path.exists(temp_out_path):
-                        os.unlink(temp_out_path)
-                except Exception:
-                    pass
+            return await self.transcribe_bytes(audio_bytes, language)
         except Exception as e:
             logger.exception(f"Erro crítico no AudioTranscriber: {e}")
             return {
                 "text": "", "status": "error", "error": f"Erro crítico: {e}"
             }
 
+    async def transcribe_bytes(
+        self, audio_bytes: bytes, language: str = "pt-BR"
+    ) -> Dict[str, Any]:
+        """
+        Envia o áudio ao Whisper (convertendo para WAV 16k mono só quando necessário),
+        com concorrência limitada e tempo de cada etapa em audio_transcription_ms:*
+        """
+        if not self.openai_available:
+            return {
+                "text": "", "status": "error",
+                "error": "OPENAI_API_KEY ausente"
+            }
+        timings: Dict[str, float] = {}
+        queued_at = time.perf_counter()
+        try:
+            async with self._semaphore:
+                stage_started = time.perf_counter()
+                timings["queue"] = (stage_started - queued_at) * 1000
+
+                audio_format = detect_whisper_format(audio_bytes)
+                if audio_format and len(audio_bytes) <= WHISPER_MAX_BYTES:
+                    payload, filename = audio_bytes, f"audio.{audio_format}"
+                    duration = ogg_opus_duration(audio_bytes) if audio_format == "ogg" else wav_duration(audio_bytes)
+                    metrics.increment("audio_transcriptions_direct")
+                else:
+                    payload, filename = await self._transcode_to_wav(audio_bytes), "audio.wav"
+                    duration = wav_duration(payload)
+                    metrics.increment("audio_transcriptions_transcoded")
+                    now = time.perf_counter()
+                    timings["transcode"] = (now - stage_started) * 1000
+                    stage_started = now
+
+                transcription = await self.openai_client.audio.transcriptions.create(
+                    model='whisper-1', file=(filename, payload), language='pt'
+                )
+                timings["whisper"] = (time.perf_counter() - stage_started) * 1000
+        except Exception as e:
+            logger.error(f"Erro Whisper: {e}")
+            return {
+                "text": "", "status": "error",
+                "error": f"Erro ao transcrever: {e}"
+            }
+        finally:
+            for stage, elapsed_ms in timings.items():
+                metrics.observe(f"audio_transcription_ms:{stage}", elapsed_ms)
+
+        text = getattr(transcription, 'text', '') or ''
+        return {
+            "text": text, "status": "success",
+            "duration": duration,
+            "language": language, "engine": "whisper-1",
+            "timings_ms": {stage: round(ms, 1) for stage, ms in timings.items()}
+        }
+
+    async def _transcode_to_wav(self, audio_bytes: bytes) -> bytes:
+        """ffmpeg stdin -> stdout: WAV PCM 16 kHz mono, sem tocar no disco"""
+        process = await asyncio.create_subprocess_exec(
+            *FFMPEG_TO_WAV,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        timeout = settings.audio_transcode_timeout
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(audio_bytes), timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"ffmpeg excedeu {timeout}s")
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        if process.returncode != 0 or not stdout:
+            raise Exception(f"ffmpeg falhou: {stderr.decode(errors='replace').strip()}")
+        return stdout
+
     async def transcribe_from_file(
         self, file_path: str, language: str = "pt-BR"
     ) -> Dict[str, Any]:
@@ -163,25 +256,19 @@ class AudioTranscriber:
         Transcreve áudio de um arquivo
         """
         try:
-            with open(file_path, 'rb') as f:
-                audio_bytes = f.read()
-                audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            extension = os.path.splitext(file_path)[1].lower()
-            mimetype_map = {
-                '.ogg': 'audio/ogg', '.mp3': 'audio/mp3',
-                '.wav': 'audio/wav', '.m4a': 'audio/m4a',
-                '.opus': 'audio/opus'
-            }
-            mimetype = mimetype_map.get(extension, 'audio/ogg')
-            return await self.transcribe_from_base64(
-                audio_base64, mimetype, language
-            )
+            audio_bytes = await asyncio.to_thread(self._read_file, file_path)
         except Exception as e:
             logger.error(f"Erro ao ler arquivo: {e}")
             return {
                 "text": "", "status": "error",
                 "error": f"Erro ao ler arquivo: {e}"
             }
+        return await self.transcribe_bytes(audio_bytes, language)
+
+    @staticmethod
+    def _read_file(file_path: str) -> bytes:
+        with open(file_path, 'rb') as f:
+            return f.read()
 
 
 audio_transcriber = AudioTranscriber()
@@ -0,0 +1,153 @@
+"""
+Conversation Summarizer - Resumo acumulado da conversa, atualizado incrementalmente
+Quando a cauda ainda não resumida passa do limite, as mensagens mais antigas dela são
+incorporadas ao resumo (em background, fora do caminho da resposta) e gravadas em
+conversations.history_summary / history_summary_until
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.integrations.supabase_client import supabase_client
+from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
+
+SUMMARY_SYSTEM_PROMPT = (
+    "Você mantém o resumo de uma conversa de WhatsApp entre a Laura (atendente do "
+    "Clube Náutico Capibaribe) e um lead. Atualize o resumo anterior com as novas "
+    "mensagens. Registre em até 10 tópicos curtos: dados do lead (nome, e-mail, "
+    "preferências), plano ou produto de interesse, objeções, combinados, reuniões e "
+    "pagamentos. Não invente nada; responda apenas com o resumo atualizado, sem markdown."
+)
+
+
+def render_transcript(messages: List[Dict[str, Any]]) -> str:
+    """Mensagens em texto corrido (mídia vira [Mídia])"""
+    lines = []
+    for msg in messages:
+        role = "Você" if msg.get("role") == "assistant" else "O Lead"
+        content = msg.get("content")
+        # Se o conteúdo for uma lista (multimodal), pega apenas o texto
+        if isinstance(content, list):
+            text_parts = [p.get("text") for p in content if p.get("type") == "text"]
+            content = " ".join(text_parts) if text_parts else "[Mídia]"
+        lines.append(f"{role}: {content}")
+    return "\n".join(lines)
+
+
+class ConversationSummarizer:
+    """
+    Atualiza o resumo da conversa só quando a cauda não resumida cruza o limite
+    """
+
+    def __init__(self, model_manager=None):
+        self.db = supabase_client
+        self.model_manager = model_manager
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def schedule(self, conversation_id: Optional[str], unsummarized_count: int) -> Optional[asyncio.Task]:
+        """
+        Dispara a atualização em background se a cauda (mensagens após o resumo)
+        tiver ao menos threshold + keep_recent mensagens; uma por conversa por vez
+        """
+        if not settings.enable_conversation_summary or not conversation_id:
+            return None
+        needed = settings.conversation_summary_threshold + settings.conversation_summary_keep_recent
+        if unsummarized_count < needed or conversation_id in self._running:
+            return None
+
+        task = asyncio.create_task(self._run(conversation_id))
+        self._running[conversation_id] = task
+        task.add_done_callback(lambda _: self._running.pop(conversation_id, None))
+        return task
+
+    async def _run(self, conversation_id: str) -> None:
+        try:
+            await self.update(conversation_id)
+        except Exception as e:
+            metrics.increment("conversation_summary_errors")
+            emoji_logger.system_warning(f"Falha ao atualizar resumo da conversa {conversation_id}: {e}")
+
+    async def update(self, conversation_id: str) -> bool:
+        """
+        Incorpora ao resumo as mensagens não resumidas, menos as keep_recent mais novas.
+        A cauda é lida da mais antiga para a mais nova, em blocos de history_fetch_limit,
+        para que conversas longas não pulem mensagens
+        """
+        row = await self.db.get_conversation_summary(conversation_id) or {}
+        summary = row.get("history_summary")
+        until = row.get("history_summary_until")
+        keep_recent = settings.conversation_summary_keep_recent
+        folded = 0
+        started = time.perf_counter()
+
+        while True:
+            messages = await self.db.get_conversation_messages(
+                conversation_id,
+                limit=settings.history_fetch_limit,
+                since=until,
+                ascending=True
+            )
+            to_fold = messages[:-keep_recent] if keep_recent else messages
+            if not to_fold or len(to_fold) < settings.conversation_summary_threshold:
+                break
+
+            new_summary = await self._summarize(summary, to_fold)
+            if not new_summary:
+                break
+            summary, until = new_summary, to_fold[-1]["created_at"]
+            await self.db.update_conversation(conversation_id, {
+                "history_summary": summary,
+                "history_summary_until": until
+            })
+            folded += len(to_fold)
+            metrics.increment("conversation_summary_updates")
+
+        if not folded:
+            return False
+
+        metrics.observe("conversation_summary_ms", (time.perf_counter() - started) * 1000)
+        emoji_logger.system_debug(
+            "Resumo da conversa atualizado",
+            conversation_id=conversation_id,
+            folded_messages=folded,
+            summary_chars=len(summary)
+        )
+        return True
+
+    async def _summarize(self, previous: Optional[str], messages: List[Dict[str, Any]]) -> Optional[str]:
+        model_manager = self.model_manager
+        if model_manager is None:
+            from app.agents.agentic_sdr_stateless import get_agentic_sdr
+            model_manager = (await get_agentic_sdr()).model_manager
+
+        prompt = (
+            f"Resumo anterior:\n{previous or '(vazio)'}\n\n"
+            f"Novas mensagens:\n{render_transcript(messages)}"
+        )
+        summary = await model_manager.get_response(
+            [{"role": "user", "content": prompt}],
+            system_prompt=SUMMARY_SYSTEM_PROMPT,
+            temperature=0.2,
+            max_tokens=settings.conversation_summary_max_tokens
+        )
+        return summary.strip() if summary else None
+
+
+_conversation_summarizer: Optional[ConversationSummarizer] = None
+
+
+def get_conversation_summarizer() -> ConversationSummarizer:
+    """Retorna a instância singleton do ConversationSummarizer"""
+    global _conversation_summarizer
+    if _conversation_summarizer is None:
+        _conversation_summarizer = ConversationSummarizer()
+    return _conversation_summarizer
+
+
+def set_conversation_summarizer(summarizer: Optional[ConversationSummarizer]) -> None:
+    """Define a instância global do ConversationSummarizer"""
+    global _conversation_summarizer
+    _conversation_summarizer = summarizer
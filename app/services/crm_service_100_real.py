@@ -9,8 +9,12 @@ import asyncio
 import aiohttp
 import json
 import random
+import re
+import time
+from contextlib import asynccontextmanager
 from functools import wraps
 from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
 from app.config import settings
 from app.services.rate_limiter import wait_for_kommo
 from app.decorators.error_handler import handle_kommo_errors
@@ -54,6 +58,44 @@ def async_retry_with_backoff(
     return decorator
 
 
+def _kommo_reuse_ratio() -> float:
+    """Fração das requisições ao Kommo que reaproveitaram conexão aberta"""
+    created = metrics.get_counter("kommo_connections_created")
+    reused = metrics.get_counter("kommo_connections_reused")
+    total = created + reused
+    return round(reused / total, 3) if total else 0.0
+
+
+def _kommo_trace_config() -> aiohttp.TraceConfig:
+    """Coleta reuso de conexões e latência por chamada ao Kommo"""
+
+    async def on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        # IDs numéricos viram {id} para não explodir a cardinalidade
+        path = re.sub(r"/\d+", "/{id}", params.url.path)
+        elapsed_ms = (time.perf_counter() - ctx.start) * 1000
+        metrics.observe("kommo_request_ms", elapsed_ms)
+        metrics.observe(f"kommo_request_ms:{params.method} {path}", elapsed_ms)
+
+    async def on_connection_create_end(session, ctx, params):
+        metrics.increment("kommo_connections_created")
+
+    async def on_connection_reuseconn(session, ctx, params):
+        metrics.increment("kommo_connections_reused")
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    return trace_config
+
+
+metrics.register_gauge("kommo_connection_reuse_ratio", _kommo_reuse_ratio)
+
+
 class CRMServiceReal:
     """Serviço REAL de CRM - Kommo API"""
 
@@ -69,6 +111,7 @@ class CRMServiceReal:
             "Content-Type": "application/json"
         }
         self._session_timeout = aiohttp.ClientTimeout(total=30)
+        self._http_session: Optional[aiohttp.ClientSession] = None
         self._stages_cache = None
         self._cache_ttl = 3600
         self._cache_timestamp = None
@@ -146,13 +189,26 @@ class CRMServiceReal:
         self._suspicious_activity_tracker["blocked_phones"].discard(phone_number)
         emoji_logger.service_info(f"📞 Phone {phone_number} desbloqueado após {delay_seconds}s")
 
-    async def _get_session(self):
-        connector = aiohttp.TCPConnector(
-            limit=10, limit_per_host=5, ttl_dns_cache=300
-        )
-        return aiohttp.ClientSession(
-            connector=connector, timeout=self._session_timeout
-        )
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Retorna a sessão HTTP compartilhada do processo (keep-alive + cache DNS),
+        evitando handshake TCP/TLS novo a cada chamada ao Kommo
+        """
+        if self._http_session is None or self._http_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=10, limit_per_host=5, ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+            self._http_session = aiohttp.ClientSession(
+                connector=connector, timeout=self._session_timeout,
+                trace_configs=[_kommo_trace_config()]
+            )
+        return self._http_session
+
+    @asynccontextmanager
+    async def _session(self):
+        """Empresta a sessão compartilhada sem fechá-la ao final do bloco"""
+        yield await self._get_session()
 
     @handle_kommo_errors(max_retries=3, delay=10.0)
     async def initialize(self):
@@ -167,7 +223,7 @@ class CRMServiceReal:
             
         try:
             await wait_for_kommo()
-            async with await self._get_session() as session:
+            async with self._session() as session:
                 async with session.get(
                     f"{self.base_url}/api/v4/account", headers=self.headers
                 ) as response:
@@ -205,7 +261,7 @@ class CRMServiceReal:
         try:
             await wait_for_kommo()
             
-            async with await self._get_session() as session:
+            async with self._session() as session:
                 url = f"{self.base_url}/api/v4/leads/custom_fields"
                 
                 async with session.get(url, headers=self.headers) as response:
@@ -259,7 +315,7 @@ class CRMServiceReal:
 
         try:
             await wait_for_kommo()
-            async with await self._get_session() as session:
+            async with self._session() as session:
                 async with session.get(
                     f"{self.base_url}/api/v4/leads/pipelines",
                     headers=self.headers
@@ -394,7 +450,7 @@ class CRMServiceReal:
             if custom_fields:
                 kommo_lead["custom_fields_values"] = custom_fields
             await wait_for_kommo()
-            async with await self._get_session() as session:
+            async with self._session() as session:
                 async with session.post(
                     f"{self.base_url}/api/v4/leads",
                     headers=self.headers,
@@ -547,7 +603,7 @@ class CRMServiceReal:
                 return {"success": True, "message": "Nenhum dado para atualizar"}
 
             await wait_for_kommo()
-            async with await self._get_session() as session:
+            async with self._session() as session:
                 async with session.patch(
                     f"{self.base_url}/api/v4/leads/{lead_id}",
                     headers=self.headers,
@@ -555,6 +611,8 @@ class CRMServiceReal:
                 ) as response:
                     if response.status == 200:
                         emoji_logger.team_crm(f"✅ Lead {lead_id} ATUALIZADO no Kommo")
+                        if "status_id" in kommo_update:
+                            await redis_client.invalidate_kommo_lead_status(str(lead_id))
                         return {"success": True, "message": "Lead atualizado com sucesso"}
                     else:
                         error_text = await response.text()
@@ -619,7 +677,7 @@ class CRMServiceReal:
             return json.loads(cached_lead)
         try:
             await wait_for_kommo()
-            async with await self._get_session() as session:
+            async with self._session() as session:
                 async with session.get(
                     f"{self.base_url}/api/v4/leads",
                     headers=self.headers,
@@ -699,7 +757,7 @@ class CRMServiceReal:
             }]
 
             await wait_for_kommo()
-            async with await self._get_session() as session:
+            async with self._session() as session:
                 async with session.patch(
                     f"{self.base_url}/api/v4/leads",
                     headers=self.headers,
@@ -709,6 +767,7 @@ class CRMServiceReal:
                         emoji_logger.team_crm(
                             f"✅ Lead {lead_id} movido para '{stage_name}'"
                         )
+                        await redis_client.invalidate_kommo_lead_status(str(lead_id))
                         if notes:
                             await self.add_note_to_lead(lead_id, notes)
                         return {
@@ -766,7 +825,7 @@ class CRMServiceReal:
             await self.initialize()
         try:
             await wait_for_kommo()
-            async with await self._get_session() as session:
+            async with self._session() as session:
                 async with session.get(
                     f"{self.base_url}/api/v4/leads/{lead_id}",
                     headers=self.headers
@@ -794,8 +853,11 @@ class CRMServiceReal:
                 raise
 
     async def close(self):
-        """Fecha conexão com Kommo CRM"""
+        """Fecha conexão com Kommo CRM e a sessão HTTP compartilhada"""
         self.is_initialized = False
+        if self._http_session and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
 
     @async_retry_with_backoff()
     @handle_kommo_errors()
@@ -811,7 +873,7 @@ class CRMServiceReal:
                 }
             }
             await wait_for_kommo()
-            async with await self._get_session() as session:
+            async with self._session() as session:
                 async with session.post(
                     f"{self.base_url}/api/v4/leads/{lead_id}/notes",
                     headers=self.headers,
@@ -156,8 +156,8 @@ class FollowUpSchedulerService:
         """
         try:
             # Buscar TODOS os follow-ups pending - isso vai limpar tudo e resetar o sistema
-            result = await asyncio.to_thread(
-                self.db.client.table('follow_ups').select("*").eq('status', 'pending').execute
+            result = await self.db.execute_query(
+                self.db.client.table('follow_ups').select("*").eq('status', 'pending')
             )
             
             conflicting_followups = result.data or []
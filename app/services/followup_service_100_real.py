@@ -126,7 +126,7 @@ class FollowUpServiceReal:
             emoji_logger.service_info(f"🔍 VALIDAÇÃO FINAL: Verificando se lead_id {supabase_lead_id} existe antes de criar follow-up")
 
             try:
-                lead_check = self.db.client.table('leads').select('id, phone_number, name').eq('id', supabase_lead_id).execute()
+                lead_check = await self.db.execute_query(self.db.client.table('leads').select('id, phone_number, name').eq('id', supabase_lead_id))
                 if not lead_check.data:
                     emoji_logger.service_error(f"❌ BLOQUEADO: Lead ID {supabase_lead_id} NÃO EXISTE na tabela leads!")
 
@@ -135,7 +135,7 @@ class FollowUpServiceReal:
                         emoji_logger.service_error(f"🚨 CORREÇÃO FINAL URGENTE: Buscando lead válido para phone {clean_phone}")
 
                         try:
-                            urgent_response = self.db.client.table('leads').select('*').eq('phone_number', clean_phone).order('created_at', desc=True).limit(1).execute()
+                            urgent_response = await self.db.execute_query(self.db.client.table('leads').select('*').eq('phone_number', clean_phone).order('created_at', desc=True).limit(1))
                             if urgent_response.data:
                                 urgent_lead = urgent_response.data[0]
                                 supabase_lead_id = urgent_lead['id']
@@ -149,7 +149,7 @@ class FollowUpServiceReal:
                         return {"success": False, "error": "lead_not_found", "lead_id": supabase_lead_id}
 
                 # Re-verificar após possível correção
-                lead_check = self.db.client.table('leads').select('id, phone_number, name').eq('id', supabase_lead_id).execute()
+                lead_check = await self.db.execute_query(self.db.client.table('leads').select('id, phone_number, name').eq('id', supabase_lead_id))
                 if not lead_check.data:
                     emoji_logger.service_error(f"❌ FALHA FINAL: Mesmo após correção, lead_id {supabase_lead_id} não existe!")
                     return {"success": False, "error": "final_validation_failed"}
@@ -166,7 +166,7 @@ class FollowUpServiceReal:
                 from datetime import timezone
                 window_start = (scheduled_time - timedelta(minutes=5)).astimezone(timezone.utc).isoformat()
                 window_end = (scheduled_time + timedelta(minutes=5)).astimezone(timezone.utc).isoformat()
-                existing = self.db.client.table('follow_ups').select('id, scheduled_at, status').eq('lead_id', supabase_lead_id).eq('status', 'pending').gte('scheduled_at', window_start).lte('scheduled_at', window_end).execute()
+                existing = await self.db.execute_query(self.db.client.table('follow_ups').select('id, scheduled_at, status').eq('lead_id', supabase_lead_id).eq('status', 'pending').gte('scheduled_at', window_start).lte('scheduled_at', window_end))
                 if existing.data:
                     emoji_logger.service_info(f"🚫 DUPLICIDADE BLOQUEADA: Já existe follow-up pendente para lead {supabase_lead_id} na janela do agendamento")
                     return {
@@ -504,7 +504,7 @@ class FollowUpServiceReal:
             emoji_logger.service_error(f"🚨 DINÂMICA: Forçando busca por phone '{phone}' (UNIVERSAL)")
             try:
                 # BUSCA DIRETA UNIVERSAL
-                dynamic_response = supabase_client.client.table('leads').select('*').eq('phone_number', phone).order('created_at', desc=True).limit(1).execute()
+                dynamic_response = await supabase_client.execute_query(supabase_client.client.table('leads').select('*').eq('phone_number', phone).order('created_at', desc=True).limit(1))
                 if dynamic_response.data:
                     dynamic_lead = dynamic_response.data[0]
                     dynamic_id = dynamic_lead['id']
@@ -512,7 +512,7 @@ class FollowUpServiceReal:
                     emoji_logger.service_error(f"✅ DINÂMICA LEAD: {dynamic_lead.get('name', 'Sem nome')} (Kommo: {dynamic_lead.get('kommo_lead_id')})")
 
                     # VERIFICAÇÃO DINÂMICA
-                    verify_dynamic = supabase_client.client.table('leads').select('id').eq('id', dynamic_id).execute()
+                    verify_dynamic = await supabase_client.execute_query(supabase_client.client.table('leads').select('id').eq('id', dynamic_id))
                     if verify_dynamic.data:
                         emoji_logger.service_error(f"✅ DINÂMICA VERIFIED: {dynamic_id} EXISTS")
                         return dynamic_id
@@ -525,7 +525,7 @@ class FollowUpServiceReal:
                     if len(phone) >= 8:
                         last_digits = phone[-8:]
                         emoji_logger.service_error(f"🔍 DINÂMICA LIKE: Buscando por últimos 8 dígitos: {last_digits}")
-                        like_response = supabase_client.client.table('leads').select('*').like('phone_number', f'%{last_digits}%').order('created_at', desc=True).limit(1).execute()
+                        like_response = await supabase_client.execute_query(supabase_client.client.table('leads').select('*').like('phone_number', f'%{last_digits}%').order('created_at', desc=True).limit(1))
                         if like_response.data:
                             like_lead = like_response.data[0]
                             like_id = like_lead['id']
@@ -539,7 +539,7 @@ class FollowUpServiceReal:
         if phone and len(phone.strip()) >= 10:
             try:
                 emoji_logger.service_error(f"🔍 BUSCA 1: Por phone '{phone}'")
-                response = supabase_client.client.table('leads').select('*').eq('phone_number', phone).order('created_at', desc=True).limit(1).execute()
+                response = await supabase_client.execute_query(supabase_client.client.table('leads').select('*').eq('phone_number', phone).order('created_at', desc=True).limit(1))
                 if response.data:
                     lead = response.data[0]
                     lead_id = lead['id']
@@ -580,7 +580,7 @@ class FollowUpServiceReal:
         if name:
             try:
                 emoji_logger.service_error(f"🔍 BUSCA 3: Por nome '{name}'")
-                response = supabase_client.client.table('leads').select('*').eq('name', name).order('created_at', desc=True).limit(1).execute()
+                response = await supabase_client.execute_query(supabase_client.client.table('leads').select('*').eq('name', name).order('created_at', desc=True).limit(1))
                 if response.data:
                     lead = response.data[0]
                     lead_id = lead['id']
@@ -594,7 +594,7 @@ class FollowUpServiceReal:
         # ESTRATÉGIA 4: ÚLTIMO RECURSO - Lead mais recente
         try:
             emoji_logger.service_error(f"🔍 BUSCA 4: Lead mais recente (último recurso)")
-            response = supabase_client.client.table('leads').select('*').order('created_at', desc=True).limit(1).execute()
+            response = await supabase_client.execute_query(supabase_client.client.table('leads').select('*').order('created_at', desc=True).limit(1))
             if response.data:
                 lead = response.data[0]
                 lead_id = lead['id']
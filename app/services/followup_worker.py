@@ -3,11 +3,13 @@ FollowUp Worker - Processa tarefas da fila de follow-ups do Redis
 """
 
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from app.integrations.redis_client import redis_client
 from app.integrations.supabase_client import supabase_client
-from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless, get_agentic_sdr
+from app.services.conversation_summarizer import render_transcript
+from app.config import settings
 from app.utils.logger import emoji_logger
 from loguru import logger
 
@@ -21,7 +23,7 @@ class FollowUpWorker:
         self.redis = redis_client
         self.db = supabase_client
         self.running = False
-        self.agent = AgenticSDRStateless()
+        self.agent: Optional[AgenticSDRStateless] = None
 
     async def start(self):
         """Inicia o worker e o loop de consumo da fila."""
@@ -29,7 +31,7 @@ class FollowUpWorker:
             logger.warning("Follow-up worker já está rodando.")
             return
 
-        await self.agent.initialize()
+        self.agent = await get_agentic_sdr()
         self.running = True
         emoji_logger.system_ready("FollowUp Worker")
         asyncio.create_task(self._consume_loop())
@@ -149,23 +151,18 @@ class FollowUpWorker:
             if conv:
                 conversation_id = conv.get("id")
 
-        conversation_history = await self.db.get_conversation_messages(
-            conversation_id
-        ) if conversation_id else []
-
-        # Constrói um resumo do histórico para o LLM
-        history_summary = ""
-        if conversation_history:
-            # Pega as últimas 5 mensagens para um resumo conciso
-            last_messages = conversation_history[-5:]
-            for msg in last_messages:
-                role = "Você" if msg.get("role") == "assistant" else "O Lead"
-                content = msg.get("content")
-                # Se o conteúdo for uma lista (multimodal), pega apenas o texto
-                if isinstance(content, list):
-                    text_parts = [p.get("text") for p in content if p.get("type") == "text"]
-                    content = " ".join(text_parts) if text_parts else "[Mídia]"
-                history_summary += f"{role}: {content}\n"
+        # Resumo acumulado da conversa (mantido pelo ConversationSummarizer) + cauda recente
+        conversation_summary = None
+        conversation_history = []
+        if conversation_id:
+            conversation_summary, conversation_history = await asyncio.gather(
+                self.db.get_conversation_summary(conversation_id),
+                self.db.get_conversation_messages(
+                    conversation_id, limit=settings.conversation_summary_keep_recent
+                )
+            )
+        previous_summary = (conversation_summary or {}).get("history_summary") or "(sem resumo anterior)"
+        history_summary = render_transcript(conversation_history)
 
         # Informações do lead para o prompt
         lead_name = lead_info.get("name", "o lead")
@@ -182,7 +179,10 @@ class FollowUpWorker:
         - Interesse em Sócios: {membership_interest}/10
         - Fluxo Escolhido: {chosen_flow}
 
-        Histórico Recente da Conversa (últimas 5 mensagens):
+        Resumo da Conversa até Aqui:
+        {previous_summary}
+
+        Mensagens Mais Recentes da Conversa:
         {history_summary}
 
         Instruções para a Mensagem:
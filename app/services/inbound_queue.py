@@ -0,0 +1,282 @@
+"""
+Inbound Queue - Ingestão durável de webhooks via Redis Streams
+O webhook apenas valida e grava o evento bruto; um pool de consumidores por processo
+roda o pipeline do agente com ack/claim (entradas pendentes são reentregues após crash)
+"""
+import asyncio
+import functools
+import json
+import os
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from app.config import settings
+from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
+
+
+Handler = Callable[..., Awaitable[None]]
+
+
+class InboundQueue:
+    """
+    Fila de entrada sobre Redis Stream + consumer group.
+
+    - enqueue: XADD do payload bruto (chamado pelo webhook)
+    - consumidores: XREADGROUP, processam um evento por vez e fazem XACK ao terminar
+    - claim: entradas pendentes há mais de claim_idle_ms (consumidor caiu no meio do
+      processamento) são reivindicadas com XCLAIM; após max_deliveries vão para {stream}:dead
+    - heartbeat: enquanto processa, o consumidor renova a posse da entrada (XCLAIM JUSTID),
+      então turnos longos (buffer, LLM, OCR) não são reivindicados por outro worker
+    """
+
+    def __init__(
+            self, stream: str = "inbound:evolution", group: str = "sdr-workers",
+            concurrency: int = 8, claim_idle_ms: int = 120000, max_deliveries: int = 5,
+            maxlen: int = 10000, block_ms: int = 1000, claim_interval: Optional[float] = None,
+            handler: Optional[Handler] = None, redis_connection=None
+    ):
+        self.stream = stream
+        self.group = group
+        self.dead_letter_stream = f"{stream}:dead"
+        self.concurrency = max(1, concurrency)
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self.maxlen = maxlen
+        self.block_ms = block_ms
+        self.claim_interval = claim_interval or max(1.0, claim_idle_ms / 4000)
+        self.consumer_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self._handler = handler
+        self._redis = redis_connection
+        self._reclaimed: asyncio.Queue = asyncio.Queue()
+        self._consumers: List[asyncio.Task] = []
+        self._claim_task: Optional[asyncio.Task] = None
+        self._running = False
+        self.in_flight = 0
+
+        metrics.register_gauge("inbound_queue_in_flight", lambda: self.in_flight)
+
+    def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        from app.integrations.redis_client import redis_client
+        return redis_client.redis_client
+
+    def _get_handler(self) -> Handler:
+        if self._handler is None:
+            from app.api.webhooks import process_new_message
+            # Falhas precisam chegar aqui: sem XACK, a entrada é reentregue ou vai para a DLQ
+            self._handler = functools.partial(process_new_message, raise_errors=True)
+        return self._handler
+
+    async def enqueue(self, data: Any) -> str:
+        """Grava o evento bruto no stream e retorna o ID da entrada"""
+        redis = self._get_redis()
+        if redis is None:
+            raise RuntimeError("Redis indisponível para a fila de entrada")
+        entry_id = await redis.xadd(
+            self.stream,
+            {"payload": json.dumps(data), "received_at": str(time.time())},
+            maxlen=self.maxlen, approximate=True
+        )
+        metrics.increment("inbound_queue_enqueued")
+        return entry_id
+
+    async def _ensure_group(self) -> None:
+        redis = self._get_redis()
+        try:
+            # id="0": eventos gravados antes da criação do grupo também são consumidos
+            await redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def start(self) -> None:
+        """Cria o consumer group e inicia consumidores e o loop de claim"""
+        if self._running:
+            return
+        await self._ensure_group()
+        self._running = True
+        self._consumers = [
+            asyncio.create_task(self._consume_loop(f"{self.consumer_prefix}-{i}"))
+            for i in range(self.concurrency)
+        ]
+        self._claim_task = asyncio.create_task(self._claim_loop())
+        emoji_logger.system_ready("Inbound Queue", data={
+            "stream": self.stream, "group": self.group, "consumers": self.concurrency
+        })
+
+    async def stop(self) -> None:
+        """Para os consumidores; entradas não confirmadas ficam pendentes para reentrega"""
+        self._running = False
+        tasks = self._consumers + ([self._claim_task] if self._claim_task else [])
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._consumers = []
+        self._claim_task = None
+
+    async def _next_entry(self, consumer: str) -> Tuple[Optional[Tuple[str, Dict[str, str]]], bool]:
+        """Entradas reivindicadas têm prioridade sobre novas; retorna (entrada, reentrega)"""
+        try:
+            return self._reclaimed.get_nowait(), True
+        except asyncio.QueueEmpty:
+            pass
+        response = await self._get_redis().xreadgroup(
+            self.group, consumer, {self.stream: ">"}, count=1, block=self.block_ms
+        )
+        for _, entries in response or []:
+            for entry in entries:
+                return entry, False
+        return None, False
+
+    async def _consume_loop(self, consumer: str) -> None:
+        while self._running:
+            try:
+                entry, redelivered = await self._next_entry(consumer)
+                if entry is None:
+                    continue
+                await self._handle_entry(*entry, redelivered=redelivered, consumer=consumer)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Erro no consumidor {consumer} da fila de entrada: {e}")
+                await asyncio.sleep(1)
+
+    async def _heartbeat(self, entry_id: str, consumer: str) -> None:
+        """Zera o tempo ocioso da entrada em mãos (JUSTID não conta como nova entrega)"""
+        while True:
+            await asyncio.sleep(self.claim_idle_ms / 3000)
+            try:
+                await self._get_redis().xclaim(
+                    self.stream, self.group, consumer, 0, [entry_id], justid=True
+                )
+            except Exception as e:
+                logger.warning(f"Falha ao renovar a entrada {entry_id} da fila de entrada: {e}")
+
+    async def _handle_entry(
+            self, entry_id: str, fields: Dict[str, str], redelivered: bool = False,
+            consumer: Optional[str] = None
+    ) -> None:
+        """Processa um evento; sem XACK em caso de erro (será reivindicado depois)"""
+        try:
+            payload = json.loads(fields["payload"])
+            received_at = float(fields.get("received_at") or time.time())
+        except (KeyError, TypeError, ValueError):
+            emoji_logger.system_warning(f"Entrada inválida descartada da fila de entrada: {entry_id}")
+            await self._get_redis().xack(self.stream, self.group, entry_id)
+            return
+
+        metrics.observe("inbound_queue_wait_ms", (time.time() - received_at) * 1000)
+        handler = self._get_handler()
+        self.in_flight += 1
+        heartbeat = asyncio.create_task(self._heartbeat(entry_id, consumer or f"{self.consumer_prefix}-claim"))
+        try:
+            # Reentregas são deduplicadas pela marca de "processado", não pela de "visto"
+            await handler(payload, received_at=received_at, redelivered=redelivered)
+        except Exception as e:
+            metrics.increment("inbound_queue_failures")
+            emoji_logger.system_error("Inbound Queue", f"Falha ao processar entrada {entry_id}: {e}")
+            return
+        finally:
+            heartbeat.cancel()
+            self.in_flight -= 1
+
+        await self._get_redis().xack(self.stream, self.group, entry_id)
+        metrics.increment("inbound_queue_acked")
+
+    async def claim_stale(self) -> int:
+        """
+        Reivindica entradas pendentes de consumidores que pararam de responder, no máximo
+        quantas os consumidores livres deste processo conseguem pegar.
+        Retorna quantas foram reenfileiradas localmente.
+        """
+        capacity = self.concurrency - self.in_flight - self._reclaimed.qsize()
+        if capacity <= 0:
+            return 0
+        redis = self._get_redis()
+        pending = await redis.xpending_range(
+            self.stream, self.group, min="-", max="+",
+            count=capacity, idle=self.claim_idle_ms
+        )
+        claimed = 0
+        for item in pending or []:
+            entry_id = item["message_id"]
+            if item.get("times_delivered", 0) >= self.max_deliveries:
+                await self._dead_letter(entry_id)
+                continue
+            entries = await redis.xclaim(
+                self.stream, self.group, f"{self.consumer_prefix}-claim",
+                self.claim_idle_ms, [entry_id]
+            )
+            for entry in entries or []:
+                if entry and entry[1]:
+                    self._reclaimed.put_nowait(entry)
+                    claimed += 1
+        if claimed:
+            metrics.increment("inbound_queue_redelivered", claimed)
+            emoji_logger.system_info(f"Fila de entrada: {claimed} entradas pendentes reivindicadas")
+        return claimed
+
+    async def _dead_letter(self, entry_id: str) -> None:
+        redis = self._get_redis()
+        entries = await redis.xrange(self.stream, min=entry_id, max=entry_id)
+        for _, fields in entries or []:
+            await redis.xadd(self.dead_letter_stream, fields, maxlen=self.maxlen, approximate=True)
+        await redis.xack(self.stream, self.group, entry_id)
+        metrics.increment("inbound_queue_dead_lettered")
+        emoji_logger.system_warning(f"Entrada {entry_id} excedeu {self.max_deliveries} entregas - movida para {self.dead_letter_stream}")
+
+    async def refresh_stats(self) -> Dict[str, int]:
+        """Atualiza gauges de profundidade (XLEN), pendentes e lag do consumer group"""
+        redis = self._get_redis()
+        stats = {"length": await redis.xlen(self.stream), "pending": 0, "lag": 0}
+        for group in await redis.xinfo_groups(self.stream) or []:
+            if group.get("name") == self.group:
+                stats["pending"] = group.get("pending") or 0
+                stats["lag"] = group.get("lag") or 0
+        for name, value in stats.items():
+            metrics.set_gauge(f"inbound_queue_{name}", value)
+        return stats
+
+    async def _claim_loop(self) -> None:
+        while self._running:
+            try:
+                await self.claim_stale()
+                await self.refresh_stats()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Erro no claim da fila de entrada: {e}")
+            await asyncio.sleep(self.claim_interval)
+
+
+def create_inbound_queue() -> InboundQueue:
+    """Cria a fila conforme as configurações INBOUND_QUEUE_*"""
+    return InboundQueue(
+        stream=settings.inbound_queue_stream,
+        group=settings.inbound_queue_group,
+        concurrency=settings.inbound_queue_concurrency,
+        claim_idle_ms=settings.inbound_queue_claim_idle_ms,
+        max_deliveries=settings.inbound_queue_max_deliveries,
+        maxlen=settings.inbound_queue_maxlen
+    )
+
+
+inbound_queue: Optional[InboundQueue] = None
+
+
+def get_inbound_queue() -> InboundQueue:
+    """Retorna instância global da fila de entrada"""
+    global inbound_queue
+    if not inbound_queue:
+        inbound_queue = create_inbound_queue()
+    return inbound_queue
+
+
+def set_inbound_queue(queue: Optional[InboundQueue]) -> None:
+    """Define instância global da fila de entrada"""
+    global inbound_queue
+    inbound_queue = queue
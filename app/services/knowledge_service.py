@@ -3,6 +3,8 @@ KnowledgeService - Serviço Simples para Consultas à Base de Conhecimento
 Substitui o KnowledgeAgent com implementação direta e mais simples
 """
 
+import hashlib
+import json
 from typing import Dict, Any, List
 from datetime import datetime
 from loguru import logger
@@ -38,9 +40,9 @@ class KnowledgeService:
             logger.info(f"🔍 Buscando na knowledge_base com RAG: '{query[:50]}...'")
 
             # Buscar todos os documentos
-            response = supabase_client.client.table("knowledge_base").select(
+            response = await supabase_client.execute_query(supabase_client.client.table("knowledge_base").select(
                 "id, question, answer, category, keywords, created_at"
-            ).limit(200).execute()
+            ).limit(200))
 
             if not response.data:
                 logger.info("ℹ️ Nenhum documento encontrado na knowledge_base")
@@ -148,9 +150,9 @@ class KnowledgeService:
             cache_key = f"category_{category}_{limit}"
             if self._is_cached(cache_key):
                 return self._cache[cache_key]['data']
-            response = supabase_client.client.table("knowledge_base").select(
+            response = await supabase_client.execute_query(supabase_client.client.table("knowledge_base").select(
                 "id, question, answer, category, keywords"
-            ).eq("category", category).limit(limit).execute()
+            ).eq("category", category).limit(limit))
             if response.data:
                 self._cache[cache_key] = {
                     'data': response.data,
@@ -162,6 +164,26 @@ class KnowledgeService:
             logger.error(f"❌ Erro na busca por categoria: {e}")
             return []
 
+    async def get_version(self) -> str:
+        """
+        Versão da base de conhecimento (hash do conteúdo); muda quando qualquer
+        pergunta/resposta é criada, alterada ou removida
+        """
+        if self._is_cached("version"):
+            return self._cache["version"]['data']
+        try:
+            response = await supabase_client.execute_query(supabase_client.client.table("knowledge_base").select(
+                "id, question, answer, category, keywords"
+            ).order("id").limit(200))
+            digest = hashlib.sha1(
+                json.dumps(response.data or [], sort_keys=True, default=str).encode()
+            ).hexdigest()[:12]
+        except Exception as e:
+            logger.error(f"❌ Erro ao calcular versão da knowledge_base: {e}")
+            return ""
+        self._cache["version"] = {'data': digest, 'timestamp': datetime.now().timestamp()}
+        return digest
+
     def _is_cached(self, key: str) -> bool:
         """Verifica se um item está cached e não expirou"""
         if key not in self._cache:
@@ -1,10 +1,17 @@
 """
 Message Buffer Service - Simples e eficiente usando asyncio.Queue
+Backend Redis opcional para coalescência compartilhada entre workers
 """
 import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
 from typing import Dict, List, Optional
 from loguru import logger
+from app.config import settings
 from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
 
 
 def validate_phone_number(phone: str) -> bool:
@@ -38,25 +45,198 @@ def validate_phone_number(phone: str) -> bool:
     return True
 
 
+# Finais que indicam que o lead ainda vai completar a frase
+INCOMPLETE_ENDINGS = (",", ":", ";", "-", "...", "…")
+INCOMPLETE_LAST_WORDS = {
+    "e", "mas", "ou", "que", "porque", "pq", "pra", "para", "de", "do", "da",
+    "com", "no", "na", "tipo", "então", "entao", "aí", "ai"
+}
+
+
+def looks_complete(text: str) -> bool:
+    """
+    Heurística barata: a mensagem parece uma frase terminada?
+    Mídia sem legenda e fragmentos curtos ("Oi", "então") são tratados como incompletos.
+    """
+    stripped = (text or "").strip()
+    if not stripped or stripped.endswith(INCOMPLETE_ENDINGS):
+        return False
+    if stripped[-1] in ".!?":
+        return True
+    words = stripped.split()
+    if words[-1].lower() in INCOMPLETE_LAST_WORDS:
+        return False
+    return len(words) >= 3
+
+
 class MessageBuffer:
     """
-    Buffer inteligente - processa imediatamente se agente está livre,
-    só aguarda timeout se agente está ocupado processando
+    Buffer inteligente - janela de coalescência adaptativa por telefone:
+    curta quando a mensagem parece completa e o lead não está digitando,
+    estendida por mensagens novas ou presença "composing", limitada por max_wait
     """
 
-    def __init__(self, timeout: float = 10.0, max_size: int = 10):
+    def __init__(
+            self, timeout: float = 10.0, max_size: int = 10,
+            idle_ttl: float = 600.0, max_buffers: int = 5000,
+            quick_window: float = 1.0, incomplete_window: float = 4.0,
+            max_wait: float = 30.0
+    ):
         """
         Inicializa o buffer
+
+        timeout: extensão da janela enquanto o lead está digitando
+        quick_window / incomplete_window: espera após a última mensagem (completa / incompleta)
+        max_wait: limite rígido contado a partir da primeira mensagem do lote
         """
         self.timeout = timeout
         self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.max_buffers = max_buffers
+        self.quick_window = quick_window
+        self.incomplete_window = incomplete_window
+        self.max_wait = max_wait
+        self.poll_interval = min(0.25, max(quick_window / 4, 0.01))
+        # Estado do lote aberto: first_at, last_at, last_complete (epoch)
+        self.batches: Dict[str, Dict[str, float]] = {}
+        # Presença "composing" estende a janela até este instante (epoch)
+        self.composing_until: Dict[str, float] = {}
         self.queues: Dict[str, asyncio.Queue] = {}
         self.tasks: Dict[str, asyncio.Task] = {}
         self.processing_locks: Dict[str, asyncio.Lock] = {}
+        # Ordem LRU: telefone mais antigo primeiro, valor = última atividade (monotonic)
+        self.last_activity: "OrderedDict[str, float]" = OrderedDict()
+        self.evictions = 0
+        self._janitor_task: Optional[asyncio.Task] = None
+
+        metrics.register_gauge("message_buffer_live", lambda: len(self.queues))
+        metrics.register_gauge("message_buffer_oldest_idle_seconds", self.oldest_idle_age)
         emoji_logger.system_info(
             f"Buffer Inteligente inicializado (timeout={timeout}s, max={max_size})"
         )
 
+    def _compute_deadline(
+            self, first_at: float, last_at: float, last_complete: bool, composing_until: float = 0.0
+    ) -> float:
+        """Prazo do lote: janela após a última mensagem, estendida pela digitação, com teto"""
+        window = self.quick_window if last_complete else self.incomplete_window
+        return min(first_at + self.max_wait, max(last_at + window, composing_until))
+
+    def _deadline(self, phone: str) -> float:
+        batch = self.batches.get(phone)
+        if not batch:
+            return 0.0
+        return self._compute_deadline(
+            batch["first_at"], batch["last_at"], bool(batch["last_complete"]),
+            self.composing_until.get(phone, 0.0)
+        )
+
+    def _record_arrival(self, phone: str, content: str, now: float) -> None:
+        batch = self.batches.setdefault(phone, {"first_at": now})
+        batch["last_at"] = now
+        batch["last_complete"] = looks_complete(content)
+
+    async def note_presence(self, phone: str, presence: str) -> None:
+        """
+        Registra presença vinda do webhook PRESENCE_UPDATE da Evolution.
+        "composing"/"recording" estendem a janela; qualquer outro estado encerra a extensão.
+        """
+        if presence in ("composing", "recording"):
+            self.composing_until[phone] = time.time() + self.timeout
+            if len(self.composing_until) > self.max_buffers:
+                # Telefones que só digitam nunca viram buffer: limpa os vencidos já na escrita
+                self._drop_expired_presence()
+            self._ensure_janitor()
+        else:
+            self.composing_until.pop(phone, None)
+
+    def _drop_expired_presence(self) -> int:
+        """Remove extensões de digitação já vencidas (não afetam mais nenhum prazo)"""
+        now = time.time()
+        expired = [phone for phone, until in self.composing_until.items() if until <= now]
+        for phone in expired:
+            del self.composing_until[phone]
+        return len(expired)
+
+    def _observe_time_to_agent(self, messages: List[Dict]) -> None:
+        received_at = next(
+            (m.get("received_at") for m in messages if isinstance(m, dict) and m.get("received_at")),
+            None
+        )
+        if received_at:
+            metrics.observe("message_buffer_wait_ms", (time.time() - received_at) * 1000)
+
+    def _touch(self, phone: str) -> None:
+        """Marca atividade do telefone e o move para o fim da ordem LRU"""
+        self.last_activity[phone] = time.monotonic()
+        self.last_activity.move_to_end(phone)
+
+    def _is_idle(self, phone: str) -> bool:
+        task = self.tasks.get(phone)
+        if task and not task.done():
+            return False
+        queue = self.queues.get(phone)
+        if queue and not queue.empty():
+            return False
+        lock = self.processing_locks.get(phone)
+        return not (lock and lock.locked())
+
+    def _evict(self, phone: str) -> None:
+        self.queues.pop(phone, None)
+        self.processing_locks.pop(phone, None)
+        self.last_activity.pop(phone, None)
+        self.batches.pop(phone, None)
+        self.composing_until.pop(phone, None)
+        self.evictions += 1
+        metrics.increment("message_buffer_evictions")
+
+    def evict_idle(self, exclude: Optional[str] = None) -> int:
+        """
+        Remove buffers ociosos há mais de idle_ttl e, acima de max_buffers,
+        os menos recentemente usados (exceto `exclude`). Retorna quantos foram removidos.
+        """
+        now = time.monotonic()
+        evicted = 0
+        for phone, last_seen in list(self.last_activity.items()):
+            if phone == exclude:
+                continue
+            over_cap = len(self.queues) > self.max_buffers
+            expired = now - last_seen >= self.idle_ttl
+            if not (expired or over_cap):
+                # Ordem LRU: os próximos são mais recentes
+                break
+            if self._is_idle(phone):
+                self._evict(phone)
+                evicted += 1
+        self._drop_expired_presence()
+        if evicted:
+            emoji_logger.system_debug(f"Message Buffer - {evicted} buffers ociosos removidos")
+        return evicted
+
+    def oldest_idle_age(self) -> float:
+        """Idade (s) do buffer ocioso mais antigo ainda em memória"""
+        now = time.monotonic()
+        for phone, last_seen in self.last_activity.items():
+            if self._is_idle(phone):
+                return round(now - last_seen, 1)
+        return 0.0
+
+    def _ensure_janitor(self) -> None:
+        if self._janitor_task is None or self._janitor_task.done():
+            self._janitor_task = asyncio.create_task(self._janitor_loop())
+
+    async def _janitor_loop(self) -> None:
+        """Varredura periódica de buffers ociosos"""
+        interval = max(1.0, min(self.idle_ttl / 2, 60.0))
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                self.evict_idle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Erro na limpeza do Message Buffer: {e}")
+
     async def add_message(
             self, phone: str, content: str, message_data: Dict, media_data: Optional[Dict] = None
     ) -> None:
@@ -72,17 +252,27 @@ class MessageBuffer:
         
         if phone not in self.queues:
             self.queues[phone] = asyncio.Queue(maxsize=self.max_size)
+        self._touch(phone)
+        if len(self.queues) > self.max_buffers:
+            # O telefone atual ainda está vazio (parece ocioso), mas não pode sair
+            self.evict_idle(exclude=phone)
+        self._ensure_janitor()
         
         # Só cria uma nova task se não existir uma ativa para este telefone
         if phone not in self.tasks or self.tasks[phone].done():
-            self.tasks[phone] = asyncio.create_task(self._process_queue(phone))
+            self.tasks[phone] = asyncio.create_task(self._process_local_queue(phone))
             emoji_logger.system_debug(
                 f"Nova task de processamento criada para {phone}"
             )
         
-        message = {"content": content, "data": message_data, "media_data": media_data}
+        now = time.time()
+        message = {
+            "content": content, "data": message_data,
+            "media_data": media_data, "received_at": now
+        }
         try:
             self.queues[phone].put_nowait(message)
+            self._record_arrival(phone, content, now)
             emoji_logger.system_debug(
                 f"Mensagem adicionada ao buffer para {phone} (task ativa: {not self.tasks[phone].done()})"
             )
@@ -93,6 +283,13 @@ class MessageBuffer:
         """
         Processa a fila de forma simplificada e robusta.
         """
+        await self._process_local_queue(phone)
+
+    async def _process_local_queue(self, phone: str) -> None:
+        """
+        Processa a fila em memória do telefone. Usado também pelo RedisMessageBuffer
+        quando o Redis está indisponível (o _process_queue dele depende do Redis).
+        """
         if phone not in self.processing_locks:
             self.processing_locks[phone] = asyncio.Lock()
         
@@ -109,46 +306,55 @@ class MessageBuffer:
                     if first_msg:
                         messages.append(first_msg)
                         emoji_logger.system_debug(f"Primeira mensagem recebida para {phone}, aguardando mensagens adicionais...")
-                    
-                    # Aguarda um período adicional para capturar mensagens sequenciais
-                    # Usa o timeout configurado para capturar mensagens relacionadas
-                    end_time = asyncio.get_event_loop().time() + self.timeout
-                    
-                    while asyncio.get_event_loop().time() < end_time:
+
+                    # Janela adaptativa: o prazo é recalculado a cada mensagem/presença
+                    while True:
+                        remaining = self._deadline(phone) - time.time()
+                        if remaining <= 0:
+                            break
                         try:
-                            # Aguarda por mais mensagens com timeout curto
-                            remaining_time = end_time - asyncio.get_event_loop().time()
-                            if remaining_time <= 0:
-                                break
-                            
-                            msg = await asyncio.wait_for(queue.get(), timeout=min(remaining_time, 1.0))
+                            msg = await asyncio.wait_for(
+                                queue.get(), timeout=min(remaining, self.poll_interval)
+                            )
                             if msg:
                                 messages.append(msg)
                                 emoji_logger.system_debug(f"Mensagem adicional capturada para {phone} (total: {len(messages)})")
                         except asyncio.TimeoutError:
-                            # Timeout normal - verifica se há mais mensagens na fila
-                            while not queue.empty():
-                                try:
-                                    msg = queue.get_nowait()
-                                    if msg:
-                                        messages.append(msg)
-                                except asyncio.QueueEmpty:
-                                    break
+                            continue
+
+                    # Captura o que chegou junto com o fim da janela
+                    while not queue.empty():
+                        try:
+                            msg = queue.get_nowait()
+                            if msg:
+                                messages.append(msg)
+                        except asyncio.QueueEmpty:
                             break
                 
                 except asyncio.TimeoutError:
                     # Se não houver mensagens após o timeout inicial, a lista estará vazia.
                     pass
 
+                # Lote fechado: mensagens que chegarem a partir daqui abrem um novo lote
+                self.batches.pop(phone, None)
                 if messages:
+                    self._observe_time_to_agent(messages)
                     await self._process_messages(phone, messages)
 
+            # Mensagens que chegaram durante o processamento ganham uma nova task
+            if not queue.empty():
+                self.tasks[phone] = asyncio.create_task(self._process_local_queue(phone))
+                return
+
         except Exception as e:
             emoji_logger.system_error("Message Buffer", f"Erro ao processar queue para {phone}: {e}")
         finally:
             # Limpa apenas a task para este telefone
-            # Mantém queue e lock para futuras mensagens
-            self.tasks.pop(phone, None)
+            # Queue e lock ficam até a varredura de ociosidade (idle_ttl / max_buffers)
+            if self.tasks.get(phone) is asyncio.current_task():
+                self.tasks.pop(phone, None)
+            if phone in self.last_activity:
+                self._touch(phone)
 
     async def _process_messages(
             self, phone: str, messages: List[Dict]
@@ -177,7 +383,8 @@ class MessageBuffer:
         
         last_message_obj = valid_messages[-1]
         last_message_data = last_message_obj.get("data")
-        media_data = last_message_obj.get("media_data")
+        # Todas as mídias do lote (ex.: foto do comprovante + "segue o comprovante")
+        media_items = [msg["media_data"] for msg in valid_messages if msg.get("media_data")]
 
         # Verificação de segurança para garantir que a carga útil da última mensagem exista
         if not last_message_data or not isinstance(last_message_data, dict):
@@ -195,11 +402,16 @@ class MessageBuffer:
             message_content=combined_content,
             original_message=last_message_data,
             message_id=message_id,
-            media_data=media_data
+            media_data=media_items or None,
+            received_at=valid_messages[0].get("received_at")
         )
 
     async def shutdown(self) -> None:
         """Cancela todas as tasks ativas e limpa recursos"""
+        if self._janitor_task:
+            self._janitor_task.cancel()
+            await asyncio.gather(self._janitor_task, return_exceptions=True)
+            self._janitor_task = None
         for task in self.tasks.values():
             task.cancel()
         if self.tasks:
@@ -207,6 +419,287 @@ class MessageBuffer:
         self.queues.clear()
         self.tasks.clear()
         self.processing_locks.clear()
+        self.last_activity.clear()
+        self.batches.clear()
+        self.composing_until.clear()
+
+
+class RedisMessageBuffer(MessageBuffer):
+    """
+    Buffer com estado no Redis para rodar com vários workers do uvicorn.
+
+    - buffer:msgs:{phone}     lista com as mensagens pendentes (JSON)
+    - buffer:batch:{phone}    hash do lote aberto (first_at, last_at, last_complete)
+    - buffer:presence:{phone} fim da extensão por digitação (epoch), com TTL
+    - buffer:deadlines        sorted set phone -> prazo (epoch) para processar o lote
+    - buffer:lease:{phone}    lease com TTL: apenas um worker processa o telefone por vez
+
+    Qualquer worker pode receber mensagens do lead; o que obtiver o lease
+    após o prazo drena a lista inteira e chama _process_messages uma única vez.
+    Enquanto processa, um heartbeat renova o lease (só se o token ainda for dele).
+    """
+
+    DEADLINES_KEY = "buffer:deadlines"
+    # Compare-and-extend: estende o TTL apenas se o lease ainda for deste worker
+    RENEW_LEASE_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("expire", KEYS[1], ARGV[2])
+    else
+        return 0
+    end
+    """
+
+    def __init__(
+            self, timeout: float = 10.0, max_size: int = 10,
+            lease_ttl: int = 120, redis_connection=None, **kwargs
+    ):
+        super().__init__(timeout=timeout, max_size=max_size, **kwargs)
+        self.lease_ttl = lease_ttl
+        self._redis = redis_connection
+        self._recovery_task: Optional[asyncio.Task] = None
+
+    def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        from app.integrations.redis_client import redis_client
+        return redis_client.redis_client
+
+    @staticmethod
+    def _msgs_key(phone: str) -> str:
+        return f"buffer:msgs:{phone}"
+
+    @staticmethod
+    def _lease_key(phone: str) -> str:
+        return f"buffer:lease:{phone}"
+
+    @staticmethod
+    def _batch_key(phone: str) -> str:
+        return f"buffer:batch:{phone}"
+
+    @staticmethod
+    def _presence_key(phone: str) -> str:
+        return f"buffer:presence:{phone}"
+
+    async def _reschedule(self, phone: str) -> None:
+        """Recalcula o prazo do lote aberto a partir do estado no Redis"""
+        redis = self._get_redis()
+        batch = await redis.hgetall(self._batch_key(phone))
+        if not batch:
+            return
+        composing_until = await redis.get(self._presence_key(phone))
+        deadline = self._compute_deadline(
+            float(batch["first_at"]), float(batch["last_at"]),
+            batch.get("last_complete") in ("1", 1, True),
+            float(composing_until or 0.0)
+        )
+        await redis.zadd(self.DEADLINES_KEY, {phone: deadline})
+
+    async def note_presence(self, phone: str, presence: str) -> None:
+        """Presença compartilhada entre workers: qualquer um pode receber o webhook"""
+        redis = self._get_redis()
+        if redis is None:
+            await super().note_presence(phone, presence)
+            return
+        if presence in ("composing", "recording"):
+            await redis.set(
+                self._presence_key(phone), time.time() + self.timeout,
+                ex=max(1, int(self.timeout) + 1)
+            )
+        else:
+            await redis.delete(self._presence_key(phone))
+        await self._reschedule(phone)
+
+    async def add_message(
+            self, phone: str, content: str, message_data: Dict, media_data: Optional[Dict] = None
+    ) -> None:
+        """
+        Adiciona mensagem à lista do telefone no Redis e agenda o processamento local
+        """
+        redis = self._get_redis()
+        if redis is None:
+            emoji_logger.system_warning("Redis indisponível - usando buffer em memória para esta mensagem")
+            await super().add_message(phone, content, message_data, media_data)
+            return
+
+        if not validate_phone_number(phone):
+            emoji_logger.system_error(
+                f"Message Buffer - Número de telefone inválido ignorado: '{phone}'"
+            )
+            return
+
+        now = time.time()
+        message = json.dumps({
+            "content": content, "data": message_data,
+            "media_data": media_data, "received_at": now
+        })
+        msgs_key = self._msgs_key(phone)
+        batch_key = self._batch_key(phone)
+        key_ttl = self.lease_ttl + int(self.max_wait) * 2
+        pipe = redis.pipeline(transaction=True)
+        pipe.rpush(msgs_key, message)
+        pipe.ltrim(msgs_key, -self.max_size, -1)
+        pipe.expire(msgs_key, key_ttl)
+        pipe.hsetnx(batch_key, "first_at", now)
+        pipe.hset(batch_key, mapping={
+            "last_at": now, "last_complete": int(looks_complete(content))
+        })
+        pipe.expire(batch_key, key_ttl)
+        await pipe.execute()
+        await self._reschedule(phone)
+
+        self._ensure_task(phone)
+        self._ensure_recovery()
+        emoji_logger.system_debug(f"Mensagem adicionada ao buffer Redis para {phone}")
+
+    def _ensure_task(self, phone: str) -> None:
+        if phone not in self.tasks or self.tasks[phone].done():
+            self.tasks[phone] = asyncio.create_task(self._process_queue(phone))
+
+    def _ensure_recovery(self) -> None:
+        if self._recovery_task is None or self._recovery_task.done():
+            self._recovery_task = asyncio.create_task(self._recovery_loop())
+
+    async def _process_queue(self, phone: str) -> None:
+        """
+        Aguarda o prazo do lote, disputa o lease e processa o que estiver pendente.
+        Repete enquanto houver lote agendado para o telefone.
+        """
+        redis = self._get_redis()
+        try:
+            while True:
+                deadline = await redis.zscore(self.DEADLINES_KEY, phone)
+                if deadline is None:
+                    return
+
+                remaining = float(deadline) - time.time()
+                if remaining > 0:
+                    await asyncio.sleep(min(remaining, self.poll_interval))
+                    continue
+
+                token = uuid.uuid4().hex
+                acquired = await redis.set(
+                    self._lease_key(phone), token, nx=True, ex=self.lease_ttl
+                )
+                if not acquired:
+                    # Outro worker está processando este telefone
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                heartbeat = asyncio.create_task(self._renew_lease(phone, token))
+                try:
+                    messages = await self._drain(phone)
+                    if messages:
+                        self._observe_time_to_agent(messages)
+                        await self._process_messages(phone, messages)
+                finally:
+                    heartbeat.cancel()
+                    await self._release_lease(phone, token)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            emoji_logger.system_error("Message Buffer", f"Erro ao processar buffer Redis para {phone}: {e}")
+        finally:
+            self.tasks.pop(phone, None)
+
+    async def _drain(self, phone: str) -> List[Dict]:
+        """Remove atomicamente o lote pendente do telefone"""
+        redis = self._get_redis()
+        msgs_key = self._msgs_key(phone)
+        pipe = redis.pipeline(transaction=True)
+        pipe.lrange(msgs_key, 0, -1)
+        pipe.delete(msgs_key)
+        pipe.delete(self._batch_key(phone))
+        pipe.zrem(self.DEADLINES_KEY, phone)
+        raw_messages = (await pipe.execute())[0]
+
+        messages = []
+        for raw in raw_messages or []:
+            try:
+                messages.append(json.loads(raw))
+            except (TypeError, ValueError):
+                emoji_logger.system_warning(f"Mensagem inválida descartada do buffer Redis de {phone}")
+        return messages
+
+    async def _renew_lease(self, phone: str, token: str) -> None:
+        """Heartbeat do lease durante o turno (LLM, tools e OCR podem passar do lease_ttl)"""
+        redis = self._get_redis()
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            try:
+                renewed = await redis.eval(
+                    self.RENEW_LEASE_SCRIPT, 1, self._lease_key(phone), token, int(max(1, self.lease_ttl))
+                )
+            except Exception as e:
+                logger.warning(f"Erro ao renovar lease do buffer para {phone}: {e}")
+                continue
+            if not renewed:
+                emoji_logger.system_warning(f"Lease do buffer de {phone} expirou durante o processamento")
+                return
+
+    async def _release_lease(self, phone: str, token: str) -> None:
+        """Libera o lease apenas se ainda pertencer a este worker"""
+        redis = self._get_redis()
+        try:
+            if await redis.get(self._lease_key(phone)) == token:
+                await redis.delete(self._lease_key(phone))
+        except Exception as e:
+            logger.warning(f"Erro ao liberar lease do buffer para {phone}: {e}")
+
+    async def _recovery_loop(self) -> None:
+        """
+        Assume lotes vencidos cujo worker de origem caiu antes de processá-los
+        """
+        grace = max(self.quick_window, self.poll_interval)
+        while True:
+            try:
+                await asyncio.sleep(grace)
+                redis = self._get_redis()
+                if redis is None:
+                    continue
+                overdue = await redis.zrangebyscore(
+                    self.DEADLINES_KEY, "-inf", time.time() - grace
+                )
+                for phone in overdue or []:
+                    if phone not in self.tasks:
+                        emoji_logger.system_info(f"Recuperando lote pendente do buffer Redis para {phone}")
+                        self._ensure_task(phone)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Erro na recuperação do buffer Redis: {e}")
+
+    async def shutdown(self) -> None:
+        """Cancela tasks locais; lotes pendentes ficam no Redis para outro worker"""
+        if self._recovery_task:
+            self._recovery_task.cancel()
+            await asyncio.gather(self._recovery_task, return_exceptions=True)
+            self._recovery_task = None
+        await super().shutdown()
+
+
+def _adaptive_window_settings() -> Dict:
+    return {
+        "idle_ttl": settings.message_buffer_idle_ttl,
+        "max_buffers": settings.message_buffer_max_phones,
+        "quick_window": settings.message_buffer_quick_window,
+        "incomplete_window": settings.message_buffer_incomplete_window,
+        "max_wait": settings.message_buffer_max_wait,
+    }
+
+
+def create_message_buffer() -> MessageBuffer:
+    """Cria o buffer conforme MESSAGE_BUFFER_BACKEND"""
+    if settings.message_buffer_backend.lower() == "redis":
+        return RedisMessageBuffer(
+            timeout=settings.message_buffer_timeout,
+            lease_ttl=settings.message_buffer_lease_ttl,
+            **_adaptive_window_settings()
+        )
+    return MessageBuffer(
+        timeout=settings.message_buffer_timeout,
+        **_adaptive_window_settings()
+    )
 
 
 message_buffer: Optional[MessageBuffer] = None
@@ -216,7 +709,7 @@ def get_message_buffer() -> MessageBuffer:
     """Retorna instância global do buffer"""
     global message_buffer
     if not message_buffer:
-        message_buffer = MessageBuffer()
+        message_buffer = create_message_buffer()
     return message_buffer
 
 
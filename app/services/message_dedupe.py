@@ -0,0 +1,86 @@
+"""
+Message Dedupe - Idempotência de webhooks por ID da mensagem do WhatsApp
+A Evolution pode reentregar MESSAGES_UPSERT; cada key.id passa pelo pipeline uma única vez
+"""
+from collections import OrderedDict
+from typing import Optional
+from app.config import settings
+from app.integrations.redis_client import redis_client
+from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
+
+
+class MessageDeduplicator:
+    """
+    LRU em memória na frente de um SET NX com TTL no Redis.
+    IDs já vistos por este processo não custam nenhuma operação no Redis;
+    os demais custam exatamente uma (compartilhada entre workers).
+
+    Reentregas da fila de entrada já foram "vistas" na primeira entrega; para elas vale
+    a marca de processado (mark_processed), gravada só quando o pipeline termina.
+    """
+
+    def __init__(self, ttl: int = 86400, lru_size: int = 10000):
+        self.ttl = ttl
+        self.lru_size = lru_size
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._processed: "OrderedDict[str, None]" = OrderedDict()
+
+    def _remember(self, message_id: str, lru: Optional[OrderedDict] = None) -> None:
+        lru = self._seen if lru is None else lru
+        lru[message_id] = None
+        lru.move_to_end(message_id)
+        while len(lru) > self.lru_size:
+            lru.popitem(last=False)
+
+    async def is_duplicate(self, message_id: str) -> bool:
+        """Marca o ID como visto e informa se ele já havia sido processado"""
+        if not message_id:
+            return False
+        if message_id in self._seen:
+            self._seen.move_to_end(message_id)
+            duplicate = True
+        else:
+            duplicate = not await redis_client.mark_message_seen(message_id, self.ttl)
+            self._remember(message_id)
+        if duplicate:
+            metrics.increment("webhook_duplicates_suppressed")
+            emoji_logger.system_debug(f"Mensagem duplicada ignorada: {message_id}")
+        return duplicate
+
+    async def mark_processed(self, message_id: str) -> None:
+        """Pipeline concluído para o ID"""
+        if not message_id:
+            return
+        self._remember(message_id, self._processed)
+        await redis_client.mark_message_processed(message_id, self.ttl)
+
+    async def is_processed(self, message_id: str) -> bool:
+        """Reentrega de um ID cujo pipeline já terminou (aqui ou em outro worker)"""
+        if not message_id:
+            return False
+        processed = message_id in self._processed or await redis_client.is_message_processed(message_id)
+        if processed:
+            metrics.increment("webhook_duplicates_suppressed")
+            emoji_logger.system_debug(f"Reentrega de mensagem já processada ignorada: {message_id}")
+        return processed
+
+
+message_deduplicator: Optional[MessageDeduplicator] = None
+
+
+def get_message_deduplicator() -> MessageDeduplicator:
+    """Retorna instância global do deduplicador"""
+    global message_deduplicator
+    if not message_deduplicator:
+        message_deduplicator = MessageDeduplicator(
+            ttl=settings.message_dedupe_ttl,
+            lru_size=settings.message_dedupe_lru_size
+        )
+    return message_deduplicator
+
+
+def set_message_deduplicator(deduplicator: Optional[MessageDeduplicator]) -> None:
+    """Define instância global do deduplicador"""
+    global message_deduplicator
+    message_deduplicator = deduplicator
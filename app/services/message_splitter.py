@@ -1,6 +1,8 @@
 """
 Message Splitter Service - Quebra mensagens preservando emojis e palavras
 """
+import re
+
 try:
     import regex
     HAS_REGEX = True
@@ -242,7 +244,87 @@ class MessageSplitter:
             result.append(indicator + chunk)
         return result
 
-    
+
+# Fim de frase seguido de espaço/quebra de linha (o texto seguinte já começou)
+SENTENCE_END_PATTERN = re.compile(r'[.!?…]+["\')\]]*\s+|\n+')
+TOOL_TAG_PATTERN = re.compile(r'\[TOOL:[^\]]*\]', re.IGNORECASE)
+SILENCE_TAGS = ("<SILENCE>", "<SILENCIO>")
+
+
+class StreamingMessageSplitter:
+    """
+    Divisão incremental de uma resposta que chega em streaming.
+
+    Só libera frases completas, agrupadas pelo MessageSplitter; o último chunk
+    é segurado até atingir min_chunk_length (ou até o fim da resposta).
+    Trechos com [ ou < ainda não fechados ficam retidos; ao surgir uma tag
+    [TOOL: ...] ou <SILENCE>, nada mais é liberado nesta rodada.
+    """
+
+    def __init__(self, splitter: MessageSplitter, min_chunk_length: int = 80):
+        self.splitter = splitter
+        self.min_chunk_length = min_chunk_length
+        self.buffer = ""
+        self.pending = ""
+        self.tool_detected = False
+        self.silenced = False
+
+    def _safe_length(self) -> int:
+        """Posição até onde o buffer pode sair: antes de qualquer tag ainda aberta"""
+        text = self.buffer
+        cut = len(text)
+        for opener, closer in (("[", "]"), ("<", ">")):
+            pos = text.rfind(opener)
+            if pos != -1 and text.find(closer, pos) == -1:
+                cut = min(cut, pos)
+        lower = text.lower()
+        pos = lower.find("<analise_interna>")
+        if pos != -1 and "</analise_interna>" not in lower[pos:]:
+            cut = min(cut, pos)
+        return cut
+
+    def _take_sentences(self, limit: int) -> str:
+        """Remove do buffer e devolve as frases completas até limit"""
+        last_end = 0
+        for match in SENTENCE_END_PATTERN.finditer(self.buffer, 0, limit):
+            last_end = match.end()
+        ready, self.buffer = self.buffer[:last_end], self.buffer[last_end:]
+        return ready
+
+    def _chunks(self, ready: str, final: bool = False) -> List[str]:
+        self.pending += ready
+        if not self.pending.strip():
+            self.pending = ""
+            return []
+        chunks = self.splitter.split_message(self.pending)
+        if final or len(chunks[-1]) >= self.min_chunk_length:
+            self.pending = ""
+            return chunks
+        self.pending = chunks[-1] + " "
+        return chunks[:-1]
+
+    def feed(self, delta: str) -> List[str]:
+        """Acrescenta tokens e devolve os chunks que já podem ser enviados"""
+        self.buffer += delta
+        if self.tool_detected or self.silenced:
+            return []
+        if any(tag in self.buffer.upper() for tag in SILENCE_TAGS):
+            self.silenced = True
+            return []
+        tool_match = TOOL_TAG_PATTERN.search(self.buffer)
+        if tool_match:
+            # O texto depois da tool é descartado; frases completas antes dela podem sair
+            self.tool_detected = True
+            return self._chunks(self._take_sentences(tool_match.start()))
+        return self._chunks(self._take_sentences(self._safe_length()))
+
+    def flush(self) -> List[str]:
+        """Fim da resposta: libera o restante (exceto tools e silêncio)"""
+        if self.silenced:
+            return []
+        remaining = "" if self.tool_detected else self.buffer
+        self.buffer = ""
+        return self._chunks(remaining, final=True)
 
 
 message_splitter: Optional[MessageSplitter] = None
@@ -0,0 +1,190 @@
+"""
+Response Cache - Respostas reaproveitadas para perguntas frequentes (FAQ)
+Chave: pergunta normalizada + estágio da conversa + versão da base de conhecimento.
+Busca por hash exato e, em seguida, por quase-duplicata (similaridade de palavras).
+Só entram respostas de turnos que usaram apenas knowledge.search; o nome do lead é
+guardado como [nome] e preenchido por ResponseFormatter.replace_placeholders no acerto.
+Perguntas que dependem do contexto ("quanto custa?", "e o anual?") não leem nem gravam.
+"""
+
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional
+
+from app.config import settings
+from app.core.response_formatter import ResponseFormatter
+from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
+
+# Palavras que não mudam o sentido da pergunta (saudações e conectivos)
+STOP_WORDS = {
+    "oi", "ola", "bom", "boa", "dia", "tarde", "noite", "tudo", "bem", "por", "favor",
+    "o", "a", "os", "as", "um", "uma", "de", "do", "da", "dos", "das", "e", "em", "no",
+    "na", "nos", "nas", "para", "pra", "pro", "me", "eu", "voce", "vc", "que", "se",
+    "ai", "la", "entao", "queria", "gostaria", "saber",
+}
+# Referências a algo dito antes na conversa: a resposta depende de outra mensagem
+# ("esta" e "la" ficam de fora: sem acento viram "está" e "lá")
+ANAPHORA_WORDS = {
+    "ele", "ela", "eles", "elas", "dele", "dela", "deles", "delas", "nele", "nela",
+    "isso", "isto", "disso", "disto", "nisso", "nisto", "esse", "essa", "esses", "essas",
+    "desse", "dessa", "nesse", "nessa", "este", "deste", "desta", "neste", "nesta",
+    "aquele", "aquela", "aquilo", "daquele", "daquela", "mesmo", "mesma", "outro", "outra",
+    "tambem", "lo", "los",
+}
+# Negações mudam o sentido sem mudar quase nada do Jaccard: precisam coincidir
+NEGATION_WORDS = {"nao", "nem", "nunca", "jamais", "sem", "nenhum", "nenhuma", "nada", "ninguem"}
+
+
+def normalize_question(text: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação e sem espaços repetidos"""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def question_terms(normalized: str) -> FrozenSet[str]:
+    return frozenset(w for w in normalized.split() if w not in STOP_WORDS)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard entre os termos das perguntas (0 se as negações forem diferentes)"""
+    if not a or not b or a & NEGATION_WORDS != b & NEGATION_WORDS:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def is_self_contained(normalized: str) -> bool:
+    """
+    Pergunta entendida sem o resto da conversa: termos suficientes, sem pronomes
+    ou demonstrativos que apontem para mensagens anteriores e sem começar com "e ..."
+    """
+    words = normalized.split()
+    if not words or words[0] == "e" or ANAPHORA_WORDS.intersection(words):
+        return False
+    return len(question_terms(normalized)) >= settings.response_cache_min_terms
+
+
+class ResponseCache:
+    """
+    Cache LRU em memória (por processo) de respostas de FAQ, com TTL por entrada
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None):
+        self.max_entries = max_entries or settings.response_cache_max_entries
+        self.ttl = ttl or settings.response_cache_ttl
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.kb_version: Optional[str] = None
+        metrics.register_gauge("response_cache_hit_rate", self.hit_rate)
+        metrics.register_gauge("response_cache_entries", lambda: len(self.entries))
+
+    @staticmethod
+    def _key(normalized: str, stage: str, kb_version: str) -> str:
+        digest = hashlib.sha1(normalized.encode()).hexdigest()
+        return f"{kb_version}:{(stage or '').upper()}:{digest}"
+
+    def _check_version(self, kb_version: str) -> None:
+        """Base de conhecimento mudou: nenhuma resposta antiga é reaproveitada"""
+        if kb_version != self.kb_version:
+            if self.entries:
+                metrics.increment("response_cache_invalidations")
+            self.invalidate()
+            self.kb_version = kb_version
+
+    def hit_rate(self) -> float:
+        hits = metrics.get_counter("response_cache_hits")
+        total = hits + metrics.get_counter("response_cache_misses")
+        return round(hits / total, 3) if total else 0.0
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return time.monotonic() - entry["stored_at"] > self.ttl
+
+    def get(self, question: str, stage: str, kb_version: str, lead_info: dict) -> Optional[str]:
+        """Resposta pronta (com o nome do lead) ou None"""
+        normalized = normalize_question(question)
+        if not kb_version or not is_self_contained(normalized):
+            return None
+        self._check_version(kb_version)
+
+        stage = (stage or "").upper()
+        entry = self.entries.get(self._key(normalized, stage, kb_version))
+        if entry is None:
+            # Quase-duplicata entre as perguntas do mesmo estágio
+            terms = question_terms(normalized)
+            best_score = 0.0
+            for candidate in self.entries.values():
+                if candidate["stage"] != stage:
+                    continue
+                score = similarity(terms, candidate["terms"])
+                if score > best_score:
+                    entry, best_score = candidate, score
+            if best_score < settings.response_cache_similarity:
+                entry = None
+
+        if entry is None or self._expired(entry):
+            metrics.increment("response_cache_misses")
+            return None
+
+        self.entries.move_to_end(entry["key"])
+        metrics.increment("response_cache_hits")
+        metrics.increment("response_cache_saved_tokens", entry["prompt_tokens"])
+        emoji_logger.system_debug(
+            "Resposta de FAQ reaproveitada do cache",
+            question=normalized[:60],
+            cached_question=entry["question"][:60]
+        )
+        return ResponseFormatter.replace_placeholders(entry["template"], lead_info)
+
+    def put(
+        self, question: str, stage: str, kb_version: str, response: str,
+        lead_info: dict, prompt_tokens: int = 0
+    ) -> None:
+        normalized = normalize_question(question)
+        if not kb_version or not response or not is_self_contained(normalized):
+            return
+        self._check_version(kb_version)
+
+        # Template: o nome do lead volta a ser placeholder
+        template = response
+        name = ((lead_info or {}).get("name") or "").strip()
+        for variant in filter(None, {name, name.split(" ")[0]}):
+            template = re.sub(rf"\b{re.escape(variant)}\b", "[nome]", template)
+
+        key = self._key(normalized, stage, kb_version)
+        self.entries[key] = {
+            "key": key,
+            "stage": (stage or "").upper(),
+            "question": normalized,
+            "terms": question_terms(normalized),
+            "template": template,
+            "prompt_tokens": prompt_tokens,
+            "stored_at": time.monotonic(),
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Descarta todas as entradas (ex.: base de conhecimento alterada)"""
+        self.entries.clear()
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Retorna a instância singleton do ResponseCache"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """Define a instância global do ResponseCache"""
+    global _response_cache
+    _response_cache = cache
@@ -0,0 +1,133 @@
+"""
+Response Streamer - Envia ao WhatsApp os trechos da resposta do LLM assim que ficam prontos
+O primeiro balão sai enquanto os tokens seguintes ainda estão chegando
+"""
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.core.response_formatter import ResponseFormatter
+from app.services.message_splitter import MessageSplitter, StreamingMessageSplitter, SILENCE_TAGS
+from app.utils.logger import emoji_logger
+from app.utils.metrics import metrics
+
+
+SendFunc = Callable[[str, str], Awaitable[Any]]
+
+
+def clean_chunk(chunk: str, lead_info: Optional[Dict] = None) -> str:
+    """Mesma limpeza da resposta completa, aplicada a um trecho (tags, placeholders, markdown)"""
+    text = re.sub(r'<analise_interna>.*?</analise_interna>', '', chunk, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<[^>]+>', '', text)
+    if lead_info:
+        text = ResponseFormatter.replace_placeholders(text, lead_info)
+    return ResponseFormatter.strip_markdown(text).strip()
+
+
+class ResponseStreamer:
+    """
+    Recebe os deltas do ModelManager (feed), divide em chunks completos e os envia
+    em ordem por uma única task, sem bloquear a leitura do stream.
+
+    Cada chamada ao LLM é uma rodada (start_round). complete() envia o que falta da
+    resposta final além do que a rodada já enviou: a resposta inteira se nada saiu,
+    ou se o stream foi abandonado (fallback de modelo, texto substituído).
+    """
+
+    def __init__(
+        self,
+        phone: str,
+        send: SendFunc,
+        splitter: MessageSplitter,
+        min_chunk_length: int = 80,
+        received_at: Optional[float] = None
+    ):
+        self.phone = phone
+        self.send = send
+        self.base_splitter = splitter
+        self.min_chunk_length = min_chunk_length
+        self.received_at = received_at
+        self.splitter = StreamingMessageSplitter(splitter, min_chunk_length)
+        self.lead_info: Dict = {}
+        self.sent_chunks: List[str] = []
+        self.round_chunks = 0
+        self.round_sent: List[str] = []
+        self.completed = False
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._sender: Optional[asyncio.Task] = None
+
+    @property
+    def sent_text(self) -> str:
+        return " ".join(self.sent_chunks)
+
+    def start_round(self, lead_info: Optional[Dict] = None) -> None:
+        """Nova chamada ao LLM: descarta o que não foi enviado da rodada anterior"""
+        self.lead_info = lead_info or {}
+        self.splitter = StreamingMessageSplitter(self.base_splitter, self.min_chunk_length)
+        self.round_chunks = 0
+        self.round_sent = []
+
+    async def feed(self, delta: str) -> None:
+        for chunk in self.splitter.feed(delta):
+            self._enqueue(chunk)
+
+    def _enqueue(self, chunk: str) -> None:
+        text = clean_chunk(chunk, self.lead_info)
+        if not text:
+            return
+        self.round_chunks += 1
+        self.round_sent.append(text)
+        self._queue.put_nowait(text)
+        if self._sender is None:
+            self._sender = asyncio.create_task(self._send_loop())
+
+    async def _send_loop(self) -> None:
+        while True:
+            chunk = await self._queue.get()
+            if chunk is None:
+                return
+            try:
+                await self.send(self.phone, chunk)
+                if not self.sent_chunks and self.received_at:
+                    metrics.observe("time_to_first_bubble_ms", (time.time() - self.received_at) * 1000)
+                self.sent_chunks.append(chunk)
+            except Exception as e:
+                emoji_logger.system_error("ResponseStreamer", f"Erro ao enviar chunk para {self.phone}: {e}")
+
+    async def complete(self, final_text: str) -> None:
+        """
+        Fim da resposta: envia final_text menos o que a rodada atual já enviou. O buffer
+        do splitter é descartado; se o stream morreu no meio (fallback de modelo, texto
+        substituído), o resto dele nunca é a resposta.
+        """
+        if any(tag in (final_text or "").upper() for tag in SILENCE_TAGS) or self.splitter.silenced:
+            chunks: List[str] = []
+        else:
+            remaining = self._unsent(final_text or "")
+            chunks = self.base_splitter.split_message(remaining) if remaining else []
+        self.start_round(self.lead_info)
+        for chunk in chunks:
+            self._enqueue(chunk)
+        self.completed = True
+        await self.aclose()
+        emoji_logger.system_debug(f"Streaming concluído para {self.phone}: {len(self.sent_chunks)} chunks enviados")
+
+    def _unsent(self, final_text: str) -> str:
+        """Texto limpo de final_text depois dos chunks da rodada que ele começa repetindo"""
+        text = clean_chunk(final_text, self.lead_info)
+        position = 0
+        for chunk in self.round_sent:
+            words = chunk.split()
+            match = re.compile(r"\s*" + r"\s+".join(map(re.escape, words))).match(text, position)
+            if not match:
+                break
+            position = match.end()
+        return text[position:].strip()
+
+    async def aclose(self) -> None:
+        """Aguarda o envio do que já está na fila e encerra a task de envio"""
+        if self._sender is None:
+            return
+        sender, self._sender = self._sender, None
+        self._queue.put_nowait(None)
+        await sender
@@ -229,6 +229,13 @@ class KnowledgeServiceWrapper:
             raise ServiceNotEnabledError(f"{self.service_name} não foi inicializado")
         return await self.knowledge_service.search_knowledge_base(query, max_results)
 
+    async def get_version(self) -> str:
+        """Versão (hash do conteúdo) da base de conhecimento"""
+        self._check_enabled()
+        if not self.knowledge_service:
+            raise ServiceNotEnabledError(f"{self.service_name} não foi inicializado")
+        return await self.knowledge_service.get_version()
+
     async def search_by_category(self, category: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Busca por categoria"""
         self._check_enabled()
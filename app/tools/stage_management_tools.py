@@ -451,19 +451,19 @@ class StageManagementTools:
             # Buscar follow-ups pendentes para este lead
             from app.integrations.supabase_client import supabase_client
             
-            pending_followups = supabase_client.client.table('follow_ups').select('id').eq(
+            pending_followups = await supabase_client.execute_query(supabase_client.client.table('follow_ups').select('id').eq(
                 'lead_id', lead_id
-            ).eq('status', 'pending').execute()
+            ).eq('status', 'pending'))
             
             if pending_followups.data:
                 followup_ids = [fu['id'] for fu in pending_followups.data]
                 
                 # Cancelar todos os follow-ups pendentes
-                cancel_result = supabase_client.client.table('follow_ups').update({
+                cancel_result = await supabase_client.execute_query(supabase_client.client.table('follow_ups').update({
                     'status': 'cancelled',
                     'error_reason': reason,
                     'updated_at': datetime.now().isoformat()
-                }).in_('id', followup_ids).execute()
+                }).in_('id', followup_ids))
                 
                 emoji_logger.service_success(f"✅ {len(followup_ids)} follow-ups cancelados para lead {lead_id[:8]}... - Motivo: {reason}")
                 
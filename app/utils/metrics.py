@@ -0,0 +1,107 @@
+"""
+Métricas em memória por processo
+Contadores, gauges e histogramas simples expostos em /health/metrics
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class Histogram:
+    """
+    Histograma de janela deslizante (últimas N amostras)
+    Suficiente para p50/p95 operacionais sem dependências externas
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, pct: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "max": round(max(self.samples), 3) if self.samples else 0.0,
+        }
+
+
+class MetricsRegistry:
+    """Registro global de métricas do processo"""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._gauge_callbacks: Dict[str, Callable[[], Any]] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], Any]) -> None:
+        """Registra gauge calculado no momento da leitura"""
+        self._gauge_callbacks[name] = callback
+
+    def observe(self, name: str, value: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Mede a duração do bloco em milissegundos"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def get_counter(self, name: str) -> int:
+        return self.counters.get(name, 0)
+
+    def get_histogram(self, name: str) -> Optional[Histogram]:
+        return self.histograms.get(name)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        gauges = dict(self.gauges)
+        for name, callback in self._gauge_callbacks.items():
+            try:
+                gauges[name] = callback()
+            except Exception:
+                continue
+        return {
+            "counters": dict(self.counters),
+            "gauges": gauges,
+            "histograms": {
+                name: histogram.snapshot()
+                for name, histogram in self.histograms.items()
+            },
+        }
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+
+metrics = MetricsRegistry()
@@ -17,13 +17,14 @@ from app.utils.logger import emoji_logger
 from app.integrations.redis_client import redis_client
 from app.integrations.supabase_client import supabase_client
 from app.services.message_buffer import get_message_buffer
+from app.services.inbound_queue import get_inbound_queue
 from app.services.message_splitter import get_message_splitter
 from app.services.followup_manager import followup_manager_service
 from app.services.followup_executor_service import FollowUpSchedulerService
 from app.services.followup_worker import FollowUpWorker
 from app.services.followup_service_100_real import FollowUpServiceReal
 from app.services.conversation_monitor import get_conversation_monitor
-from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.agents.agentic_sdr_stateless import get_agentic_sdr
 
 # Importações dos routers
 from app.api.health import router as health_router
@@ -106,7 +107,10 @@ async def lifespan(app: FastAPI):
 
         # Inicializar Message Buffer (já inicializado no construtor)
         message_buffer = get_message_buffer()
-        emoji_logger.system_ready("Message Buffer", data={"timeout": f"{message_buffer.timeout}s"})
+        emoji_logger.system_ready("Message Buffer", data={
+            "timeout": f"{message_buffer.timeout}s",
+            "backend": settings.message_buffer_backend
+        })
 
         # Inicializar Message Splitter (já inicializado no construtor)
         message_splitter = get_message_splitter()
@@ -129,10 +133,16 @@ async def lifespan(app: FastAPI):
         emoji_logger.system_ready("Kommo Queue Service", data={"rate_limit": "6 req/s", "queue": "async"})
 
         # Inicializar Agente Principal
-        agentic_sdr = AgenticSDRStateless()
-        await agentic_sdr.initialize()
+        agentic_sdr = await get_agentic_sdr()
         emoji_logger.system_ready("AgenticSDR (Stateless)", data={"status": "sistema pronto"})
 
+        # Fila de entrada durável (webhook -> Redis Stream -> consumidores)
+        if settings.inbound_queue_enabled:
+            if redis_client.redis_client:
+                await get_inbound_queue().start()
+            else:
+                emoji_logger.system_warning("Inbound Queue requer Redis - webhooks processados em background")
+
         # Inicializar FollowUp Services Final
         emoji_logger.system_ready("FollowUp Services")
         
@@ -170,6 +180,10 @@ async def lifespan(app: FastAPI):
         # Parar workers de follow-up primeiro
         await stop_background_workers()
         
+        # Parar consumidores da fila de entrada (pendentes serão reentregues)
+        if settings.inbound_queue_enabled:
+            await get_inbound_queue().stop()
+
         # Parar serviços
         if 'message_buffer' in locals():
             await message_buffer.shutdown()
@@ -180,6 +194,14 @@ async def lifespan(app: FastAPI):
             
         if redis_client:
             await redis_client.disconnect()
+
+        from app.services.kommo_queue_service import kommo_queue_service
+        await kommo_queue_service.close()
+
+        await supabase_client.close()
+
+        from app.core.media_pool import get_media_pool
+        get_media_pool().shutdown()
             
         emoji_logger.system_info("✅ Shutdown concluído")
         
@@ -0,0 +1,7 @@
+-- Resumo acumulado dos turnos antigos da conversa, usado quando o histórico excede o orçamento de tokens do LLM.
+ALTER TABLE public.conversations
+ADD COLUMN IF NOT EXISTS history_summary TEXT,
+ADD COLUMN IF NOT EXISTS history_summary_until TIMESTAMPTZ;
+
+COMMENT ON COLUMN public.conversations.history_summary IS 'Resumo acumulado das mensagens antigas da conversa (fora do orçamento de tokens do histórico).';
+COMMENT ON COLUMN public.conversations.history_summary_until IS 'created_at da última mensagem coberta por history_summary.';
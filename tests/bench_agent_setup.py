@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do custo de preparar o agente por mensagem.
+
+Compara o fluxo antigo (AgenticSDRStateless() + initialize() a cada mensagem)
+com a instância compartilhada obtida via get_agentic_sdr().
+
+Requer o .env configurado: initialize() conecta aos serviços habilitados.
+
+Uso:
+    python tests/bench_agent_setup.py [iteracoes]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless, get_agentic_sdr
+
+
+async def per_message_agent() -> None:
+    agent = AgenticSDRStateless()
+    await agent.initialize()
+
+
+async def shared_agent() -> None:
+    await get_agentic_sdr()
+
+
+async def measure(label: str, setup, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await setup()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    p50 = statistics.median(samples)
+    p95 = sorted(samples)[max(0, int(len(samples) * 0.95) - 1)]
+    print(f"{label:<28} p50={p50:9.3f}ms  p95={p95:9.3f}ms  total={sum(samples):9.1f}ms")
+    return p50
+
+
+async def main(iterations: int) -> None:
+    print(f"Setup do agente por mensagem ({iterations} iterações)")
+    before = await measure("antes (novo agente)", per_message_agent, iterations)
+    # A primeira chamada paga a inicialização, equivalente ao startup do lifespan
+    await get_agentic_sdr()
+    after = await measure("depois (agente compartilhado)", shared_agent, iterations)
+    if after > 0:
+        print(f"Ganho p50: {before / after:,.0f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da extração de valores/pagador de comprovantes (app/core/receipt_extractor).
+
+Roda a análise completa de um texto de OCR (valor da conta, valor do comprovante,
+pagador e validação do plano) sobre o corpus de tests/fixtures/receipt_texts.json,
+em textos curtos (um comprovante) e longos (~1.500 caracteres, PDF de várias páginas).
+
+Uso:
+    python tests/bench_receipt_extractor.py [iteracoes]
+"""
+
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.core import receipt_extractor
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "receipt_texts.json")
+
+
+def analyze(texts) -> None:
+    for text in texts:
+        # Sem reaproveitar a varredura entre textos (cada mídia chega uma vez)
+        receipt_extractor._scan.cache_clear()
+        receipt_extractor.extract_bill_value(text)
+        value = receipt_extractor.extract_payment_value(text)
+        receipt_extractor.extract_payer_name(text)
+        if value:
+            receipt_extractor.is_valid_plan_value(value)
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    with open(CORPUS, encoding="utf-8") as f:
+        short = [case["text"] for case in json.load(f)]
+    long = ["\n".join(short[i:] + short[:i])[:1500] for i in range(len(short))]
+
+    for label, texts in (("curto", short), ("longo", long)):
+        best = min(timeit.repeat(lambda: analyze(texts), number=iterations, repeat=5))
+        print(f"{label:<6} {best / iterations / len(texts) * 1e6:8.1f} µs por texto ({len(texts)} textos)")
+
+
+if __name__ == "__main__":
+    main()
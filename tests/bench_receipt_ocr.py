@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark do OCR de comprovantes: imagem crua (como antes) contra o pré-processamento
+de media_jobs.preprocess_for_ocr (redução, cinza, binarização, recorte, --psm 4).
+
+Corpus em tests/fixtures/receipts: screenshots sintéticos de comprovantes (PIX, TED,
+boleto, modo escuro, valores distratores como saldo e tarifa) com o valor esperado
+em labels.json. Reporta latência do OCR (média/p95) e acerto de payment_value.
+
+Requer o binário tesseract com o idioma "por".
+
+Uso:
+    python tests/bench_receipt_ocr.py [iteracoes]
+    python tests/bench_receipt_ocr.py --gerar-corpus
+"""
+
+import os
+import sys
+import json
+import time
+import statistics
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.core import media_jobs
+from app.core.multimodal_processor import MultimodalProcessor
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "receipts")
+
+# (arquivo, tamanho, modo escuro, linhas, valor esperado)
+RECEIPTS = [
+    ("pix_claro_1080.png", (1080, 2400), False, [
+        "Comprovante de transferência", "", "Valor", "R$ 39,90", "",
+        "Tipo de transferência", "Pix", "Data", "14/09/2025 19:42",
+        "Destino", "Clube Náutico Capibaribe", "CNPJ 10.866.752/0001-40",
+        "Origem", "Maria Silva Souza", "Banco Exemplo S.A.",
+    ], 39.90),
+    ("pix_escuro_1080.png", (1080, 2400), True, [
+        "Pix enviado", "", "R$ 99,90", "", "Para Clube Náutico Capibaribe",
+        "Chave CNPJ", "Instituição Banco do Brasil", "Data 02/10/2025 08:15",
+        "ID E12345678202510020815",
+    ], 99.90),
+    ("ted_saldo_1440.png", (1440, 3200), False, [
+        "Comprovante TED", "", "Saldo disponível R$ 1.532,18", "",
+        "Valor da transferência: R$ 79,90", "Tarifa R$ 0,00",
+        "Favorecido Clube Náutico Capibaribe", "Agência 0001 Conta 12345-6",
+        "Remetente João Pedro Lima", "Autenticação A1B2C3D4E5",
+    ], 79.90),
+    ("boleto_1080.png", (1080, 2400), False, [
+        "Pagamento realizado", "", "Boleto", "Beneficiário", "Clube Náutico Capibaribe",
+        "Valor do pagamento R$ 24,90", "Vencimento 10/10/2025",
+        "Código de barras", "23793.38128 60000.000003 00000.000400 1 00000000002490",
+    ], 24.90),
+    ("pix_banner_1440.png", (1440, 3200), False, [
+        "Transferência Pix realizada", "", "Valor R$ 399,90", "",
+        "Quem recebeu", "Clube Náutico Capibaribe", "Quem pagou",
+        "Ana Beatriz Costa", "Data e hora 21/08/2025 12:03", "Saldo após R$ 2.100,00",
+    ], 399.90),
+]
+
+
+def render_receipt(size, dark, lines):
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = size
+    background, foreground = ((18, 18, 18), (235, 235, 235)) if dark else ((255, 255, 255), (30, 30, 30))
+    image = Image.new("RGB", size, background)
+    draw = ImageDraw.Draw(image)
+    scale = width / 1080
+    # Barra de status e cabeçalho colorido, como num app de banco
+    draw.rectangle((0, 0, width, int(90 * scale)), fill=(0, 0, 0) if dark else (240, 240, 240))
+    draw.rectangle((0, int(90 * scale), width, int(300 * scale)), fill=(130, 10, 209))
+    draw.text((int(60 * scale), int(160 * scale)), "Meu Banco", fill=(255, 255, 255),
+              font=ImageFont.load_default(size=int(64 * scale)))
+
+    font = ImageFont.load_default(size=int(46 * scale))
+    y = int(420 * scale)
+    for line in lines:
+        # A fonte embutida do Pillow não tem glifos acentuados
+        line = unicodedata.normalize("NFKD", line).encode("ascii", "ignore").decode()
+        draw.text((int(60 * scale), y), line, fill=foreground, font=font)
+        y += int(78 * scale)
+    return image
+
+
+def generate_corpus() -> None:
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    labels = {}
+    for name, size, dark, lines, value in RECEIPTS:
+        render_receipt(size, dark, lines).save(os.path.join(CORPUS_DIR, name), optimize=True)
+        labels[name] = value
+    with open(os.path.join(CORPUS_DIR, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump(labels, f, indent=2)
+    print(f"{len(labels)} comprovantes gerados em {CORPUS_DIR}")
+
+
+def measure(label: str, iterations: int, **ocr_kwargs) -> None:
+    with open(os.path.join(CORPUS_DIR, "labels.json"), encoding="utf-8") as f:
+        labels = json.load(f)
+    processor = MultimodalProcessor()
+
+    latencies, hits = [], 0
+    for name, expected in labels.items():
+        with open(os.path.join(CORPUS_DIR, name), "rb") as f:
+            image_bytes = f.read()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            text, *_ = media_jobs.ocr_image(image_bytes, **ocr_kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+        value = processor._extract_payment_value_from_text(text)
+        hits += value is not None and abs(value - expected) < 0.01
+        print(f"  {name:<24} esperado R$ {expected:>7.2f}  extraído {value}")
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"{label:<16} ocr média {statistics.mean(latencies):7.0f} ms  p95 {p95:7.0f} ms  "
+        f"payment_value {hits}/{len(labels)}"
+    )
+
+
+def main() -> None:
+    if "--gerar-corpus" in sys.argv:
+        generate_corpus()
+        return
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    # Antes: imagem original com o --psm padrão do Tesseract (3)
+    measure("original", iterations, preprocess=False, psm=3)
+    measure("pré-processado", iterations, preprocess=True)
+
+
+if __name__ == "__main__":
+    main()
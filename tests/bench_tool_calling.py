@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark de um turno com tool: tags [TOOL: ...] + segunda chamada (modo texto)
+contra function calling nativo (ENABLE_NATIVE_TOOL_CALLING).
+
+Mede latência do turno e tokens de entrada enviados ao modelo primário, e quantos
+turnos realmente seguiram cada caminho: no modo nativo, um modelo que ainda escreve
+tags [TOOL: ...] cai silenciosamente no caminho de texto.
+Os tools são simulados (resultado fixo); só o LLM é chamado de verdade.
+
+Requer o .env configurado com a chave do modelo primário.
+
+Uso:
+    python tests/bench_tool_calling.py [iteracoes]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.config import settings
+from app.utils.metrics import metrics
+
+QUESTION = "Quais são os planos de sócio e quanto custa cada um?"
+KNOWLEDGE = {
+    "planos": [
+        {"nome": "Alvirrubro", "valor": "R$ 29,90"},
+        {"nome": "Timbu", "valor": "R$ 59,90"},
+        {"nome": "Náutico de Coração", "valor": "R$ 99,90"},
+    ]
+}
+
+
+async def fake_execute_single_tool(service_method, params, *args):
+    return KNOWLEDGE
+
+
+async def measure(label: str, native: bool, iterations: int) -> None:
+    settings.enable_native_tool_calling = native
+    metrics.reset()
+    agent = AgenticSDRStateless()
+    agent.model_manager.initialize()
+    agent.calendar_service = agent.crm_service = agent.followup_service = None
+    agent.knowledge_service = object()
+    agent._execute_single_tool = fake_execute_single_tool
+
+    latencies, tokens = [], []
+    for i in range(iterations):
+        conversation_id = f"bench-{label}-{i}"
+        start = time.perf_counter()
+        await agent._generate_response(
+            QUESTION, {}, {"name": "Ana"}, [{"role": "user", "content": QUESTION}],
+            {"conversation_id": conversation_id}
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        tokens.append(agent.model_manager.get_conversation_usage(conversation_id).get("prompt_tokens", 0))
+
+    paths = {
+        mode: getattr(metrics.get_histogram(f"tool_turn_ms:{mode}"), "count", 0)
+        for mode in ("native", "text")
+    }
+    print(
+        f"{label:<10} p50={statistics.median(latencies):8.0f}ms  "
+        f"max={max(latencies):8.0f}ms  tokens p50={statistics.median(tokens):8.0f}  "
+        f"caminho nativo={paths['native']} texto={paths['text']}"
+    )
+    if native and paths["native"] < iterations:
+        print(f"{'':<10} ATENÇÃO: {iterations - paths['native']} turno(s) no modo nativo não usaram function calling")
+
+
+async def main(iterations: int) -> None:
+    print(f"Turno com tool ({iterations} iterações, modelo {settings.primary_ai_model})")
+    await measure("texto", False, iterations)
+    await measure("nativo", True, iterations)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
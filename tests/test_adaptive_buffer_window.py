@@ -0,0 +1,143 @@
+import os
+import time
+import asyncio
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.api import webhooks
+from app.config import settings
+from app.services.message_buffer import MessageBuffer, looks_complete
+from app.utils.metrics import metrics
+
+
+PHONE = "5581999990001"
+
+
+def make_buffer(**kwargs):
+    options = {"timeout": 0.4, "quick_window": 0.05, "incomplete_window": 0.3, "max_wait": 5.0}
+    options.update(kwargs)
+    buffer = MessageBuffer(**options)
+    processed = []
+
+    async def fake_process_messages(phone, messages):
+        processed.append((time.time(), [m["content"] for m in messages]))
+
+    buffer._process_messages = fake_process_messages
+    return buffer, processed
+
+
+def message(msg_id):
+    return {"key": {"id": msg_id}}
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("Quero saber dos planos de sócio.", True),
+    ("Qual o valor?", True),
+    ("quero saber dos planos", True),
+    ("Oi", False),
+    ("quero saber dos planos de", False),
+    ("então,", False),
+    ("", False),
+])
+def test_looks_complete(text, expected):
+    assert looks_complete(text) is expected
+
+
+@pytest.mark.asyncio
+async def test_complete_message_flushes_quickly():
+    buffer, processed = make_buffer()
+    start = time.time()
+    await buffer.add_message(PHONE, "Quero saber dos planos de sócio.", message("1"))
+    await asyncio.sleep(0.25)
+
+    assert len(processed) == 1
+    assert processed[0][0] - start < 0.2
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_incomplete_message_waits_for_continuation():
+    buffer, processed = make_buffer()
+    await buffer.add_message(PHONE, "Oi", message("1"))
+    await asyncio.sleep(0.15)
+    await buffer.add_message(PHONE, "quero saber dos planos.", message("2"))
+    await asyncio.sleep(0.3)
+
+    assert [batch for _, batch in processed] == [["Oi", "quero saber dos planos."]]
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_composing_presence_extends_window():
+    buffer, processed = make_buffer()
+    await buffer.add_message(PHONE, "Tenho uma dúvida.", message("1"))
+    await buffer.note_presence(PHONE, "composing")
+    await asyncio.sleep(0.2)
+    assert processed == []
+
+    await buffer.add_message(PHONE, "Qual o valor do plano?", message("2"))
+    await buffer.note_presence(PHONE, "paused")
+    await asyncio.sleep(0.25)
+
+    assert [batch for _, batch in processed] == [["Tenho uma dúvida.", "Qual o valor do plano?"]]
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_max_wait_caps_the_window():
+    buffer, processed = make_buffer(timeout=10.0, max_wait=0.3)
+    start = time.time()
+    await buffer.add_message(PHONE, "Oi", message("1"))
+    await buffer.note_presence(PHONE, "composing")
+    await asyncio.sleep(0.6)
+
+    assert len(processed) == 1
+    assert processed[0][0] - start < 0.5
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_buffer_wait_histogram_recorded():
+    metrics.reset()
+    buffer = MessageBuffer(timeout=0.4, quick_window=0.05)
+    seen = []
+
+    async def fake_process_messages(phone, messages):
+        seen.append(messages)
+
+    buffer._process_messages = fake_process_messages
+    msg = message("1")
+    msg["received_at"] = time.time()
+    await buffer.add_message(PHONE, "Qual o valor do plano?", msg)
+    await asyncio.sleep(0.25)
+
+    assert len(seen) == 1
+    assert metrics.get_histogram("message_buffer_wait_ms").count == 1
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_presence_webhook_v2_payload_reaches_buffer(monkeypatch):
+    notes = []
+
+    class RecordingBuffer:
+        async def note_presence(self, phone, presence):
+            notes.append((phone, presence))
+
+    monkeypatch.setattr(settings, "enable_message_buffer", True)
+    monkeypatch.setattr(webhooks, "get_message_buffer_instance", lambda: RecordingBuffer())
+
+    await webhooks.process_presence_update({
+        "data": {
+            "id": f"{PHONE}@s.whatsapp.net",
+            "presences": {f"{PHONE}@s.whatsapp.net": {"lastKnownPresence": "composing"}},
+        }
+    })
+    await webhooks.process_presence_update({
+        "data": {"remoteJid": "120363000000@g.us", "presence": "composing"}
+    })
+
+    assert notes == [(PHONE, "composing")]
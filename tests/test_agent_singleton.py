@@ -0,0 +1,67 @@
+import os
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents import agentic_sdr_stateless
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless, get_agentic_sdr, set_agentic_sdr
+from app.api import webhooks
+from app.integrations.supabase_client import supabase_client
+
+
+@pytest.fixture
+def counted_initialize(monkeypatch):
+    calls = {"initialize": 0}
+
+    async def fake_initialize(self):
+        calls["initialize"] += 1
+        self.is_initialized = True
+
+    monkeypatch.setattr(AgenticSDRStateless, "initialize", fake_initialize)
+    set_agentic_sdr(None)
+    yield calls
+    set_agentic_sdr(None)
+
+
+@pytest.mark.asyncio
+async def test_get_agentic_sdr_initializes_once(counted_initialize):
+    first = await get_agentic_sdr()
+    second = await get_agentic_sdr()
+
+    assert first is second
+    assert first is agentic_sdr_stateless.agentic_sdr
+    assert counted_initialize["initialize"] == 1
+
+
+@pytest.mark.asyncio
+async def test_create_agent_with_context_reuses_agent(monkeypatch, counted_initialize):
+    leads = {
+        "5581999990001": {"id": "lead-1", "name": "Ana"},
+        "5581999990002": {"id": "lead-2", "name": "Bruno"},
+    }
+
+    async def fake_get_lead_by_phone(phone):
+        return leads[phone]
+
+    async def fake_get_conversation_messages(conversation_id, limit=200, since=None):
+        return [{"role": "user", "content": f"oi de {conversation_id}"}]
+
+    async def fake_get_conversation_summary(conversation_id):
+        return None
+
+    monkeypatch.setattr(supabase_client, "get_lead_by_phone", fake_get_lead_by_phone)
+    monkeypatch.setattr(supabase_client, "get_conversation_messages", fake_get_conversation_messages)
+    monkeypatch.setattr(supabase_client, "get_conversation_summary", fake_get_conversation_summary)
+
+    agent_a, context_a = await webhooks.create_agent_with_context("5581999990001", "conv-1")
+    agent_b, context_b = await webhooks.create_agent_with_context("5581999990002", "conv-2")
+
+    assert agent_a is agent_b
+    assert counted_initialize["initialize"] == 1
+
+    # Estado por conversa fica apenas no execution_context
+    assert context_a["lead_info"]["id"] == "lead-1"
+    assert context_b["lead_info"]["id"] == "lead-2"
+    assert context_a["conversation_history"] != context_b["conversation_history"]
@@ -0,0 +1,163 @@
+import os
+import io
+import wave
+import asyncio
+import base64
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.config import settings
+from app.services import audio_transcriber as at
+from app.utils.metrics import metrics
+
+
+def ogg_opus(seconds: float, pre_skip: int = 312) -> bytes:
+    """OGG/Opus mínimo: página com OpusHead + última página com o granule position"""
+    opus_head = b"OpusHead" + bytes([1, 1]) + pre_skip.to_bytes(2, "little") + (48000).to_bytes(4, "little") + b"\x00\x00\x00"
+    first_page = b"OggS\x00\x02" + (0).to_bytes(8, "little") + b"\x00" * 13 + opus_head
+    granule = int(seconds * 48000) + pre_skip
+    last_page = b"OggS\x00\x04" + granule.to_bytes(8, "little") + b"\x00" * 13 + b"\x00" * 64
+    return first_page + b"\x00" * 128 + last_page
+
+
+def piped_wav(seconds: float) -> bytes:
+    """WAV 16 kHz mono como o ffmpeg escreve em pipe (tamanho do chunk data não preenchido)"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\x00\x00" * int(seconds * 16000))
+    data = bytearray(buffer.getvalue())
+    data[40:44] = b"\xff\xff\xff\xff"
+    return bytes(data)
+
+
+class FakeTranscriptions:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, model, file, language):
+        self.calls.append((model, file, language))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return type("Transcription", (), {"text": "Quero o plano Timbu"})()
+
+
+class FakeProcess:
+    def __init__(self, stdout=b"", delay=0.0):
+        self.stdout_data = stdout
+        self.delay = delay
+        self.returncode = None
+        self.stdin_data = None
+        self.killed = False
+
+    async def communicate(self, data):
+        self.stdin_data = data
+        await asyncio.sleep(self.delay)
+        self.returncode = 0
+        return self.stdout_data, b""
+
+    def kill(self):
+        self.killed = True
+        self.returncode = -9
+
+    async def wait(self):
+        return self.returncode
+
+
+def make_transcriber(monkeypatch, concurrency=4, delay=0.0):
+    metrics.reset()
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    monkeypatch.setattr(settings, "audio_transcription_concurrency", concurrency)
+    transcriber = at.AudioTranscriber()
+    transcriber.openai_client = type("Client", (), {})()
+    transcriber.openai_client.audio = type("Audio", (), {})()
+    transcriber.openai_client.audio.transcriptions = FakeTranscriptions(delay)
+    return transcriber
+
+
+@pytest.mark.asyncio
+async def test_whatsapp_ogg_goes_straight_to_whisper(monkeypatch):
+    transcriber = make_transcriber(monkeypatch)
+
+    async def no_ffmpeg(*args, **kwargs):
+        raise AssertionError("OGG/Opus não deveria passar pelo ffmpeg")
+
+    monkeypatch.setattr(at.asyncio, "create_subprocess_exec", no_ffmpeg)
+    audio = ogg_opus(3.5)
+
+    result = await transcriber.transcribe_from_base64(
+        "data:audio/ogg; codecs=opus;base64," + base64.b64encode(audio).decode()
+    )
+
+    assert result["status"] == "success"
+    assert result["text"] == "Quero o plano Timbu"
+    assert result["duration"] == pytest.approx(3.5)
+    assert transcriber.openai_client.audio.transcriptions.calls == [("whisper-1", ("audio.ogg", audio), "pt")]
+    assert set(result["timings_ms"]) == {"queue", "whisper"}
+    assert metrics.get_counter("audio_transcriptions_direct") == 1
+    assert metrics.get_histogram("audio_transcription_ms:whisper").count == 1
+
+
+@pytest.mark.asyncio
+async def test_unsupported_format_is_piped_through_ffmpeg(monkeypatch):
+    transcriber = make_transcriber(monkeypatch)
+    process = FakeProcess(stdout=piped_wav(2.0))
+    commands = []
+
+    async def fake_exec(*args, **kwargs):
+        commands.append(args)
+        return process
+
+    monkeypatch.setattr(at.asyncio, "create_subprocess_exec", fake_exec)
+    amr = b"#!AMR\n" + b"\x3c" * 400
+
+    result = await transcriber.transcribe_bytes(amr)
+
+    assert result["status"] == "success"
+    assert result["duration"] == pytest.approx(2.0)
+    assert commands[0][0] == "ffmpeg" and "pipe:0" in commands[0] and commands[0][-1] == "pipe:1"
+    assert process.stdin_data == amr
+    model, (filename, payload), _ = transcriber.openai_client.audio.transcriptions.calls[0]
+    assert (filename, payload) == ("audio.wav", process.stdout_data)
+    assert metrics.get_counter("audio_transcriptions_transcoded") == 1
+    assert metrics.get_histogram("audio_transcription_ms:transcode").count == 1
+
+
+@pytest.mark.asyncio
+async def test_ffmpeg_timeout_kills_process(monkeypatch):
+    transcriber = make_transcriber(monkeypatch)
+    monkeypatch.setattr(settings, "audio_transcode_timeout", 0.05)
+    process = FakeProcess(delay=5)
+
+    async def fake_exec(*args, **kwargs):
+        return process
+
+    monkeypatch.setattr(at.asyncio, "create_subprocess_exec", fake_exec)
+
+    result = await transcriber.transcribe_bytes(b"#!AMR\n" + b"\x00" * 100)
+
+    assert result["status"] == "error"
+    assert "ffmpeg excedeu" in result["error"]
+    assert process.killed
+    assert transcriber.openai_client.audio.transcriptions.calls == []
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_limited(monkeypatch):
+    transcriber = make_transcriber(monkeypatch, concurrency=2, delay=0.05)
+
+    results = await asyncio.gather(*(transcriber.transcribe_bytes(ogg_opus(1.0)) for _ in range(5)))
+
+    assert all(r["status"] == "success" for r in results)
+    assert transcriber.openai_client.audio.transcriptions.max_in_flight == 2
+    assert metrics.get_histogram("audio_transcription_ms:queue").snapshot()["max"] >= 50
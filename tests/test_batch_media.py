@@ -0,0 +1,142 @@
+import os
+import time
+import asyncio
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.api import webhooks
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.integrations.supabase_client import supabase_client
+from app.services.message_buffer import MessageBuffer
+
+
+PHONE = "5581999990001"
+MEDIA_LATENCY = 0.2
+
+IMAGE = {"type": "image", "content": "data:image/jpeg;base64,IMG", "mimetype": "image/jpeg"}
+AUDIO = {"type": "audio", "content": "AUD", "mimetype": "audio/ogg"}
+
+
+def message(msg_id):
+    return {"key": {"id": msg_id, "remoteJid": f"{PHONE}@s.whatsapp.net"}}
+
+
+@pytest.mark.asyncio
+async def test_buffer_batch_keeps_every_media_item(monkeypatch):
+    calls = []
+
+    async def fake_process_message_with_agent(**kwargs):
+        calls.append(kwargs)
+
+    monkeypatch.setattr(webhooks, "process_message_with_agent", fake_process_message_with_agent)
+    buffer = MessageBuffer(timeout=0.05, quick_window=0.05, incomplete_window=0.05)
+
+    await buffer.add_message(PHONE, "", message("1"), media_data=IMAGE)
+    await buffer.add_message(PHONE, "", message("2"), media_data=AUDIO)
+    await buffer.add_message(PHONE, "segue o comprovante", message("3"))
+    await asyncio.sleep(0.4)
+    await buffer.shutdown()
+
+    assert len(calls) == 1
+    assert calls[0]["message_content"] == "segue o comprovante"
+    assert calls[0]["media_data"] == [IMAGE, AUDIO]
+    assert calls[0]["message_id"] == "3"
+
+
+@pytest.mark.asyncio
+async def test_text_only_batch_has_no_media(monkeypatch):
+    calls = []
+
+    async def fake_process_message_with_agent(**kwargs):
+        calls.append(kwargs)
+
+    monkeypatch.setattr(webhooks, "process_message_with_agent", fake_process_message_with_agent)
+    buffer = MessageBuffer(timeout=0.05, quick_window=0.05, incomplete_window=0.05)
+
+    await buffer.add_message(PHONE, "Oi", message("1"))
+    await buffer.add_message(PHONE, "Tudo bem?", message("2"))
+    await asyncio.sleep(0.4)
+    await buffer.shutdown()
+
+    assert calls[0]["media_data"] is None
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    agent = AgenticSDRStateless()
+    processed = []
+
+    async def fake_process_media(media_data):
+        processed.append(media_data["type"])
+        await asyncio.sleep(MEDIA_LATENCY)
+        if media_data["type"] == "audio":
+            return {"success": True, "type": "audio", "text": "segue o comprovante do plano"}
+        return {
+            "success": True,
+            "type": "image",
+            "analysis": {
+                "is_payment_receipt": True,
+                "payment_value": 50.0,
+                "payer_name": "Ana Souza",
+                "is_valid_nautico_payment": False,
+            },
+        }
+
+    async def fake_update_lead(lead_id, data):
+        return {"id": lead_id, **data}
+
+    monkeypatch.setattr(agent.multimodal, "process_media", fake_process_media)
+    monkeypatch.setattr(supabase_client, "update_lead", fake_update_lead)
+    agent.processed_media = processed
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_mixed_batch_injected_into_single_user_turn(agent):
+    lead_info = {"id": "lead-1", "name": "Ana", "phone_number": PHONE}
+
+    start = time.perf_counter()
+    history, lead = await agent._update_context("segue o comprovante", [], lead_info, [IMAGE, AUDIO])
+    elapsed = time.perf_counter() - start
+
+    # Uma mídia por vez levaria 2 * MEDIA_LATENCY
+    assert elapsed < 2 * MEDIA_LATENCY
+    assert sorted(agent.processed_media) == ["audio", "image"]
+
+    assert len(history) == 1
+    parts = history[0]["content"]
+    assert parts[0] == {"type": "text", "text": "segue o comprovante"}
+    media_parts = [p["media_data"] for p in parts if p["type"] == "media"]
+    assert media_parts == [
+        {"mime_type": "image/jpeg", "content": "IMG"},
+        {"mime_type": "audio/ogg", "content": "AUD"},
+    ]
+    assert any(p["type"] == "text" and p["text"].startswith("[Áudio]") for p in parts)
+    assert lead["payment_value"] == 50.0
+    assert lead["payer_name"] == "Ana Souza"
+
+
+@pytest.mark.asyncio
+async def test_single_media_dict_still_supported(agent):
+    history, _ = await agent._update_context("[voice]", [], {"id": "lead-1"}, AUDIO)
+
+    parts = history[0]["content"]
+    assert agent.processed_media == ["audio"]
+    assert [p["type"] for p in parts] == ["text", "media", "text"]
+
+
+@pytest.mark.asyncio
+async def test_failed_download_does_not_drop_rest_of_batch(agent):
+    failed = {"type": "error", "content": "Não consegui baixar a imagem que você enviou."}
+
+    history, _ = await agent._update_context("segue", [], {"id": "lead-1"}, [failed, AUDIO])
+
+    parts = history[0]["content"]
+    assert agent.processed_media == ["audio"]
+    assert any(p["type"] == "text" and p["text"].startswith("[Mídia não recebida]") for p in parts)
+
+    with pytest.raises(ValueError):
+        await agent._update_context("", [], {"id": "lead-1"}, [failed])
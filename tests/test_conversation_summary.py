@@ -0,0 +1,155 @@
+import os
+import asyncio
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.config import settings
+from app.core.history_builder import build_history
+from app.services.conversation_summarizer import ConversationSummarizer
+from app.services.followup_worker import FollowUpWorker
+from app.utils.metrics import metrics
+
+
+def make_messages(count, start=0):
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"mensagem {i}",
+            "created_at": f"2026-10-18T10:{i:02d}:00",
+        }
+        for i in range(start, start + count)
+    ]
+
+
+class FakeDB:
+    def __init__(self, messages, summary=None, until=None):
+        self.messages = messages
+        self.row = {"history_summary": summary, "history_summary_until": until}
+        self.updates = []
+
+    async def get_conversation_summary(self, conversation_id):
+        return dict(self.row)
+
+    async def get_conversation_messages(self, conversation_id, limit=200, since=None, ascending=False):
+        messages = [m for m in self.messages if not since or m["created_at"] > since]
+        return messages[:limit] if ascending else messages[-limit:]
+
+    async def update_conversation(self, conversation_id, update_data):
+        self.updates.append(update_data)
+        self.row.update(update_data)
+        return update_data
+
+    async def get_lead_by_id(self, lead_id):
+        return {"id": lead_id, "name": "Ana", "phone_number": "5581999990001"}
+
+    async def get_conversation_by_phone(self, phone):
+        return {"id": "conv-1"}
+
+
+class FakeModelManager:
+    def __init__(self, delay=0.0):
+        self.prompts = []
+        self.delay = delay
+
+    async def get_response(self, messages, system_prompt=None, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        await asyncio.sleep(self.delay)
+        return f"Resumo {len(self.prompts)}: lead quer o plano Timbu."
+
+
+@pytest.fixture
+def thresholds(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(settings, "enable_conversation_summary", True)
+    monkeypatch.setattr(settings, "conversation_summary_threshold", 6)
+    monkeypatch.setattr(settings, "conversation_summary_keep_recent", 4)
+
+
+@pytest.mark.asyncio
+async def test_summary_folds_only_older_part_of_tail(thresholds):
+    db = FakeDB(make_messages(12, start=10), summary="Lead se chama Ana.", until="2026-10-18T10:09:00")
+    summarizer = ConversationSummarizer(model_manager=FakeModelManager())
+    summarizer.db = db
+
+    assert summarizer.schedule("conv-1", unsummarized_count=9) is None
+    task = summarizer.schedule("conv-1", unsummarized_count=12)
+    await task
+
+    prompt = summarizer.model_manager.prompts[0]
+    assert "Lead se chama Ana." in prompt
+    assert "mensagem 17" in prompt and "mensagem 18" not in prompt
+    assert db.updates == [{
+        "history_summary": "Resumo 1: lead quer o plano Timbu.",
+        "history_summary_until": "2026-10-18T10:17:00",
+    }]
+    assert metrics.get_counter("conversation_summary_updates") == 1
+
+
+@pytest.mark.asyncio
+async def test_one_update_per_conversation_at_a_time(thresholds):
+    db = FakeDB(make_messages(12))
+    summarizer = ConversationSummarizer(model_manager=FakeModelManager(delay=0.05))
+    summarizer.db = db
+
+    first = summarizer.schedule("conv-1", 12)
+    assert summarizer.schedule("conv-1", 13) is None
+    await first
+
+    # Cauda restante (4 recentes) fica abaixo do limite: nada a resumir
+    assert await summarizer.update("conv-1") is False
+    assert len(db.updates) == 1
+
+
+@pytest.mark.asyncio
+async def test_long_backlog_is_folded_oldest_first_in_chunks(thresholds, monkeypatch):
+    monkeypatch.setattr(settings, "history_fetch_limit", 20)
+    db = FakeDB(make_messages(50))
+    summarizer = ConversationSummarizer(model_manager=FakeModelManager())
+    summarizer.db = db
+
+    assert await summarizer.update("conv-1") is True
+
+    prompts = summarizer.model_manager.prompts
+    # Blocos de 20 (menos as 4 recentes de cada bloco), do mais antigo ao mais novo
+    assert "mensagem 0\n" in prompts[0] and "mensagem 15" in prompts[0] and "mensagem 16" not in prompts[0]
+    assert "Resumo 1" in prompts[1] and "mensagem 16" in prompts[1]
+    assert [u["history_summary_until"] for u in db.updates] == [
+        "2026-10-18T10:15:00", "2026-10-18T10:31:00", "2026-10-18T10:45:00"
+    ]
+    # Nenhuma mensagem pulada: sobram exatamente as keep_recent mais novas
+    remaining = await db.get_conversation_messages("conv-1", since=db.row["history_summary_until"])
+    assert [m["content"] for m in remaining] == [f"mensagem {i}" for i in range(46, 50)]
+
+
+def test_tail_history_is_prefixed_with_summary():
+    tail = make_messages(3)
+
+    history, _ = build_history(tail, budget=100_000, summary="Lead quer o plano Timbu.", history_is_tail=True)
+
+    assert "Lead quer o plano Timbu." in history[0]["content"]
+    assert history[1:] == tail
+
+
+@pytest.mark.asyncio
+async def test_followup_uses_summary_and_recent_tail(thresholds):
+    worker = FollowUpWorker()
+    worker.db = FakeDB(make_messages(40), summary="Lead pediu o boleto do plano Timbu.")
+    captured = {}
+
+    class FakeAgent:
+        async def _generate_response(self, message, **kwargs):
+            captured["prompt"] = message
+            return "Oi, Ana! Conseguiu ver o boleto?"
+
+    worker.agent = FakeAgent()
+    await worker._generate_intelligent_followup_message(
+        {"lead_id": "lead-1", "followup_type": "IMMEDIATE_REENGAGEMENT"}
+    )
+
+    prompt = captured["prompt"]
+    assert "Lead pediu o boleto do plano Timbu." in prompt
+    assert "mensagem 39" in prompt and "mensagem 36" in prompt
+    assert "mensagem 35" not in prompt
@@ -122,6 +122,9 @@ async def test_schedule_followup_dedupe(monkeypatch):
         def __init__(self, client):
             self.client = client
 
+        async def execute_query(self, query):
+            return query.execute()
+
         async def create_follow_up(self, data):
             return {"id": "fu-new"}
 
@@ -0,0 +1,73 @@
+import os
+import asyncio
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.core import model_manager as mm
+from app.core.model_manager import Gemini
+from app.utils.metrics import metrics
+from tests.test_prompt_cache_layout import FakeGenAI
+
+
+HISTORY = [{"role": "user", "content": "Oi"}]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeGenAI()
+    monkeypatch.setattr(mm, "genai", fake, raising=False)
+    monkeypatch.setattr(mm, "GEMINI_AVAILABLE", True)
+    # Sem cache explícito: exercita o caminho de system_instruction
+    monkeypatch.setattr(mm.settings, "enable_prompt_cache", False)
+    metrics.reset()
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_generative_model_built_once_per_system_prompt(fake):
+    gemini = Gemini(id="gemini-2.5-flash", api_key="test")
+
+    for minute in range(5):
+        await gemini.achat(HISTORY, system_prompt="persona", context_suffix=f"<agora>{minute}</agora>")
+    await gemini.achat(HISTORY, system_prompt="outra persona")
+
+    assert fake.models_created == 2
+    assert metrics.get_counter("gemini_models_created") == 2
+
+
+@pytest.mark.asyncio
+async def test_model_cache_is_lru_bounded(fake, monkeypatch):
+    monkeypatch.setattr(mm.settings, "gemini_model_cache_size", 2)
+    gemini = Gemini(id="gemini-2.5-flash", api_key="test")
+
+    for prompt in ("a", "b", "a", "c", "a"):
+        await gemini.achat(HISTORY, system_prompt=prompt)
+
+    # "b" foi o menos usado recentemente quando "c" entrou
+    assert len(gemini._models) == 2
+    assert fake.models_created == 3
+
+
+@pytest.mark.asyncio
+async def test_per_model_concurrency_limit_and_histograms(fake, monkeypatch):
+    monkeypatch.setattr(mm.settings, "llm_max_concurrency_per_model", 2)
+    fake.latency = 0.1
+    gemini = Gemini(id="gemini-2.5-flash", api_key="test")
+    peak = {"max": 0}
+
+    async def sample():
+        while True:
+            peak["max"] = max(peak["max"], gemini.in_flight)
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.create_task(sample())
+    await asyncio.gather(*(gemini.achat(HISTORY, system_prompt="persona") for _ in range(6)))
+    sampler.cancel()
+
+    assert peak["max"] == 2
+    assert metrics.get_histogram("llm_request_ms:gemini-2.5-flash").count == 6
+    waits = metrics.get_histogram("llm_concurrency_wait_ms:gemini-2.5-flash")
+    assert waits.count == 6 and waits.snapshot()["max"] >= 100
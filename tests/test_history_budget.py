@@ -0,0 +1,96 @@
+import os
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.config import settings
+from app.core.history_builder import (
+    MEDIA_PART_TOKENS,
+    build_history,
+    count_message_tokens,
+)
+from app.utils.metrics import metrics
+
+
+def conversation(count, size=400):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i:04d} " + "x" * size}
+        for i in range(count)
+    ]
+
+
+def test_keeps_newest_messages_within_budget():
+    metrics.reset()
+    messages = conversation(50)
+    per_message = count_message_tokens(messages[0], "gemini-2.5-flash")
+
+    history, tokens = build_history(messages, per_message * 10, model_id="gemini-2.5-flash")
+
+    assert history == messages[-10:]
+    assert tokens <= per_message * 10
+    assert metrics.get_counter("history_messages_dropped") == 40
+    assert metrics.get_histogram("history_prompt_tokens").count == 1
+
+
+def test_latest_message_always_kept_even_over_budget():
+    messages = conversation(3, size=4000)
+
+    history, _ = build_history(messages, budget=10)
+
+    assert history == messages[-1:]
+
+
+def test_summary_opens_history_only_when_turns_dropped():
+    messages = conversation(20)
+
+    history, _ = build_history(messages, budget=1_000_000, summary="Lead quer o plano Timbu.")
+    assert history == messages
+
+    per_message = count_message_tokens(messages[0])
+    history, _ = build_history(messages, per_message * 4, summary="Lead quer o plano Timbu.")
+    assert "Lead quer o plano Timbu." in history[0]["content"]
+    assert history[1:] == messages[-4:]
+
+
+def test_media_parts_have_fixed_cost():
+    message = {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": "segue o comprovante"},
+            {"type": "media", "media_data": {"mime_type": "image/jpeg", "content": "A" * 500_000}},
+        ]
+    }
+
+    assert count_message_tokens(message) < MEDIA_PART_TOKENS + 50
+
+
+@pytest.mark.asyncio
+async def test_truncation_is_by_tokens_not_message_count(monkeypatch):
+    """Regressão: antes eram as últimas 200 mensagens, independente do tamanho"""
+    monkeypatch.setattr(settings, "history_token_budget", 2000)
+    agent = AgenticSDRStateless()
+    sent = {}
+
+    async def fake_get_response(messages, system_prompt, **kwargs):
+        sent["messages"] = messages
+        return "Oi!"
+
+    agent.model_manager.get_response = fake_get_response
+    long_history = conversation(120, size=2000)
+    await agent._generate_response(
+        "oi", {}, {"name": "Ana"}, long_history,
+        {"history_summary": "Lead já recebeu a tabela de planos."}
+    )
+
+    messages = sent["messages"]
+    assert len(messages) < 20
+    assert "Lead já recebeu a tabela de planos." in messages[0]["content"]
+    assert messages[-1]["content"] == long_history[-1]["content"]
+
+    # Muitas mensagens curtas cabem inteiras no orçamento (sem corte fixo por contagem)
+    short_history = [{"role": "user", "content": "ok"} for _ in range(250)]
+    await agent._generate_response("ok", {}, {"name": "Ana"}, short_history, {})
+    assert len(sent["messages"]) >= 250
@@ -0,0 +1,296 @@
+import os
+import time
+import asyncio
+import pytest
+from fastapi import BackgroundTasks
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.api import webhooks
+from app.config import settings
+from app.services.inbound_queue import InboundQueue, set_inbound_queue
+from app.utils.metrics import metrics
+
+
+class FakeStreamRedis:
+    """Subconjunto de comandos de Redis Streams usado pela InboundQueue"""
+
+    def __init__(self):
+        self.streams = {}
+        self.groups = {}
+        self.seq = 0
+
+    async def xadd(self, name, fields, maxlen=None, approximate=True):
+        self.seq += 1
+        entry_id = f"{int(time.time() * 1000)}-{self.seq}"
+        self.streams.setdefault(name, []).append((entry_id, dict(fields)))
+        return entry_id
+
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        if (name, groupname) in self.groups:
+            raise Exception("BUSYGROUP Consumer Group name already exists")
+        self.streams.setdefault(name, [])
+        self.groups[(name, groupname)] = {"delivered": 0, "pending": {}}
+
+    async def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        deadline = time.time() + (block or 0) / 1000
+        while True:
+            for name in streams:
+                group = self.groups[(name, groupname)]
+                entries = self.streams[name]
+                if group["delivered"] < len(entries):
+                    entry = entries[group["delivered"]]
+                    group["delivered"] += 1
+                    group["pending"][entry[0]] = {
+                        "consumer": consumername, "delivered_at": time.time(), "times": 1
+                    }
+                    return [[name, [entry]]]
+            if time.time() >= deadline:
+                return []
+            await asyncio.sleep(0.01)
+
+    async def xack(self, name, groupname, *ids):
+        pending = self.groups[(name, groupname)]["pending"]
+        return sum(pending.pop(entry_id, None) is not None for entry_id in ids)
+
+    async def xpending_range(self, name, groupname, min, max, count, consumername=None, idle=None):
+        now = time.time()
+        return [
+            {
+                "message_id": entry_id, "consumer": info["consumer"],
+                "time_since_delivered": int((now - info["delivered_at"]) * 1000),
+                "times_delivered": info["times"],
+            }
+            for entry_id, info in self.groups[(name, groupname)]["pending"].items()
+            if (now - info["delivered_at"]) * 1000 >= (idle or 0)
+        ][:count]
+
+    async def xclaim(self, name, groupname, consumername, min_idle_time, message_ids, justid=False):
+        claimed = []
+        pending = self.groups[(name, groupname)]["pending"]
+        for entry_id in message_ids:
+            info = pending.get(entry_id)
+            if not info or (time.time() - info["delivered_at"]) * 1000 < min_idle_time:
+                continue
+            if justid:
+                # JUSTID: só renova a posse, sem contar nova entrega
+                info.update(consumer=consumername, delivered_at=time.time())
+                claimed.append(entry_id)
+                continue
+            info.update(consumer=consumername, delivered_at=time.time(), times=info["times"] + 1)
+            claimed.extend(e for e in self.streams[name] if e[0] == entry_id)
+        return claimed
+
+    async def xrange(self, name, min="-", max="+"):
+        return [e for e in self.streams.get(name, []) if min <= e[0] <= max]
+
+    async def xlen(self, name):
+        return len(self.streams.get(name, []))
+
+    async def xinfo_groups(self, name):
+        return [
+            {
+                "name": group_name, "pending": len(group["pending"]),
+                "lag": len(self.streams[name]) - group["delivered"],
+            }
+            for (stream, group_name), group in self.groups.items() if stream == name
+        ]
+
+
+def make_queue(redis, handler, **kwargs):
+    options = {"concurrency": 2, "claim_idle_ms": 100, "block_ms": 20, "claim_interval": 0.05}
+    options.update(kwargs)
+    return InboundQueue(handler=handler, redis_connection=redis, **options)
+
+
+@pytest.mark.asyncio
+async def test_webhook_only_enqueues_when_queue_enabled(monkeypatch):
+    redis = FakeStreamRedis()
+    queue = make_queue(redis, handler=None)
+    set_inbound_queue(queue)
+    monkeypatch.setattr(settings, "inbound_queue_enabled", True)
+    try:
+        background_tasks = BackgroundTasks()
+        await webhooks.dispatch_new_message(background_tasks, {"key": {"id": "m1"}})
+    finally:
+        set_inbound_queue(None)
+
+    assert background_tasks.tasks == []
+    assert await redis.xlen(queue.stream) == 1
+
+
+@pytest.mark.asyncio
+async def test_consumer_pool_respects_concurrency_and_acks():
+    metrics.reset()
+    redis = FakeStreamRedis()
+    active = {"now": 0, "max": 0}
+    handled = []
+
+    async def handler(payload, received_at=None, redelivered=False):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.1)
+        handled.append(payload["id"])
+        active["now"] -= 1
+
+    queue = make_queue(redis, handler)
+    for i in range(5):
+        await queue.enqueue({"id": i})
+    await queue.start()
+    await asyncio.sleep(0.6)
+    await queue.stop()
+
+    assert sorted(handled) == [0, 1, 2, 3, 4]
+    assert active["max"] == 2
+    assert redis.groups[(queue.stream, queue.group)]["pending"] == {}
+    assert metrics.get_counter("inbound_queue_acked") == 5
+    assert metrics.get_histogram("inbound_queue_wait_ms").count == 5
+
+
+@pytest.mark.asyncio
+async def test_entry_redelivered_after_consumer_crash():
+    redis = FakeStreamRedis()
+    started = asyncio.Event()
+
+    async def hanging_handler(payload, received_at=None, redelivered=False):
+        started.set()
+        await asyncio.sleep(60)  # worker cai no meio da chamada ao LLM
+
+    crashed = make_queue(redis, hanging_handler, concurrency=1)
+    await crashed.enqueue({"id": "m1"})
+    await crashed.start()
+    await asyncio.wait_for(started.wait(), 1)
+    await crashed.stop()
+    assert len(redis.groups[(crashed.stream, crashed.group)]["pending"]) == 1
+
+    handled = []
+
+    async def handler(payload, received_at=None, redelivered=False):
+        handled.append((payload["id"], redelivered))
+
+    survivor = make_queue(redis, handler, concurrency=1)
+    await survivor.start()
+    await asyncio.sleep(0.4)
+    await survivor.stop()
+
+    assert handled == [("m1", True)]
+    assert redis.groups[(survivor.stream, survivor.group)]["pending"] == {}
+
+
+@pytest.mark.asyncio
+async def test_slow_entry_is_not_reclaimed_while_being_handled():
+    redis = FakeStreamRedis()
+    deliveries = []
+
+    async def slow_handler(payload, received_at=None, redelivered=False):
+        deliveries.append(redelivered)
+        await asyncio.sleep(0.5)  # buffer + LLM + OCR bem acima de claim_idle_ms
+
+    queue = make_queue(redis, slow_handler, concurrency=2, claim_idle_ms=150)
+    await queue.enqueue({"id": "m1"})
+    await queue.start()
+    await asyncio.sleep(0.8)
+    await queue.stop()
+
+    assert deliveries == [False]
+    assert redis.groups[(queue.stream, queue.group)]["pending"] == {}
+
+
+@pytest.mark.asyncio
+async def test_claim_is_capped_by_free_consumers():
+    redis = FakeStreamRedis()
+    queue = make_queue(redis, handler=None, concurrency=2)
+    await queue._ensure_group()
+    for i in range(5):
+        await queue.enqueue({"id": i})
+        await redis.xreadgroup(queue.group, "c1", {queue.stream: ">"}, count=1)
+    await asyncio.sleep(0.15)
+
+    assert await queue.claim_stale() == 2
+    assert await queue.claim_stale() == 0
+    assert queue._reclaimed.qsize() == 2
+
+
+@pytest.mark.asyncio
+async def test_poison_entry_moved_to_dead_letter():
+    redis = FakeStreamRedis()
+    queue = make_queue(redis, handler=None, max_deliveries=2)
+    await queue._ensure_group()
+    await queue.enqueue({"id": "poison"})
+    await redis.xreadgroup(queue.group, "c1", {queue.stream: ">"}, count=1)
+
+    await asyncio.sleep(0.15)
+    assert await queue.claim_stale() == 1
+    await asyncio.sleep(0.15)
+    assert await queue.claim_stale() == 0
+
+    assert await redis.xlen(queue.dead_letter_stream) == 1
+    assert redis.groups[(queue.stream, queue.group)]["pending"] == {}
+
+
+@pytest.mark.asyncio
+async def test_depth_and_lag_exposed_as_gauges():
+    metrics.reset()
+    redis = FakeStreamRedis()
+    queue = make_queue(redis, handler=None)
+    await queue._ensure_group()
+    for i in range(3):
+        await queue.enqueue({"id": i})
+    await redis.xreadgroup(queue.group, "c1", {queue.stream: ">"}, count=1)
+
+    stats = await queue.refresh_stats()
+
+    assert stats == {"length": 3, "pending": 1, "lag": 2}
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges["inbound_queue_lag"] == 2
+    assert gauges["inbound_queue_pending"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_entry_stays_pending_until_dead_lettered():
+    metrics.reset()
+    redis = FakeStreamRedis()
+    deliveries = []
+
+    async def failing_handler(payload, received_at=None, redelivered=False):
+        deliveries.append(redelivered)
+        raise RuntimeError("Supabase indisponível")
+
+    queue = make_queue(redis, failing_handler, concurrency=1, max_deliveries=2)
+    await queue.enqueue({"id": "m1"})
+    await queue.start()
+    await asyncio.sleep(0.6)
+    await queue.stop()
+
+    assert deliveries == [False, True]
+    assert metrics.get_counter("inbound_queue_failures") == 2
+    assert await redis.xlen(queue.dead_letter_stream) == 1
+    assert redis.groups[(queue.stream, queue.group)]["pending"] == {}
+
+
+@pytest.mark.asyncio
+async def test_queue_handler_propagates_pipeline_errors(monkeypatch):
+    async def broken_process_message_with_agent(**kwargs):
+        raise RuntimeError("Supabase indisponível")
+
+    async def allow(*args, **kwargs):
+        return True
+
+    async def not_duplicate(message_id):
+        return False
+
+    monkeypatch.setattr(webhooks, "process_message_with_agent", broken_process_message_with_agent)
+    monkeypatch.setattr(webhooks.redis_client, "check_rate_limit", allow)
+    monkeypatch.setattr(webhooks.get_message_deduplicator(), "is_duplicate", not_duplicate)
+    monkeypatch.setattr(settings, "enable_message_buffer", False)
+    message = {
+        "key": {"id": "WAMID-9", "remoteJid": "5581999990001@s.whatsapp.net", "fromMe": False},
+        "message": {"conversation": "Quero ser sócio"},
+    }
+
+    # BackgroundTasks: só registra
+    await webhooks.process_new_message(message)
+    with pytest.raises(RuntimeError):
+        await InboundQueue(redis_connection=FakeStreamRedis())._get_handler()(message)
@@ -0,0 +1,52 @@
+import os
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.services.crm_service_100_real import CRMServiceReal
+from app.utils.metrics import metrics
+
+
+@pytest_asyncio.fixture
+async def kommo_server():
+    async def get_lead(request):
+        lead_id = int(request.match_info["lead_id"])
+        return web.json_response({"id": lead_id, "status_id": 89709590})
+
+    app = web.Application()
+    app.router.add_get("/api/v4/leads/{lead_id}", get_lead)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_kommo_calls_reuse_one_session(kommo_server):
+    metrics.reset()
+    crm = CRMServiceReal()
+    crm.base_url = kommo_server
+    crm.is_initialized = True
+
+    for lead_id in ("101", "102", "103"):
+        lead = await crm.get_lead_by_id(lead_id)
+        assert lead["id"] == int(lead_id)
+
+    session = await crm._get_session()
+    assert not session.closed
+
+    assert metrics.get_counter("kommo_connections_created") == 1
+    assert metrics.get_counter("kommo_connections_reused") == 2
+    snapshot = metrics.snapshot()
+    assert snapshot["gauges"]["kommo_connection_reuse_ratio"] == pytest.approx(0.667)
+    assert snapshot["histograms"]["kommo_request_ms:GET /api/v4/leads/{id}"]["count"] == 3
+
+    await crm.close()
+    assert session.closed
@@ -0,0 +1,102 @@
+import os
+import types
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.api import webhooks
+from app.api.kommo_webhook import process_lead_status_change
+from app.agents.agentic_sdr_stateless import set_agentic_sdr
+from app.config import settings
+from app.exceptions import HandoffActiveException
+from app.integrations.redis_client import redis_client
+from app.integrations.supabase_client import supabase_client
+from app.services.kommo_queue_service import kommo_queue_service
+
+
+PHONE = "5581999990001"
+KOMMO_ID = "777"
+ACTIVE_STAGE = 89709590
+
+
+@pytest.fixture
+def kommo_env(monkeypatch):
+    store = {}
+    kommo = {"calls": 0, "status_id": ACTIVE_STAGE}
+
+    async def fake_get(key):
+        return store.get(key)
+
+    async def fake_set(key, value, ttl=None):
+        store[key] = value
+        return True
+
+    async def fake_delete(key):
+        return store.pop(key, None) is not None
+
+    async def fake_pause(phone):
+        return True
+
+    monkeypatch.setattr(redis_client, "get", fake_get)
+    monkeypatch.setattr(redis_client, "set", fake_set)
+    monkeypatch.setattr(redis_client, "delete", fake_delete)
+    monkeypatch.setattr(redis_client, "set_human_handoff_pause", fake_pause)
+    monkeypatch.setattr(redis_client, "clear_human_handoff_pause", fake_pause)
+
+    async def fake_get_lead_by_id(lead_id):
+        kommo["calls"] += 1
+        return {"id": int(lead_id), "status_id": kommo["status_id"]}
+
+    monkeypatch.setattr(kommo_queue_service.crm_service, "get_lead_by_id", fake_get_lead_by_id)
+
+    async def fake_get_lead_by_phone(phone):
+        return {"id": "lead-1", "name": "Ana", "kommo_lead_id": KOMMO_ID, "current_stage_id": ACTIVE_STAGE}
+
+    async def fake_get_conversation_messages(conversation_id, limit=200, since=None):
+        return []
+
+    async def fake_get_conversation_summary(conversation_id):
+        return None
+
+    async def fake_update_lead(lead_id, data):
+        return {"id": lead_id, **data}
+
+    monkeypatch.setattr(supabase_client, "get_lead_by_phone", fake_get_lead_by_phone)
+    monkeypatch.setattr(supabase_client, "get_conversation_messages", fake_get_conversation_messages)
+    monkeypatch.setattr(supabase_client, "get_conversation_summary", fake_get_conversation_summary)
+    monkeypatch.setattr(supabase_client, "update_lead", fake_update_lead)
+    monkeypatch.setattr(settings, "enable_kommo_crm", True)
+
+    set_agentic_sdr(types.SimpleNamespace(is_initialized=True))
+    yield kommo
+    set_agentic_sdr(None)
+
+
+@pytest.mark.asyncio
+async def test_repeated_messages_cost_one_kommo_call(kommo_env):
+    for _ in range(3):
+        await webhooks.create_agent_with_context(PHONE, "conv-1")
+
+    assert kommo_env["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_kommo_webhook_invalidates_status_cache(kommo_env):
+    await webhooks.create_agent_with_context(PHONE, "conv-1")
+    assert kommo_env["calls"] == 1
+
+    # Lead movido para atendimento humano no Kommo
+    kommo_env["status_id"] = settings.kommo_human_handoff_stage_id
+    await process_lead_status_change({
+        "lead": {
+            "id": KOMMO_ID,
+            "status_id": settings.kommo_human_handoff_stage_id,
+            "custom_fields": [{"name": "Telefone", "values": [{"value": PHONE}]}],
+        }
+    })
+
+    with pytest.raises(HandoffActiveException):
+        await webhooks.create_agent_with_context(PHONE, "conv-1")
+    assert kommo_env["calls"] == 2
@@ -0,0 +1,173 @@
+import os
+import io
+import time
+import asyncio
+import base64
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.core import media_cache as mc
+from app.config import settings
+from app.core.media_cache import MediaAnalysisCache, content_digest, set_media_cache
+from app.core.media_pool import set_media_pool
+from app.core.multimodal_processor import MultimodalProcessor
+from app.utils.metrics import metrics
+
+
+RECEIPT = b"\xff\xd8\xff" + b"comprovante pix" * 100
+ANALYSIS = {
+    "success": True,
+    "type": "image",
+    "text": "Comprovante PIX R$ 29,90",
+    "metadata": {"width": 10, "height": 10, "format": "JPEG"},
+    "analysis": {"is_payment_receipt": True, "payment_value": 29.9},
+}
+
+
+@pytest.fixture
+def processor(monkeypatch, tmp_path):
+    metrics.reset()
+    monkeypatch.setattr(mc.redis_client, "redis_client", None)
+    set_media_cache(MediaAnalysisCache(directory=str(tmp_path)))
+    processor = MultimodalProcessor()
+    processor.enabled = True
+    processor.dependencies = {"ocr": True, "audio": True, "pdf": True}
+    processor.ocr_runs = 0
+
+    async def fake_process_image(content):
+        processor.ocr_runs += 1
+        return dict(ANALYSIS)
+
+    monkeypatch.setattr(processor, "process_image", fake_process_image)
+    yield processor
+    set_media_cache(None)
+
+
+@pytest.mark.asyncio
+async def test_resent_media_skips_processing(processor, tmp_path):
+    encoded = base64.b64encode(RECEIPT).decode()
+
+    first = await processor.process_media({"type": "image", "content": encoded})
+    # Reenvio chega como data URL: mesmos bytes, mesma chave
+    second = await processor.process_media({"type": "image", "content": f"data:image/jpeg;base64,{encoded}"})
+
+    assert first == second == ANALYSIS
+    assert processor.ocr_runs == 1
+    assert metrics.get_counter("media_cache_hits") == 1
+    assert metrics.get_counter("media_cache_misses") == 1
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    await processor.process_media({"type": "image", "content": base64.b64encode(RECEIPT + b"x").decode()})
+    assert processor.ocr_runs == 2
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached(processor, monkeypatch):
+    async def failing_process_image(content):
+        processor.ocr_runs += 1
+        return {"success": False, "message": "imagem ilegível"}
+
+    monkeypatch.setattr(processor, "process_image", failing_process_image)
+    media = {"type": "image", "content": base64.b64encode(RECEIPT).decode()}
+
+    await processor.process_media(media)
+    await processor.process_media(media)
+
+    assert processor.ocr_runs == 2
+
+
+@pytest.mark.asyncio
+async def test_toggling_ocr_preprocessing_misses_the_cache(processor, monkeypatch):
+    media = {"type": "image", "content": base64.b64encode(RECEIPT).decode()}
+
+    monkeypatch.setattr(settings, "enable_ocr_preprocessing", False)
+    await processor.process_media(media)
+    monkeypatch.setattr(settings, "enable_ocr_preprocessing", True)
+    await processor.process_media(media)
+    await processor.process_media(media)
+
+    assert processor.ocr_runs == 2
+
+
+class TimingOutPool:
+    def __init__(self):
+        self.runs = 0
+
+    async def run(self, fn, *args, timeout=None):
+        self.runs += 1
+        raise asyncio.TimeoutError()
+
+
+@pytest.mark.asyncio
+async def test_failed_ocr_is_not_cached(monkeypatch, tmp_path):
+    PIL = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr(mc.redis_client, "redis_client", None)
+    set_media_cache(MediaAnalysisCache(directory=str(tmp_path)))
+    pool = TimingOutPool()
+    set_media_pool(pool)
+    processor = MultimodalProcessor()
+    processor.enabled = True
+    processor.dependencies = {"ocr": True, "audio": True, "pdf": True}
+    buffer = io.BytesIO()
+    PIL.new("RGB", (40, 20), "white").save(buffer, format="PNG")
+    media = {"type": "image", "content": base64.b64encode(buffer.getvalue()).decode()}
+
+    try:
+        first = await processor.process_media(media)
+        await processor.process_media(media)
+    finally:
+        set_media_pool(None)
+        set_media_cache(None)
+
+    assert first["success"] and first["ocr_failed"] and first["text"] == ""
+    assert pool.runs == 2
+    assert list(tmp_path.glob("*.json")) == []
+
+
+@pytest.mark.asyncio
+async def test_redis_used_when_available(processor, monkeypatch, tmp_path):
+    store = {}
+
+    async def fake_get(key):
+        return store.get(key)
+
+    async def fake_set(key, value, ttl=None):
+        store[key] = value
+        return True
+
+    monkeypatch.setattr(mc.redis_client, "redis_client", object())
+    monkeypatch.setattr(mc.redis_client, "get", fake_get)
+    monkeypatch.setattr(mc.redis_client, "set", fake_set)
+    media = {"type": "image", "content": base64.b64encode(RECEIPT).decode()}
+
+    await processor.process_media(media)
+    await processor.process_media(media)
+
+    assert processor.ocr_runs == 1
+    variant = f"pre{int(settings.enable_ocr_preprocessing)}-w{settings.ocr_target_width}-psm{settings.ocr_tesseract_psm}"
+    assert list(store) == [f"media:analysis:v{mc.MEDIA_CACHE_VERSION}:image:{variant}:{content_digest(RECEIPT)}"]
+    assert list(tmp_path.glob("*.json")) == []
+
+
+@pytest.mark.asyncio
+async def test_disk_fallback_respects_ttl_and_size(monkeypatch, tmp_path):
+    metrics.reset()
+    monkeypatch.setattr(mc.redis_client, "redis_client", None)
+    cache = MediaAnalysisCache(directory=str(tmp_path), ttl=60, disk_max_bytes=600)
+
+    for i in range(3):
+        await cache.put("image", f"digest{i}", {**ANALYSIS, "text": "x" * 200})
+        path = cache._path(cache._key("image", f"digest{i}"))
+        os.utime(path, (time.time() - 30 + i, time.time() - 30 + i))
+    await cache.put("image", "digest3", {**ANALYSIS, "text": "x" * 200})
+
+    assert await cache.get("image", "digest0") is None
+    assert await cache.get("image", "digest3") is not None
+    assert metrics.get_counter("media_cache_disk_evictions") >= 1
+
+    path = cache._path(cache._key("image", "digest3"))
+    os.utime(path, (time.time() - 120, time.time() - 120))
+    assert await cache.get("image", "digest3") is None
@@ -0,0 +1,120 @@
+import os
+import json
+import base64
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.config import settings
+from app.core import media_history
+from app.core.media_history import compact_media, content_text, describe_image, media_fingerprint
+from app.core.model_manager import OpenAI
+from app.utils.metrics import metrics
+
+
+RECEIPT = base64.b64encode(b"\xff\xd8\xff" + b"comprovante" * 2000).decode()
+
+
+def media_turn(text, content=RECEIPT, extracted=None):
+    part = {
+        "type": "media",
+        "media_data": {"mime_type": "image/jpeg", "content": content},
+        "sha256": media_fingerprint(content),
+    }
+    if extracted:
+        part["extracted_text"] = extracted
+    return {"role": "user", "content": [{"type": "text", "text": text}, part]}
+
+
+def has_media(messages):
+    return any(
+        isinstance(m["content"], list) and any(p.get("type") == "media" for p in m["content"])
+        for m in messages
+    )
+
+
+def test_only_current_turn_keeps_inline_media():
+    metrics.reset()
+    history = [
+        media_turn("segue o comprovante", extracted="PIX R$ 29,90 para Clube Náutico"),
+        {"role": "assistant", "content": "Recebi, obrigado!"},
+        media_turn("e esse outro?", content=RECEIPT[::-1]),
+    ]
+
+    compacted = compact_media(history)
+
+    assert compacted[2] is history[2]
+    reference = compacted[0]["content"][1]["text"]
+    assert "PIX R$ 29,90 para Clube Náutico" in reference
+    assert media_fingerprint(RECEIPT) in reference
+    assert RECEIPT not in json.dumps(compacted[:2])
+    assert metrics.get_counter("media_parts_compacted") == 1
+    assert not has_media(compact_media(history, keep_last=False))
+
+
+def test_persisted_text_has_reference_not_base64():
+    text = content_text(media_turn("segue", extracted="Valor: R$ 29,90")["content"])
+
+    assert text.startswith("segue\n[Mídia do lead: Imagem (image/jpeg")
+    assert "Valor: R$ 29,90" in text
+    assert RECEIPT not in text
+
+
+@pytest.mark.asyncio
+async def test_tool_follow_up_call_does_not_resend_image():
+    agent = AgenticSDRStateless()
+    calls = []
+    rounds = ["[TOOL: knowledge.search | query=comprovante]", "Comprovante recebido!"]
+
+    async def fake_get_response(messages, system_prompt, **kwargs):
+        calls.append(messages)
+        return rounds.pop(0)
+
+    async def fake_execute_single_tool(*args, **kwargs):
+        return {"ok": True}
+
+    agent.model_manager.get_response = fake_get_response
+    agent._execute_single_tool = fake_execute_single_tool
+    history = [media_turn("segue o comprovante", extracted="PIX R$ 29,90")]
+
+    await agent._generate_response("segue o comprovante", {}, {"name": "Ana"}, history, {})
+
+    first, second = calls
+    assert has_media(first)
+    assert not has_media(second)
+    params = OpenAI(id="gpt-4o-mini", api_key=None)._build_params(second)
+    assert "image_url" not in json.dumps(params)
+    assert "PIX R$ 29,90" in json.dumps(params, ensure_ascii=False)
+
+
+@pytest.mark.asyncio
+async def test_image_description_cached_by_content_hash(monkeypatch):
+    monkeypatch.setattr(settings, "enable_image_description_cache", True)
+    store = {}
+
+    async def fake_get(key):
+        return store.get(key)
+
+    async def fake_set(key, value, ttl=None):
+        store[key] = value
+        return True
+
+    monkeypatch.setattr(media_history.redis_client, "get", fake_get)
+    monkeypatch.setattr(media_history.redis_client, "set", fake_set)
+
+    class FakeModelManager:
+        calls = 0
+
+        async def get_response(self, messages, **kwargs):
+            FakeModelManager.calls += 1
+            return "Comprovante PIX de R$ 29,90."
+
+    manager = FakeModelManager()
+    part = media_turn("x")["content"][1]
+
+    assert await describe_image(manager, part) == "Comprovante PIX de R$ 29,90."
+    assert await describe_image(manager, {"media_data": dict(part["media_data"])}) == "Comprovante PIX de R$ 29,90."
+    assert FakeModelManager.calls == 1
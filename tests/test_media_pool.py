@@ -0,0 +1,151 @@
+import os
+import io
+import time
+import asyncio
+import base64
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.core import media_jobs
+from app.core import multimodal_processor as mp
+from app.core.media_pool import MediaPoolBusyError, MediaProcessPool, set_media_pool
+from app.utils.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    set_media_pool(None)
+
+
+def thread_pool(workers, **kwargs):
+    """Pool com threads no lugar de processos (funções de teste não precisam ser picklable)"""
+    pool = MediaProcessPool(workers=workers, **kwargs)
+    pool._executor = ThreadPoolExecutor(max_workers=workers)
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_blocking_job_does_not_freeze_event_loop():
+    pool = thread_pool(1)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    await pool.run(time.sleep, 0.3)
+    task.cancel()
+
+    assert ticks >= 10
+    assert metrics.get_histogram("media_job_ms:sleep").count == 1
+    assert metrics.get_histogram("media_pool_queue_wait_ms").count == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_limit_rejects_and_timeout_frees_slot_when_job_ends():
+    pool = thread_pool(1, max_queue=2)
+    running = [asyncio.create_task(pool.run(time.sleep, 0.2)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(MediaPoolBusyError):
+        await pool.run(time.sleep, 0)
+    assert metrics.get_counter("media_pool_rejected") == 1
+    await asyncio.gather(*running)
+    assert pool.pending == 0
+
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.run(time.sleep, 0.2, timeout=0.05)
+    assert metrics.get_counter("media_job_timeouts") == 1
+    assert pool.pending == 1
+    await asyncio.sleep(0.3)
+    assert pool.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_scanned_pdf_pages_are_ocr_in_parallel(monkeypatch):
+    set_media_pool(thread_pool(3))
+    monkeypatch.setattr(mp, "PDF2IMAGE_AVAILABLE", True)
+    monkeypatch.setattr(media_jobs, "pdf_text", lambda data: ("", 3))
+
+    timeouts = []
+
+    def fake_ocr_page(data, page_number, lang="por", timeout=0):
+        timeouts.append(timeout)
+        time.sleep(0.2)
+        return f"Comprovante PIX página {page_number} R$ 29,90"
+
+    monkeypatch.setattr(media_jobs, "ocr_pdf_page", fake_ocr_page)
+    processor = mp.MultimodalProcessor()
+
+    started = time.monotonic()
+    result = await processor.process_document(base64.b64encode(b"%PDF-1.4").decode())
+
+    assert time.monotonic() - started < 0.45
+    assert result["success"] and result["metadata"]["ocr_used"]
+    assert result["text"].split("\n\n") == [
+        f"Comprovante PIX página {n} R$ 29,90" for n in (1, 2, 3)
+    ]
+    assert timeouts == [mp.settings.media_job_timeout] * 3
+    assert not result["ocr_failed"]
+
+
+@pytest.mark.asyncio
+async def test_failed_pdf_page_marks_result_as_ocr_failed(monkeypatch):
+    set_media_pool(thread_pool(3))
+    monkeypatch.setattr(mp, "PDF2IMAGE_AVAILABLE", True)
+    monkeypatch.setattr(media_jobs, "pdf_text", lambda data: ("", 2))
+
+    def flaky_ocr_page(data, page_number, lang="por", timeout=0):
+        if page_number == 2:
+            raise RuntimeError("Tesseract process timeout")
+        return "Comprovante PIX R$ 29,90"
+
+    monkeypatch.setattr(media_jobs, "ocr_pdf_page", flaky_ocr_page)
+
+    result = await mp.MultimodalProcessor().process_document(base64.b64encode(b"%PDF-1.4").decode())
+
+    assert result["success"] and result["ocr_failed"]
+    assert result["text"] == "Comprovante PIX R$ 29,90"
+
+
+@pytest.mark.asyncio
+async def test_real_process_pool_runs_media_job():
+    PyPDF2 = pytest.importorskip("PyPDF2")
+    writer = PyPDF2.PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    writer.add_blank_page(width=200, height=200)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    pool = MediaProcessPool(workers=1)
+    try:
+        text, pages = await pool.run(media_jobs.pdf_text, buffer.getvalue(), timeout=60)
+    finally:
+        pool.shutdown()
+
+    assert (text.strip(), pages) == ("", 2)
+
+
+@pytest.mark.asyncio
+async def test_broken_process_pool_fails_only_that_job_and_is_rebuilt():
+    metrics.reset()
+    pool = MediaProcessPool(workers=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(os._exit, 1, timeout=60)
+        assert await pool.run(abs, -3, timeout=60) == 3
+    finally:
+        pool.shutdown()
+
+    assert metrics.get_counter("media_pool_broken") == 1
+    assert pool.pending == 0
@@ -0,0 +1,133 @@
+import os
+import asyncio
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.services.message_buffer import MessageBuffer
+from app.utils.metrics import metrics
+
+
+PHONES = ["5581999990001", "5581999990002", "5581999990003"]
+
+
+FAST_WINDOWS = {"timeout": 0.05, "quick_window": 0.02, "incomplete_window": 0.02}
+
+
+def make_buffer(**kwargs):
+    buffer = MessageBuffer(**FAST_WINDOWS, **kwargs)
+    processed = []
+
+    async def fake_process_messages(phone, messages):
+        processed.append(phone)
+
+    buffer._process_messages = fake_process_messages
+    return buffer, processed
+
+
+async def send_and_drain(buffer, phones):
+    for phone in phones:
+        await buffer.add_message(phone, "Oi", {"key": {"id": phone}})
+    await asyncio.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_idle_buffers_evicted_after_ttl():
+    metrics.reset()
+    buffer, processed = make_buffer(idle_ttl=0.1)
+    await send_and_drain(buffer, PHONES)
+    assert sorted(processed) == PHONES
+
+    await asyncio.sleep(0.15)
+    assert buffer.evict_idle() == 3
+    assert buffer.queues == {}
+    assert buffer.processing_locks == {}
+    assert metrics.get_counter("message_buffer_evictions") == 3
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hard_cap_evicts_least_recently_used():
+    buffer, _ = make_buffer(idle_ttl=3600, max_buffers=2)
+    await send_and_drain(buffer, PHONES[:2])
+
+    await send_and_drain(buffer, PHONES[2:])
+
+    assert set(buffer.queues) == {PHONES[1], PHONES[2]}
+    assert buffer.evictions == 1
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_active_buffer_is_never_evicted():
+    buffer = MessageBuffer(**FAST_WINDOWS, idle_ttl=0.0)
+    release = asyncio.Event()
+
+    async def slow_process_messages(phone, messages):
+        await release.wait()
+
+    buffer._process_messages = slow_process_messages
+    await buffer.add_message(PHONES[0], "Oi", {"key": {"id": "1"}})
+    await asyncio.sleep(0.15)
+
+    assert buffer.evict_idle() == 0
+    assert PHONES[0] in buffer.queues
+
+    release.set()
+    await asyncio.sleep(0.05)
+    assert buffer.evict_idle() == 1
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_buffer_gauges_exposed_in_metrics():
+    buffer, _ = make_buffer(idle_ttl=3600)
+    await send_and_drain(buffer, PHONES[:1])
+
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges["message_buffer_live"] == 1
+    assert gauges["message_buffer_oldest_idle_seconds"] >= 0
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_new_phone_not_evicted_when_others_are_busy_at_cap():
+    buffer, processed = make_buffer(idle_ttl=3600, max_buffers=2)
+    release = asyncio.Event()
+
+    async def slow_process_messages(phone, messages):
+        await release.wait()
+        processed.append(phone)
+
+    buffer._process_messages = slow_process_messages
+    for phone in PHONES[:2]:
+        await buffer.add_message(phone, "Oi", {"key": {"id": phone}})
+    await asyncio.sleep(0.2)  # os dois primeiros estão processando
+
+    await buffer.add_message(PHONES[2], "Oi", {"key": {"id": PHONES[2]}})
+    release.set()
+    await asyncio.sleep(0.3)
+
+    assert sorted(processed) == PHONES
+    assert buffer.evictions == 0
+    await buffer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_presence_without_messages_is_dropped_once_expired():
+    buffer, _ = make_buffer(idle_ttl=3600, max_buffers=2)
+    for phone in PHONES[:2]:
+        await buffer.note_presence(phone, "composing")
+    assert set(buffer.composing_until) == set(PHONES[:2])
+
+    await asyncio.sleep(0.1)
+    # Acima do limite, a própria escrita descarta as extensões vencidas
+    await buffer.note_presence(PHONES[2], "composing")
+    assert set(buffer.composing_until) == {PHONES[2]}
+
+    await asyncio.sleep(0.1)
+    buffer.evict_idle()
+    assert buffer.composing_until == {}
+    await buffer.shutdown()
@@ -0,0 +1,138 @@
+import os
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.api import webhooks
+from app.config import settings
+from app.integrations.redis_client import redis_client
+from app.services.message_dedupe import MessageDeduplicator, set_message_deduplicator
+from app.utils.metrics import metrics
+
+
+PHONE = "5581999990001"
+
+
+class CountingRedis:
+    """Redis fake que conta as operações SET NX usadas pela deduplicação"""
+
+    def __init__(self):
+        self.keys = {}
+        self.ops = 0
+
+    async def set(self, key, value, nx=False, ex=None):
+        self.ops += 1
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    async def exists(self, key):
+        self.ops += 1
+        return int(key in self.keys)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = CountingRedis()
+    monkeypatch.setattr(redis_client, "redis_client", redis)
+    metrics.reset()
+    return redis
+
+
+def upsert(message_id):
+    return {
+        "key": {"id": message_id, "remoteJid": f"{PHONE}@s.whatsapp.net", "fromMe": False},
+        "message": {"conversation": "Quero saber dos planos"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_lru_front_avoids_redis_for_repeated_ids(fake_redis):
+    dedupe = MessageDeduplicator(ttl=60, lru_size=10)
+
+    assert await dedupe.is_duplicate("ABC") is False
+    assert await dedupe.is_duplicate("ABC") is True
+    assert await dedupe.is_duplicate("ABC") is True
+
+    assert fake_redis.ops == 1
+    assert metrics.get_counter("webhook_duplicates_suppressed") == 2
+
+
+@pytest.mark.asyncio
+async def test_duplicate_seen_by_other_worker_costs_one_redis_op(fake_redis):
+    worker_a = MessageDeduplicator(ttl=60, lru_size=10)
+    worker_b = MessageDeduplicator(ttl=60, lru_size=10)
+
+    assert await worker_a.is_duplicate("ABC") is False
+    assert await worker_b.is_duplicate("ABC") is True
+    assert fake_redis.ops == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_is_bounded(fake_redis):
+    dedupe = MessageDeduplicator(ttl=60, lru_size=2)
+    for message_id in ("A", "B", "C"):
+        await dedupe.is_duplicate(message_id)
+
+    assert list(dedupe._seen) == ["B", "C"]
+    # "A" saiu do LRU, mas o Redis ainda o conhece
+    assert await dedupe.is_duplicate("A") is True
+
+
+@pytest.mark.asyncio
+async def test_redelivered_webhook_runs_pipeline_once(fake_redis, monkeypatch):
+    calls = []
+
+    async def fake_process_message_with_agent(**kwargs):
+        calls.append(kwargs["message_id"])
+
+    async def fake_check_rate_limit(*args, **kwargs):
+        return True
+
+    monkeypatch.setattr(webhooks, "process_message_with_agent", fake_process_message_with_agent)
+    monkeypatch.setattr(redis_client, "check_rate_limit", fake_check_rate_limit)
+    monkeypatch.setattr(settings, "enable_message_buffer", False)
+    set_message_deduplicator(MessageDeduplicator(ttl=60, lru_size=10))
+    try:
+        await webhooks.process_new_message(upsert("WAMID-1"))
+        await webhooks.process_new_message(upsert("WAMID-1"))
+        await webhooks.process_new_message(upsert("WAMID-2"))
+        # Reentrega da fila de algo que já terminou também é ignorada
+        await webhooks.process_new_message(upsert("WAMID-2"), redelivered=True)
+    finally:
+        set_message_deduplicator(None)
+
+    assert calls == ["WAMID-1", "WAMID-2"]
+    assert metrics.get_counter("webhook_duplicates_suppressed") == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_redelivery_after_failure_runs_pipeline_again(fake_redis, monkeypatch):
+    calls = []
+
+    async def flaky_process_message_with_agent(**kwargs):
+        calls.append(kwargs["message_id"])
+        if len(calls) == 1:
+            raise RuntimeError("LLM indisponível")
+
+    async def fake_check_rate_limit(*args, **kwargs):
+        return True
+
+    monkeypatch.setattr(webhooks, "process_message_with_agent", flaky_process_message_with_agent)
+    monkeypatch.setattr(redis_client, "check_rate_limit", fake_check_rate_limit)
+    monkeypatch.setattr(settings, "enable_message_buffer", False)
+    set_message_deduplicator(MessageDeduplicator(ttl=60, lru_size=10))
+    try:
+        with pytest.raises(RuntimeError):
+            await webhooks.process_new_message(upsert("WAMID-3"), raise_errors=True)
+        # Primeira entrega falhou: a reentrega roda o pipeline; a seguinte não
+        await webhooks.process_new_message(upsert("WAMID-3"), redelivered=True, raise_errors=True)
+        await webhooks.process_new_message(upsert("WAMID-3"), redelivered=True, raise_errors=True)
+    finally:
+        set_message_deduplicator(None)
+
+    assert calls == ["WAMID-3", "WAMID-3"]
+    assert "msg:done:WAMID-3" in fake_redis.keys
@@ -0,0 +1,155 @@
+import os
+import json
+import types
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.config import settings
+from app.core import model_manager as mm
+from app.core.model_manager import Gemini, OpenAI
+from app.utils.metrics import metrics
+
+
+HISTORY = [{"role": "user", "content": "Quais são os planos de sócio?"}]
+FINAL = "Temos três planos: Alvirrubro, Timbu e Náutico de Coração."
+
+
+def usage(prompt_tokens):
+    return types.SimpleNamespace(
+        prompt_tokens=prompt_tokens, prompt_tokens_details=types.SimpleNamespace(cached_tokens=0)
+    )
+
+
+class ToolCallingCompletions:
+    """Primeira chamada pede knowledge_search; a seguinte responde em texto"""
+
+    def __init__(self, fail_after_tools=False):
+        self.calls = []
+        self.fail_after_tools = fail_after_tools
+
+    async def create(self, **params):
+        self.calls.append(json.loads(json.dumps(params)))
+        messages = params["messages"]
+        if "tools" in params and not any(m["role"] == "tool" for m in messages):
+            call = types.SimpleNamespace(
+                id="call_1",
+                function=types.SimpleNamespace(name="knowledge_search", arguments='{"query": "planos"}')
+            )
+            message = types.SimpleNamespace(content=None, tool_calls=[call])
+        elif "tools" in params and self.fail_after_tools:
+            raise RuntimeError("timeout do provedor")
+        else:
+            message = types.SimpleNamespace(content=FINAL, tool_calls=None)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=message)], usage=usage(100 * len(messages))
+        )
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(settings, "enable_native_tool_calling", True)
+    agent = AgenticSDRStateless()
+    # Só a base de conhecimento habilitada: apenas knowledge_search é declarado
+    agent.calendar_service = agent.crm_service = agent.followup_service = None
+    agent.knowledge_service = object()
+    agent.executed = []
+
+    async def fake_execute_single_tool(service_method, params, *args):
+        agent.executed.append((service_method, params))
+        return {"planos": ["Alvirrubro", "Timbu", "Náutico de Coração"]}
+
+    monkeypatch.setattr(agent, "_execute_single_tool", fake_execute_single_tool)
+    return agent
+
+
+def use_openai(agent, completions):
+    model = OpenAI(id="gpt-4o-mini", api_key="test")
+    model.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    agent.model_manager.primary_model = model
+
+
+@pytest.mark.asyncio
+async def test_openai_structured_tool_call_appends_only_tool_messages(agent):
+    completions = ToolCallingCompletions()
+    use_openai(agent, completions)
+
+    response = await agent._generate_response(
+        "Quais são os planos?", {}, {"name": "Ana"}, HISTORY, {"conversation_id": "conv-1"}
+    )
+
+    assert response == FINAL
+    assert agent.executed == [("knowledge.search", {"query": "planos"})]
+    first, second = completions.calls
+    assert [tool["function"]["name"] for tool in first["tools"]] == ["knowledge_search"]
+    # A segunda rodada repete o prefixo byte a byte e só acrescenta a chamada e o resultado
+    assert second["messages"][:len(first["messages"])] == first["messages"]
+    added = second["messages"][len(first["messages"]):]
+    assert [m["role"] for m in added] == ["assistant", "tool"]
+    assert added[0]["tool_calls"][0]["function"]["name"] == "knowledge_search"
+    assert json.loads(added[1]["content"]) == {"planos": ["Alvirrubro", "Timbu", "Náutico de Coração"]}
+    assert "RESULTADO DAS FERRAMENTAS" not in json.dumps(second["messages"], ensure_ascii=False)
+
+    assert metrics.get_histogram("tool_turn_ms:native").count == 1
+    assert metrics.get_histogram("tool_turn_prompt_tokens:native").snapshot()["max"] > 0
+
+
+@pytest.mark.asyncio
+async def test_model_failure_after_tools_does_not_rerun_them(agent):
+    completions = ToolCallingCompletions(fail_after_tools=True)
+    use_openai(agent, completions)
+
+    response = await agent._generate_response(
+        "Quais são os planos?", {}, {"name": "Ana"}, HISTORY, {"conversation_id": "conv-1"}
+    )
+
+    assert response == FINAL
+    assert len(agent.executed) == 1
+    # Segunda chamada em texto com os resultados já obtidos
+    assert "tools" not in completions.calls[-1]
+    assert "RESULTADO DAS FERRAMENTAS" in completions.calls[-1]["messages"][-2]["content"]
+
+
+@pytest.mark.asyncio
+async def test_gemini_function_call_round_trip(agent, monkeypatch):
+    requests = []
+
+    class FakeModel:
+        def __init__(self, model_name=None, system_instruction=None):
+            self.system_instruction = system_instruction
+
+        async def generate_content_async(self, contents, **kwargs):
+            requests.append({"contents": [dict(c, parts=list(c["parts"])) for c in contents], **kwargs})
+            if len(requests) == 1:
+                call = types.SimpleNamespace(name="knowledge_search", args={"query": "planos"})
+                parts = [types.SimpleNamespace(function_call=call)]
+            else:
+                parts = [types.SimpleNamespace(function_call=None)]
+            return types.SimpleNamespace(
+                candidates=[types.SimpleNamespace(content=types.SimpleNamespace(parts=parts))],
+                text=FINAL,
+                usage_metadata=types.SimpleNamespace(prompt_token_count=500, cached_content_token_count=0)
+            )
+
+    fake_genai = types.SimpleNamespace(configure=lambda api_key: None, GenerativeModel=FakeModel)
+    monkeypatch.setattr(mm, "genai", fake_genai, raising=False)
+    monkeypatch.setattr(mm, "GEMINI_AVAILABLE", True)
+    agent.model_manager.primary_model = Gemini(id="gemini-2.5-flash", api_key="test")
+
+    response = await agent._generate_response("Quais são os planos?", {}, {"name": "Ana"}, HISTORY, {})
+
+    assert response == FINAL
+    assert agent.executed == [("knowledge.search", {"query": "planos"})]
+    first, second = requests
+    declarations = first["tools"][0]["function_declarations"]
+    assert [d["name"] for d in declarations] == ["knowledge_search"]
+    assert second["contents"][:len(first["contents"])] == first["contents"]
+    model_turn, tool_turn = second["contents"][len(first["contents"]):]
+    assert model_turn["parts"][0]["function_call"]["name"] == "knowledge_search"
+    assert tool_turn["parts"][0]["function_response"]["response"] == {
+        "result": {"planos": ["Alvirrubro", "Timbu", "Náutico de Coração"]}
+    }
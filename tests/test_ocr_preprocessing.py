@@ -0,0 +1,67 @@
+import os
+import json
+import shutil
+from pathlib import Path
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from PIL import Image
+
+from app.core import media_jobs
+from app.core.multimodal_processor import MultimodalProcessor
+
+CORPUS_DIR = Path(__file__).parent / "fixtures" / "receipts"
+LABELS = json.loads((CORPUS_DIR / "labels.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("name", ["pix_claro_1080.png", "ted_saldo_1440.png"])
+def test_preprocess_downscales_binarizes_and_crops(name):
+    original = Image.open(CORPUS_DIR / name)
+
+    prepared = media_jobs.preprocess_for_ocr(original)
+
+    assert prepared.mode == "L"
+    assert set(prepared.getdata()) <= {0, 255}
+    assert prepared.width <= media_jobs.OCR_TARGET_WIDTH
+    scaled_height = original.height * prepared.width / original.width
+    # Recorte descarta o fundo vazio abaixo do texto
+    assert prepared.height < scaled_height * 0.7
+
+
+def test_dark_mode_becomes_dark_text_on_white():
+    prepared = media_jobs.preprocess_for_ocr(Image.open(CORPUS_DIR / "pix_escuro_1080.png"))
+
+    pixels = list(prepared.getdata())
+    assert pixels.count(255) > pixels.count(0) * 3
+
+
+def test_ocr_image_runs_tesseract_on_prepared_image(monkeypatch):
+    pytesseract = pytest.importorskip("pytesseract")
+    calls = []
+
+    def fake_image_to_string(image, lang=None, config="", timeout=0):
+        calls.append((image.size, image.mode, lang, config, timeout))
+        return "Valor R$ 39,90"
+
+    monkeypatch.setattr(pytesseract, "image_to_string", fake_image_to_string)
+    image_bytes = (CORPUS_DIR / "pix_claro_1080.png").read_bytes()
+
+    text, width, height, image_format = media_jobs.ocr_image(image_bytes)
+    media_jobs.ocr_image(image_bytes, preprocess=False, psm=3, timeout=30)
+
+    assert (text, width, height, image_format) == ("Valor R$ 39,90", 1080, 2400, "PNG")
+    assert calls[0][1:] == ("L", "por", "--psm 4", 0)
+    assert calls[0][0][0] <= media_jobs.OCR_TARGET_WIDTH
+    assert calls[1] == ((1080, 2400), "RGB", "por", "--psm 3", 30)
+
+
+@pytest.mark.skipif(shutil.which("tesseract") is None, reason="tesseract não instalado")
+def test_corpus_payment_values_are_extracted():
+    processor = MultimodalProcessor()
+
+    for name, expected in LABELS.items():
+        text, *_ = media_jobs.ocr_image((CORPUS_DIR / name).read_bytes())
+        assert processor._extract_payment_value_from_text(text) == pytest.approx(expected), name
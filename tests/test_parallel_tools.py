@@ -0,0 +1,108 @@
+import os
+import time
+import asyncio
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+TOOL_LATENCY = 0.2
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    metrics.reset()
+    agent = AgenticSDRStateless()
+    agent.timeline = []
+
+    async def fake_execute_single_tool(service_method, params, lead_info, context, conversation_history):
+        started = time.monotonic()
+        if service_method == "crm.update_field":
+            raise ValueError("campo inexistente")
+        await asyncio.sleep(float(params.get("sleep", TOOL_LATENCY)))
+        agent.timeline.append((service_method, started, time.monotonic()))
+        return {"tool": service_method, **params}
+
+    monkeypatch.setattr(agent, "_execute_single_tool", fake_execute_single_tool)
+    return agent
+
+
+async def run_tools(agent, response):
+    return await agent._parse_and_execute_tools(response, {}, {}, [])
+
+
+@pytest.mark.asyncio
+async def test_independent_tools_run_concurrently(agent):
+    started = time.monotonic()
+    results = await run_tools(
+        agent,
+        "[TOOL: knowledge.search | query=planos] [TOOL: calendar.check_availability | date_request=amanhã]"
+    )
+    elapsed = time.monotonic() - started
+
+    assert elapsed < TOOL_LATENCY * 1.5
+    assert list(results) == ["knowledge.search", "calendar.check_availability"]
+    assert results["knowledge.search"]["query"] == "planos"
+    assert metrics.get_histogram("tool_latency_ms:knowledge.search").count == 1
+    assert metrics.get_histogram("tool_latency_ms:calendar.check_availability").count == 1
+
+
+@pytest.mark.asyncio
+async def test_schedule_waits_for_availability(agent):
+    results = await run_tools(
+        agent,
+        "[TOOL: calendar.schedule_meeting | date=2026-10-20 | time=10:00] "
+        "[TOOL: calendar.check_availability | date_request=segunda] "
+        "[TOOL: knowledge.search | query=planos]"
+    )
+
+    timeline = {name: (start, end) for name, start, end in agent.timeline}
+    assert timeline["calendar.schedule_meeting"][0] >= timeline["calendar.check_availability"][1]
+    # A busca não depende de ninguém e roda junto com a verificação de agenda
+    assert timeline["knowledge.search"][0] < timeline["calendar.check_availability"][1]
+    assert list(results) == [
+        "calendar.schedule_meeting", "calendar.check_availability", "knowledge.search"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_timeout_and_errors_do_not_block_other_tools(agent, monkeypatch):
+    monkeypatch.setattr(settings, "tool_call_timeout", 0.1)
+
+    results = await run_tools(
+        agent,
+        "[TOOL: knowledge.search | query=lento | sleep=1] "
+        "[TOOL: crm.update_field | field=x | value=y] "
+        "[TOOL: calendar.suggest_times | sleep=0.01]"
+    )
+
+    assert "timeout" in results["knowledge.search"]["error"]
+    assert results["crm.update_field"] == {"error": "campo inexistente"}
+    assert results["calendar.suggest_times"]["tool"] == "calendar.suggest_times"
+    assert metrics.get_counter("tool_timeouts") == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_write_tool_is_not_cancelled_on_timeout(agent, monkeypatch):
+    monkeypatch.setattr(settings, "tool_call_timeout", 0.05)
+
+    results = await run_tools(
+        agent,
+        "[TOOL: calendar.schedule_meeting | date=2026-10-20 | time=10:00 | sleep=0.15] "
+        "[TOOL: knowledge.search | query=lento | sleep=1]"
+    )
+
+    assert results["calendar.schedule_meeting"]["status"] == "pending"
+    assert "timeout" in results["knowledge.search"]["error"]
+    assert metrics.get_counter("tool_pending") == 1
+
+    # O agendamento termina em background; a busca foi cancelada
+    await asyncio.sleep(0.2)
+    finished = [name for name, _, _ in agent.timeline]
+    assert finished == ["calendar.schedule_meeting"]
@@ -0,0 +1,167 @@
+import os
+import types
+import asyncio
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.core import model_manager as mm
+from app.core.model_manager import Gemini, ModelManager, OpenAI
+from app.utils.metrics import metrics
+
+
+PREFIX = "Você é Laura, do Náutico." * 50
+HISTORY = [{"role": "user", "content": "Quais são os planos?"}]
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **params):
+        self.calls.append(params)
+        cached = 1024 if len(self.calls) > 1 else 0
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content="Temos 3 planos."))],
+            usage=types.SimpleNamespace(
+                prompt_tokens=1500,
+                prompt_tokens_details=types.SimpleNamespace(cached_tokens=cached)
+            )
+        )
+
+
+@pytest.mark.asyncio
+async def test_openai_static_prefix_first_and_volatile_context_last():
+    metrics.reset()
+    completions = FakeCompletions()
+    manager = ModelManager()
+    manager.primary_model = OpenAI(id="gpt-4o-mini", api_key="test")
+    manager.primary_model.client = types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=completions)
+    )
+
+    for minute in ("10:00", "10:05"):
+        response = await manager.get_response(
+            HISTORY, system_prompt=PREFIX,
+            context_suffix=f"<contexto_temporal>{minute}</contexto_temporal>",
+            conversation_id="conv-1"
+        )
+        assert response == "Temos 3 planos."
+
+    first, second = (call["messages"] for call in completions.calls)
+    assert first[0] == second[0] == {"role": "system", "content": PREFIX}
+    assert first[1:-1] == second[1:-1] == HISTORY
+    assert first[-1]["content"].endswith("10:00</contexto_temporal>")
+    assert second[-1]["content"].endswith("10:05</contexto_temporal>")
+
+    assert metrics.get_counter("llm_prompt_tokens") == 3000
+    assert metrics.get_counter("llm_cached_tokens") == 1024
+    assert metrics.get_histogram("llm_latency_ms:cache_hit").count == 1
+    assert metrics.get_histogram("llm_latency_ms:cache_miss").count == 1
+    usage = manager.get_conversation_usage("conv-1")
+    assert usage["calls"] == 2 and usage["cached_tokens"] == 1024
+
+
+class FakeGenAI:
+    """Substitui google.generativeai: registra caches criados e chamadas ao modelo"""
+
+    def __init__(self, fail_cache=False):
+        self.caches = []
+        self.generated = []
+        self.fail_cache = fail_cache
+        self.models_created = 0
+        self.latency = 0.0
+        fake = self
+
+        class CachedContent:
+            @staticmethod
+            def create(model, display_name, system_instruction, ttl):
+                if fake.fail_cache:
+                    raise ValueError("Cached content is too small")
+                fake.caches.append({"model": model, "system_instruction": system_instruction, "ttl": ttl})
+                return types.SimpleNamespace(name=f"cachedContents/{len(fake.caches)}")
+
+        class GenerativeModel:
+            def __init__(self, model_name=None, system_instruction=None, cached_content=None):
+                self.system_instruction = system_instruction
+                self.cached_content = cached_content
+                fake.models_created += 1
+
+            @classmethod
+            def from_cached_content(cls, cached_content):
+                return cls(cached_content=cached_content)
+
+            async def generate_content_async(self, contents):
+                await asyncio.sleep(fake.latency)
+                fake.generated.append({
+                    "system_instruction": self.system_instruction,
+                    "cached_content": self.cached_content,
+                    "contents": contents,
+                })
+                return types.SimpleNamespace(
+                    text="Temos 3 planos.",
+                    usage_metadata=types.SimpleNamespace(
+                        prompt_token_count=40000,
+                        cached_content_token_count=32768 if self.cached_content else 0
+                    )
+                )
+
+        self.caching = types.SimpleNamespace(CachedContent=CachedContent)
+        self.GenerativeModel = GenerativeModel
+
+    def configure(self, api_key):
+        pass
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    def install(fail_cache=False):
+        fake = FakeGenAI(fail_cache)
+        monkeypatch.setattr(mm, "genai", fake, raising=False)
+        monkeypatch.setattr(mm, "GEMINI_AVAILABLE", True)
+        monkeypatch.setattr(mm.settings, "enable_prompt_cache", True)
+        return fake
+    return install
+
+
+@pytest.mark.asyncio
+async def test_gemini_persona_served_from_context_cache(fake_genai):
+    metrics.reset()
+    fake = fake_genai()
+    manager = ModelManager()
+    manager.primary_model = Gemini(id="gemini-2.5-flash", api_key="test")
+
+    for minute in ("10:00", "10:05"):
+        await manager.get_response(
+            HISTORY, system_prompt=PREFIX, context_suffix=f"<agora>{minute}</agora>",
+            conversation_id="conv-1"
+        )
+
+    assert len(fake.caches) == 1
+    assert fake.caches[0]["system_instruction"] == PREFIX
+    assert fake.caches[0]["model"] == "models/gemini-2.5-flash"
+    for call, minute in zip(fake.generated, ("10:00", "10:05")):
+        assert call["cached_content"] is not None
+        assert call["system_instruction"] is None
+        assert call["contents"][-1]["parts"] == ["Quais são os planos?", f"<agora>{minute}</agora>"]
+
+    assert metrics.get_counter("llm_cached_tokens") == 2 * 32768
+    assert manager.get_conversation_usage("conv-1")["prompt_tokens"] == 80000
+
+
+@pytest.mark.asyncio
+async def test_gemini_falls_back_to_system_instruction_when_cache_unavailable(fake_genai):
+    fake = fake_genai(fail_cache=True)
+    model = Gemini(id="gemini-2.5-flash", api_key="test")
+
+    await model.achat(HISTORY, system_prompt=PREFIX, context_suffix="<agora>10:00</agora>")
+    await model.achat(HISTORY, system_prompt=PREFIX, context_suffix="<agora>10:05</agora>")
+
+    first, second = fake.generated
+    assert first["system_instruction"] == second["system_instruction"] == PREFIX
+    assert first["contents"][-1]["parts"][-1] == "<agora>10:00</agora>"
+    assert second["contents"][-1]["parts"][-1] == "<agora>10:05</agora>"
+    # Falha de criação não é repetida a cada chamada
+    assert model._cache_disabled_until > 0
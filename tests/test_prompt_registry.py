@@ -0,0 +1,128 @@
+import os
+import time
+from datetime import datetime
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.api import diagnostics
+from app.config import settings
+from app.core.prompt_registry import PromptRegistry, set_prompt_registry
+
+
+NOW = datetime(2026, 3, 2, 14, 30)  # segunda-feira
+
+
+@pytest.fixture
+def prompt_file(tmp_path):
+    path = tmp_path / "persona.md"
+    path.write_text("Você é Laura, do Náutico.", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def registry(prompt_file):
+    registry = PromptRegistry(paths=[str(prompt_file)], check_interval=0)
+    set_prompt_registry(registry)
+    yield registry
+    set_prompt_registry(None)
+
+
+def test_static_prefix_is_shared_and_suffix_is_per_lead(registry):
+    paid = registry.build_system_prompt(
+        {"name": "Ana Souza", "is_valid_nautico_payment": True, "payment_value": 50}, NOW
+    )
+    anonymous = registry.build_system_prompt({"name": "Lead Náutico"}, NOW)
+
+    assert paid.startswith(registry.static_prefix)
+    assert anonymous.startswith(registry.static_prefix)
+    assert registry.static_prefix.startswith("Você é Laura, do Náutico.")
+
+    paid_suffix = paid[len(registry.static_prefix):]
+    assert "2026-03-02 14:30 (Segunda-feira)" in paid_suffix
+    assert "JÁ TEM PAGAMENTO VALIDADO de R$50" in paid_suffix
+    assert 'use EXATAMENTE "Ana Souza"' in paid_suffix
+    assert "NÃO tem comprovante" in anonymous
+    assert "<nome_do_lead>" not in anonymous[len(registry.static_prefix):]
+    assert registry.loads == 1
+
+
+def test_reload_on_mtime_change(registry, prompt_file):
+    old_hash = registry.prefix_hash
+    assert registry.refresh_if_changed() is False
+
+    prompt_file.write_text("Você é Laura, nova persona.", encoding="utf-8")
+    future = time.time() + 10
+    os.utime(prompt_file, (future, future))
+
+    assert registry.get_static_prefix().startswith("Você é Laura, nova persona.")
+    assert registry.prefix_hash != old_hash
+    assert registry.loads == 2
+
+
+def test_mtime_check_is_throttled(prompt_file):
+    registry = PromptRegistry(paths=[str(prompt_file)], check_interval=3600)
+    prompt_file.write_text("alterado", encoding="utf-8")
+    os.utime(prompt_file, (time.time() + 10, time.time() + 10))
+
+    assert registry.get_static_prefix().startswith("Você é Laura, do Náutico.")
+    assert registry.loads == 1
+
+
+def test_native_tool_calling_swaps_tool_syntax_section(prompt_file, monkeypatch):
+    prompt_file.write_text(
+        "Você é Laura.\n<ferramentas_disponiveis>\n"
+        "<syntax>[TOOL: knowledge.search | query=sua pergunta aqui]</syntax>\n"
+        "</ferramentas_disponiveis>\nFim da persona.",
+        encoding="utf-8"
+    )
+    monkeypatch.setattr(settings, "enable_native_tool_calling", False)
+    registry = PromptRegistry(paths=[str(prompt_file)], check_interval=3600)
+    text_prefix = registry.get_static_prefix()
+
+    monkeypatch.setattr(settings, "enable_native_tool_calling", True)
+    native_prefix = registry.get_static_prefix()
+
+    assert text_prefix.count("[TOOL: knowledge.search") == 2
+    assert "[TOOL:" not in native_prefix
+    assert "knowledge_search" in native_prefix and "Fim da persona." in native_prefix
+    assert "{nome}" in native_prefix
+    assert registry.loads == 1
+
+
+def test_fallback_persona_when_file_missing(tmp_path):
+    registry = PromptRegistry(paths=[str(tmp_path / "missing.md")])
+    assert registry.static_prefix.startswith("Você é um assistente de vendas.")
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoint_reloads(registry, prompt_file):
+    prompt_file.write_text("Persona via endpoint", encoding="utf-8")
+
+    result = await diagnostics.reload_prompts()
+
+    assert result["prompt"]["loads"] == 2
+    assert registry.static_prefix.startswith("Persona via endpoint")
+
+
+@pytest.mark.asyncio
+async def test_generate_response_does_not_read_prompt_per_call(registry, monkeypatch):
+    agent = AgenticSDRStateless()
+    prompts = []
+
+    async def fake_get_response(messages, system_prompt, **kwargs):
+        prompts.append(system_prompt)
+        return "Claro! Posso te ajudar com os planos."
+
+    monkeypatch.setattr(agent.model_manager, "get_response", fake_get_response)
+    history = [{"role": "user", "content": "Quais são os planos?"}]
+
+    for _ in range(3):
+        await agent._generate_response("Quais são os planos?", {}, {"name": "Ana"}, history, {})
+
+    assert registry.loads == 1
+    assert len(prompts) == 3
+    assert all(p == registry.static_prefix for p in prompts)
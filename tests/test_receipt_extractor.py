@@ -0,0 +1,48 @@
+import os
+import json
+from pathlib import Path
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.core import receipt_extractor
+from app.core.multimodal_processor import MultimodalProcessor
+
+# Textos de OCR de comprovantes/boletos com o resultado da extração anterior
+# (um findall por padrão); a versão compilada precisa reproduzir exatamente
+GOLDEN = json.loads(
+    (Path(__file__).parent / "fixtures" / "receipt_texts.json").read_text(encoding="utf-8")
+)
+
+
+@pytest.mark.parametrize("case", GOLDEN, ids=[case["name"] for case in GOLDEN])
+def test_golden_corpus(case):
+    processor = MultimodalProcessor()
+    text = case["text"]
+
+    payment_value = processor._extract_payment_value_from_text(text)
+
+    assert processor._extract_bill_value_from_text(text) == case["bill_value"]
+    assert payment_value == case["payment_value"]
+    assert processor._extract_payer_name_from_text(text) == case["payer_name"]
+    assert bool(payment_value and processor._is_valid_nautico_payment_value(payment_value)) == case[
+        "is_valid_nautico_payment"
+    ]
+
+
+def test_labeled_value_wins_over_balance_and_fees():
+    text = "Saldo R$ 1.532,18\nTarifa R$ 2,50\nValor da transferência: R$ 79,90"
+
+    assert receipt_extractor.extract_payment_value(text) == 79.90
+    assert receipt_extractor.extract_payment_value("Saldo 12.345,67") == 12345.67
+    assert receipt_extractor.extract_payment_value("sem valores") is None
+
+
+@pytest.mark.parametrize("value,expected", [
+    (39.90, True), (39.89, True), (39.91, True), (39.92, False),
+    (1518.00, True), (3000.00, True), (59.90, False), (0.0, False),
+])
+def test_plan_values_with_one_cent_tolerance(value, expected):
+    assert receipt_extractor.is_valid_plan_value(value) is expected
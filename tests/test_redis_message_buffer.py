@@ -0,0 +1,246 @@
+import os
+import time
+import asyncio
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.services.message_buffer import RedisMessageBuffer
+
+
+PHONE = "5581999990001"
+
+
+class FakeRedis:
+    """Subconjunto de redis.asyncio usado pelo buffer, compartilhado entre 'workers'"""
+
+    def __init__(self):
+        self.lists = {}
+        self.zsets = {}
+        self.strings = {}
+        self.hashes = {}
+        self.expiry = {}
+
+    def _alive(self, key):
+        if key in self.expiry and self.expiry[key] <= time.time():
+            self.strings.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.strings
+
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+        return len(self.lists[key])
+
+    async def ltrim(self, key, start, end):
+        items = self.lists.get(key, [])
+        self.lists[key] = items[start:] if end == -1 else items[start:end + 1]
+
+    async def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    async def expire(self, key, ttl):
+        return True
+
+    async def delete(self, key):
+        removed = int(key in self.lists) + int(key in self.strings) + int(key in self.hashes)
+        self.lists.pop(key, None)
+        self.strings.pop(key, None)
+        self.hashes.pop(key, None)
+        return removed
+
+    async def hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if field in fields:
+            return 0
+        fields[field] = str(value)
+        return 1
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def zadd(self, key, mapping, nx=False):
+        zset = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            if nx and member in zset:
+                continue
+            zset[member] = score
+
+    async def zrem(self, key, member):
+        return int(self.zsets.get(key, {}).pop(member, None) is not None)
+
+    async def zscore(self, key, member):
+        return self.zsets.get(key, {}).get(member)
+
+    async def zrangebyscore(self, key, minimum, maximum):
+        return [m for m, score in self.zsets.get(key, {}).items() if score <= maximum]
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and self._alive(key):
+            return None
+        self.strings[key] = value
+        if ex:
+            self.expiry[key] = time.time() + ex
+        return True
+
+    async def get(self, key):
+        return self.strings.get(key) if self._alive(key) else None
+
+    async def eval(self, script, numkeys, key, token, ttl):
+        # Só o RENEW_LEASE_SCRIPT: estende o TTL se o valor ainda for o token
+        if await self.get(key) != token:
+            return 0
+        self.expiry[key] = time.time() + float(ttl)
+        return 1
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        # Sem awaits reais entre os comandos: atômico dentro do event loop
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+def make_worker(redis, processed, timeout=0.2, delay=0.0, lease_ttl=120):
+    buffer = RedisMessageBuffer(
+        timeout=timeout, quick_window=timeout, incomplete_window=timeout,
+        lease_ttl=lease_ttl, redis_connection=redis
+    )
+
+    async def fake_process_messages(phone, messages):
+        processed.append((id(buffer), phone, [m["content"] for m in messages]))
+        if delay:
+            await asyncio.sleep(delay)
+
+    buffer._process_messages = fake_process_messages
+    return buffer
+
+
+def message(msg_id):
+    return {"key": {"id": msg_id, "remoteJid": f"{PHONE}@s.whatsapp.net"}}
+
+
+@pytest.mark.asyncio
+async def test_two_workers_coalesce_into_single_batch():
+    redis = FakeRedis()
+    processed = []
+    worker_a = make_worker(redis, processed)
+    worker_b = make_worker(redis, processed)
+
+    await worker_a.add_message(PHONE, "Oi", message("1"))
+    await worker_b.add_message(PHONE, "quero saber dos planos", message("2"))
+    await worker_a.add_message(PHONE, "de sócio", message("3"))
+
+    await asyncio.sleep(0.8)
+    await worker_a.shutdown()
+    await worker_b.shutdown()
+
+    assert len(processed) == 1
+    assert processed[0][2] == ["Oi", "quero saber dos planos", "de sócio"]
+
+
+@pytest.mark.asyncio
+async def test_lease_keeps_single_flight_per_phone():
+    redis = FakeRedis()
+    processed = []
+    active = {"now": 0, "max": 0}
+    worker_a = make_worker(redis, processed, timeout=0.1)
+    worker_b = make_worker(redis, processed, timeout=0.1)
+
+    for worker in (worker_a, worker_b):
+        async def tracked(phone, messages, worker=worker):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            processed.append((id(worker), phone, [m["content"] for m in messages]))
+            await asyncio.sleep(0.3)
+            active["now"] -= 1
+        worker._process_messages = tracked
+
+    await worker_a.add_message(PHONE, "primeira", message("1"))
+    await asyncio.sleep(0.2)  # worker A já está processando o primeiro lote
+    await worker_b.add_message(PHONE, "segunda", message("2"))
+
+    await asyncio.sleep(1.0)
+    await worker_a.shutdown()
+    await worker_b.shutdown()
+
+    assert [batch[2] for batch in processed] == [["primeira"], ["segunda"]]
+    assert active["max"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lease_renewed_while_turn_outlasts_its_ttl():
+    redis = FakeRedis()
+    processed = []
+    active = {"now": 0, "max": 0}
+    worker_a = make_worker(redis, processed, timeout=0.1, lease_ttl=0.3)
+    worker_b = make_worker(redis, processed, timeout=0.1, lease_ttl=0.3)
+
+    for worker in (worker_a, worker_b):
+        async def slow(phone, messages, worker=worker):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            processed.append((id(worker), phone, [m["content"] for m in messages]))
+            await asyncio.sleep(0.9)  # turno bem mais longo que o lease
+            active["now"] -= 1
+        worker._process_messages = slow
+
+    await worker_a.add_message(PHONE, "primeira", message("1"))
+    await asyncio.sleep(0.2)
+    await worker_b.add_message(PHONE, "segunda", message("2"))
+
+    await asyncio.sleep(2.2)
+    await worker_a.shutdown()
+    await worker_b.shutdown()
+
+    assert [batch[2] for batch in processed] == [["primeira"], ["segunda"]]
+    assert active["max"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pending_batch_recovered_by_other_worker():
+    redis = FakeRedis()
+    processed = []
+    worker_a = make_worker(redis, processed, timeout=0.1)
+    worker_b = make_worker(redis, processed, timeout=0.1)
+
+    await worker_a.add_message(PHONE, "mensagem órfã", message("1"))
+    # Worker A cai antes do prazo do lote
+    await worker_a.shutdown()
+
+    # Worker B só conhece o lote pelo Redis (recuperação de prazos vencidos)
+    worker_b._ensure_recovery()
+    await asyncio.sleep(1.5)
+    await worker_b.shutdown()
+
+    assert processed == [(id(worker_b), PHONE, ["mensagem órfã"])]
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_memory_buffer_without_redis():
+    processed = []
+    worker = make_worker(None, processed, timeout=0.1)
+    worker._get_redis = lambda: None
+
+    await worker.add_message(PHONE, "Oi", message("1"))
+    await worker.add_message(PHONE, "tudo bem?", message("2"))
+    await asyncio.sleep(0.6)
+    await worker.shutdown()
+
+    assert processed == [(id(worker), PHONE, ["Oi", "tudo bem?"])]
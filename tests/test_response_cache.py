@@ -0,0 +1,129 @@
+import os
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from app.config import settings
+from app.services.response_cache import ResponseCache, set_response_cache
+from app.utils.metrics import metrics
+
+
+ANSWER = "Oi, Ana! O plano Timbu custa R$ 59,90 por mês e dá prioridade na compra de ingressos."
+ANA = {"name": "Ana", "current_stage": "INTERESTED"}
+BRUNO = {"name": "Bruno", "current_stage": "INTERESTED"}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(settings, "enable_response_cache", True)
+    cache = ResponseCache(max_entries=10, ttl=60)
+    set_response_cache(cache)
+    yield cache
+    set_response_cache(None)
+
+
+def test_exact_and_near_duplicate_questions_hit(cache):
+    cache.put("Quanto custa o plano Timbu?", "interested", "v1", ANSWER, ANA, prompt_tokens=3000)
+
+    assert cache.get("quanto custa o plano timbu", "INTERESTED", "v1", BRUNO) == ANSWER.replace("Ana", "Bruno")
+    assert cache.get("Oi! Quanto custa o plano Timbu, por favor?", "INTERESTED", "v1", BRUNO) is not None
+    assert cache.get("Quanto custa o plano Timbu?", "QUALIFICADO", "v1", BRUNO) is None
+    assert cache.get("Como cancelo o plano?", "INTERESTED", "v1", BRUNO) is None
+
+    assert metrics.get_counter("response_cache_hits") == 2
+    assert metrics.get_counter("response_cache_saved_tokens") == 6000
+    assert cache.hit_rate() == 0.5
+
+
+def test_knowledge_base_change_invalidates(cache):
+    cache.put("Quanto custa o plano Timbu?", "INTERESTED", "v1", ANSWER, ANA)
+
+    assert cache.get("Quanto custa o plano Timbu?", "INTERESTED", "v2", ANA) is None
+    assert cache.get("Quanto custa o plano Timbu?", "INTERESTED", "v1", ANA) is None
+    assert metrics.get_counter("response_cache_invalidations") == 1
+
+
+class FakeKnowledge:
+    def __init__(self):
+        self.version = "v1"
+
+    async def get_version(self):
+        return self.version
+
+
+@pytest.mark.asyncio
+async def test_repeated_faq_skips_model_and_tool(cache):
+    agent = AgenticSDRStateless()
+    agent.knowledge_service = FakeKnowledge()
+    model_calls = []
+    tool_calls = []
+
+    async def fake_get_response(messages, system_prompt, **kwargs):
+        model_calls.append(messages[-1]["content"])
+        if len(model_calls) % 2 == 1:
+            return "[TOOL: knowledge.search | query=plano timbu]"
+        return ANSWER
+
+    async def fake_execute_single_tool(service_method, *args):
+        tool_calls.append(service_method)
+        return [{"question": "Plano Timbu", "answer": "R$ 59,90"}]
+
+    agent.model_manager.get_response = fake_get_response
+    agent._execute_single_tool = fake_execute_single_tool
+
+    async def ask(question, lead):
+        return await agent._generate_response(
+            question, {}, dict(lead), [{"role": "user", "content": question}], {}
+        )
+
+    assert await ask("Quanto custa o plano Timbu?", ANA) == ANSWER
+    assert len(model_calls) == 2 and tool_calls == ["knowledge.search"]
+
+    assert await ask("quanto custa o plano timbu??", BRUNO) == ANSWER.replace("Ana", "Bruno")
+    assert len(model_calls) == 2 and len(tool_calls) == 1
+
+    # Base de conhecimento alterada: volta ao modelo
+    agent.knowledge_service.version = "v2"
+    await ask("Quanto custa o plano Timbu?", BRUNO)
+    assert len(model_calls) == 4 and len(tool_calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_turns_with_other_tools_are_not_cached(cache):
+    agent = AgenticSDRStateless()
+    agent.knowledge_service = FakeKnowledge()
+    rounds = ["[TOOL: calendar.suggest_times]", "Tenho horário amanhã às 10h, Ana."]
+
+    async def fake_get_response(messages, system_prompt, **kwargs):
+        return rounds.pop(0)
+
+    async def fake_execute_single_tool(*args):
+        return {"horarios": ["10:00"]}
+
+    agent.model_manager.get_response = fake_get_response
+    agent._execute_single_tool = fake_execute_single_tool
+    await agent._generate_response("Tem horário amanhã?", {}, dict(ANA), [{"role": "user", "content": "Tem horário amanhã?"}], {})
+
+    assert cache.entries == {}
+
+
+@pytest.mark.parametrize("question", [
+    "Quanto custa?", "E o anual?", "e pra pagar ele no cartão?", "Isso inclui ingresso do plano?",
+])
+def test_context_dependent_questions_are_never_cached(cache, question):
+    cache.put(question, "INTERESTED", "v1", ANSWER, ANA)
+
+    assert cache.entries == {}
+    assert cache.get(question, "INTERESTED", "v1", BRUNO) is None
+    assert metrics.get_counter("response_cache_misses") == 0
+
+
+def test_negation_must_match_for_near_duplicates(cache):
+    cache.put("Eu não quero cancelar meu plano sócio torcedor ouro", "INTERESTED", "v1", ANSWER, ANA)
+
+    assert cache.get("Eu quero cancelar meu plano sócio torcedor ouro", "INTERESTED", "v1", BRUNO) is None
+    assert cache.get("Não quero cancelar o meu plano sócio torcedor ouro", "INTERESTED", "v1", BRUNO) is not None
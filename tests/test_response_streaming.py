@@ -0,0 +1,268 @@
+import os
+import time
+import types
+import asyncio
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.agents.agentic_sdr_stateless import AgenticSDRStateless
+from google.api_core.exceptions import ResourceExhausted
+
+from app.core import model_manager as mm
+from app.core.model_manager import Gemini, ModelManager, OpenAI
+from app.services.message_splitter import MessageSplitter, StreamingMessageSplitter
+from app.services.response_streamer import ResponseStreamer
+from app.utils.metrics import metrics
+
+
+PHONE = "5581999990001"
+ANSWER = (
+    "Oi, Ana! Temos três planos de sócio para você escolher hoje. "
+    "O plano Alvirrubro custa R$ 29.90 por mês e dá desconto nos ingressos. "
+    "Quer que eu te mande o link para se associar?"
+)
+HISTORY = [{"role": "user", "content": "Quais são os planos?"}]
+
+
+def tokens(text, size=6):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class RecordingSender:
+    def __init__(self):
+        self.sent = []
+
+    async def __call__(self, phone, message):
+        self.sent.append((time.monotonic(), message))
+
+
+def make_streamer(sender, min_chunk_length=40):
+    return ResponseStreamer(
+        phone=PHONE, send=sender, splitter=MessageSplitter(max_length=200),
+        min_chunk_length=min_chunk_length, received_at=time.time()
+    )
+
+
+def test_splitter_holds_back_tool_tags():
+    splitter = StreamingMessageSplitter(MessageSplitter(max_length=200), min_chunk_length=10)
+    text = "Vou conferir os planos para você agora. [TOOL: knowledge.search | query=planos] Pronto."
+
+    emitted = []
+    for delta in tokens(text):
+        emitted.extend(splitter.feed(delta))
+    emitted.extend(splitter.flush())
+
+    assert emitted == ["Vou conferir os planos para você agora."]
+    assert splitter.tool_detected
+    assert not any("TOOL" in chunk for chunk in emitted)
+
+
+def test_splitter_emits_nothing_on_silence():
+    splitter = StreamingMessageSplitter(MessageSplitter(max_length=200), min_chunk_length=1)
+    for delta in tokens("<SILENCE> Tudo certo por aqui."):
+        assert splitter.feed(delta) == []
+    assert splitter.flush() == []
+
+
+@pytest.mark.asyncio
+async def test_first_bubble_sent_while_tokens_still_arriving():
+    metrics.reset()
+    sender = RecordingSender()
+    agent = AgenticSDRStateless()
+    streamer = make_streamer(sender)
+    finished = {}
+
+    async def fake_get_response(messages, system_prompt, on_delta=None, **kwargs):
+        for delta in tokens(ANSWER):
+            await on_delta(delta)
+            await asyncio.sleep(0.01)
+        finished["at"] = time.monotonic()
+        return ANSWER
+
+    agent.model_manager.get_response = fake_get_response
+    response = await agent._generate_response(
+        "Quais são os planos?", {}, {"name": "Ana"}, HISTORY, {"response_streamer": streamer}
+    )
+
+    assert response == ANSWER
+    assert streamer.completed
+    assert sender.sent[0][0] < finished["at"]
+    assert " ".join(message for _, message in sender.sent) == ANSWER
+    assert metrics.get_histogram("time_to_first_bubble_ms").count == 1
+
+
+@pytest.mark.asyncio
+async def test_tool_round_is_never_sent_and_final_answer_streams():
+    sender = RecordingSender()
+    agent = AgenticSDRStateless()
+    streamer = make_streamer(sender)
+    rounds = [
+        "[TOOL: knowledge.search | query=planos]",
+        ANSWER,
+    ]
+    instructions = []
+
+    async def fake_get_response(messages, system_prompt, on_delta=None, **kwargs):
+        instructions.append(messages[-1]["content"])
+        text = rounds.pop(0)
+        for delta in tokens(text):
+            await on_delta(delta)
+        return text
+
+    async def fake_execute_single_tool(*args, **kwargs):
+        return {"planos": ["Alvirrubro", "Timbu", "Náutico de Coração"]}
+
+    agent.model_manager.get_response = fake_get_response
+    agent._execute_single_tool = fake_execute_single_tool
+    await agent._generate_response(
+        "Quais são os planos?", {}, {"name": "Ana"}, HISTORY, {"response_streamer": streamer}
+    )
+
+    sent = [message for _, message in sender.sent]
+    assert not any("TOOL" in message for message in sent)
+    assert " ".join(sent) == ANSWER
+    assert len(instructions) == 2
+
+
+@pytest.mark.asyncio
+async def test_short_answer_sent_once_at_the_end():
+    sender = RecordingSender()
+    streamer = make_streamer(sender, min_chunk_length=80)
+    streamer.start_round({"name": "Ana"})
+
+    for delta in tokens("Oi, [nome]! Tudo bem?"):
+        await streamer.feed(delta)
+    assert sender.sent == []
+
+    await streamer.complete("Oi, [nome]! Tudo bem?")
+    assert [message for _, message in sender.sent] == ["Oi, Ana! Tudo bem?"]
+
+
+class FakeStreamingCompletions:
+    def __init__(self):
+        self.params = None
+
+    async def create(self, **params):
+        self.params = params
+
+        async def stream():
+            for delta in tokens(ANSWER):
+                yield types.SimpleNamespace(
+                    choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=delta))],
+                    usage=None
+                )
+            yield types.SimpleNamespace(
+                choices=[],
+                usage=types.SimpleNamespace(
+                    prompt_tokens=1200, prompt_tokens_details=types.SimpleNamespace(cached_tokens=1024)
+                )
+            )
+        return stream()
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_forwards_deltas_and_records_usage():
+    metrics.reset()
+    completions = FakeStreamingCompletions()
+    manager = ModelManager()
+    manager.primary_model = OpenAI(id="gpt-4o-mini", api_key="test")
+    manager.primary_model.client = types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=completions)
+    )
+    deltas = []
+
+    async def on_delta(delta):
+        deltas.append(delta)
+
+    response = await manager.get_response(HISTORY, system_prompt="Persona", on_delta=on_delta)
+
+    assert response == ANSWER
+    assert "".join(deltas) == ANSWER
+    assert completions.params["stream"] is True
+    assert completions.params["stream_options"] == {"include_usage": True}
+    assert metrics.get_counter("llm_cached_tokens") == 1024
+    assert metrics.get_histogram("llm_first_token_ms:gpt-4o-mini").count == 1
+
+
+@pytest.mark.asyncio
+async def test_gemini_stream_is_not_retried_after_first_delta(monkeypatch):
+    metrics.reset()
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(mm.asyncio, "sleep", lambda delay: real_sleep(0))
+    attempts = []
+
+    async def astream(messages, on_delta, system_prompt=None, context_suffix=None):
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise ResourceExhausted("quota")
+        await on_delta(ANSWER[:20])
+        raise ResourceExhausted("quota")
+
+    async def fallback_achat(messages):
+        return types.SimpleNamespace(content=ANSWER, usage=None)
+
+    manager = ModelManager()
+    manager.primary_model = Gemini(id="gemini-test", api_key="test")
+    monkeypatch.setattr(manager.primary_model, "astream", astream)
+    manager.fallback_model = types.SimpleNamespace(id="fallback", achat=fallback_achat)
+    deltas = []
+
+    async def on_delta(delta):
+        deltas.append(delta)
+
+    response = await manager.get_response(HISTORY, system_prompt="Persona", on_delta=on_delta)
+
+    # 429 antes de qualquer trecho ainda é repetido; depois do primeiro, não
+    assert attempts == [0, 1]
+    assert deltas == [ANSWER[:20]]
+    assert response == ANSWER
+
+
+@pytest.mark.asyncio
+async def test_stream_failing_after_first_chunk_sends_the_fallback_answer():
+    sender = RecordingSender()
+    agent = AgenticSDRStateless()
+    streamer = make_streamer(sender, min_chunk_length=10)
+    first_sentence = "Temos três planos de sócio para você."
+    fallback_answer = "O plano ouro inclui ingresso para todos os jogos em casa. Quer o link?"
+
+    async def astream(messages, on_delta):
+        for delta in tokens(first_sentence + " Além disso, o plano ouro inclu"):
+            await on_delta(delta)
+        raise ConnectionError("stream interrompido")
+
+    async def fallback_achat(messages):
+        return types.SimpleNamespace(content=fallback_answer, usage=None)
+
+    manager = ModelManager()
+    manager.primary_model = types.SimpleNamespace(id="primary", astream=astream)
+    manager.fallback_model = types.SimpleNamespace(id="fallback", achat=fallback_achat)
+    agent.model_manager = manager
+
+    response = await agent._generate_response(
+        "Quais são os planos?", {}, {"name": "Ana"}, HISTORY, {"response_streamer": streamer}
+    )
+
+    sent = [message for _, message in sender.sent]
+    assert response == fallback_answer
+    assert sent[0] == first_sentence
+    assert " ".join(sent[1:]) == fallback_answer
+    assert not any("inclu " in message or message.endswith("inclu") for message in sent)
+
+
+@pytest.mark.asyncio
+async def test_replaced_answer_is_sent_without_repeating_streamed_chunks():
+    sender = RecordingSender()
+    streamer = make_streamer(sender, min_chunk_length=10)
+    streamer.start_round({"name": "Ana"})
+
+    for delta in tokens("Oi, [nome]! Temos três planos. O Timbu cust"):
+        await streamer.feed(delta)
+    await streamer.complete("Oi, [nome]! Temos três planos. O Timbu custa R$ 39,90 por mês.")
+
+    assert " ".join(message for _, message in sender.sent) == (
+        "Oi, Ana! Temos três planos. O Timbu custa R$ 39,90 por mês."
+    )
@@ -0,0 +1,110 @@
+import os
+import time
+import types
+import asyncio
+
+import pytest
+
+# Variáveis mínimas para inicializar serviços
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "dummy-key")
+
+from app.api import webhooks
+from app.integrations.supabase_client import supabase_client
+
+
+# Latência simulada de cada round-trip ao PostgREST (bloqueante, como o supabase-py)
+QUERY_LATENCY = 0.1
+
+
+class BlockingQuery:
+    """Query fake que bloqueia a thread no execute(), igual ao cliente síncrono"""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+
+    def __getattr__(self, name):
+        # select/eq/order/limit/insert/update... retornam a própria query
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(QUERY_LATENCY)
+        row = {"id": f"{self.table_name}-1", "total_messages": 0, "name": "Teste"}
+        return types.SimpleNamespace(data=[row], count=1)
+
+
+class BlockingClient:
+    def table(self, name):
+        return BlockingQuery(name)
+
+
+class EchoAgent:
+    async def process_message(self, message, execution_context):
+        return "Olá! Tudo bem?", None
+
+
+@pytest.fixture
+def blocking_supabase(monkeypatch):
+    monkeypatch.setattr(supabase_client, "client", BlockingClient())
+
+    async def fake_create_agent(phone, conversation_id, media_data=None):
+        return EchoAgent(), {"phone": phone, "conversation_id": conversation_id}
+
+    async def fake_cache_conversation(*args, **kwargs):
+        return True
+
+    async def fake_send_text_message(*args, **kwargs):
+        return {"key": {"id": "sent"}}
+
+    monkeypatch.setattr(webhooks, "create_agent_with_context", fake_create_agent)
+    monkeypatch.setattr(webhooks.redis_client, "cache_conversation", fake_cache_conversation)
+    monkeypatch.setattr(webhooks.evolution_client, "send_text_message", fake_send_text_message)
+
+
+@pytest.mark.asyncio
+async def test_supabase_query_does_not_block_event_loop(blocking_supabase):
+    ticks = 0
+    done = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal ticks
+        while not done.is_set():
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    beat = asyncio.create_task(heartbeat())
+    await supabase_client.get_lead_by_phone("5581999999999")
+    done.set()
+    await beat
+
+    # Com execute() bloqueante no loop o heartbeat não rodaria durante a query
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_concurrent_process_message_with_agent_overlap(blocking_supabase):
+    phones = [f"55819999900{i:02d}" for i in range(8)]
+
+    start = time.perf_counter()
+    await webhooks.process_message_with_agent(
+        phone=phones[0],
+        message_content="Oi",
+        original_message={"key": {"id": "msg-0"}},
+        message_id="msg-0",
+    )
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        webhooks.process_message_with_agent(
+            phone=phone,
+            message_content="Oi",
+            original_message={"key": {"id": f"msg-{i}"}},
+            message_id=f"msg-{i}",
+        )
+        for i, phone in enumerate(phones)
+    ])
+    concurrent = time.perf_counter() - start
+
+    # Enfileiradas levariam ~8x o tempo de uma; sobrepostas ficam perto de 1x
+    assert concurrent < single * len(phones) / 3